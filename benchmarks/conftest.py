@@ -0,0 +1,251 @@
+"""pytest 統合のマイクロベンチマーク基盤
+
+`make bench` で計測し、`benchmarks/baselines.json` と比較して
+閾値を超えて遅くなったパスがあればテストを失敗させる。
+`make bench-update` でベースラインを書き換える。
+
+`benchmark` はウォームアップの後に繰り返し計測した 1 回あたりの中央値（ns/op）を、
+`latency_benchmark` は 1 回ずつの所要時間の分布から p99 を計測して比較する。
+
+ベースラインには、記録したマシンで固定の処理（`_calibration_workload`）にかかった時間を
+`_calibration` として一緒に残す。比較するときは同じ処理を今のマシンで測り、その比で
+ベースラインを補正するので、記録したマシンより遅い（速い）マシンでも劣化だけを検出できる。
+"""
+
+import json
+import math
+import os
+import statistics
+import time
+import timeit
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_REPEAT = 7
+CALIBRATION_REPEAT = 15
+CALIBRATION = "_calibration"
+TARGET_SECONDS_PER_REPEAT = 0.05
+DEFAULT_LATENCY_ITERATIONS = 200
+NS_PER_OP = "ns_per_op"
+P99_NS = "p99_ns"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark")
+    group.addoption(
+        "--bench-update",
+        action="store_true",
+        default=False,
+        help="計測結果でベースラインを上書きする",
+    )
+    group.addoption(
+        "--bench-threshold",
+        type=float,
+        default=None,
+        help="許容する劣化率 (0.5 = 50%%)。未指定時は BENCH_THRESHOLD 環境変数",
+    )
+
+
+def _threshold(config) -> float:
+    value = config.getoption("--bench-threshold")
+    if value is not None:
+        return value
+    return float(os.environ.get("BENCH_THRESHOLD", DEFAULT_THRESHOLD))
+
+
+def _load_baselines() -> dict:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+
+
+def measure_ns_per_op(fn: Callable[[], object], repeat: int = DEFAULT_REPEAT) -> float:
+    """ウォームアップの後、repeat 回の計測の中央値を 1 回あたりの ns で返す"""
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    if elapsed < TARGET_SECONDS_PER_REPEAT:
+        number = max(1, int(number * TARGET_SECONDS_PER_REPEAT / max(elapsed, 1e-9)))
+    # キャッシュ・遅延 import・CPU のクロックを温めてから測る
+    timer.timeit(number)
+    return statistics.median(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def _calibration_workload() -> int:
+    # マシンの速さの目安にする固定の処理（辞書・文字列・JSON と、ベンチマーク対象に近いもの）
+    data = {f"key{i}": {"id": i, "name": f"name{i}"} for i in range(50)}
+    encoded = json.dumps(data, ensure_ascii=False)
+    return len(json.loads(encoded)) + sum(len(key) for key in sorted(data))
+
+
+def measure_calibration() -> float:
+    return measure_ns_per_op(_calibration_workload, repeat=CALIBRATION_REPEAT)
+
+
+def measure_latencies_ns(fn: Callable[[], object], iterations: int) -> list[float]:
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        fn()
+        latencies.append(float(time.perf_counter_ns() - started))
+    return sorted(latencies)
+
+
+def percentile(sorted_values: list[float], ratio: float) -> float:
+    # nearest-rank 法（src/infrastructure/metrics.py と同じ定義）
+    rank = math.ceil(ratio * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+class BenchmarkSession:
+    def __init__(self, config):
+        self.config = config
+        self.threshold = _threshold(config)
+        self.update = config.getoption("--bench-update")
+        self.baselines = _load_baselines()
+        # name -> (計測値の種類, 値)
+        self.results: dict[str, tuple[str, float]] = {}
+        self._calibration: float | None = None
+
+    @property
+    def calibration(self) -> float:
+        if self._calibration is None:
+            self._calibration = measure_calibration()
+        return self._calibration
+
+    @property
+    def speed_factor(self) -> float:
+        """今のマシンがベースラインを記録したマシンの何倍遅いか（記録がなければ 1）
+
+        I/O や sleep が支配的なベンチマークは CPU の速さに比例しないので、
+        速いマシンでベースラインを縮めることはしない（1 未満は 1 に丸める）。
+        """
+        recorded = self.baselines.get(CALIBRATION, {}).get(NS_PER_OP)
+        if not recorded:
+            return 1.0
+        return max(1.0, self.calibration / recorded)
+
+    def baseline(self, name: str, key: str = NS_PER_OP) -> float | None:
+        value = self.baselines.get(name, {}).get(key)
+        return None if value is None else value * self.speed_factor
+
+    def exceeds(self, name: str, value: float, key: str = NS_PER_OP) -> bool:
+        baseline = self.baseline(name, key)
+        if self.update or baseline is None:
+            return False
+        return value > baseline * (1 + self.threshold)
+
+    def check(self, name: str, value: float, key: str = NS_PER_OP) -> None:
+        self.results[name] = (key, value)
+        if self.update:
+            return
+
+        baseline = self.baseline(name, key)
+        if baseline is None:
+            pytest.skip(f"{name}: ベースライン未登録 ({value:.0f} {_unit(key)})")
+
+        limit = baseline * (1 + self.threshold)
+        if value > limit:
+            unit = _unit(key)
+            pytest.fail(
+                f"{name}: {value:.0f} {unit} がベースライン "
+                f"{baseline:.0f} {unit}（マシンの速さで x{self.speed_factor:.2f} 補正）"
+                f"の許容値 {limit:.0f} {unit} を超過"
+            )
+
+    def write_baselines(self) -> None:
+        merged = dict(self.baselines)
+        for name, (key, value) in self.results.items():
+            merged[name] = {key: round(value, 1)}
+        merged[CALIBRATION] = {NS_PER_OP: round(self.calibration, 1)}
+        BASELINE_PATH.write_text(
+            json.dumps(merged, indent=2, sort_keys=True, ensure_ascii=False) + "\n",
+            encoding="utf-8",
+        )
+
+
+def _unit(key: str) -> str:
+    return "ns/op" if key == NS_PER_OP else "ns (p99)"
+
+
+def pytest_configure(config):
+    config._bench_session = BenchmarkSession(config)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    bench_session: BenchmarkSession = session.config._bench_session
+    if bench_session.update and bench_session.results:
+        bench_session.write_baselines()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    bench_session: BenchmarkSession = config._bench_session
+    if not bench_session.results:
+        return
+
+    terminalreporter.section("benchmark")
+    if not bench_session.update:
+        terminalreporter.write_line(
+            f"{'calibration (speed factor)':<48} "
+            f"{bench_session.speed_factor:>12.2f} x"
+        )
+    for name, (key, value) in sorted(bench_session.results.items()):
+        line = f"{name:<48} {value:>12.0f} {_unit(key)}"
+        baseline = bench_session.baseline(name, key)
+        if baseline:
+            line += f"  (x{value / baseline:.2f})"
+        terminalreporter.write_line(line)
+
+
+@pytest.fixture
+def benchmark(request) -> Callable[[str, Callable[[], object]], float]:
+    bench_session: BenchmarkSession = request.config._bench_session
+
+    def run(name: str, fn: Callable[[], object]) -> float:
+        ns_per_op = measure_ns_per_op(fn)
+        if bench_session.exceeds(name, ns_per_op):
+            # 一時的なノイズと区別するため、劣化を検出したら 1 回だけ測り直す
+            ns_per_op = min(ns_per_op, measure_ns_per_op(fn))
+        bench_session.check(name, ns_per_op)
+        return ns_per_op
+
+    return run
+
+
+@pytest.fixture
+def record_benchmark(request) -> Callable[[str, float], None]:
+    """自前で計測した ns/op をベースラインと比較する（複数プロセスでの計測など）"""
+    bench_session: BenchmarkSession = request.config._bench_session
+
+    def record(name: str, ns_per_op: float) -> None:
+        bench_session.check(name, ns_per_op)
+
+    return record
+
+
+@pytest.fixture
+def latency_benchmark(request) -> Callable[..., dict[str, float]]:
+    """fn を iterations 回呼び、p99 をベースラインと比較する（p50/p99 を返す）"""
+    bench_session: BenchmarkSession = request.config._bench_session
+
+    def run(
+        name: str,
+        fn: Callable[[], object],
+        iterations: int = DEFAULT_LATENCY_ITERATIONS,
+    ) -> dict[str, float]:
+        latencies = measure_latencies_ns(fn, iterations)
+        if bench_session.exceeds(name, percentile(latencies, 0.99), key=P99_NS):
+            retried = measure_latencies_ns(fn, iterations)
+            if percentile(retried, 0.99) < percentile(latencies, 0.99):
+                latencies = retried
+        result = {
+            "p50": percentile(latencies, 0.5),
+            "p99": percentile(latencies, 0.99),
+        }
+        bench_session.check(name, result["p99"], key=P99_NS)
+        return result
+
+    return run
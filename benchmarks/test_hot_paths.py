@@ -0,0 +1,159 @@
+"""純 Python のホットパスのマイクロベンチマーク"""
+
+import itertools
+import json
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+from src.application.register_flask_routes import _is_duplicate_event, _processed_events
+from src.application.routes.command_rate_limiter import (
+    CHEAP,
+    EXPENSIVE,
+    CommandRateLimiter,
+)
+from src.application.routes.message_router import MessageRouter
+from src.domain.models.digimon_info import DigimonInfo
+from src.domain.models.janken import JankenGame
+from src.domain.models.pokemon_info import PokemonInfo
+from src.infrastructure.line_model.zukan_button_template import (
+    create_pokemon_zukan_button_template,
+)
+from src.infrastructure.ratelimit.sliding_window import SlidingWindowLimiter
+from tests.support.mock_adapter import MockMessagingAdapter
+
+
+class NullLogger:
+    def debug(self, msg: str) -> None:
+        pass
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def warning(self, msg: str) -> None:
+        pass
+
+    def error(self, msg: str) -> None:
+        pass
+
+    def exception(self, msg: str) -> None:
+        pass
+
+
+def _make_message_event(text: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        reply_token="rtok",
+        source=SimpleNamespace(user_id="U123"),
+        message=SimpleNamespace(text=text),
+    )
+
+
+@pytest.fixture
+def message_router() -> MessageRouter:
+    line_adapter = MockMessagingAdapter()
+    router = MessageRouter(
+        line_adapter,
+        Mock(),
+        Mock(),
+        Mock(),
+        Mock(),
+        Mock(),
+        logger=NullLogger(),
+        rate_limiter=CommandRateLimiter(
+            line_adapter,
+            {
+                command_class: SlidingWindowLimiter(command_class, 10**9, 60)
+                for command_class in (CHEAP, EXPENSIVE)
+            },
+            logger=NullLogger(),
+        ),
+    )
+    return router
+
+
+@pytest.fixture
+def clean_dedup_cache():
+    _processed_events.clear()
+    yield
+    _processed_events.clear()
+
+
+def test_dedup_new_event(benchmark, clean_dedup_cache):
+    counter = itertools.count()
+
+    def run():
+        body = (
+            '{"events":[{"type":"message","webhookEventId":"ev-'
+            + str(next(counter))
+            + '"}]}'
+        )
+        _is_duplicate_event(body)
+
+    benchmark("dedup.new_event", run)
+
+
+def test_dedup_duplicate_event(benchmark, clean_dedup_cache):
+    body = json.dumps({"events": [{"type": "message", "webhookEventId": "dup"}]})
+    _is_duplicate_event(body)
+
+    benchmark("dedup.duplicate_event", lambda: _is_duplicate_event(body))
+
+
+def test_route_message_unmatched(benchmark, message_router):
+    event = _make_message_event("こんにちは")
+
+    benchmark("routing.unmatched_text", lambda: message_router.route_message(event))
+
+
+def test_route_message_janken(benchmark, message_router):
+    event = _make_message_event("じゃんけん")
+    line_adapter = message_router.line_adapter
+
+    def run():
+        message_router.route_message(event)
+        line_adapter.reset()
+
+    benchmark("routing.janken_template", run)
+
+
+def test_janken_game_play(benchmark):
+    game = JankenGame()
+
+    benchmark("domain.janken_play", lambda: game.play("✊"))
+
+
+def test_pokemon_info_from_mapping(benchmark):
+    data = {
+        "name": "ピカチュウ",
+        "types": ["electric"],
+        "image_url": "https://example.com/25.png",
+        "zukan_no": 25,
+    }
+
+    benchmark("domain.pokemon_from_mapping", lambda: PokemonInfo.from_mapping(data))
+
+
+def test_digimon_info_from_mapping(benchmark):
+    data = {
+        "id": 1,
+        "name": "Agumon",
+        "level": "Rookie",
+        "images": [{"href": "https://digi-api.com/images/digimon/w/Agumon.png"}],
+    }
+
+    benchmark("domain.digimon_from_mapping", lambda: DigimonInfo.from_mapping(data))
+
+
+def test_create_pokemon_zukan_button_template(benchmark):
+    info = PokemonInfo(
+        name="ピカチュウ",
+        types=["electric"],
+        image_url="https://example.com/25.png",
+        zukan_no=25,
+    )
+
+    benchmark(
+        "line_model.pokemon_zukan_template",
+        lambda: create_pokemon_zukan_button_template(info),
+    )
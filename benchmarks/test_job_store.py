@@ -0,0 +1,97 @@
+"""JobStore（SQLite WAL のジョブキュー）の enqueue / claim スループット計測
+
+1 プロセスでの enqueue と enqueue → claim → complete の 1 周のほか、フォークした
+4 プロセスが同じファイルに同時に enqueue / claim したときの全体のスループットを
+計測する（全プロセスの操作数 / 最も遅いプロセスの所要時間）。
+"""
+
+import multiprocessing
+import time
+
+from src.infrastructure.jobs.job_store import JobStore
+
+PROCESSES = 4
+JOBS_PER_PROCESS = 500
+PAYLOAD = {"text": "20度の服装"}
+
+
+def _enqueue_loop(path: str) -> int:
+    store = JobStore(path)
+    for _ in range(JOBS_PER_PROCESS):
+        store.enqueue("outfit", "U1", "rtok", PAYLOAD)
+    return JOBS_PER_PROCESS
+
+
+def _claim_loop(path: str) -> int:
+    store = JobStore(path)
+    claimed = 0
+    while jobs := store.claim_resumable(limit=1):
+        for job in jobs:
+            store.complete(job.id)
+            claimed += 1
+    return claimed
+
+
+def _timed(target, path: str, start, results) -> None:
+    start.wait()
+    started = time.perf_counter_ns()
+    count = target(path)
+    results.put((time.perf_counter_ns() - started, count))
+
+
+def _run_in_processes(target, path: str) -> tuple[float, int]:
+    """全プロセスで同時に target を実行し、全体での ns/op と処理件数を返す"""
+    context = multiprocessing.get_context("fork")
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=_timed, args=(target, path, start, results))
+        for _ in range(PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    start.set()
+    outcomes = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    total = sum(count for _, count in outcomes)
+    return max(elapsed for elapsed, _ in outcomes) / total, total
+
+
+def test_bench_enqueue_single_process(benchmark, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    benchmark("jobs.enqueue", lambda: store.enqueue("outfit", "U1", "rtok", PAYLOAD))
+
+
+def test_bench_enqueue_claim_complete_single_process(benchmark, tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+
+    def cycle():
+        store.enqueue("outfit", "U1", "rtok", PAYLOAD)
+        for job in store.claim_resumable(limit=1):
+            store.complete(job.id)
+
+    benchmark("jobs.enqueue_claim_complete", cycle)
+
+
+def test_bench_enqueue_multi_process(record_benchmark, tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    ns_per_op, total = _run_in_processes(_enqueue_loop, path)
+
+    assert total == PROCESSES * JOBS_PER_PROCESS
+    record_benchmark("jobs.enqueue_4_processes", ns_per_op)
+
+
+def test_bench_claim_multi_process(record_benchmark, tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    for _ in range(PROCESSES * JOBS_PER_PROCESS):
+        store.enqueue("outfit", "U1", "rtok", PAYLOAD)
+
+    ns_per_op, total = _run_in_processes(_claim_loop, path)
+
+    # どのジョブも二重に取り出されず、すべて完了していること
+    assert total == PROCESSES * JOBS_PER_PROCESS
+    assert store.counts() == {}
+    record_benchmark("jobs.claim_complete_4_processes", ns_per_op)
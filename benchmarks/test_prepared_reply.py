@@ -0,0 +1,63 @@
+"""定型返信のシリアライズコスト（SDK のモデル経由と事前シリアライズの比較）
+
+`*.sdk` は ReplyMessageRequest を組み立てて SDK と同じ手順（sanitize → json.dumps）で
+ボディを作る従来の経路、`*.prepared` はリプライトークンを差し込むだけの経路を計測する。
+"""
+
+import json
+
+import pytest
+from linebot.v3.messaging.api_client import ApiClient
+from linebot.v3.messaging.configuration import Configuration
+from linebot.v3.messaging.models import ReplyMessageRequest, TextMessage
+
+from src.infrastructure.line_model.prepared_reply import (
+    GENERAL_ERROR_TEXT,
+    MEAL_FEEDBACK_THANKS_TEXT,
+    general_error_reply,
+    janken_options_reply,
+    meal_feedback_thanks_reply,
+)
+from src.infrastructure.line_model.template_factory import janken_options_message
+
+REPLY_TOKEN = "nHuyWiB7yP5Zw52FIkcQobQuGDXCTA"
+API_CLIENT = ApiClient(Configuration(access_token="dummy-token"))
+
+
+def _sdk_body(messages_factory) -> bytes:
+    request = ReplyMessageRequest(
+        replyToken=REPLY_TOKEN,
+        messages=messages_factory(),
+        notificationDisabled=False,
+    )
+    return json.dumps(API_CLIENT.sanitize_for_serialization(request)).encode("utf-8")
+
+
+def _text(text: str):
+    return lambda: [TextMessage(text=text, quickReply=None, quoteToken=None)]
+
+
+CASES = {
+    "janken_options": (
+        lambda: [janken_options_message().message],
+        janken_options_reply,
+    ),
+    "general_error": (_text(GENERAL_ERROR_TEXT), general_error_reply),
+    "meal_feedback_thanks": (
+        _text(MEAL_FEEDBACK_THANKS_TEXT),
+        meal_feedback_thanks_reply,
+    ),
+}
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_reply_body_sdk(benchmark, case):
+    messages_factory, _ = CASES[case]
+    benchmark(f"reply_body.{case}.sdk", lambda: _sdk_body(messages_factory))
+
+
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_reply_body_prepared(benchmark, case):
+    _, prepared_factory = CASES[case]
+    prepared = prepared_factory()
+    benchmark(f"reply_body.{case}.prepared", lambda: prepared.body(REPLY_TOKEN))
@@ -0,0 +1,138 @@
+"""ローカルの LINE API スタブに対する push 配信のスループット計測
+
+個別に push_message を呼ぶ場合と LinePushDispatcher でまとめる場合を比較する。
+スタブは 1 リクエストごとに固定の遅延を入れ、LINE API の往復を模擬する。
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from linebot.v3.messaging.models import PushMessageRequest, TextMessage
+
+from src.infrastructure.adapters.line_adapter import LineMessagingAdapter
+from src.infrastructure.adapters.line_push_dispatcher import LinePushDispatcher
+from src.infrastructure.metrics import MetricsRegistry
+
+STUB_LATENCY_SECONDS = 0.002
+BROADCAST_RECIPIENTS = [f"U{i:032x}" for i in range(50)]
+CHATTY_RECIPIENTS = [f"U{i:032x}" for i in range(100, 110)]
+MESSAGES_PER_CHATTY_RECIPIENT = 3
+PUSH_RESPONSE_BODY = b'{"sentMessages": [{"id": "1", "quoteToken": "q"}]}'
+
+
+class NullLogger:
+    def debug(self, msg: str) -> None:
+        pass
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def warning(self, msg: str) -> None:
+        pass
+
+    def error(self, msg: str) -> None:
+        pass
+
+
+class StubLineApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    request_count = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        with StubLineApiHandler.lock:
+            StubLineApiHandler.request_count += 1
+        time.sleep(STUB_LATENCY_SECONDS)
+        body = PUSH_RESPONSE_BODY if self.path.endswith("/push") else b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def line_api_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubLineApiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def line_adapter(line_api_stub) -> LineMessagingAdapter:
+    adapter = LineMessagingAdapter(
+        logger=NullLogger(), metrics_registry=MetricsRegistry()
+    )
+    adapter.init("dummy-token")
+    adapter.messaging_api.line_base_path = line_api_stub
+    return adapter
+
+
+def _text(text: str) -> TextMessage:
+    return TextMessage(text=text, quickReply=None, quoteToken=None)
+
+
+def _outbound_messages() -> list[tuple[str, TextMessage]]:
+    outbound = [(user_id, _text("お知らせ")) for user_id in BROADCAST_RECIPIENTS]
+    for user_id in CHATTY_RECIPIENTS:
+        for i in range(MESSAGES_PER_CHATTY_RECIPIENT):
+            outbound.append((user_id, _text(f"{user_id} へのメッセージ {i}")))
+    return outbound
+
+
+def _send_sequentially(adapter: LineMessagingAdapter) -> None:
+    for to, message in _outbound_messages():
+        adapter.push_message(
+            PushMessageRequest(
+                to=to,
+                messages=[message],
+                notificationDisabled=False,
+                customAggregationUnits=None,
+            )
+        )
+
+
+def _send_dispatched(adapter: LineMessagingAdapter) -> None:
+    dispatcher = LinePushDispatcher(
+        adapter,
+        window_seconds=60,
+        rate_per_second=10_000,
+        logger=NullLogger(),
+        metrics_registry=MetricsRegistry(),
+    )
+    for to, message in _outbound_messages():
+        dispatcher.enqueue(to, [message])
+    dispatcher.flush()
+
+
+def _count_requests(send, adapter: LineMessagingAdapter) -> int:
+    before = StubLineApiHandler.request_count
+    send(adapter)
+    return StubLineApiHandler.request_count - before
+
+
+def test_dispatcher_reduces_request_count(line_adapter):
+    assert _count_requests(_send_sequentially, line_adapter) == 80
+    assert _count_requests(_send_dispatched, line_adapter) == 11
+
+
+def test_bench_push_sequential(benchmark, line_adapter):
+    benchmark(
+        "line.push.sequential_80_messages", lambda: _send_sequentially(line_adapter)
+    )
+
+
+def test_bench_push_dispatched(benchmark, line_adapter):
+    benchmark(
+        "line.push.dispatched_80_messages", lambda: _send_dispatched(line_adapter)
+    )
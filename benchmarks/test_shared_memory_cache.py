@@ -0,0 +1,105 @@
+"""SharedMemoryCache の読み書きスループット計測
+
+1 プロセスでの get/set を LruTtlCache と比べるほか、フォークした 4 プロセスが
+同じキャッシュに同時に get / set したときの全体のスループットを計測する
+（フォークの時間は含めず、全プロセスの操作数 / 最も遅いプロセスの所要時間）。
+"""
+
+import multiprocessing
+import time
+
+from src.domain.models.pokemon_info import PokemonInfo
+from src.infrastructure.cache.lru_ttl_cache import LruTtlCache
+from src.infrastructure.cache.shared_memory_cache import SharedMemoryCache
+
+PROCESSES = 4
+OPS_PER_PROCESS = 20000
+KEYS = [str(i) for i in range(1, 1001)]
+INFO = PokemonInfo(
+    zukan_no=25,
+    name="ピカチュウ",
+    types=["electric"],
+    image_url="https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/other/official-artwork/25.png",
+)
+
+
+def _filled(cache):
+    for key in KEYS:
+        cache.set(key, INFO)
+    return cache
+
+
+def _shared_cache() -> SharedMemoryCache[PokemonInfo]:
+    return _filled(SharedMemoryCache(max_size=1100, ttl_seconds=3600))
+
+
+def _get_loop(cache, offset: int) -> None:
+    for i in range(OPS_PER_PROCESS):
+        cache.get(KEYS[(offset + i) % len(KEYS)])
+
+
+def _set_loop(cache, offset: int) -> None:
+    for i in range(OPS_PER_PROCESS):
+        cache.set(KEYS[(offset + i) % len(KEYS)], INFO)
+
+
+def _timed(target, cache, offset: int, start, results) -> None:
+    start.wait()
+    started = time.perf_counter_ns()
+    target(cache, offset)
+    results.put(time.perf_counter_ns() - started)
+
+
+def _run_in_processes(target, cache) -> float:
+    """全プロセスで同時に target を実行し、全体での ns/op を返す"""
+    context = multiprocessing.get_context("fork")
+    start = context.Event()
+    results = context.Queue()
+    processes = [
+        context.Process(target=_timed, args=(target, cache, n * 250, start, results))
+        for n in range(PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    start.set()
+    elapsed = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    return max(elapsed) / (PROCESSES * OPS_PER_PROCESS)
+
+
+def test_bench_shared_cache_get_single_process(benchmark):
+    cache = _shared_cache()
+    benchmark("cache.shared.get", lambda: cache.get("25"))
+
+
+def test_bench_lru_cache_get_single_process(benchmark):
+    cache = _filled(LruTtlCache(max_size=1100, ttl_seconds=3600))
+    benchmark("cache.lru.get", lambda: cache.get("25"))
+
+
+def test_bench_shared_cache_set_single_process(benchmark):
+    cache = _shared_cache()
+    benchmark("cache.shared.set", lambda: cache.set("25", INFO))
+
+
+def test_bench_shared_cache_get_multi_process(record_benchmark):
+    cache = _shared_cache()
+    record_benchmark(
+        "cache.shared.get_4_processes", _run_in_processes(_get_loop, cache)
+    )
+
+
+def test_bench_shared_cache_set_multi_process(record_benchmark):
+    cache = _shared_cache()
+    record_benchmark(
+        "cache.shared.set_4_processes", _run_in_processes(_set_loop, cache)
+    )
+
+
+def test_entries_written_by_workers_are_visible_to_all():
+    cache = SharedMemoryCache(max_size=1100, ttl_seconds=3600)
+    _run_in_processes(_set_loop, cache)
+
+    assert all(cache.get(key)[0] for key in KEYS)
@@ -0,0 +1,94 @@
+"""LINE テンプレートの組み立てコスト（毎回組み立てる場合とファクトリ経由の比較）
+
+`*.validated` は毎回 pydantic の検証付きで組み立てる従来の方法、
+`*.factory` はテンプレートファクトリ経由の組み立てを計測する。
+"""
+
+import json
+
+from linebot.v3.messaging.models import ButtonsTemplate, PostbackAction, TemplateMessage
+
+from src.domain.models.pokemon_info import PokemonInfo
+from src.infrastructure.line_model.template_factory import (
+    MEAL_FEEDBACK_CHOICES,
+    build_pokemon_zukan_template,
+    janken_options_message,
+    meal_feedback_payload,
+    meal_feedback_template,
+    pokemon_zukan_message,
+)
+
+PIKACHU = PokemonInfo(
+    name="ピカチュウ",
+    types=["electric"],
+    image_url="https://example.com/25.png",
+    zukan_no=25,
+)
+
+
+def _validated_meal_feedback(pl_request_id: int) -> TemplateMessage:
+    return TemplateMessage(
+        altText="料理提案の評価をお願いします",
+        template=ButtonsTemplate(
+            title="評価",
+            text="この提案はいかがでしたか？",
+            actions=[
+                PostbackAction(
+                    label=label,
+                    data=f"meal_feedback:{pl_request_id}:{score}",
+                    displayText=None,
+                    inputOption=None,
+                    fillInText=None,
+                )
+                for label, score in MEAL_FEEDBACK_CHOICES
+            ],
+            thumbnailImageUrl=None,
+            imageAspectRatio=None,
+            imageSize=None,
+            imageBackgroundColor=None,
+            defaultAction=None,
+        ),
+        quickReply=None,
+    )
+
+
+def test_pokemon_zukan_validated(benchmark):
+    benchmark(
+        "line_model.pokemon_zukan.validated",
+        lambda: build_pokemon_zukan_template(PIKACHU).to_json(),
+    )
+
+
+def test_pokemon_zukan_factory(benchmark):
+    benchmark(
+        "line_model.pokemon_zukan.factory",
+        lambda: pokemon_zukan_message(PIKACHU).json,
+    )
+
+
+def test_meal_feedback_validated(benchmark):
+    benchmark(
+        "line_model.meal_feedback.validated",
+        lambda: _validated_meal_feedback(12345).to_json(),
+    )
+
+
+def test_meal_feedback_factory(benchmark):
+    benchmark(
+        "line_model.meal_feedback.factory",
+        lambda: meal_feedback_template(12345).to_json(),
+    )
+
+
+def test_meal_feedback_payload(benchmark):
+    benchmark(
+        "line_model.meal_feedback.payload",
+        lambda: json.dumps(meal_feedback_payload(12345)),
+    )
+
+
+def test_janken_options_factory(benchmark):
+    benchmark(
+        "line_model.janken_options.factory",
+        lambda: janken_options_message().json,
+    )
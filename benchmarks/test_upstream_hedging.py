@@ -0,0 +1,83 @@
+"""ローカルの上流スタブに対するヘッジ付き GET のテールレイテンシ計測
+
+一定割合のリクエストだけ大きく遅れるスタブを立て、ヘッジなしとありで p99 を比較する。
+"""
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.infrastructure.adapters.http_client import HedgeBudget, UpstreamHttpClient
+from src.infrastructure.circuit_breaker import CircuitBreaker
+from src.infrastructure.metrics import MetricsRegistry
+
+FAST_LATENCY_SECONDS = 0.003
+SLOW_LATENCY_SECONDS = 0.15
+SLOW_RATIO = 0.03
+WARMUP_REQUESTS = 40
+MEASURED_REQUESTS = 400
+RESPONSE_BODY = b'{"id": 25, "name": "pikachu"}'
+
+
+class StubUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StubUpstreamHandler.lock:
+            slow = StubUpstreamHandler.rng.random() < SLOW_RATIO
+        time.sleep(SLOW_LATENCY_SECONDS if slow else FAST_LATENCY_SECONDS)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def upstream_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubUpstreamHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/api/v2/pokemon/25"
+    server.shutdown()
+    server.server_close()
+
+
+def _client(hedge: HedgeBudget) -> UpstreamHttpClient:
+    registry = MetricsRegistry()
+    breaker = CircuitBreaker("stub", metrics_registry=registry)
+    return UpstreamHttpClient(breaker, hedge=hedge, metrics_registry=registry)
+
+
+def _run(latency_benchmark, name: str, client: UpstreamHttpClient, url: str):
+    for _ in range(WARMUP_REQUESTS):
+        client.get(url)
+    StubUpstreamHandler.rng.seed(0)
+    return latency_benchmark(
+        name, lambda: client.get(url), iterations=MEASURED_REQUESTS
+    )
+
+
+def test_upstream_get_without_hedging(latency_benchmark, upstream_stub):
+    client = _client(HedgeBudget(enabled=False))
+    _run(latency_benchmark, "upstream.get.unhedged", client, upstream_stub)
+
+
+def test_upstream_get_with_hedging(latency_benchmark, upstream_stub):
+    # 既定の p90 だとスタブの揺らぎだけで 1 割がヘッジ対象になり 5% の枠を
+    # 使い切って結果がぶれるため、遅延の山だけを狙う p95 で比較する
+    hedge = HedgeBudget(ratio=0.05, percentile=0.95)
+    client = _client(hedge)
+    _run(latency_benchmark, "upstream.get.hedged", client, upstream_stub)
+
+    snapshot = hedge.snapshot()
+    assert snapshot["hedges"] <= snapshot["requests"] * 0.05 + hedge.capacity
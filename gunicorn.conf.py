@@ -0,0 +1,72 @@
+"""Gunicorn の設定
+
+start.sh から `gunicorn -c gunicorn.conf.py src.app:app` で読み込む。
+ワーカー数・スレッド数・ワーカークラスは src/infrastructure/gunicorn_tuning.py が
+CPU コア数・cgroup のメモリ上限・待ち時間の割合（GUNICORN_IO_WAIT_RATIO）から決める。
+WORKERS / THREADS を指定した場合はその値を使う。
+
+GUNICORN_PRELOAD=1 ならマスターでアプリを読み込んでからフォークするため、
+重いモジュールの import はマスターで一度だけになり、ワーカーの起動が速くなる。
+
+ワーカーが SIGTERM を受けたら（新しい接続は gunicorn が受け付けなくなる）受け付け済みの
+Webhook を graceful_timeout の間に処理し終え、終了時に処理中のジョブをジョブストアへ戻して
+他のワーカーに引き継ぐ。
+"""
+
+import importlib
+import os
+import signal
+
+from src.infrastructure.gunicorn_tuning import WORKER_CLASS_GEVENT, autotune_from_env
+
+server_config = autotune_from_env()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+worker_class = server_config.gunicorn_worker_class
+workers = server_config.workers
+threads = server_config.threads
+timeout = server_config.timeout
+# 受け付け済みの Webhook が処理期限（TIMEOUT から余裕を引いた時刻）まで続けられるようにする
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", str(timeout)))
+if server_config.worker_connections is not None:
+    worker_connections = server_config.worker_connections
+preload_app = os.environ.get("GUNICORN_PRELOAD") == "1"
+
+# LINE の HTTP プールなどスレッド数を参照する設定をワーカーと揃える
+os.environ.setdefault("THREADS", str(threads))
+
+if server_config.worker_class == WORKER_CLASS_GEVENT and preload_app:
+    # マスターでアプリを読み込む前にパッチしないと、socket などが差し替わらない
+    importlib.import_module("gevent.monkey").patch_all()
+
+
+def on_starting(server):
+    server.log.info(f"Gunicorn config: {server_config.describe()}")
+
+
+def post_fork(server, worker):
+    # --preload 時はアプリ読み込み済みなので、ワーカーごとの資源だけを用意する
+    if not server.cfg.preload_app:
+        return
+    importlib.import_module("src.app").init_worker()
+
+
+def post_worker_init(worker):
+    # SIGTERM を受けた時点でジョブの取得を止める（処理中のリクエストは graceful_timeout まで続く）
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        importlib.import_module("src.infrastructure.jobs.drain").drain_state.start()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+
+def worker_abort(worker):
+    # タイムアウトで強制終了される場合も、リースの期限を待たずに引き継がせる
+    importlib.import_module("src.app").drain_worker()
+
+
+def worker_exit(server, worker):
+    importlib.import_module("src.app").drain_worker()
@@ -0,0 +1,69 @@
+"""PokeAPI を巡回し、公式アートワークと日本語名が揃っている図鑑番号の一覧を作る
+
+生成したファイルを POKEMON_ID_POOL_PATH に指定すると、ランダム表示の候補が
+検証済みの番号だけになる。
+
+    PYTHONPATH=. python scripts/build_pokemon_id_pool.py --range 1-1025 \\
+        --output pokemon_id_pool.json
+"""
+
+import argparse
+import json
+import time
+
+import requests
+
+from src.infrastructure.adapters.pokemon_id_pool import (
+    DEFAULT_ID_RANGE,
+    parse_id_ranges,
+)
+
+API_BASE = "https://pokeapi.co/api/v2"
+
+
+def is_valid(session: requests.Session, poke_id: int) -> bool:
+    resp = session.get(f"{API_BASE}/pokemon/{poke_id}", timeout=10)
+    if resp.status_code == 404:
+        return False
+    resp.raise_for_status()
+    data = resp.json()
+
+    artwork = (
+        data.get("sprites", {})
+        .get("other", {})
+        .get("official-artwork", {})
+        .get("front_default")
+    )
+    species_url = data.get("species", {}).get("url")
+    if not artwork or not species_url:
+        return False
+
+    species = session.get(species_url, timeout=10)
+    species.raise_for_status()
+    return any(
+        name.get("language", {}).get("name") == "ja"
+        for name in species.json().get("names", [])
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--range", default=DEFAULT_ID_RANGE, help="例: 1-151,252-386")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--interval", type=float, default=0.1, help="リクエスト間隔秒")
+    args = parser.parse_args()
+
+    valid: list[int] = []
+    invalid: list[int] = []
+    with requests.Session() as session:
+        for poke_id in parse_id_ranges(args.range):
+            (valid if is_valid(session, poke_id) else invalid).append(poke_id)
+            time.sleep(args.interval)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"valid": valid, "invalid": invalid}, f)
+    print(f"valid={len(valid)} invalid={len(invalid)} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
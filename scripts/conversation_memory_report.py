@@ -0,0 +1,106 @@
+"""会話履歴の持ち方ごとの、1 往復あたりのプロンプトトークン数と処理時間を比べる
+
+ぐんまちゃんとの 1 人分の会話（--turns 往復、応答は --reply-chars 文字）を流し、
+各往復で OpenAI に送るメッセージのトークン数（ローカルの見積もり）を記録する。
+
+- stateless: システムプロンプト + 今回の発言のみ（従来の動作）
+- full: これまでの全往復をそのまま含める
+- memory: ConversationMemory（直近 N 往復 + トークン予算 + 古い往復の要約）
+
+memory では履歴の取得と記録（要約の呼び出しは除く）にかかった時間も表示する。
+
+    PYTHONPATH=. python scripts/conversation_memory_report.py --turns 30
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from src.infrastructure.conversation.conversation_memory import (
+    ConversationMemory,
+    estimate_message_tokens,
+)
+
+SYSTEM_PROMPT = (
+    "あなたは群馬県のマスコットキャラクターの「ぐんまちゃん」です。ユーザーのメッセージに対して、"
+    "親しみやすく、時にはユーモアを交えて返答してください。"
+    "話を広げるように心がけ、ユーザーとの会話を楽しんでください。"
+)
+USER_MESSAGES = [
+    "こんにちは！今日は前橋に来てるよ",
+    "おすすめのお昼ごはんある？",
+    "焼きまんじゅう食べたことないんだよね",
+    "甘いのとしょっぱいのどっちが好き？",
+    "週末は草津温泉に行く予定なんだ",
+    "湯畑ってどんなところ？",
+]
+
+
+def _prompt_tokens(history: list[dict[str, str]], user_message: str) -> int:
+    return estimate_message_tokens(
+        [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            *history,
+            {"role": "user", "content": user_message},
+        ]
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--reply-chars", type=int, default=120)
+    parser.add_argument("--max-turns", type=int, default=6)
+    parser.add_argument("--token-budget", type=int, default=1200)
+    args = parser.parse_args()
+
+    reply = "ぐんまちゃんだよ！" * (args.reply_chars // 9 + 1)
+    reply = reply[: args.reply_chars]
+    summary_executor = ThreadPoolExecutor(max_workers=1)
+    memory = ConversationMemory(
+        max_turns=args.max_turns,
+        token_budget=args.token_budget,
+        summarizer=lambda previous, messages: "・前橋に来ている・焼きまんじゅうに興味"
+        "・週末は草津温泉",
+        logger=MagicMock(),
+        summary_executor=summary_executor,
+    )
+
+    tokens: dict[str, list[int]] = {"stateless": [], "full": [], "memory": []}
+    overhead_us: list[float] = []
+    full_history: list[dict[str, str]] = []
+    for n in range(args.turns):
+        user_message = USER_MESSAGES[n % len(USER_MESSAGES)]
+        tokens["stateless"].append(_prompt_tokens([], user_message))
+        tokens["full"].append(_prompt_tokens(full_history, user_message))
+
+        started = time.perf_counter()
+        history = memory.context("U1")
+        elapsed = time.perf_counter() - started
+        tokens["memory"].append(_prompt_tokens(history, user_message))
+        started = time.perf_counter()
+        memory.append("U1", user_message, reply)
+        overhead_us.append((elapsed + time.perf_counter() - started) * 1e6)
+        # 要約は別スレッドで行われるので、次の往復の前に終わらせておく
+        summary_executor.submit(lambda: None).result()
+
+        full_history += [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": reply},
+        ]
+
+    for name, values in tokens.items():
+        print(
+            f"{name:>9}: prompt tokens/turn mean={statistics.mean(values):.0f} "
+            f"last={values[-1]}"
+        )
+    print(
+        f"memory overhead/turn: median={statistics.median(overhead_us):.1f}us "
+        f"max={max(overhead_us):.1f}us"
+    )
+
+
+if __name__ == "__main__":
+    main()
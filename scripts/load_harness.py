@@ -0,0 +1,157 @@
+"""gunicorn の構成ごとのスループットを比べる負荷試験
+
+このボットと同じく処理時間の大半が上流の応答待ちになる疑似アプリ（1 リクエスト
+あたり CPU を --cpu-ms 使い、--io-ms 待つ）を gunicorn.conf.py で起動し、
+--clients 本の同時接続で --seconds 秒間リクエストを送り続ける。
+
+構成は「固定値（WORKERS=2 THREADS=4）」と「自動調整（gunicorn_tuning）」の 2 つ。
+
+    PYTHONPATH=. python scripts/load_harness.py --clients 64 --seconds 10
+"""
+
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+IO_MS = float(os.environ.get("LOAD_HARNESS_IO_MS", "100"))
+CPU_MS = float(os.environ.get("LOAD_HARNESS_CPU_MS", "5"))
+
+
+def application(environ, start_response):
+    """gunicorn から読み込まれる疑似アプリ"""
+    deadline = time.thread_time() + CPU_MS / 1000
+    while time.thread_time() < deadline:
+        pass
+    time.sleep(IO_MS / 1000)
+    body = b"ok"
+    start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "2")])
+    return [body]
+
+
+def _start_server(port: int, env_overrides: dict[str, str]) -> subprocess.Popen:
+    env = {**os.environ, **env_overrides, "PORT": str(port), "GUNICORN_PRELOAD": "0"}
+    for name in ("WORKERS", "THREADS"):
+        if name not in env_overrides:
+            env.pop(name, None)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "--pythonpath",
+            "scripts",
+            "load_harness:application",
+        ],
+        cwd=root,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+
+def _wait_until_ready(port: int, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def _drive(port: int, clients: int, seconds: float) -> dict[str, float]:
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client() -> None:
+        nonlocal errors
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local: list[float] = []
+        local_errors = 0
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                conn.request("GET", "/")
+                conn.getresponse().read()
+                local.append(time.perf_counter() - started)
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p99_index = max(0, int(len(latencies) * 0.99) - 1)
+    return {
+        "requests_per_second": len(latencies) / seconds,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[p99_index] * 1000 if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+def run(name: str, port: int, env: dict[str, str], clients: int, seconds: float):
+    server = _start_server(port, env)
+    try:
+        _wait_until_ready(port)
+        result = _drive(port, clients, seconds)
+    finally:
+        server.terminate()
+        _, stderr = server.communicate(timeout=30)
+    config_line = next(
+        (line for line in stderr.splitlines() if "Gunicorn config:" in line), ""
+    )
+    print(f"[{name}] {config_line.split('Gunicorn config: ')[-1]}")
+    print(
+        f"[{name}] {result['requests_per_second']:.1f} req/s, "
+        f"p50 {result['p50_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms, "
+        f"errors {result['errors']}"
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=18090)
+    args = parser.parse_args()
+
+    fixed = run(
+        "fixed",
+        args.port,
+        {"WORKERS": "2", "THREADS": "4"},
+        args.clients,
+        args.seconds,
+    )
+    tuned = run("autotuned", args.port + 1, {}, args.clients, args.seconds)
+    ratio = tuned["requests_per_second"] / max(fixed["requests_per_second"], 1e-9)
+    print(f"autotuned / fixed throughput: x{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    main()
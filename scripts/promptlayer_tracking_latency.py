@@ -0,0 +1,92 @@
+"""PromptLayer を有効にしたときの応答までの時間を、同期送信とバックグラウンド送信で比べる
+
+OpenAI の応答を --openai-ms、PromptLayer への記録（track.prompt / track.score）を
+--promptlayer-ms のスリープで模擬し、料理提案（生成 + プロンプトの記録）と
+料理の評価（スコアの記録）の呼び出しにかかる時間を --requests 回ずつ測る。
+
+- sync: PROMPTLAYER_ASYNC_TRACKING=0（従来どおり応答の前に記録を送る）
+- async: TelemetryExporter に積み、バックグラウンドで送る
+
+    PYTHONPATH=. python scripts/promptlayer_tracking_latency.py --requests 50
+"""
+
+import argparse
+import os
+import statistics
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from src.infrastructure.adapters.openai_adapter import OpenAIAdapter
+
+
+def _fake_promptlayer(openai_ms: float, promptlayer_ms: float) -> MagicMock:
+    def create(**kwargs):
+        time.sleep(openai_ms / 1000)
+        message = SimpleNamespace(content="肉じゃがはいかが？")
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            usage=None,
+        )
+        return (response, 1) if kwargs.get("return_pl_id") else response
+
+    def track(*args, **kwargs):
+        time.sleep(promptlayer_ms / 1000)
+        return True
+
+    client = MagicMock()
+    client.openai.OpenAI.return_value.chat.completions.create.side_effect = create
+    client.track.prompt.side_effect = track
+    client.track.score.side_effect = track
+    return client
+
+
+def _measure(adapter: OpenAIAdapter, requests: int) -> dict[str, list[float]]:
+    timings: dict[str, list[float]] = {"meal": [], "score": []}
+    for _ in range(requests):
+        started = time.perf_counter()
+        adapter.get_chatgpt_meal_suggestion()
+        timings["meal"].append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        adapter.track_score(1, 100)
+        timings["score"].append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--openai-ms", type=float, default=20)
+    parser.add_argument("--promptlayer-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    for mode, async_tracking in (("sync", "0"), ("async", "1")):
+        env = {
+            "OPENAI_API_KEY": "dummy",
+            "PROMPTLAYER_API_KEY": "dummy",
+            "PROMPTLAYER_ASYNC_TRACKING": async_tracking,
+        }
+        client = _fake_promptlayer(args.openai_ms, args.promptlayer_ms)
+        with (
+            patch.dict(os.environ, env),
+            patch(
+                "src.infrastructure.adapters.openai_adapter.PromptLayer",
+                return_value=client,
+            ),
+        ):
+            adapter = OpenAIAdapter(logger=MagicMock())
+            timings = _measure(adapter, args.requests)
+            if adapter.telemetry is not None:
+                adapter.telemetry.close(
+                    timeout=args.requests * args.promptlayer_ms * 2 / 1000
+                )
+        for name, values in timings.items():
+            print(
+                f"{mode:>5} {name:>5}: mean={statistics.mean(values):7.1f}ms "
+                f"p90={statistics.quantiles(values, n=10)[-1]:7.1f}ms "
+                f"(tracked={client.track.prompt.call_count + client.track.score.call_count})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""ローリング再起動で失われる応答の数を数えるシミュレーション
+
+フォークした --workers 個のワーカープロセスがチャットのイベントを処理する
+（OpenAI の応答待ちを --min-ms〜--max-ms のスリープで模擬し、LINE への送信は
+記録するだけ）。イベントを流している間に 1 台ずつ停止→起動を繰り返し、
+停止時は --grace-ms だけ処理中のジョブを待ってから強制終了する。
+
+- none: ジョブストアなし。猶予内に終わらなかったジョブの応答は失われる
+- checkpoint: JOB_STORE_PATH のジョブストアに記録し、終了時に手放したジョブを
+  残りのワーカーが push で届け直す
+
+    PYTHONPATH=. python scripts/rolling_restart_sim.py --events 200 --workers 3
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+from typing import Optional
+
+from src.application.usecases.reply_scheduler import ReplyScheduler
+from src.application.usecases.send_chat_response_usecase import (
+    SendChatResponseUsecase,
+)
+from src.infrastructure.jobs.drain import DrainState
+from src.infrastructure.jobs.job_resumer import JobResumer
+from src.infrastructure.jobs.job_store import JobStore
+
+
+class _RecordingLineAdapter:
+    """reply / push された本文（イベント ID）を親プロセスに送る"""
+
+    def __init__(self, deliveries):
+        self._deliveries = deliveries
+
+    def reply_message(self, request) -> None:
+        for message in request.messages:
+            self._deliveries.put(message.text)
+
+    def enqueue_push(self, to, messages) -> None:
+        for message in messages:
+            self._deliveries.put(message.text)
+
+
+class _SlowOpenAIAdapter:
+    def __init__(self, min_ms: float, max_ms: float):
+        self._min = min_ms / 1000
+        self._max = max_ms / 1000
+
+    def get_chatgpt_response(self, prompt: str) -> str:
+        time.sleep(random.uniform(self._min, self._max))
+        return prompt
+
+
+def _worker_main(args, events, deliveries, stop, store_path: Optional[str]) -> None:
+    random.seed(os.getpid())
+    store = JobStore(store_path) if store_path else None
+    line = _RecordingLineAdapter(deliveries)
+    openai = _SlowOpenAIAdapter(args.min_ms, args.max_ms)
+    scheduler = ReplyScheduler(line, job_store=store)  # type: ignore[arg-type]
+    drain = DrainState()
+    pool = ThreadPoolExecutor(max_workers=args.threads)
+    in_flight = threading.Semaphore(args.threads)
+    futures: list[Future] = []
+
+    def run(fn, *fn_args) -> None:
+        try:
+            fn(*fn_args)
+        finally:
+            in_flight.release()
+
+    def usecase() -> SendChatResponseUsecase:
+        return SendChatResponseUsecase(
+            line, openai, reply_scheduler=scheduler  # type: ignore[arg-type]
+        )
+
+    resumer = JobResumer(
+        store_provider=lambda: store, poll_seconds=0.1, threads=2, drain=drain
+    )
+    resumer.register("chat", lambda job: usecase().resume(job))
+    resumer.start()
+
+    while not stop.is_set():
+        if not in_flight.acquire(timeout=0.05):
+            continue
+        try:
+            event_id = events.get(timeout=0.05)
+        except queue.Empty:
+            in_flight.release()
+            continue
+        event = SimpleNamespace(
+            reply_token=f"token-{event_id}",
+            timestamp=int(time.time() * 1000),
+            source=SimpleNamespace(user_id=f"U{event_id}"),
+        )
+        futures.append(pool.submit(run, usecase().execute, event, event_id))
+
+    # SIGTERM 相当: 受付を止め、猶予の間だけ処理中のジョブを待つ
+    drain.start()
+    resumer.stop()
+    wait(list(futures), timeout=args.grace_ms / 1000)
+    if store is not None:
+        store.release()
+    # 猶予を過ぎたスレッドは gunicorn と同じく待たずに終了させる
+    os._exit(0)
+
+
+def _spawn(context, args, events, deliveries, store_path):
+    stop = context.Event()
+    process = context.Process(
+        target=_worker_main, args=(args, events, deliveries, stop, store_path)
+    )
+    process.start()
+    return process, stop
+
+
+def simulate(args, store_path: Optional[str]) -> dict[str, int]:
+    context = multiprocessing.get_context("fork")
+    events = context.Queue()
+    deliveries = context.Queue()
+    workers = [
+        _spawn(context, args, events, deliveries, store_path)
+        for _ in range(args.workers)
+    ]
+
+    interval = args.feed_seconds / args.events
+    restart_every = args.feed_seconds / (args.restarts + 1)
+    next_restart = time.monotonic() + restart_every
+    restarted = 0
+    for event_id in range(args.events):
+        events.put(str(event_id))
+        time.sleep(interval)
+        if restarted < args.restarts and time.monotonic() >= next_restart:
+            index = restarted % len(workers)
+            process, stop = workers[index]
+            stop.set()
+            workers[index] = _spawn(context, args, events, deliveries, store_path)
+            process.join()
+            restarted += 1
+            next_restart += restart_every
+
+    delivered: dict[str, int] = {}
+    deadline = time.monotonic() + args.settle_seconds
+    while time.monotonic() < deadline:
+        try:
+            text = deliveries.get(timeout=0.2)
+        except queue.Empty:
+            if len(delivered) == args.events:
+                break
+            continue
+        delivered[text] = delivered.get(text, 0) + 1
+
+    for process, stop in workers:
+        stop.set()
+    for process, _ in workers:
+        process.join()
+
+    return {
+        "events": args.events,
+        "restarts": restarted,
+        "delivered": len(delivered),
+        "lost": args.events - len(delivered),
+        "duplicated": sum(1 for count in delivered.values() if count > 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--restarts", type=int, default=3)
+    parser.add_argument("--feed-seconds", type=float, default=6.0)
+    parser.add_argument("--min-ms", type=float, default=200)
+    parser.add_argument("--max-ms", type=float, default=1500)
+    parser.add_argument("--grace-ms", type=float, default=500)
+    parser.add_argument("--settle-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode, store_path in (
+            ("none", None),
+            ("checkpoint", os.path.join(directory, "jobs.sqlite3")),
+        ):
+            result = simulate(args, store_path)
+            print(
+                f"{mode:>10}: events={result['events']} restarts={result['restarts']} "
+                f"delivered={result['delivered']} lost={result['lost']} "
+                f"duplicated={result['duplicated']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""アプリの起動（src.app の import）にかかる時間とメモリを計測する
+
+別プロセスで `python -X importtime -c "import src.app"` を繰り返し実行し、
+所要時間の中央値、最大 RSS、累積 import 時間の大きいモジュールを表示する。
+
+    PYTHONPATH=. python scripts/startup_benchmark.py --runs 5 --top 15
+"""
+
+import argparse
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+# 起動時に外部へ通信しないよう、ダミーの資格情報で読み込む
+DEFAULT_ENV = {
+    "LINE_CHANNEL_SECRET": "dummy-secret",
+    "LINE_CHANNEL_ACCESS_TOKEN": "dummy-token",
+    "OPENAI_API_KEY": "sk-dummy",
+    "DISABLE_STARTUP_NOTIFICATION": "1",
+    "PREFETCH_DEPTH": "0",
+}
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """`-X importtime` の出力をモジュール名 -> (累積 µs, 入れ子の深さ) にする"""
+    modules: dict[str, tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative_us, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        modules[name] = (int(cumulative_us), depth)
+    return modules
+
+
+def run_once(module: str) -> tuple[float, int, dict[str, tuple[int, int]]]:
+    env = {**os.environ, **DEFAULT_ENV}
+    env.setdefault("PYTHONPATH", ".")
+    before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - started
+    # ru_maxrss は子プロセス全体の最大値（Linux では KiB）
+    max_rss = max(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss, before)
+    return elapsed, max_rss, parse_importtime(result.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="src.app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # 1 回目は .pyc の生成やディスクキャッシュの影響を受けるので捨てる
+    run_once(args.module)
+
+    wall_times = []
+    max_rss = 0
+    cumulative: dict[str, list[int]] = {}
+    depths: dict[str, int] = {}
+    for _ in range(args.runs):
+        elapsed, rss, modules = run_once(args.module)
+        wall_times.append(elapsed)
+        max_rss = max(max_rss, rss)
+        for name, (cumulative_us, depth) in modules.items():
+            cumulative.setdefault(name, []).append(cumulative_us)
+            depths[name] = depth
+
+    total_us = statistics.median(cumulative.get(args.module, [0]))
+    print(f"module: {args.module} (runs={args.runs})")
+    print(f"wall time (median): {statistics.median(wall_times) * 1000:.0f} ms")
+    print(f"import time (median): {total_us / 1000:.0f} ms")
+    print(f"max RSS: {max_rss / 1024:.1f} MiB")
+    print()
+    print(f"top {args.top} by cumulative import time:")
+    ranked = sorted(
+        ((statistics.median(values), name) for name, values in cumulative.items()),
+        reverse=True,
+    )
+    for median_us, name in ranked[: args.top]:
+        indent = "  " * depths[name]
+        print(f"  {median_us / 1000:8.1f} ms  {indent}{name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,12 @@ from .application.usecases.send_startup_notification_usecase import (
     SendStartupNotificationUsecase,
 )
 from .infrastructure.adapters.line_adapter import LineMessagingAdapter
+from .infrastructure.jobs.drain import drain_state
+from .infrastructure.jobs.job_resumer import job_resumer
+from .infrastructure.jobs.job_store import default_job_store
 from .infrastructure.logger import create_logger
+from .infrastructure.prefetch.card_prefetcher import prefetchers
+from .infrastructure.telemetry.telemetry_exporter import close_exporters
 
 load_dotenv()
 
@@ -20,11 +25,16 @@ CHANNEL_SECRET = os.environ.get("LINE_CHANNEL_SECRET", "")
 CHANNEL_ACCESS_TOKEN = os.environ.get("LINE_CHANNEL_ACCESS_TOKEN", "")
 
 # Gunicorn 前提。ここで必要な初期化のみ行う。
+# GUNICORN_PRELOAD=1 のときはマスターで読み込まれるため、ソケットやスレッドなど
+# フォーク後に引き継げない資源は作らず、post_fork から呼ばれる init_worker に任せる。
+PRELOAD = os.environ.get("GUNICORN_PRELOAD") == "1"
+# ワーカー終了時に、ジョブ実行スレッドが処理中のジョブを待つ秒数
+JOB_DRAIN_WAIT_SECONDS = float(os.environ.get("JOB_DRAIN_WAIT_SECONDS", "2"))
 
 _line_adapter = LineMessagingAdapter(logger=logger)
 _line_adapter.init(CHANNEL_ACCESS_TOKEN)
 handler = WebhookHandler(CHANNEL_SECRET)
-bind_routes(app, handler, _line_adapter)
+bind_routes(app, handler, _line_adapter, start_background=not PRELOAD)
 
 logger.info("App initialized (module imported)")
 
@@ -63,4 +73,50 @@ def _notify_once_on_import() -> None:
         )
 
 
-_notify_once_on_import()
+def init_worker() -> None:
+    """フォーク後のワーカーでプロセスごとの資源を用意する（--preload 時のみ）"""
+    # マスターで作った HTTP プールは使わず、ワーカーごとに作り直す
+    _line_adapter.init(CHANNEL_ACCESS_TOKEN)
+    prefetchers.start_all()
+    job_resumer.start()
+    _notify_once_on_import()
+    logger.info(f"Worker initialized (pid={os.getpid()})")
+
+
+def drain_worker() -> None:
+    """ワーカー終了時に呼ぶ。ジョブの取得を止め、処理中のジョブを手放す
+
+    ジョブ実行スレッドの処理を少し待ち、待機中の push を送り切ってから、
+    まだ終わっていないジョブを pending に戻す。戻したジョブは残りのワーカー
+    （または次に起動したワーカー）が push で届ける。待っても終わらなかった
+    ジョブは、このプロセスがまだ届けるかもしれないので戻さない
+    （プロセスの終了後、リースが切れてから拾われる）。
+    """
+    drain_state.start()
+    job_resumer.stop(timeout=JOB_DRAIN_WAIT_SECONDS)
+    try:
+        _line_adapter.flush_pushes()
+    except Exception as e:
+        logger.error(f"Failed to flush pushes while draining: {e}")
+    try:
+        _line_adapter.save_profile_cache()
+    except Exception as e:
+        logger.error(f"Failed to save profile cache while draining: {e}")
+    try:
+        # 送れていない PromptLayer の記録は TELEMETRY_SPOOL_PATH に書き出す
+        close_exporters(timeout=2.0)
+    except Exception as e:
+        logger.error(f"Failed to close telemetry exporters while draining: {e}")
+
+    store = default_job_store()
+    if store is None:
+        return
+    try:
+        released = store.release(exclude=job_resumer.running_job_ids())
+        logger.info(f"Worker draining (pid={os.getpid()}): released {released} jobs")
+    except Exception as e:
+        logger.error(f"Failed to release in-flight jobs while draining: {e}")
+
+
+if not PRELOAD:
+    _notify_once_on_import()
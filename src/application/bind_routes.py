@@ -1,20 +1,39 @@
+import os
 from typing import Optional
 
 from flask import Flask
 from linebot.v3.webhook import WebhookHandler
+from linebot.v3.webhooks.models.follow_event import FollowEvent
 from linebot.v3.webhooks.models.message_event import MessageEvent
 from linebot.v3.webhooks.models.postback_event import PostbackEvent
+from linebot.v3.webhooks.models.unfollow_event import UnfollowEvent
 
+from src.application.routes.command_rate_limiter import CommandRateLimiter
+from src.application.routes.follow_router import FollowRouter
 from src.application.routes.message_router import MessageRouter
 from src.application.routes.postback_router import PostbackRouter
 from src.application.usecases.protocols import LineAdapterProtocol
+from src.application.usecases.send_chat_response_usecase import (
+    SendChatResponseUsecase,
+)
+from src.application.usecases.send_meal_usecase import SendMealUsecase
+from src.application.usecases.send_outfit_usecase import SendOutfitUsecase
 
 from ..infrastructure.adapters.digimon_adapter import DigimonApiAdapter
+from ..infrastructure.adapters.lazy_openai_adapter import LazyOpenAIAdapter
 from ..infrastructure.adapters.line_adapter import LineMessagingAdapter
-from ..infrastructure.adapters.openai_adapter import OpenAIAdapter
 from ..infrastructure.adapters.pokemon_adapter import PokemonApiAdapter
 from ..infrastructure.adapters.weather_adapter import WeatherAdapter
+from ..infrastructure.conversation.conversation_memory import ConversationMemory
+from ..infrastructure.jobs.job_resumer import job_resumer
+from ..infrastructure.line_model.digimon_button_template import (
+    create_digimon_zukan_button_template,
+)
+from ..infrastructure.line_model.zukan_button_template import (
+    create_pokemon_zukan_button_template,
+)
 from ..infrastructure.logger import Logger, create_logger
+from ..infrastructure.prefetch.card_prefetcher import CardPrefetcher, prefetchers
 from .register_flask_routes import register_routes
 
 
@@ -23,11 +42,14 @@ def bind_routes(
     handler: WebhookHandler,
     line_adapter: Optional[LineAdapterProtocol] = None,
     logger: Optional[Logger] = None,
+    start_background: bool = True,
 ) -> None:
     """Webhook ハンドラを登録する。
 
     - LineMessagingAdapter はテストで差し替え可能なように遅延生成する。
-    - OpenAI クライアントは遅延初期化される（コストの高い初期化を回避）。
+    - OpenAI クライアントは最初に使われたときに生成される（コストの高い初期化を回避）。
+    - start_background=False なら先読み・ジョブ引き継ぎのスレッドを起動しない
+      （--preload 時はフォーク後に `init_worker` から起動する）。
     """
 
     adapter_logger = logger or create_logger(__name__)
@@ -37,34 +59,92 @@ def bind_routes(
 
     from ..domain.services.janken_game_master_service import JankenGameMasterService
 
-    _openai_holder: dict = {"client": None}
+    # ルーターにはプロキシを渡し、OpenAIAdapter の生成は最初のリクエストまで遅らせる
+    _openai_adapter = LazyOpenAIAdapter(logger=adapter_logger)
     _weather_adapter = WeatherAdapter()
     _pokemon_adapter = PokemonApiAdapter()
     _digimon_adapter = DigimonApiAdapter(logger=adapter_logger)
     _janken_service = JankenGameMasterService()
 
-    def _get_openai_client():
-        if _openai_holder["client"] is None:
-            _openai_holder["client"] = OpenAIAdapter()
-        return _openai_holder["client"]
+    # ランダム図鑑の先読み。PREFETCH_DEPTH が 0（既定）なら無効
+    prefetch_depth = int(os.environ.get("PREFETCH_DEPTH", "0"))
+    _pokemon_prefetcher = None
+    _digimon_prefetcher = None
+    if prefetch_depth > 0:
+        _pokemon_prefetcher = CardPrefetcher(
+            "pokemon",
+            _pokemon_adapter.get_random_pokemon_info,
+            create_pokemon_zukan_button_template,
+            capacity=prefetch_depth,
+            logger=adapter_logger,
+        )
+        _digimon_prefetcher = CardPrefetcher(
+            "digimon",
+            _digimon_adapter.get_random_digimon_info,
+            create_digimon_zukan_button_template,
+            capacity=prefetch_depth,
+            logger=adapter_logger,
+        )
+        for prefetcher in (_pokemon_prefetcher, _digimon_prefetcher):
+            prefetchers.register(prefetcher)
+            if start_background:
+                prefetcher.start()
+
+    # ぐんまちゃんとの会話履歴。CONVERSATION_MEMORY_TURNS が 0（既定）なら使わない
+    _conversation_memory = ConversationMemory.from_env(
+        summarizer=_openai_adapter.summarize_conversation
+    )
+
+    # 終了したワーカーが残したジョブ（JOB_STORE_PATH 設定時のみ）を push で届け直す
+    job_resumer.register(
+        "chat",
+        lambda job: SendChatResponseUsecase(
+            _line_adapter, _openai_adapter, memory=_conversation_memory
+        ).resume(job),
+    )
+    job_resumer.register(
+        "meal", lambda job: SendMealUsecase(_line_adapter, _openai_adapter).resume(job)
+    )
+    job_resumer.register(
+        "outfit",
+        lambda job: SendOutfitUsecase(_line_adapter, _openai_adapter).resume(job),
+    )
+    if start_background:
+        job_resumer.start()
+
+    # メッセージとポストバックで同じ発言元の回数を数えるよう、制限は 1 つを共有する
+    _rate_limiter = CommandRateLimiter.from_env(_line_adapter, adapter_logger)
 
     # Router インスタンスを生成。Logger として adapter_logger を再利用する。
     message_router_instance = MessageRouter(
         _line_adapter,
-        _get_openai_client(),
+        _openai_adapter,
         _weather_adapter,
         _pokemon_adapter,
         _digimon_adapter,
         _janken_service,
         logger=adapter_logger,
+        rate_limiter=_rate_limiter,
+        pokemon_prefetcher=_pokemon_prefetcher,
+        digimon_prefetcher=_digimon_prefetcher,
+        conversation_memory=_conversation_memory,
     )
 
     postback_router_instance = PostbackRouter(
         _line_adapter,
-        _get_openai_client(),
+        _openai_adapter,
         _janken_service,
         logger=adapter_logger,
+        rate_limiter=_rate_limiter,
+    )
+
+    follow_router_instance = FollowRouter(
+        _line_adapter,
+        logger=adapter_logger,
+        conversation_memory=_conversation_memory,
     )
 
     handler.add(MessageEvent)(message_router_instance.route_message)
     handler.add(PostbackEvent)(postback_router_instance.route_postback)
+    handler.add(FollowEvent)(follow_router_instance.route_follow)
+    handler.add(UnfollowEvent)(follow_router_instance.route_unfollow)
@@ -2,12 +2,24 @@ import json
 import time
 from collections import OrderedDict
 
-from flask import abort, request
+from flask import abort, jsonify, request
 from linebot.v3.exceptions import InvalidSignatureError
-from linebot.v3.messaging.models import ReplyMessageRequest, TextMessage
 from linebot.v3.webhook import WebhookHandler
 
+from ..infrastructure.adapters.prompt_registry import prompt_cache_stats
+from ..infrastructure.circuit_breaker import circuit_breakers
+from ..infrastructure.deadline import deadline_scope, request_deadline
+from ..infrastructure.jobs.drain import drain_state
+from ..infrastructure.jobs.job_store import default_job_store
+from ..infrastructure.line_model.prepared_reply import (
+    general_error_reply,
+    send_prepared_reply,
+    signature_error_reply,
+    warm_prepared_replies,
+)
 from ..infrastructure.logger import create_logger
+from ..infrastructure.metrics import metrics
+from ..infrastructure.prefetch.card_prefetcher import prefetchers
 
 logger = create_logger(__name__)
 
@@ -61,11 +73,38 @@ def _is_duplicate_event(body: str) -> bool:
 
 
 def register_routes(app, handler: WebhookHandler, line_adapter):
+    # 定型の返信は起動時にシリアライズしておき、リクエスト中はトークンを差し込むだけにする
+    warm_prepared_replies()
+
     @app.route("/health", methods=["GET"])
     def health():
         logger.debug("/health endpoint called")
         return "ok", 200
 
+    @app.route("/status", methods=["GET"])
+    def status():
+        # 上流ごとのサーキットブレーカーの状態（closed / open / half_open）
+        store = default_job_store()
+        return (
+            jsonify(
+                {
+                    "circuit_breakers": circuit_breakers.snapshot(),
+                    "prefetch": prefetchers.snapshot(),
+                    "draining": drain_state.draining,
+                    "jobs": store.counts() if store else None,
+                    # チャット 1 往復あたりのプロンプトトークン数（見積もり）と生成時間
+                    "chat": metrics.summaries("chat."),
+                    # プロンプトごとの OpenAI プロンプトキャッシュのヒット率
+                    "prompt_cache": prompt_cache_stats(),
+                    # プロンプトごとの所要時間・出力トークン数（出力上限・モデルの見直し用）
+                    "openai": metrics.summaries("openai."),
+                    # 処理期限で打ち切った・短くした上流の呼び出し
+                    "deadline": metrics.snapshot("deadline."),
+                }
+            ),
+            200,
+        )
+
     @app.route("/callback", methods=["POST"])
     def callback():
         signature = request.headers.get("X-Line-Signature", "")
@@ -78,7 +117,9 @@ def register_routes(app, handler: WebhookHandler, line_adapter):
             return "OK", 200
 
         try:
-            handler.handle(body, signature)
+            # ワーカーが強制終了される前に上流の呼び出しを打ち切れるよう、期限を持たせる
+            with deadline_scope(request_deadline()):
+                handler.handle(body, signature)
             logger.debug("handler.handle succeeded")
         except InvalidSignatureError:
             logger.error("InvalidSignatureError: signature invalid")
@@ -105,18 +146,7 @@ def _handle_signature_error(body, line_adapter):
         for ev in data.get("events", []):
             reply_token = ev.get("replyToken")
             if reply_token:
-                reply_message_request = ReplyMessageRequest(
-                    replyToken=reply_token,
-                    messages=[
-                        TextMessage(
-                            text="署名検証に失敗しました。管理者に連絡してください。",
-                            quickReply=None,
-                            quoteToken=None,
-                        )
-                    ],
-                    notificationDisabled=False,
-                )
-                line_adapter.reply_message(reply_message_request)
+                send_prepared_reply(line_adapter, reply_token, signature_error_reply())
     except Exception as ex:
         logger.error(f"障害通知送信失敗: {ex}")
 
@@ -127,17 +157,6 @@ def _handle_general_error(body, line_adapter):
         for ev in data.get("events", []):
             reply_token = ev.get("replyToken")
             if reply_token:
-                reply_message_request = ReplyMessageRequest(
-                    replyToken=reply_token,
-                    messages=[
-                        TextMessage(
-                            text="現在障害が発生しています。管理者に連絡してください。",
-                            quickReply=None,
-                            quoteToken=None,
-                        )
-                    ],
-                    notificationDisabled=False,
-                )
-                line_adapter.reply_message(reply_message_request)
+                send_prepared_reply(line_adapter, reply_token, general_error_reply())
     except Exception as ex:
         logger.error(f"障害通知送信失敗: {ex}")
@@ -0,0 +1,121 @@
+"""発言元（ユーザー・グループ・トークルーム）ごとのコマンド実行回数の制限
+
+コマンドを軽いもの（じゃんけん・ポケモンなど）と重いもの（OpenAI を使うもの）に分け、
+それぞれのスライディングウィンドウで上限を超えたら、上流を呼ばずに定型文だけ返信する。
+"""
+
+import os
+from typing import Any, Optional
+
+from linebot.v3.messaging.models import ReplyMessageRequest, TextMessage
+
+from ...infrastructure.logger import Logger, create_logger
+from ...infrastructure.metrics import MetricsRegistry, metrics
+from ...infrastructure.ratelimit.shared_state import create_state_store
+from ...infrastructure.ratelimit.sliding_window import SlidingWindowLimiter
+from ..usecases.protocols import LineAdapterProtocol
+from ..usecases.reply_scheduler import event_source_id
+
+CHEAP = "cheap"
+EXPENSIVE = "expensive"
+
+COMMAND_CLASSES = {
+    "janken": CHEAP,
+    "pokemon": CHEAP,
+    "digimon": CHEAP,
+    "weather": CHEAP,
+    "meal_feedback": CHEAP,
+    "chat": EXPENSIVE,
+    "meal": EXPENSIVE,
+    "outfit": EXPENSIVE,
+}
+
+DEFAULT_LIMITS = {CHEAP: "20/60", EXPENSIVE: "5/60"}
+
+THROTTLED_MESSAGE = (
+    "ちょっと待ってね！短い時間にたくさんリクエストが来ているみたい。"
+    "少し時間をおいてからもう一度試してね。"
+)
+THROTTLED_METRIC = "ratelimit.{command_class}.throttled"
+
+
+def _parse_limit(value: str) -> tuple[int, float]:
+    """回数/秒数 形式の設定値（例: "5/60"）を解釈する"""
+    count, _, seconds = value.partition("/")
+    return int(count), float(seconds or "60")
+
+
+class CommandRateLimiter:
+    def __init__(
+        self,
+        line_adapter: LineAdapterProtocol,
+        limiters: dict[str, SlidingWindowLimiter],
+        logger: Optional[Logger] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
+    ):
+        self._line_adapter = line_adapter
+        self._limiters = limiters
+        self._logger = logger or create_logger(__name__)
+        self._metrics = metrics_registry or metrics
+
+    @classmethod
+    def from_env(
+        cls, line_adapter: LineAdapterProtocol, logger: Optional[Logger] = None
+    ) -> "CommandRateLimiter":
+        store = create_state_store(os.environ.get("RATE_LIMIT_STATE_PATH"))
+        limiters = {}
+        for command_class, default in DEFAULT_LIMITS.items():
+            limit, window_seconds = _parse_limit(
+                os.environ.get(f"RATE_LIMIT_{command_class.upper()}", default)
+            )
+            limiters[command_class] = SlidingWindowLimiter(
+                f"commands.{command_class}", limit, window_seconds, store=store
+            )
+        return cls(line_adapter, limiters, logger=logger)
+
+    def allow(self, event: Any, command: str) -> bool:
+        """実行してよければ True。超過時は定型文を返信して False を返す"""
+        source_id = event_source_id(event)
+        command_class = COMMAND_CLASSES.get(command)
+        limiter = self._limiters.get(command_class) if command_class else None
+        if source_id is None or limiter is None:
+            return True
+
+        try:
+            if limiter.hit(source_id):
+                return True
+        except Exception as e:
+            # 共有ストアの障害で全リクエストを止めないよう、制限なしで通す
+            self._logger.error(
+                f"Rate limit check failed ({type(e).__name__}): {e}; allowing"
+            )
+            return True
+
+        self._metrics.increment(THROTTLED_METRIC.format(command_class=command_class))
+        self._logger.info(f"Rate limited {command} ({command_class}) for {source_id}")
+        self._reply_throttled(event)
+        return False
+
+    def _reply_throttled(self, event: Any) -> None:
+        reply_token = getattr(event, "reply_token", None)
+        if not reply_token:
+            return
+        try:
+            self._line_adapter.reply_message(
+                ReplyMessageRequest(
+                    replyToken=reply_token,
+                    messages=[
+                        TextMessage(
+                            text=THROTTLED_MESSAGE, quickReply=None, quoteToken=None
+                        )
+                    ],
+                    notificationDisabled=False,
+                )
+            )
+        except Exception as e:
+            self._logger.error(
+                f"Failed to send throttled reply ({type(e).__name__}): {e}"
+            )
+
+
+__all__ = ["CommandRateLimiter", "COMMAND_CLASSES"]
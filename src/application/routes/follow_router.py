@@ -0,0 +1,49 @@
+from typing import Optional
+
+from ...infrastructure.logger import Logger, create_logger
+from ..usecases.protocols import ConversationMemoryProtocol, LineAdapterProtocol
+
+
+class FollowRouter:
+    """フォロー/フォロー解除イベントでユーザーのキャッシュ情報を破棄する
+
+    フォロー解除ではぐんまちゃんとの会話履歴も消す。
+    """
+
+    def __init__(
+        self,
+        line_adapter: LineAdapterProtocol,
+        logger: Optional[Logger] = None,
+        conversation_memory: Optional[ConversationMemoryProtocol] = None,
+    ):
+        self.line_adapter = line_adapter
+        self.logger = logger or create_logger(__name__)
+        self.conversation_memory = conversation_memory
+
+    def route_follow(self, event) -> None:
+        self._invalidate_profile(event, "follow")
+
+    def route_unfollow(self, event) -> None:
+        self._invalidate_profile(event, "unfollow")
+        self._forget_conversation(event)
+
+    def _forget_conversation(self, event) -> None:
+        user_id = getattr(getattr(event, "source", None), "user_id", None)
+        if not user_id or self.conversation_memory is None:
+            return
+        try:
+            self.conversation_memory.forget(user_id)
+        except Exception as e:
+            self.logger.error(f"会話履歴の削除に失敗: {e}")
+
+    def _invalidate_profile(self, event, event_type: str) -> None:
+        user_id = getattr(getattr(event, "source", None), "user_id", None)
+        if not user_id:
+            self.logger.debug(f"{event_type} event without user_id; skipping")
+            return
+
+        self.logger.info(f"{event_type} event: プロフィールキャッシュを破棄")
+        try:
+            self.line_adapter.invalidate_display_name(user_id)
+        except Exception as e:
+            self.logger.error(f"プロフィールキャッシュの破棄に失敗: {e}")
@@ -1,7 +1,10 @@
 from typing import Optional
 
+from ...infrastructure.deadline import event_deadline_scope
 from ...infrastructure.logger import Logger, create_logger
 from ..usecases.protocols import (
+    CardPrefetcherProtocol,
+    ConversationMemoryProtocol,
     DigimonAdapterProtocol,
     JankenServiceProtocol,
     LineAdapterProtocol,
@@ -16,6 +19,7 @@ from ..usecases.send_meal_usecase import SendMealUsecase
 from ..usecases.send_outfit_usecase import SendOutfitUsecase
 from ..usecases.send_pokemon_zukan_usecase import SendPokemonZukanUsecase
 from ..usecases.send_weather_usecase import SendWeatherUsecase
+from .command_rate_limiter import CommandRateLimiter
 
 
 class MessageRouter:
@@ -28,14 +32,24 @@ class MessageRouter:
         digimon_adapter: DigimonAdapterProtocol,
         janken_service: JankenServiceProtocol,
         logger: Optional[Logger] = None,
+        rate_limiter: Optional[CommandRateLimiter] = None,
+        pokemon_prefetcher: Optional[CardPrefetcherProtocol] = None,
+        digimon_prefetcher: Optional[CardPrefetcherProtocol] = None,
+        conversation_memory: Optional[ConversationMemoryProtocol] = None,
     ):
         self.line_adapter = line_adapter
         self.openai_adapter = openai_adapter
         self.weather_adapter = weather_adapter
         self.pokemon_adapter = pokemon_adapter
         self.digimon_adapter = digimon_adapter
+        self.pokemon_prefetcher = pokemon_prefetcher
+        self.digimon_prefetcher = digimon_prefetcher
+        self.conversation_memory = conversation_memory
         self.logger = logger or create_logger(__name__)
         self.janken_service = janken_service
+        self.rate_limiter = rate_limiter or CommandRateLimiter.from_env(
+            line_adapter, self.logger
+        )
 
     def route_message(self, *args, **kwargs) -> None:
         # Be permissive about the handler calling convention.
@@ -98,31 +112,64 @@ class MessageRouter:
             return self._route_chatgpt(event, text)
 
     def _route_weather(self, event, text: str) -> None:
+        if not self.rate_limiter.allow(event, "weather"):
+            return
         self.logger.info("天気リクエスト検出: usecase に委譲")
-        SendWeatherUsecase(self.line_adapter, self.weather_adapter).execute(event, text)
+        # 上流を呼ぶコマンドだけ、イベントの timestamp から決めた処理期限を引き継ぐ
+        with event_deadline_scope(event):
+            SendWeatherUsecase(self.line_adapter, self.weather_adapter).execute(
+                event, text
+            )
 
     def _route_janken(self, event) -> None:
+        if not self.rate_limiter.allow(event, "janken"):
+            return
         self.logger.info("じゃんけんテンプレートを送信 (usecase に委譲)")
         SendJankenOptionsUsecase(self.line_adapter).execute(event)
 
     def _route_meal(self, event) -> None:
+        if not self.rate_limiter.allow(event, "meal"):
+            return
         self.logger.info("今日のご飯リクエストを受信: usecase に委譲")
-        SendMealUsecase(self.line_adapter, self.openai_adapter).execute(event)
+        with event_deadline_scope(event):
+            SendMealUsecase(self.line_adapter, self.openai_adapter).execute(event)
 
     def _route_pokemon_zukan(self, event) -> None:
+        if not self.rate_limiter.allow(event, "pokemon"):
+            return
         self.logger.info("ポケモンリクエスト受信: usecase に委譲")
-        SendPokemonZukanUsecase(self.line_adapter, self.pokemon_adapter).execute(event)
+        with event_deadline_scope(event):
+            SendPokemonZukanUsecase(
+                self.line_adapter,
+                self.pokemon_adapter,
+                prefetcher=self.pokemon_prefetcher,
+            ).execute(event)
 
     def _route_digimon(self, event) -> None:
+        if not self.rate_limiter.allow(event, "digimon"):
+            return
         self.logger.info("デジモンリクエスト受信: usecase に委譲")
-        SendDigimonUsecase(self.line_adapter, self.digimon_adapter).execute(event)
+        with event_deadline_scope(event):
+            SendDigimonUsecase(
+                self.line_adapter,
+                self.digimon_adapter,
+                prefetcher=self.digimon_prefetcher,
+            ).execute(event)
 
     def _route_chatgpt(self, event, text: str) -> None:
+        if not self.rate_limiter.allow(event, "chat"):
+            return
         self.logger.info("コマンド以外のメッセージを受信: usecase に委譲")
-        SendChatResponseUsecase(self.line_adapter, self.openai_adapter).execute(
-            event, text
-        )
+        with event_deadline_scope(event):
+            SendChatResponseUsecase(
+                self.line_adapter, self.openai_adapter, memory=self.conversation_memory
+            ).execute(event, text)
 
     def _route_outfit(self, event, text: str) -> None:
+        if not self.rate_limiter.allow(event, "outfit"):
+            return
         self.logger.info("服装画像リクエストを受信: usecase に委譲")
-        SendOutfitUsecase(self.line_adapter, self.openai_adapter).execute(event, text)
+        with event_deadline_scope(event):
+            SendOutfitUsecase(self.line_adapter, self.openai_adapter).execute(
+                event, text
+            )
@@ -2,6 +2,7 @@ from typing import Optional
 
 from linebot.v3.webhooks import PostbackEvent
 
+from ...infrastructure.deadline import event_deadline_scope
 from ...infrastructure.logger import Logger, create_logger
 from ..usecases.protocols import (
     JankenServiceProtocol,
@@ -10,6 +11,7 @@ from ..usecases.protocols import (
 )
 from ..usecases.start_janken_game_usecase import StartJankenGameUsecase
 from ..usecases.track_meal_feedback_usecase import TrackMealFeedbackUsecase
+from .command_rate_limiter import CommandRateLimiter
 
 
 class PostbackRouter:
@@ -19,11 +21,15 @@ class PostbackRouter:
         openai_adapter: OpenAIAdapterProtocol,
         janken_service: JankenServiceProtocol,
         logger: Optional[Logger] = None,
+        rate_limiter: Optional[CommandRateLimiter] = None,
     ):
         self.line_adapter = line_adapter
         self.openai_adapter = openai_adapter
         self.logger = logger or create_logger(__name__)
         self.janken_service = janken_service
+        self.rate_limiter = rate_limiter or CommandRateLimiter.from_env(
+            line_adapter, self.logger
+        )
 
     def route_postback(self, *args, **kwargs) -> None:
         # Be permissive about calling convention: webhook handler may call
@@ -64,14 +70,21 @@ class PostbackRouter:
             self._route_meal_feedback_postback(event, data)
 
     def _route_meal_feedback_postback(self, event: PostbackEvent, data: str) -> None:
+        if not self.rate_limiter.allow(event, "meal_feedback"):
+            return
         usecase = TrackMealFeedbackUsecase(
             line_adapter=self.line_adapter,
             openai_adapter=self.openai_adapter,
         )
-        usecase.execute(event, data)
+        # 上流を呼ぶ処理だけ、イベントの timestamp から決めた処理期限を引き継ぐ
+        with event_deadline_scope(event):
+            usecase.execute(event, data)
 
     def _route_janken_postback(self, event: PostbackEvent) -> None:
-        StartJankenGameUsecase(
-            line_adapter=self.line_adapter,
-            janken_service=self.janken_service,
-        ).execute(event)
+        if not self.rate_limiter.allow(event, "janken"):
+            return
+        with event_deadline_scope(event):
+            StartJankenGameUsecase(
+                line_adapter=self.line_adapter,
+                janken_service=self.janken_service,
+            ).execute(event)
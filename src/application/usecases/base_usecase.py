@@ -1,19 +1,60 @@
-from typing import Optional, Sequence, Union
+from typing import Any, Optional, Sequence, Union
 
 from linebot.v3.messaging.models import Message, ReplyMessageRequest, TextMessage
 from linebot.v3.webhooks.models.message_event import MessageEvent
 from linebot.v3.webhooks.models.postback_event import PostbackEvent
 
+from ...infrastructure.jobs.job_store import Job
+from ...infrastructure.line_model.prepared_reply import (
+    PreparedReply,
+    send_prepared_reply,
+)
 from ...infrastructure.logger import Logger, create_logger
 from .protocols import LineAdapterProtocol
+from .reply_scheduler import ReplyScheduler, ReplyTicket
 
 
 class BaseUsecase:
     def __init__(
-        self, line_adapter: LineAdapterProtocol, logger: Optional[Logger] = None
+        self,
+        line_adapter: LineAdapterProtocol,
+        logger: Optional[Logger] = None,
+        reply_scheduler: Optional[ReplyScheduler] = None,
     ):
         self._line_adapter = line_adapter
         self._logger = logger or create_logger(self.__class__.__name__)
+        self._reply_scheduler = reply_scheduler or ReplyScheduler(
+            line_adapter, logger=self._logger
+        )
+
+    def _begin_reply(
+        self,
+        event: Union[MessageEvent, PostbackEvent],
+        command: str,
+        payload: Optional[dict[str, Any]] = None,
+    ) -> ReplyTicket:
+        return self._reply_scheduler.start(command, event, payload)
+
+    def _finish_reply(self, ticket: ReplyTicket) -> None:
+        """`_begin_reply` で始めた応答の終了時に呼ぶ（例外で抜ける場合も）"""
+        self._reply_scheduler.finish(ticket)
+
+    def _enqueue_reply(
+        self,
+        event: Union[MessageEvent, PostbackEvent],
+        command: str,
+        payload: dict[str, Any],
+    ) -> bool:
+        """非同期モードならジョブとして積み、True を返す（応答はジョブ実行スレッドが送る）"""
+        return self._reply_scheduler.enqueue(command, event, payload) is not None
+
+    def _resume_reply(self, job: Job) -> ReplyTicket:
+        return self._reply_scheduler.resume(job)
+
+    def _send_text(self, ticket: ReplyTicket, text: str) -> Optional[str]:
+        return ticket.deliver(
+            [TextMessage(text=text, quickReply=None, quoteToken=None)]
+        )
 
     def _validate_reply_token(self, event: Union[MessageEvent, PostbackEvent]) -> bool:
         if not event.reply_token:
@@ -34,5 +75,8 @@ class BaseUsecase:
         )
         self._line_adapter.reply_message(reply_message_request)
 
+    def _send_prepared_reply(self, reply_token: str, prepared: PreparedReply) -> None:
+        send_prepared_reply(self._line_adapter, reply_token, prepared)
+
     def _send_error_reply(self, reply_token: str, error_message: str) -> None:
         self._send_text_reply(reply_token, error_message)
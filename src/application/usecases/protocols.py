@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Optional, Protocol
+from typing import TYPE_CHECKING, Any, Optional, Protocol, Sequence
 
 if TYPE_CHECKING:
     from src.domain.models.digimon_info import DigimonInfo
@@ -10,11 +10,19 @@ class LineAdapterProtocol(Protocol):
 
     def push_message(self, push_message_request) -> None: ...
 
+    def enqueue_push(self, to: str, messages: Sequence[Any]) -> None: ...
+
     def get_display_name_from_line_profile(self, user_id: str) -> Optional[str]: ...
 
+    def get_cached_display_name(self, user_id: str) -> tuple[bool, Optional[str]]: ...
+
+    def invalidate_display_name(self, user_id: str) -> None: ...
+
 
 class OpenAIAdapterProtocol(Protocol):
-    def get_chatgpt_response(self, user_message: str) -> str: ...
+    def get_chatgpt_response(
+        self, user_message: str, history: Optional[list[dict[str, str]]] = None
+    ) -> str: ...
 
     def generate_image(self, prompt: str) -> Optional[str]: ...
 
@@ -29,6 +37,14 @@ class OpenAIAdapterProtocol(Protocol):
     ) -> bool: ...
 
 
+class ConversationMemoryProtocol(Protocol):
+    def context(self, source_id: str) -> list[dict[str, str]]: ...
+
+    def append(self, source_id: str, user_message: str, reply: str) -> None: ...
+
+    def forget(self, source_id: str) -> None: ...
+
+
 class WeatherAdapterProtocol(Protocol):
     def get_weather_text(self, location: str) -> str: ...
 
@@ -41,5 +57,9 @@ class PokemonAdapterProtocol(Protocol):
     def get_random_pokemon_info(self) -> Optional["PokemonInfo"]: ...
 
 
+class CardPrefetcherProtocol(Protocol):
+    def take(self) -> Optional[Any]: ...
+
+
 class JankenServiceProtocol(Protocol):
     def play_and_make_reply(self, user_hand_input: str, user_label: str) -> str: ...
@@ -0,0 +1,327 @@
+"""リプライトークンの有効期限を考慮した応答スケジューラ
+
+Webhook イベントの `timestamp` からリプライトークンの残り時間を求め、
+期限内なら reply、期限切れなら push にフォールバックする。
+push できないコマンドで期限が切れた場合は、それ以降の上流処理を打ち切る。
+
+ジョブストア（JOB_STORE_PATH）が設定されていれば、push できるコマンドの入力を
+処理の開始時に記録し、処理を終えたら（配信できなかった・例外で抜けた場合も）消す。
+ワーカーが途中で終了しても、残った記録から別のワーカーが `resume` で処理を
+やり直して push で届ける。
+JOB_QUEUE_COMMANDS に挙げたコマンドは Webhook の処理中には実行せず、ジョブとして
+積むだけにする（ジョブ実行スレッドが `resume` で処理し、reply か push で届ける）。
+"""
+
+import os
+import time
+from http import HTTPStatus
+from typing import Any, Callable, Optional, Sequence
+
+from linebot.v3.messaging.exceptions import ApiException
+from linebot.v3.messaging.models import (
+    Message,
+    PushMessageRequest,
+    ReplyMessageRequest,
+)
+
+from ...infrastructure.jobs.job_store import Job, JobStore, default_job_store
+from ...infrastructure.logger import Logger, create_logger
+from ...infrastructure.metrics import MetricsRegistry, metrics
+from .protocols import LineAdapterProtocol
+
+DEFAULT_REPLY_BUDGET_MS = 30000
+DEFAULT_SAFETY_MARGIN_MS = 2000
+DEFAULT_PUSH_FALLBACK_COMMANDS = "chat,meal,outfit"
+
+ON_TIME = "on_time"
+FALLBACK = "fallback"
+ABANDONED = "abandoned"
+OUTCOMES = (ON_TIME, FALLBACK, ABANDONED)
+METRIC_PREFIX = "reply."
+
+
+def _metric_name(command: str, outcome: str) -> str:
+    return f"{METRIC_PREFIX}{command}.{outcome}"
+
+
+def _event_time(event: Any) -> Optional[float]:
+    timestamp = getattr(event, "timestamp", None)
+    if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)):
+        return None
+    return timestamp / 1000
+
+
+def event_source_id(event: Any) -> Optional[str]:
+    # グループ・トークルームではユーザー個人ではなく発言元に送る
+    source = getattr(event, "source", None)
+    for attr in ("group_id", "room_id", "user_id"):
+        recipient = getattr(source, attr, None)
+        if isinstance(recipient, str) and recipient:
+            return recipient
+    return None
+
+
+class ReplyTicket:
+    """1 イベント分の応答期限と配信結果を管理する"""
+
+    def __init__(
+        self,
+        scheduler: "ReplyScheduler",
+        command: str,
+        reply_token: Optional[str],
+        recipient: Optional[str],
+        deadline: float,
+        allow_push: bool,
+        job_id: Optional[str] = None,
+    ):
+        self.command = command
+        self.reply_token = reply_token
+        self.recipient = recipient
+        self.deadline = deadline
+        self.allow_push = allow_push
+        self.job_id = job_id
+        self.outcome: Optional[str] = None
+        self._scheduler = scheduler
+
+    def remaining(self) -> float:
+        """リプライトークンを使える残り秒数（期限切れなら 0 以下）"""
+        return self.deadline - self._scheduler.clock()
+
+    @property
+    def reply_available(self) -> bool:
+        return bool(self.reply_token) and self.remaining() > 0
+
+    @property
+    def push_available(self) -> bool:
+        return self.allow_push and self.recipient is not None
+
+    def check(self) -> bool:
+        """上流処理を続ける価値があるか。配信できなければ打ち切りとして記録する"""
+        if self.outcome is not None:
+            return self.outcome != ABANDONED
+        if self.reply_available or self.push_available:
+            return True
+        self._scheduler.record(self, ABANDONED)
+        return False
+
+    def deliver(self, messages: Sequence[Message]) -> Optional[str]:
+        """残り時間に応じて reply か push で送信し、結果を返す"""
+        if self.outcome is not None:
+            return None
+
+        if self.reply_available:
+            try:
+                self._scheduler.send_reply(self, messages)
+                self._scheduler.record(self, ON_TIME)
+                return ON_TIME
+            except ApiException as e:
+                # 処理中に期限が切れたトークンは 400 で拒否されるので push に回す
+                if e.status != HTTPStatus.BAD_REQUEST or not self.push_available:
+                    raise
+                self._scheduler.logger.warning(
+                    f"reply token rejected for {self.command}; falling back to push: {e.reason}"
+                )
+
+        if self.push_available:
+            self._scheduler.send_push(self, messages)
+            self._scheduler.record(self, FALLBACK)
+            return FALLBACK
+
+        self._scheduler.record(self, ABANDONED)
+        return ABANDONED
+
+
+class ReplyScheduler:
+    def __init__(
+        self,
+        line_adapter: LineAdapterProtocol,
+        budget_seconds: Optional[float] = None,
+        safety_margin_seconds: Optional[float] = None,
+        push_fallback_commands: Optional[Sequence[str]] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
+        logger: Optional[Logger] = None,
+        clock: Callable[[], float] = time.time,
+        job_store: Optional[JobStore] = None,
+        queued_commands: Optional[Sequence[str]] = None,
+    ):
+        self._line_adapter = line_adapter
+        self._job_store = job_store or default_job_store()
+        if budget_seconds is None:
+            budget_seconds = (
+                float(os.environ.get("REPLY_TOKEN_BUDGET_MS", DEFAULT_REPLY_BUDGET_MS))
+                / 1000
+            )
+        if safety_margin_seconds is None:
+            safety_margin_seconds = (
+                float(
+                    os.environ.get(
+                        "REPLY_TOKEN_SAFETY_MARGIN_MS", DEFAULT_SAFETY_MARGIN_MS
+                    )
+                )
+                / 1000
+            )
+        if push_fallback_commands is None:
+            push_fallback_commands = os.environ.get(
+                "REPLY_PUSH_FALLBACK_COMMANDS", DEFAULT_PUSH_FALLBACK_COMMANDS
+            ).split(",")
+        if queued_commands is None:
+            queued_commands = os.environ.get("JOB_QUEUE_COMMANDS", "").split(",")
+        self.budget_seconds = budget_seconds
+        self.safety_margin_seconds = safety_margin_seconds
+        self.push_fallback_commands = frozenset(
+            command.strip() for command in push_fallback_commands if command.strip()
+        )
+        self.queued_commands = frozenset(
+            command.strip() for command in queued_commands if command.strip()
+        )
+        self.clock = clock
+        self.logger: Logger = logger or create_logger(__name__)
+        self._metrics = metrics_registry or metrics
+
+    def start(
+        self, command: str, event: Any, payload: Optional[dict[str, Any]] = None
+    ) -> ReplyTicket:
+        """payload を渡すと、push できるコマンドはジョブストアに記録する"""
+        received_at = _event_time(event)
+        if received_at is None:
+            received_at = self.clock()
+        deadline = received_at + self.budget_seconds - self.safety_margin_seconds
+        ticket = ReplyTicket(
+            self,
+            command,
+            getattr(event, "reply_token", None),
+            event_source_id(event),
+            deadline,
+            allow_push=command in self.push_fallback_commands,
+        )
+        if payload is not None and ticket.push_available:
+            ticket.job_id = self._checkpoint(ticket, payload, received_at)
+        return ticket
+
+    def finish(self, ticket: ReplyTicket) -> None:
+        """`start` で始めた処理の終了時に必ず呼び、記録が残っていれば消す
+
+        配信前に例外で抜けた場合も消す。残すとリースが切れた後に別のワーカーが
+        やり直し、応答が二重に届くことがあるため（引き継ぐのはワーカーが
+        処理の途中で終了した場合だけ）。
+        """
+        self._complete(ticket)
+
+    def enqueue(
+        self, command: str, event: Any, payload: dict[str, Any]
+    ) -> Optional[str]:
+        """非同期モードのコマンドならジョブとして積んで ID を返す。それ以外は None
+
+        積めなかった場合も None を返すので、呼び出し側はそのまま同期で処理する。
+        """
+        if command not in self.queued_commands or self._job_store is None:
+            return None
+        try:
+            job_id = self._job_store.enqueue(
+                command,
+                event_source_id(event),
+                getattr(event, "reply_token", None),
+                payload,
+                created_at=_event_time(event),
+            )
+        except Exception as e:
+            self.logger.warning(f"failed to enqueue {command} job: {e}")
+            return None
+        self._metrics.increment(f"{METRIC_PREFIX}{command}.queued")
+        return job_id
+
+    def resume(self, job: Job) -> ReplyTicket:
+        """積まれたジョブ・別のワーカーが始めたジョブを処理する。
+
+        リプライトークンはイベントを受けた時刻からの期限で判定する。
+        """
+        deadline = job.created_at + self.budget_seconds - self.safety_margin_seconds
+        return ReplyTicket(
+            self,
+            job.command,
+            job.reply_token,
+            job.recipient,
+            deadline,
+            allow_push=True,
+            job_id=job.id,
+        )
+
+    def _checkpoint(
+        self, ticket: ReplyTicket, payload: dict[str, Any], received_at: float
+    ) -> Optional[str]:
+        if self._job_store is None:
+            return None
+        try:
+            return self._job_store.checkpoint(
+                ticket.command,
+                ticket.recipient,
+                ticket.reply_token,
+                payload,
+                created_at=received_at,
+            )
+        except Exception as e:
+            # 記録できなくても応答自体は続ける（引き継ぎができなくなるだけ）
+            self.logger.warning(f"failed to checkpoint {ticket.command} job: {e}")
+            return None
+
+    def send_reply(self, ticket: ReplyTicket, messages: Sequence[Message]) -> None:
+        self._line_adapter.reply_message(
+            ReplyMessageRequest(
+                replyToken=ticket.reply_token,
+                messages=list(messages),
+                notificationDisabled=False,
+            )
+        )
+
+    def send_push(self, ticket: ReplyTicket, messages: Sequence[Message]) -> None:
+        """ジョブの記録があれば送り終えるまで待つ（失敗したら例外で記録を残す）
+
+        記録のない応答はディスパッチャに積み、同じ宛先への送信とまとめる。
+        積んだだけで記録を消すと、まとめて送る前に失敗・終了したときに応答が失われる。
+        """
+        assert ticket.recipient is not None
+        if ticket.job_id is None:
+            self._line_adapter.enqueue_push(ticket.recipient, list(messages))
+            return
+        self._line_adapter.push_message(
+            PushMessageRequest(
+                to=ticket.recipient,
+                messages=list(messages),
+                notificationDisabled=False,
+                customAggregationUnits=None,
+            )
+        )
+
+    def record(self, ticket: ReplyTicket, outcome: str) -> None:
+        ticket.outcome = outcome
+        self._metrics.increment(_metric_name(ticket.command, outcome))
+        self._complete(ticket)
+        if outcome == ABANDONED:
+            self.logger.warning(
+                f"reply token for {ticket.command} expired; abandoning work"
+            )
+        elif outcome == FALLBACK:
+            self.logger.info(f"reply token for {ticket.command} expired; sent via push")
+
+    def _complete(self, ticket: ReplyTicket) -> None:
+        job_id = ticket.job_id
+        if job_id is None or self._job_store is None:
+            return
+        ticket.job_id = None
+        try:
+            self._job_store.complete(job_id)
+        except Exception as e:
+            self.logger.warning(f"failed to complete job {job_id}: {e}")
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """コマンドごとの on_time / fallback / abandoned 件数"""
+        result: dict[str, dict[str, int]] = {}
+        for name, count in self._metrics.snapshot(METRIC_PREFIX).items():
+            command, _, outcome = name[len(METRIC_PREFIX) :].rpartition(".")
+            if outcome not in OUTCOMES:
+                continue
+            result.setdefault(command, dict.fromkeys(OUTCOMES, 0))[outcome] = count
+        return result
+
+
+__all__ = ["ReplyScheduler", "ReplyTicket", "event_source_id"]
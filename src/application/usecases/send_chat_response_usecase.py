@@ -1,10 +1,27 @@
+import time
 from typing import Optional
 
 from linebot.v3.webhooks.models.message_event import MessageEvent
 
+from ...infrastructure.conversation.conversation_memory import (
+    estimate_message_tokens,
+)
+from ...infrastructure.jobs.job_store import Job
 from ...infrastructure.logger import Logger
+from ...infrastructure.metrics import MetricsRegistry, metrics
 from .base_usecase import BaseUsecase
-from .protocols import LineAdapterProtocol, OpenAIAdapterProtocol
+from .protocols import (
+    ConversationMemoryProtocol,
+    LineAdapterProtocol,
+    OpenAIAdapterProtocol,
+)
+from .reply_scheduler import FALLBACK, ON_TIME, ReplyScheduler, ReplyTicket
+
+# 1 往復ごとに、送った履歴と発言のトークン数（見積もり）と応答の生成時間を記録する
+PROMPT_TOKENS_METRIC = "chat.prompt_tokens"
+LATENCY_METRIC = "chat.latency_seconds"
+
+FAILURE_MESSAGE = "申し訳ないです。応答を生成できませんでした。管理者に OPENAI_API_KEY の設定を確認してもらってください。"
 
 
 class SendChatResponseUsecase(BaseUsecase):
@@ -13,27 +30,85 @@ class SendChatResponseUsecase(BaseUsecase):
         line_adapter: LineAdapterProtocol,
         openai_adapter: OpenAIAdapterProtocol,
         logger: Optional[Logger] = None,
+        reply_scheduler: Optional[ReplyScheduler] = None,
+        memory: Optional[ConversationMemoryProtocol] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
     ):
-        super().__init__(line_adapter, logger)
+        super().__init__(line_adapter, logger, reply_scheduler)
         self._openai_adapter = openai_adapter
+        self._memory = memory
+        self._metrics = metrics_registry or metrics
 
     def execute(self, event: MessageEvent, user_message: str) -> None:
         if not self._validate_reply_token(event):
             return
 
+        if self._enqueue_reply(event, "chat", {"user_message": user_message}):
+            return
+
+        ticket = self._begin_reply(event, "chat", {"user_message": user_message})
+        try:
+            self._respond(ticket, user_message)
+        finally:
+            self._finish_reply(ticket)
+
+    def resume(self, job: Job) -> None:
+        """ジョブキューから取り出したジョブ・終了したワーカーから引き継いだジョブを処理する"""
+        self._respond(self._resume_reply(job), job.payload["user_message"])
+
+    def _respond(self, ticket: ReplyTicket, user_message: str) -> None:
+        if not ticket.check():
+            return
+
         try:
-            response_text = self._get_response(user_message)
-            if event.reply_token:
-                self._send_text_reply(event.reply_token, response_text)
+            history = self._history(ticket)
+            response_text = self._get_response(user_message, history)
+            outcome = self._send_text(ticket, response_text)
+            if response_text != FAILURE_MESSAGE and outcome in (ON_TIME, FALLBACK):
+                self._remember(ticket, user_message, response_text)
         except Exception as e:
             self._logger.exception(f"チャット応答の送信中にエラーが発生: {e}")
 
-    def _get_response(self, user_message: str) -> str:
+    def _history(self, ticket: ReplyTicket) -> list[dict[str, str]]:
+        if self._memory is None or ticket.recipient is None:
+            return []
+        try:
+            return self._memory.context(ticket.recipient)
+        except Exception as e:
+            self._logger.warning(f"会話履歴の取得に失敗: {e}")
+            return []
+
+    def _remember(self, ticket: ReplyTicket, user_message: str, reply: str) -> None:
+        if self._memory is None or ticket.recipient is None:
+            return
+        try:
+            # 要約が必要なら OpenAI を呼ぶため、応答を送った後に記録する
+            self._memory.append(ticket.recipient, user_message, reply)
+        except Exception as e:
+            self._logger.warning(f"会話履歴の記録に失敗: {e}")
+
+    def _get_response(
+        self, user_message: str, history: Optional[list[dict[str, str]]] = None
+    ) -> str:
+        self._metrics.observe(
+            PROMPT_TOKENS_METRIC,
+            estimate_message_tokens(
+                [*(history or []), {"role": "user", "content": user_message}]
+            ),
+        )
+        started = time.monotonic()
         try:
-            response = self._openai_adapter.get_chatgpt_response(user_message)
+            if history:
+                response = self._openai_adapter.get_chatgpt_response(
+                    user_message, history
+                )
+            else:
+                response = self._openai_adapter.get_chatgpt_response(user_message)
             if response:
                 return response
         except Exception as e:
             self._logger.error(f"ChatGPT応答の取得に失敗: {e}")
+        finally:
+            self._metrics.observe(LATENCY_METRIC, time.monotonic() - started)
 
-        return "申し訳ないです。応答を生成できませんでした。管理者に OPENAI_API_KEY の設定を確認してもらってください。"
+        return FAILURE_MESSAGE
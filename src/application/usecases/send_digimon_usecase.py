@@ -1,3 +1,5 @@
+from typing import Optional
+
 from linebot.v3.webhooks.models.message_event import MessageEvent
 
 from ...domain.models.digimon_info import DigimonInfo
@@ -5,7 +7,12 @@ from ...infrastructure.line_model.digimon_button_template import (
     create_digimon_zukan_button_template,
 )
 from .base_usecase import BaseUsecase
-from .protocols import DigimonAdapterProtocol, LineAdapterProtocol
+from .protocols import (
+    CardPrefetcherProtocol,
+    DigimonAdapterProtocol,
+    LineAdapterProtocol,
+)
+from .reply_scheduler import ReplyTicket
 
 
 class SendDigimonUsecase(BaseUsecase):
@@ -13,9 +20,11 @@ class SendDigimonUsecase(BaseUsecase):
         self,
         line_adapter: LineAdapterProtocol,
         digimon_adapter: DigimonAdapterProtocol,
+        prefetcher: Optional[CardPrefetcherProtocol] = None,
     ):
         super().__init__(line_adapter)
         self.digimon_adapter = digimon_adapter
+        self.prefetcher = prefetcher
 
     def execute(self, event: MessageEvent) -> None:
         self._logger.info("デジモンリクエスト受信。図鑑風情報を返信")
@@ -23,28 +32,29 @@ class SendDigimonUsecase(BaseUsecase):
         if not self._validate_reply_token(event):
             return
 
+        ticket = self._begin_reply(event, "digimon")
+        if not ticket.check():
+            return
+
+        card = self.prefetcher.take() if self.prefetcher else None
+        if card is not None:
+            # 先読み済みのテンプレートをそのまま返信し、上流の待ち時間をなくす
+            ticket.deliver([card.message])
+            return
+
         info = self.digimon_adapter.get_random_digimon_info()
         if not info:
-            if event.reply_token:
-                self._send_error_reply(
-                    event.reply_token, "デジモン図鑑情報の取得に失敗しました。"
-                )
+            self._send_text(ticket, "デジモン図鑑情報の取得に失敗しました。")
             return
 
-        self._send_digimon_zukan_message(event, info)
+        self._send_digimon_zukan_message(ticket, info)
 
     def _send_digimon_zukan_message(
-        self, event: MessageEvent, info: DigimonInfo
+        self, ticket: ReplyTicket, info: DigimonInfo
     ) -> None:
-        reply_token = event.reply_token
-        if not reply_token:
-            return
-
         try:
             candidate = create_digimon_zukan_button_template(info)
-            self._send_reply(reply_token, [candidate])
+            ticket.deliver([candidate])
         except Exception as e:
             self._logger.error(f"デジモンメッセージ送信エラー: {e}")
-            self._send_error_reply(
-                reply_token, "デジモン図鑑情報の取得に失敗しました。"
-            )
+            self._send_text(ticket, "デジモン図鑑情報の取得に失敗しました。")
@@ -1,10 +1,6 @@
-from linebot.v3.messaging.models import (
-    ButtonsTemplate,
-    PostbackAction,
-    TemplateMessage,
-)
 from linebot.v3.webhooks.models.message_event import MessageEvent
 
+from ...infrastructure.line_model.prepared_reply import janken_options_reply
 from .base_usecase import BaseUsecase
 from .protocols import LineAdapterProtocol
 
@@ -17,40 +13,5 @@ class SendJankenOptionsUsecase(BaseUsecase):
         self._validate_reply_token(event)
         if not event.reply_token:
             return
-        template = TemplateMessage(
-            altText="じゃんけんしましょう！",
-            template=ButtonsTemplate(
-                title="じゃんけん",
-                text="どれを出しますか？",
-                actions=[
-                    PostbackAction(
-                        label="✊ グー",
-                        data="janken:✊",
-                        displayText=None,
-                        inputOption=None,
-                        fillInText=None,
-                    ),
-                    PostbackAction(
-                        label="✌️ チョキ",
-                        data="janken:✌️",
-                        displayText=None,
-                        inputOption=None,
-                        fillInText=None,
-                    ),
-                    PostbackAction(
-                        label="✋ パー",
-                        data="janken:✋",
-                        displayText=None,
-                        inputOption=None,
-                        fillInText=None,
-                    ),
-                ],
-                thumbnailImageUrl=None,
-                imageAspectRatio=None,
-                imageSize=None,
-                imageBackgroundColor=None,
-                defaultAction=None,
-            ),
-            quickReply=None,
-        )
-        self._send_reply(event.reply_token, [template])
+        # 選択肢は固定なので、シリアライズ済みの返信を使い回す
+        self._send_prepared_reply(event.reply_token, janken_options_reply())
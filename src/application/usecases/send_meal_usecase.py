@@ -1,16 +1,13 @@
 from typing import Optional, cast
 
-from linebot.v3.messaging.models import (
-    ButtonsTemplate,
-    Message,
-    PostbackAction,
-    TemplateMessage,
-    TextMessage,
-)
+from linebot.v3.messaging.models import Message, TemplateMessage, TextMessage
 from linebot.v3.webhooks.models.message_event import MessageEvent
 
+from ...infrastructure.jobs.job_store import Job
+from ...infrastructure.line_model.template_factory import meal_feedback_template
 from .base_usecase import BaseUsecase
 from .protocols import LineAdapterProtocol, OpenAIAdapterProtocol
+from .reply_scheduler import ReplyScheduler, ReplyTicket
 
 
 class SendMealUsecase(BaseUsecase):
@@ -18,8 +15,9 @@ class SendMealUsecase(BaseUsecase):
         self,
         line_adapter: LineAdapterProtocol,
         openai_adapter: OpenAIAdapterProtocol,
+        reply_scheduler: Optional[ReplyScheduler] = None,
     ):
-        super().__init__(line_adapter)
+        super().__init__(line_adapter, reply_scheduler=reply_scheduler)
         self._openai_adapter = openai_adapter
 
     def execute(self, event: MessageEvent) -> None:
@@ -28,10 +26,27 @@ class SendMealUsecase(BaseUsecase):
             self._logger.warning("reply_tokenが存在しないため、応答をスキップします")
             return
 
+        if self._enqueue_reply(event, "meal", {}):
+            return
+
+        ticket = self._begin_reply(event, "meal", {})
+        try:
+            self._respond(ticket)
+        finally:
+            self._finish_reply(ticket)
+
+    def resume(self, job: Job) -> None:
+        """ジョブキューから取り出したジョブ・終了したワーカーから引き継いだジョブを処理する"""
+        self._respond(self._resume_reply(job))
+
+    def _respond(self, ticket: ReplyTicket) -> None:
+        if not ticket.check():
+            return
+
         try:
             suggestion, pl_request_id = self._get_meal_suggestion()
             messages = self._create_messages(suggestion, pl_request_id)
-            self._send_reply(reply_token, cast(list[Message], messages))
+            ticket.deliver(cast(list[Message], messages))
         except Exception as e:
             self._logger.exception(f"料理提案の送信中にエラーが発生: {e}")
 
@@ -68,39 +83,4 @@ class SendMealUsecase(BaseUsecase):
         return messages
 
     def _create_feedback_template(self, pl_request_id: int) -> TemplateMessage:
-        return TemplateMessage(
-            altText="料理提案の評価をお願いします",
-            template=ButtonsTemplate(
-                title="評価",
-                text="この提案はいかがでしたか？",
-                actions=[
-                    PostbackAction(
-                        label="😊 良い",
-                        data=f"meal_feedback:{pl_request_id}:100",
-                        displayText=None,
-                        inputOption=None,
-                        fillInText=None,
-                    ),
-                    PostbackAction(
-                        label="😐 普通",
-                        data=f"meal_feedback:{pl_request_id}:50",
-                        displayText=None,
-                        inputOption=None,
-                        fillInText=None,
-                    ),
-                    PostbackAction(
-                        label="😞 悪い",
-                        data=f"meal_feedback:{pl_request_id}:0",
-                        displayText=None,
-                        inputOption=None,
-                        fillInText=None,
-                    ),
-                ],
-                thumbnailImageUrl=None,
-                imageAspectRatio=None,
-                imageSize=None,
-                imageBackgroundColor=None,
-                defaultAction=None,
-            ),
-            quickReply=None,
-        )
+        return meal_feedback_template(pl_request_id)
@@ -6,15 +6,20 @@ from zoneinfo import ZoneInfo
 from linebot.v3.messaging.models import ImageMessage
 from linebot.v3.webhooks.models.message_event import MessageEvent
 
+from ...infrastructure.jobs.job_store import Job
 from .base_usecase import BaseUsecase
 from .protocols import LineAdapterProtocol, OpenAIAdapterProtocol
+from .reply_scheduler import ReplyScheduler, ReplyTicket
 
 
 class SendOutfitUsecase(BaseUsecase):
     def __init__(
-        self, line_adapter: LineAdapterProtocol, openai_adapter: OpenAIAdapterProtocol
+        self,
+        line_adapter: LineAdapterProtocol,
+        openai_adapter: OpenAIAdapterProtocol,
+        reply_scheduler: Optional[ReplyScheduler] = None,
     ):
-        super().__init__(line_adapter)
+        super().__init__(line_adapter, reply_scheduler=reply_scheduler)
         self._openai_adapter = openai_adapter
 
     def execute(self, event: MessageEvent, text: str) -> None:
@@ -22,25 +27,38 @@ class SendOutfitUsecase(BaseUsecase):
         if not event.reply_token:
             return
 
+        if self._enqueue_reply(event, "outfit", {"text": text}):
+            return
+
+        ticket = self._begin_reply(event, "outfit", {"text": text})
+        try:
+            self._respond(ticket, text)
+        finally:
+            self._finish_reply(ticket)
+
+    def resume(self, job: Job) -> None:
+        """ジョブキューから取り出したジョブ・終了したワーカーから引き継いだジョブを処理する"""
+        self._respond(self._resume_reply(job), job.payload["text"])
+
+    def _respond(self, ticket: ReplyTicket, text: str) -> None:
         temp = self._parse_temperature(text or "")
         if temp is None:
-            self._send_text_reply(
-                event.reply_token, "温度指定が見つかりませんでした。例: 20度の服装"
-            )
+            self._send_text(ticket, "温度指定が見つかりませんでした。例: 20度の服装")
             return
 
         now = datetime.datetime.now(ZoneInfo("Asia/Tokyo"))
         requirements = self._build_outfit_requirements(temp, now.month)
 
-        image_url = self._generate_outfit_image(requirements)
+        image_url = self._generate_outfit_image(ticket, requirements)
+        if not ticket.check():
+            return
         if not image_url:
-            self._send_text_reply(
-                event.reply_token,
-                "画像の生成に失敗しました。後でもう一度お試しください。",
+            self._send_text(
+                ticket, "画像の生成に失敗しました。後でもう一度お試しください。"
             )
             return
 
-        self._reply_with_image(event.reply_token, image_url)
+        self._reply_with_image(ticket, image_url)
 
     def _parse_temperature(self, text: str) -> Optional[int]:
         m = re.search(r"(\d{1,2})\s*度の服装", text)
@@ -51,20 +69,25 @@ class SendOutfitUsecase(BaseUsecase):
         except ValueError:
             return None
 
-    def _reply_with_image(self, reply_token: str, image_url: str) -> None:
+    def _reply_with_image(self, ticket: ReplyTicket, image_url: str) -> None:
         image_message = ImageMessage(
             originalContentUrl=image_url,
             previewImageUrl=image_url,
             quickReply=None,
         )
-        self._send_reply(reply_token, [image_message])
+        ticket.deliver([image_message])
 
     def _build_outfit_requirements(self, temperature: int, month: int) -> str:
         return f"アラサーの日本人男性と日本人女性に適した、{month}月の雰囲気に合う摂氏{temperature}度の服装コーディネート。キレイ目のファッション。"
 
-    def _generate_outfit_image(self, requirements: str) -> Optional[str]:
+    def _generate_outfit_image(
+        self, ticket: ReplyTicket, requirements: str
+    ) -> Optional[str]:
         try:
             image_prompt = self._openai_adapter.generate_image_prompt(requirements)
+            # 画像生成は最も時間がかかるため、届けられない場合は呼ばない
+            if not ticket.check():
+                return None
             return self._openai_adapter.generate_image(image_prompt)
         except Exception:
             return None
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from linebot.v3.webhooks.models.message_event import MessageEvent
 
 from ...domain.models.pokemon_info import PokemonInfo
@@ -5,7 +7,12 @@ from ...infrastructure.line_model.zukan_button_template import (
     create_pokemon_zukan_button_template,
 )
 from .base_usecase import BaseUsecase
-from .protocols import LineAdapterProtocol, PokemonAdapterProtocol
+from .protocols import (
+    CardPrefetcherProtocol,
+    LineAdapterProtocol,
+    PokemonAdapterProtocol,
+)
+from .reply_scheduler import ReplyTicket
 
 
 class SendPokemonZukanUsecase(BaseUsecase):
@@ -13,9 +20,11 @@ class SendPokemonZukanUsecase(BaseUsecase):
         self,
         line_adapter: LineAdapterProtocol,
         pokemon_adapter: PokemonAdapterProtocol,
+        prefetcher: Optional[CardPrefetcherProtocol] = None,
     ):
         super().__init__(line_adapter)
         self.pokemon_adapter = pokemon_adapter
+        self.prefetcher = prefetcher
 
     def execute(self, event: MessageEvent) -> None:
         self._logger.info("ポケモンリクエスト受信。図鑑風情報を返信")
@@ -25,27 +34,29 @@ class SendPokemonZukanUsecase(BaseUsecase):
             self._logger.warning("reply_tokenが存在しないため、応答をスキップします")
             return
 
+        ticket = self._begin_reply(event, "pokemon")
+        if not ticket.check():
+            return
+
+        card = self.prefetcher.take() if self.prefetcher else None
+        if card is not None:
+            # 先読み済みのテンプレートをそのまま返信し、上流の待ち時間をなくす
+            ticket.deliver([card.message])
+            return
+
         info = self.pokemon_adapter.get_random_pokemon_info()
         if not info:
-            self._send_error_reply(
-                reply_token, "ポケモン図鑑情報の取得に失敗しました。"
-            )
+            self._send_text(ticket, "ポケモン図鑑情報の取得に失敗しました。")
             return
 
-        self._send_pokemon_zukan_message(event, info)
+        self._send_pokemon_zukan_message(ticket, info)
 
     def _send_pokemon_zukan_message(
-        self, event: MessageEvent, info: PokemonInfo
+        self, ticket: ReplyTicket, info: PokemonInfo
     ) -> None:
-        reply_token = event.reply_token
-        if not reply_token:
-            return
-
         try:
             candidate = create_pokemon_zukan_button_template(info)
-            self._send_reply(reply_token, [candidate])
+            ticket.deliver([candidate])
         except Exception as e:
             self._logger.error(f"ポケモンメッセージ送信エラー: {e}")
-            self._send_error_reply(
-                reply_token, "ポケモン図鑑情報の取得に失敗しました。"
-            )
+            self._send_text(ticket, "ポケモン図鑑情報の取得に失敗しました。")
@@ -17,10 +17,15 @@ class SendWeatherUsecase(BaseUsecase):
 
     def execute(self, event: MessageEvent, text: str) -> None:
         self._validate_reply_token(event)
+        if not event.reply_token:
+            return
+
+        ticket = self._begin_reply(event, "weather")
+        if not ticket.check():
+            return
 
         reply_text = self._get_weather_reply_text(text)
-        if event.reply_token:
-            self._send_text_reply(event.reply_token, reply_text)
+        self._send_text(ticket, reply_text)
 
     def _get_weather_reply_text(self, text: str) -> str:
         t = text.strip()
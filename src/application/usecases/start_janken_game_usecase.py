@@ -1,19 +1,42 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import Optional
 
 from linebot.v3.webhooks.models.postback_event import PostbackEvent
 
+from ...infrastructure.deadline import run_with_deadline
+from ...infrastructure.metrics import MetricsRegistry, metrics
 from .base_usecase import BaseUsecase
 from .protocols import JankenServiceProtocol, LineAdapterProtocol
 
+DEFAULT_USER_LABEL = "あなた"
+
+# スレッドは最初の submit 時に生成されるため、import 時(fork 前)に作っても安全
+_profile_executor = ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix="janken-profile"
+)
+
 
 class StartJankenGameUsecase(BaseUsecase):
+    PROFILE_LOOKUP_METRIC = "janken.profile_lookup"
+    PROFILE_FALLBACK_METRIC = "janken.profile_lookup.fallback"
+
     def __init__(
         self,
         line_adapter: LineAdapterProtocol,
         janken_service: JankenServiceProtocol,
+        profile_timeout_seconds: Optional[float] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
     ):
         super().__init__(line_adapter)
         self._janken_service = janken_service
+        self._profile_timeout_seconds = (
+            profile_timeout_seconds
+            if profile_timeout_seconds is not None
+            else float(os.environ.get("JANKEN_PROFILE_TIMEOUT_MS", "150")) / 1000
+        )
+        self._metrics = metrics_registry or metrics
 
     def execute(self, event: PostbackEvent) -> None:
         reply_token = event.reply_token
@@ -26,8 +49,9 @@ class StartJankenGameUsecase(BaseUsecase):
             return
 
         try:
+            profile_future = self._start_profile_lookup(event)
             user_hand_input = self._extract_user_hand(event.postback.data)
-            user_label = self._get_user_label(event)
+            user_label = self._resolve_user_label(profile_future)
             reply_text = self._play_game(user_hand_input, user_label)
             self._send_text_reply(reply_token, reply_text)
         except Exception as e:
@@ -36,16 +60,57 @@ class StartJankenGameUsecase(BaseUsecase):
     def _extract_user_hand(self, postback_data: str) -> str:
         return postback_data.split(":", 1)[1]
 
-    def _get_user_label(self, event: PostbackEvent) -> str:
+    def _start_profile_lookup(
+        self, event: PostbackEvent
+    ) -> Optional[Future[Optional[str]]]:
         if not event.source:
-            return "あなた"
+            return None
 
         user_id = getattr(event.source, "user_id", None)
         if not user_id:
-            return "あなた"
+            return None
+
+        self._metrics.increment(self.PROFILE_LOOKUP_METRIC)
+        # キャッシュに載っていればスレッドプールを通さずに返す
+        # （遅い問い合わせでプールが埋まっていても、既知のユーザーは待たされない）
+        found, cached_name = self._get_cached_display_name(user_id)
+        if found:
+            cached: Future[Optional[str]] = Future()
+            cached.set_result(cached_name)
+            return cached
+
+        # 別スレッドでも Webhook の処理期限で LINE のタイムアウトを決める
+        return _profile_executor.submit(
+            run_with_deadline(self._get_display_name, user_id)
+        )
 
-        display_name = self._get_display_name(user_id)
-        return f"あなた ({display_name})" if display_name else "あなた"
+    def _resolve_user_label(
+        self, profile_future: Optional[Future[Optional[str]]]
+    ) -> str:
+        if profile_future is None:
+            return DEFAULT_USER_LABEL
+
+        try:
+            display_name = profile_future.result(timeout=self._profile_timeout_seconds)
+        except FutureTimeoutError:
+            # 取得自体は継続し、プロフィールキャッシュに載れば次回以降は即時に返る
+            self._metrics.increment(self.PROFILE_FALLBACK_METRIC)
+            self._logger.info(
+                f"プロフィール取得が {self._profile_timeout_seconds * 1000:.0f}ms "
+                "以内に完了しないため既定の表示名を使用"
+            )
+            return DEFAULT_USER_LABEL
+
+        if not display_name:
+            return DEFAULT_USER_LABEL
+        return f"{DEFAULT_USER_LABEL} ({display_name})"
+
+    def _get_cached_display_name(self, user_id: str) -> tuple[bool, Optional[str]]:
+        try:
+            return self._line_adapter.get_cached_display_name(user_id)
+        except Exception as e:
+            self._logger.error(f"プロフィールキャッシュの参照に失敗: {e}")
+            return False, None
 
     def _get_display_name(self, user_id: str) -> Optional[str]:
         try:
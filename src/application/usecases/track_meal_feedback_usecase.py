@@ -2,6 +2,7 @@ from typing import Optional
 
 from linebot.v3.webhooks.models.postback_event import PostbackEvent
 
+from ...infrastructure.line_model.prepared_reply import meal_feedback_thanks_reply
 from .base_usecase import BaseUsecase
 from .protocols import LineAdapterProtocol, OpenAIAdapterProtocol
 
@@ -29,7 +30,7 @@ class TrackMealFeedbackUsecase(BaseUsecase):
 
         try:
             success = self._track_score(pl_request_id, score)
-            self._send_text_reply(reply_token, "評価ありがとうございます!😊")
+            self._send_prepared_reply(reply_token, meal_feedback_thanks_reply())
             return success
         except Exception as e:
             self._logger.exception(f"フィードバック処理中にエラーが発生: {e}")
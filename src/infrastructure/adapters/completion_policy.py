@@ -0,0 +1,211 @@
+"""プロンプトごとの OpenAI 呼び出しの設定（モデル・出力上限・推論の深さ・タイムアウト）
+
+短い英語の画像プロンプトとレシピでは必要な出力の長さも待てる時間も違うため、
+`prompt_registry` のプロンプト名ごとに `CompletionPolicy` を持つ。各値は
+`OPENAI_<プロンプト名>_MODEL` / `_MAX_TOKENS` / `_REASONING_EFFORT` / `_TIMEOUT_SECONDS`
+（プロンプト名は大文字）で上書きできる。`reasoning_effort` は推論モデル（gpt-5 系・o 系）を
+呼ぶときだけ送る。
+
+呼び出しごとの所要時間と出力トークン数を `openai.<プロンプト名>.` の計測値に記録する。
+主モデルの所要時間の p90 が応答期限（`latency_budget_seconds`）を超えている間は、
+速い代替モデル（`OPENAI_FALLBACK_MODEL`）に切り替える。主モデルの計測値を更新するため、
+切り替え中も `probe_every` 回に 1 回は主モデルで呼ぶ。
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Optional
+
+from ..metrics import MetricsRegistry, metrics
+
+DEFAULT_FALLBACK_MODEL = "gpt-5-nano"
+DEFAULT_MAX_COMPLETION_TOKENS = 3000
+DEFAULT_TIMEOUT_SECONDS = 60.0
+DEFAULT_PROBE_EVERY = 20
+# 切り替えを判断するのに必要な主モデルの計測数
+MIN_SAMPLES = 5
+LATENCY_RATIO = 0.9
+
+METRIC_PREFIX = "openai."
+
+# reasoning_effort を受け付けるモデル（gpt-5 系・o 系の推論モデル。ファインチューン済みも含む）。
+# gpt-4o などそれ以外のモデルに送ると 400 になる
+REASONING_MODEL_PATTERN = re.compile(r"^(ft:)?(gpt-5(?!-chat)|o\d)")
+
+
+def supports_reasoning_effort(model: str) -> bool:
+    return REASONING_MODEL_PATTERN.match(model.lower()) is not None
+
+
+@dataclass(frozen=True)
+class CompletionPolicy:
+    name: str
+    model: Optional[str] = None  # None なら OPENAI_MODEL
+    max_completion_tokens: int = DEFAULT_MAX_COMPLETION_TOKENS
+    reasoning_effort: Optional[str] = None
+    timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS
+    # この秒数を超えそうなら代替モデルを使う。None なら切り替えない
+    latency_budget_seconds: Optional[float] = None
+
+    def completion_kwargs(self, model: str) -> dict[str, Any]:
+        kwargs: dict[str, Any] = {
+            "model": model,
+            "max_completion_tokens": self.max_completion_tokens,
+            "timeout": self.timeout_seconds,
+        }
+        if self.reasoning_effort and supports_reasoning_effort(model):
+            kwargs["reasoning_effort"] = self.reasoning_effort
+        return kwargs
+
+
+def _reply_budget_seconds() -> float:
+    # リプライトークンの期限（ReplyScheduler と同じ設定）から安全マージンを引いた残り
+    budget_ms = float(os.environ.get("REPLY_TOKEN_BUDGET_MS", "30000"))
+    margin_ms = float(os.environ.get("REPLY_TOKEN_SAFETY_MARGIN_MS", "2000"))
+    return max(0.0, budget_ms - margin_ms) / 1000
+
+
+def default_policies() -> dict[str, CompletionPolicy]:
+    reply_budget = _reply_budget_seconds()
+    policies = [
+        CompletionPolicy(
+            "chat_response",
+            max_completion_tokens=1000,
+            reasoning_effort="low",
+            timeout_seconds=reply_budget,
+            latency_budget_seconds=reply_budget,
+        ),
+        CompletionPolicy(
+            "meal_suggestion",
+            max_completion_tokens=1500,
+            reasoning_effort="low",
+            timeout_seconds=reply_budget,
+            latency_budget_seconds=reply_budget,
+        ),
+        # 画像プロンプトの後に画像生成が続くので、期限の半分に収める
+        CompletionPolicy(
+            "image_prompt_generation",
+            max_completion_tokens=600,
+            reasoning_effort="minimal",
+            timeout_seconds=reply_budget / 2,
+            latency_budget_seconds=reply_budget / 2,
+        ),
+        # 応答の送信後に呼ぶので期限はない
+        CompletionPolicy(
+            "conversation_summary",
+            max_completion_tokens=600,
+            reasoning_effort="minimal",
+        ),
+    ]
+    return {policy.name: _apply_env(policy) for policy in policies}
+
+
+def _apply_env(policy: CompletionPolicy) -> CompletionPolicy:
+    prefix = f"OPENAI_{policy.name.upper()}_"
+    changes: dict[str, Any] = {}
+    if os.environ.get(prefix + "MODEL"):
+        changes["model"] = os.environ[prefix + "MODEL"]
+    if os.environ.get(prefix + "MAX_TOKENS"):
+        changes["max_completion_tokens"] = int(os.environ[prefix + "MAX_TOKENS"])
+    if prefix + "REASONING_EFFORT" in os.environ:
+        # 空文字なら reasoning_effort を送らない（推論しないモデル向け）
+        changes["reasoning_effort"] = os.environ[prefix + "REASONING_EFFORT"] or None
+    if os.environ.get(prefix + "TIMEOUT_SECONDS"):
+        changes["timeout_seconds"] = float(os.environ[prefix + "TIMEOUT_SECONDS"])
+    return replace(policy, **changes) if changes else policy
+
+
+def _int_attr(obj: Any, name: str) -> Optional[int]:
+    value = getattr(obj, name, None)
+    return value if isinstance(value, int) else None
+
+
+class CompletionRouter:
+    """ポリシーを引き、計測値を記録し、主モデルが遅ければ代替モデルを選ぶ"""
+
+    def __init__(
+        self,
+        default_model: str,
+        policies: Optional[dict[str, CompletionPolicy]] = None,
+        fallback_model: Optional[str] = None,
+        probe_every: int = DEFAULT_PROBE_EVERY,
+        metrics_registry: Optional[MetricsRegistry] = None,
+    ):
+        self.default_model = default_model
+        self.policies = default_policies() if policies is None else policies
+        if fallback_model is None:
+            fallback_model = os.environ.get(
+                "OPENAI_FALLBACK_MODEL", DEFAULT_FALLBACK_MODEL
+            )
+        self.fallback_model = fallback_model
+        self.probe_every = max(1, probe_every)
+        self._metrics = metrics_registry or metrics
+        self._fallback_calls: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def policy(self, name: Optional[str]) -> CompletionPolicy:
+        # 登録のないプロンプトは従来どおり OPENAI_MODEL・出力上限 3000
+        return self.policies.get(name or "") or CompletionPolicy(name or "default")
+
+    def primary_model(self, policy: CompletionPolicy) -> str:
+        return policy.model or self.default_model
+
+    def choose_model(self, policy: CompletionPolicy) -> str:
+        primary = self.primary_model(policy)
+        budget = policy.latency_budget_seconds
+        if budget is None or not self.fallback_model or self.fallback_model == primary:
+            return primary
+        name = self._latency_metric(policy, primary)
+        if self._metrics.get(f"{name}.count") < MIN_SAMPLES:
+            return primary
+        p90 = self._metrics.percentile(name, LATENCY_RATIO)
+        if p90 is None or p90 <= budget:
+            return primary
+
+        with self._lock:
+            calls = self._fallback_calls.get(policy.name, 0) + 1
+            self._fallback_calls[policy.name] = calls
+        if calls % self.probe_every == 0:
+            return primary
+        self._metrics.increment(f"{METRIC_PREFIX}{policy.name}.fallback")
+        return self.fallback_model
+
+    def record(
+        self,
+        policy: CompletionPolicy,
+        model: str,
+        latency_seconds: float,
+        response: Any,
+    ) -> None:
+        prefix = f"{METRIC_PREFIX}{policy.name}."
+        self._metrics.observe(self._latency_metric(policy, model), latency_seconds)
+        self._metrics.observe(prefix + "latency_seconds", latency_seconds)
+        completion_tokens = _int_attr(
+            getattr(response, "usage", None), "completion_tokens"
+        )
+        if completion_tokens is not None:
+            self._metrics.observe(prefix + "completion_tokens", completion_tokens)
+        choices = getattr(response, "choices", None) or [None]
+        if getattr(choices[0], "finish_reason", None) == "length":
+            # 出力上限で打ち切られた（max_completion_tokens を見直す目安）
+            self._metrics.increment(prefix + "truncated")
+
+    def record_timeout(self, policy: CompletionPolicy, model: str) -> None:
+        # タイムアウトも期限を超えた 1 回として主モデルの所要時間に数える
+        self._metrics.observe(
+            self._latency_metric(policy, model), policy.timeout_seconds
+        )
+        self._metrics.increment(f"{METRIC_PREFIX}{policy.name}.timeouts")
+
+    def _latency_metric(self, policy: CompletionPolicy, model: str) -> str:
+        return f"{METRIC_PREFIX}{policy.name}.model.{model}.latency_seconds"
+
+
+__all__ = [
+    "CompletionPolicy",
+    "CompletionRouter",
+    "default_policies",
+    "supports_reasoning_effort",
+]
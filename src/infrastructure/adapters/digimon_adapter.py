@@ -6,26 +6,34 @@ from typing import Optional
 import requests
 
 from ...domain.models.digimon_info import DigimonInfo
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError, circuit_breakers
 from ..logger import Logger
+from .http_client import UpstreamHttpClient
 
 
 class DigimonApiAdapter:
-    def __init__(self, logger: Logger):
+    def __init__(
+        self, logger: Logger, circuit_breaker: Optional[CircuitBreaker] = None
+    ):
         self.logger = logger
+        self.http = UpstreamHttpClient(
+            circuit_breaker or circuit_breakers.get("digi-api")
+        )
 
     def get_random_digimon_info(self) -> Optional[DigimonInfo]:
         try:
             digimon_id = random.randint(1, 1422)
             self.logger.debug(f"Fetching Digimon ID: {digimon_id}")
 
-            resp = requests.get(
-                f"https://digi-api.com/api/v1/digimon/{digimon_id}", timeout=10
-            )
+            resp = self.http.get(f"https://digi-api.com/api/v1/digimon/{digimon_id}")
             resp.raise_for_status()
             data = resp.json()
 
             return DigimonInfo.from_mapping(data)
 
+        except CircuitOpenError as e:
+            self.logger.warning(f"デジモンAPIを一時的に呼び出していません: {e}")
+            return None
         except requests.RequestException as e:
             self.logger.error(f"デジモンAPI通信エラー: {e}")
             return None
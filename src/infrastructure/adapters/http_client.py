@@ -0,0 +1,202 @@
+"""外部 HTTP API（天気・ポケモン・デジモン）向けの GET クライアント
+
+呼び出しをサーキットブレーカー越しに行い、接続エラー・タイムアウト・5xx を
+上流の障害として数える。4xx は上流が正常に応答したものとして扱う。
+
+GET は冪等なので、上流ごとに観測した p90 を過ぎても応答がなければ同じリクエストを
+もう 1 本送り（ヘッジ）、先に返ってきた方を使う。追加で送る量は全上流で共有する
+HedgeBudget で通常リクエストの一定割合までに抑える。
+
+Webhook の処理期限（`deadline`）が設定されていれば、タイムアウトは期限までの残りを
+超えないようにし、残りがヘッジの待ち時間より短ければヘッジしない。
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from typing import Any, Optional
+
+import requests
+
+from ..circuit_breaker import CircuitBreaker
+from ..deadline import call_timeout, current_deadline
+from ..metrics import MetricsRegistry, metrics
+
+DEFAULT_TIMEOUT_SECONDS = 10
+HEDGE_MAX_WORKERS = 16
+
+LATENCY_METRIC = "upstream.{name}.latency_seconds"
+HEDGED_METRIC = "upstream.{name}.hedged"
+HEDGE_WON_METRIC = "upstream.{name}.hedge_won"
+HEDGE_DENIED_METRIC = "upstream.{name}.hedge_denied"
+
+
+def _is_server_error(response: requests.Response) -> bool:
+    status = response.status_code
+    return isinstance(status, int) and status >= 500
+
+
+class HedgeBudget:
+    """ヘッジの送信枠。通常リクエスト 1 件ごとに ratio 件分の枠が貯まる"""
+
+    def __init__(
+        self,
+        ratio: float = 0.05,
+        capacity: float = 5.0,
+        enabled: bool = True,
+        percentile: float = 0.9,
+        min_samples: int = 20,
+    ):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._tokens = 0.0
+        self._requests = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "HedgeBudget":
+        return cls(
+            ratio=float(os.environ.get("UPSTREAM_HEDGE_BUDGET", "0.05")),
+            enabled=os.environ.get("UPSTREAM_HEDGE_ENABLED", "1") != "0",
+            percentile=float(os.environ.get("UPSTREAM_HEDGE_PERCENTILE", "0.9")),
+            min_samples=int(os.environ.get("UPSTREAM_HEDGE_MIN_SAMPLES", "20")),
+        )
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._requests += 1
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self._hedges += 1
+            return True
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "hedges": self._hedges,
+                "tokens": round(self._tokens, 2),
+            }
+
+
+hedge_budget = HedgeBudget.from_env()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    # Gunicorn の fork 後はスレッドが引き継がれないため、プロセスごとに作り直す
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="upstream-hedge"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _close_response(future: Future) -> None:
+    if future.exception() is None:
+        future.result().close()
+
+
+class UpstreamHttpClient:
+    def __init__(
+        self,
+        circuit_breaker: CircuitBreaker,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        hedge: Optional[HedgeBudget] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
+    ):
+        self.circuit_breaker = circuit_breaker
+        self.timeout = timeout
+        self.hedge = hedge or hedge_budget
+        self._metrics = metrics_registry or metrics
+        self._latency_metric = LATENCY_METRIC.format(name=circuit_breaker.name)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """GET を送る。ブレーカーが OPEN の場合は送らずに CircuitOpenError を送出する"""
+        kwargs.setdefault(
+            "timeout", call_timeout(self.circuit_breaker.name, self.timeout)
+        )
+        return self.circuit_breaker.call(lambda: self._get_with_hedge(url, **kwargs))
+
+    def hedge_delay(self) -> Optional[float]:
+        """ヘッジを送るまでの待ち時間。計測値が揃うまでは None（ヘッジしない）"""
+        if not self.hedge.enabled:
+            return None
+        if self._metrics.get(f"{self._latency_metric}.count") < self.hedge.min_samples:
+            return None
+        return self._metrics.percentile(self._latency_metric, self.hedge.percentile)
+
+    def _get_with_hedge(self, url: str, **kwargs: Any) -> requests.Response:
+        self.hedge.record_request()
+        delay = self.hedge_delay()
+        deadline = current_deadline()
+        if delay is None or (deadline is not None and deadline.remaining() <= delay):
+            return self._timed_get(url, **kwargs)
+
+        executor = _hedge_executor()
+        primary = executor.submit(self._timed_get, url, **kwargs)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+
+        name = self.circuit_breaker.name
+        if not self.hedge.try_spend():
+            self._metrics.increment(HEDGE_DENIED_METRIC.format(name=name))
+            return primary.result()
+
+        self._metrics.increment(HEDGED_METRIC.format(name=name))
+        hedged = executor.submit(self._timed_get, url, **kwargs)
+        winner = self._first_success({primary, hedged})
+        if winner is hedged:
+            self._metrics.increment(HEDGE_WON_METRIC.format(name=name))
+        return winner.result()
+
+    def _first_success(self, futures: set[Future]) -> Future:
+        """先に成功した方を返す。両方失敗したら後の例外を送出する"""
+        pending = futures
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    # 負けた方は完了を待たずに、終わり次第コネクションを返す
+                    for loser in pending:
+                        loser.add_done_callback(_close_response)
+                    return future
+        assert error is not None
+        raise error
+
+    def _timed_get(self, url: str, **kwargs: Any) -> requests.Response:
+        started = time.monotonic()
+        response = self._get(url, **kwargs)
+        self._metrics.observe(self._latency_metric, time.monotonic() - started)
+        return response
+
+    def _get(self, url: str, **kwargs: Any) -> requests.Response:
+        response = requests.get(url, **kwargs)
+        if _is_server_error(response):
+            response.raise_for_status()
+        return response
+
+
+__all__ = ["HedgeBudget", "UpstreamHttpClient", "hedge_budget"]
@@ -0,0 +1,76 @@
+"""OpenAIAdapter を初めて使うときまで生成しないプロキシ
+
+ルーターには起動時にこのプロキシを渡し、チャット・料理・服装などで OpenAI を
+呼ぶ最初のリクエストで OpenAIAdapter（と openai / promptlayer の読み込み）を行う。
+天気・ポケモン・じゃんけんだけを処理するワーカーは OpenAI の初期化コストを払わない。
+"""
+
+import threading
+from typing import Callable, Optional
+
+from ..logger import Logger, create_logger
+from .openai_adapter import OpenAIAdapter
+
+
+class LazyOpenAIAdapter:
+    def __init__(
+        self,
+        factory: Optional[Callable[[], OpenAIAdapter]] = None,
+        logger: Optional[Logger] = None,
+    ):
+        self._factory = factory or OpenAIAdapter
+        self._logger = logger or create_logger(__name__)
+        self._adapter: Optional[OpenAIAdapter] = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._adapter is not None
+
+    def get(self) -> OpenAIAdapter:
+        """スレッド間で共有する OpenAIAdapter を返す（初回のみ生成）
+
+        生成に失敗した場合（OPENAI_API_KEY 未設定など）はキャッシュせず、
+        例外をそのまま呼び出し側に返す。次の呼び出しで再度生成を試みる。
+        """
+        adapter = self._adapter
+        if adapter is not None:
+            return adapter
+        with self._lock:
+            if self._adapter is None:
+                self._adapter = self._factory()
+                self._logger.info("OpenAIAdapter initialized on first use")
+            return self._adapter
+
+    def get_chatgpt_response(
+        self, user_message: str, history: Optional[list[dict[str, str]]] = None
+    ) -> str:
+        if history is None:
+            return self.get().get_chatgpt_response(user_message)
+        return self.get().get_chatgpt_response(user_message, history)
+
+    def summarize_conversation(
+        self, previous_summary: str, messages: list[dict[str, str]]
+    ) -> str:
+        return self.get().summarize_conversation(previous_summary, messages)
+
+    def generate_image(self, prompt: str) -> Optional[str]:
+        return self.get().generate_image(prompt)
+
+    def generate_image_prompt(self, requirements: str) -> str:
+        return self.get().generate_image_prompt(requirements)
+
+    def get_chatgpt_meal_suggestion(
+        self, return_request_id: bool = False
+    ) -> str | tuple[str, Optional[int]]:
+        return self.get().get_chatgpt_meal_suggestion(
+            return_request_id=return_request_id
+        )
+
+    def track_score(
+        self, request_id: int, score: int, score_name: str = "user_feedback"
+    ) -> bool:
+        return self.get().track_score(request_id, score, score_name)
+
+
+__all__ = ["LazyOpenAIAdapter"]
@@ -1,23 +1,94 @@
-from typing import Optional
 import http.client
+import os
+import threading
+import uuid
+from http import HTTPStatus
+from typing import Callable, Optional, Sequence, TypeVar
 
 from linebot.v3.messaging import MessagingApi
 from linebot.v3.messaging.api_client import ApiClient
 from linebot.v3.messaging.configuration import Configuration
+from linebot.v3.messaging.exceptions import ApiException, NotFoundException
+from linebot.v3.messaging.models import Message
+from linebot.v3.messaging.rest import RESTResponse
+from urllib3 import Timeout
 from urllib3.exceptions import ProtocolError
 
+from ..cache.shared_memory_cache import TtlCache, create_cache
+from ..circuit_breaker import CircuitBreaker, circuit_breakers
+from ..deadline import call_timeout
+from ..line_model.prepared_reply import PreparedReply
 from ..logger import Logger, create_logger
+from ..metrics import MetricsRegistry, metrics
+from .line_http_pool import POOL_WAIT_METRIC, LineHttpSettings, instrument_pool_manager
+from .line_push_dispatcher import LinePushDispatcher
+
+T = TypeVar("T")
+
+RECONNECT_METRIC = "line.http.reconnect"
+PREPARED_REPLY_METRIC = "line.reply.prepared"
+REPLY_PATH = "/v2/bot/message/reply"
+MAX_RECONNECTS = 1
+
+
+def _is_upstream_failure(error: Exception) -> bool:
+    # 期限切れのリプライトークンなど 4xx は LINE 側の障害ではない
+    if isinstance(error, ApiException):
+        return error.status is None or error.status >= 500
+    return True
+
+
+def _create_profile_cache() -> TtlCache[str]:
+    return create_cache(
+        max_size=int(os.environ.get("LINE_PROFILE_CACHE_SIZE", "1000")),
+        ttl_seconds=float(os.environ.get("LINE_PROFILE_CACHE_TTL", "3600")),
+    )
 
 
 class LineMessagingAdapter:
-    def __init__(self, logger: Optional[Logger] = None):
+    def __init__(
+        self,
+        logger: Optional[Logger] = None,
+        profile_cache: Optional[TtlCache[str]] = None,
+        profile_cache_path: Optional[str] = None,
+        http_settings: Optional[LineHttpSettings] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
         self.logger: Logger = logger or create_logger(__name__)
         self.messaging_api = None
+        self.circuit_breaker = circuit_breaker or circuit_breakers.get("line")
+        self.http_settings = http_settings or LineHttpSettings.from_env()
+        self._metrics = metrics_registry or metrics
+        self._push_dispatcher: Optional[LinePushDispatcher] = None
+        self._push_dispatcher_lock = threading.Lock()
+        self.profile_cache: TtlCache[str] = profile_cache or _create_profile_cache()
+        self._profile_negative_ttl = float(
+            os.environ.get("LINE_PROFILE_NEGATIVE_TTL", "300")
+        )
+        self._profile_cache_path = profile_cache_path or os.environ.get(
+            "LINE_PROFILE_CACHE_PATH"
+        )
+        # 更新のたびには書き出さず、最初の更新から一定時間後にまとめて書き出す
+        self._profile_save_interval = float(
+            os.environ.get("LINE_PROFILE_CACHE_SAVE_INTERVAL", "30")
+        )
+        self._profile_save_timer: Optional[threading.Timer] = None
+        self._profile_save_lock = threading.Lock()
+        self._load_profile_cache()
 
     def init(self, access_token: str):
         try:
             config = Configuration(access_token=access_token)
+            config.connection_pool_maxsize = self.http_settings.pool_size
+            config.retries = self.http_settings.retries()
+            config.socket_options = self.http_settings.socket_options()
             api_client = ApiClient(configuration=config)
+            instrument_pool_manager(
+                api_client.rest_client.pool_manager,
+                self._metrics,
+                self.http_settings.connect_timeout,
+            )
             self.messaging_api = MessagingApi(api_client)
         except Exception as e:
             self.messaging_api = None
@@ -32,8 +103,15 @@ class LineMessagingAdapter:
 
         self._log_payload(reply_message_request, "reply")
 
+        messaging_api = self.messaging_api
         try:
-            self.messaging_api.reply_message(reply_message_request)
+            self._call_with_reconnect(
+                "reply_message",
+                lambda: messaging_api.reply_message(
+                    reply_message_request,
+                    _request_timeout=self._request_timeout(),
+                ),
+            )
         except (ProtocolError, http.client.RemoteDisconnected) as e:
             self.logger.error(
                 f"Connection error when calling messaging_api.reply_message: {type(e).__name__}: {e}"
@@ -45,28 +123,103 @@ class LineMessagingAdapter:
             )
             raise
 
-    def push_message(self, push_message_request):
+    def reply_prepared(self, reply_token: str, prepared: PreparedReply) -> None:
+        """事前にシリアライズした返信を、SDK のモデルを通さずに POST する
+
+        リプライトークンを差し込んだ JSON をプール済みの HTTP 接続でそのまま送る。
+        エラー時は reply_message と同じく ApiException を送出する。
+        """
         if self.messaging_api is None:
             self.logger.warning(
-                "messaging_api is not initialized; skipping push_message"
+                "messaging_api is not initialized; skipping reply_prepared"
             )
             return
 
-        self._log_payload(push_message_request, "push")
+        messaging_api = self.messaging_api
+        api_client = messaging_api.api_client
+        url = f"{messaging_api.line_base_path}{REPLY_PATH}"
+        headers = dict(api_client.default_headers)
+        headers["Content-Type"] = "application/json"
+        body = prepared.body(reply_token)
 
-        try:
-            self.messaging_api.push_message(push_message_request)
-        except (ProtocolError, http.client.RemoteDisconnected) as e:
-            self.logger.error(
-                f"Connection error when calling messaging_api.push_message: {type(e).__name__}: {e}"
+        def post() -> None:
+            connect_timeout, read_timeout = self._request_timeout()
+            timeout = Timeout(connect=connect_timeout, read=read_timeout)
+            response = api_client.rest_client.pool_manager.request(
+                "POST", url, body=body, headers=headers, timeout=timeout
             )
-            raise
+            if not 200 <= response.status <= 299:
+                raise ApiException(http_resp=RESTResponse(response))
+
+        try:
+            self._call_with_reconnect("reply_message", post)
+            self._metrics.increment(PREPARED_REPLY_METRIC)
         except Exception as e:
             self.logger.error(
-                f"Error when calling messaging_api.push_message: {type(e).__name__}: {e}"
+                f"Error when posting prepared reply: {type(e).__name__}: {e}"
             )
             raise
 
+    def push_message(self, push_message_request):
+        if self.messaging_api is None:
+            self.logger.warning(
+                "messaging_api is not initialized; skipping push_message"
+            )
+            return
+
+        self._log_payload(push_message_request, "push")
+
+        messaging_api = self.messaging_api
+        self._post_with_retry_key(
+            "push_message",
+            lambda retry_key: messaging_api.push_message(
+                push_message_request,
+                x_line_retry_key=retry_key,
+                _request_timeout=self._request_timeout(),
+            ),
+        )
+
+    def multicast(self, multicast_request):
+        if self.messaging_api is None:
+            self.logger.warning("messaging_api is not initialized; skipping multicast")
+            return
+
+        self._log_payload(multicast_request, "multicast")
+
+        messaging_api = self.messaging_api
+        self._post_with_retry_key(
+            "multicast",
+            lambda retry_key: messaging_api.multicast(
+                multicast_request,
+                x_line_retry_key=retry_key,
+                _request_timeout=self._request_timeout(),
+            ),
+        )
+
+    def enqueue_push(self, to: str, messages: Sequence[Message]) -> None:
+        """push をディスパッチャに積み、同じ宛先・同じ内容の送信をまとめて行う"""
+        self._get_push_dispatcher().enqueue(to, messages)
+
+    def flush_pushes(self) -> int:
+        if self._push_dispatcher is None:
+            return 0
+        return self._push_dispatcher.flush()
+
+    def _get_push_dispatcher(self) -> LinePushDispatcher:
+        with self._push_dispatcher_lock:
+            if self._push_dispatcher is None:
+                window_ms = float(os.environ.get("LINE_PUSH_COALESCE_WINDOW_MS", "200"))
+                self._push_dispatcher = LinePushDispatcher(
+                    self,
+                    window_seconds=window_ms / 1000,
+                    rate_per_second=float(
+                        os.environ.get("LINE_PUSH_RATE_PER_SECOND", "100")
+                    ),
+                    logger=self.logger,
+                    metrics_registry=self._metrics,
+                )
+            return self._push_dispatcher
+
     def get_display_name_from_line_profile(self, user_id: str) -> Optional[str]:
         if self.messaging_api is None:
             self.logger.debug(
@@ -78,9 +231,27 @@ class LineMessagingAdapter:
             self.logger.debug("user_id is empty; skipping profile fetch")
             return None
 
+        found, cached_name = self.profile_cache.get(user_id)
+        if found:
+            return cached_name
+
+        messaging_api = self.messaging_api
         try:
-            profile = self.messaging_api.get_profile(user_id)
-            return profile.display_name
+            profile = self._call_with_reconnect(
+                "get_profile",
+                lambda: messaging_api.get_profile(
+                    user_id, _request_timeout=self._request_timeout()
+                ),
+            )
+            display_name = profile.display_name
+            self.profile_cache.set(user_id, display_name)
+            self._schedule_profile_cache_save()
+            return display_name
+        except NotFoundException:
+            # ブロック済み・友だちでないユーザーはしばらく問い合わせない
+            self.logger.debug(f"Profile not found for {user_id}; caching negative")
+            self.profile_cache.set(user_id, None, self._profile_negative_ttl)
+            return None
         except (ProtocolError, http.client.RemoteDisconnected) as e:
             self.logger.error(
                 f"Connection error when fetching profile for {user_id}: {type(e).__name__}: {e}"
@@ -92,6 +263,128 @@ class LineMessagingAdapter:
             )
             return None
 
+    def get_cached_display_name(self, user_id: str) -> tuple[bool, Optional[str]]:
+        """LINE に問い合わせず、プロフィールキャッシュだけを引く（(見つかったか, 表示名)）"""
+        if not user_id:
+            return False, None
+        return self.profile_cache.get(user_id)
+
+    def invalidate_display_name(self, user_id: str) -> None:
+        """フォロー/フォロー解除イベントでプロフィールキャッシュを破棄する"""
+        if self.profile_cache.invalidate(user_id):
+            self._schedule_profile_cache_save()
+
+    def save_profile_cache(self) -> None:
+        """予約済みの書き出しがあれば今すぐ書き出す（タイマーとワーカー終了時に呼ぶ）"""
+        with self._profile_save_lock:
+            timer = self._profile_save_timer
+            self._profile_save_timer = None
+        if timer is None:
+            return
+        timer.cancel()
+        self._save_profile_cache()
+
+    def get_profile_cache_stats(self) -> dict:
+        return self.profile_cache.stats().to_dict()
+
+    def get_http_stats(self) -> dict:
+        return {
+            "pool_size": self.http_settings.pool_size,
+            "reconnects": self._metrics.get(RECONNECT_METRIC),
+            "pool_wait_seconds": self._metrics.summary(POOL_WAIT_METRIC),
+        }
+
+    def _post_with_retry_key(
+        self, operation: str, call: Callable[[str], object]
+    ) -> None:
+        # 再送時に LINE 側で重複配信を防ぐため、同じリトライキーを使う
+        retry_key = str(uuid.uuid4())
+        try:
+            self._call_with_reconnect(operation, lambda: call(retry_key))
+        except ApiException as e:
+            if e.status == HTTPStatus.CONFLICT:
+                self.logger.info(
+                    f"{operation} already accepted for retry key {retry_key}"
+                )
+                return
+            self.logger.error(
+                f"Error when calling messaging_api.{operation}: {type(e).__name__}: {e}"
+            )
+            raise
+        except (ProtocolError, http.client.RemoteDisconnected) as e:
+            self.logger.error(
+                f"Connection error when calling messaging_api.{operation}: {type(e).__name__}: {e}"
+            )
+            raise
+        except Exception as e:
+            self.logger.error(
+                f"Error when calling messaging_api.{operation}: {type(e).__name__}: {e}"
+            )
+            raise
+
+    def _request_timeout(self) -> tuple[float, float]:
+        """Webhook の処理期限までの残りで (接続, 読み込み) のタイムアウトを短くする
+
+        返信が届かないとユーザーには何も表示されないため、期限を過ぎていても送る。
+        """
+        connect_timeout, read_timeout = self.http_settings.request_timeout
+        read_timeout = call_timeout("line", read_timeout, skip_when_expired=False)
+        return min(connect_timeout, read_timeout), read_timeout
+
+    def _call_with_reconnect(self, operation: str, call: Callable[[], T]) -> T:
+        """キープアライブ切れの接続で失敗した場合に再接続して再試行する"""
+        return self.circuit_breaker.call(
+            lambda: self._retry_stale_connection(operation, call),
+            is_failure=_is_upstream_failure,
+        )
+
+    def _retry_stale_connection(self, operation: str, call: Callable[[], T]) -> T:
+        for _ in range(MAX_RECONNECTS):
+            try:
+                return call()
+            except (ProtocolError, http.client.RemoteDisconnected) as e:
+                self._metrics.increment(RECONNECT_METRIC)
+                self.logger.warning(
+                    f"Stale connection on messaging_api.{operation}; reconnecting: {type(e).__name__}: {e}"
+                )
+        return call()
+
+    def _load_profile_cache(self) -> None:
+        if not self._profile_cache_path:
+            return
+        try:
+            loaded = self.profile_cache.load(self._profile_cache_path)
+            self.logger.info(f"Loaded {loaded} cached LINE profiles")
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.warning(
+                f"Failed to load profile cache ({type(e).__name__}): {e}"
+            )
+
+    def _schedule_profile_cache_save(self) -> None:
+        if not self._profile_cache_path:
+            return
+        with self._profile_save_lock:
+            if self._profile_save_timer is not None:
+                return
+            timer = threading.Timer(
+                self._profile_save_interval, self.save_profile_cache
+            )
+            timer.daemon = True
+            self._profile_save_timer = timer
+        timer.start()
+
+    def _save_profile_cache(self) -> None:
+        if not self._profile_cache_path:
+            return
+        try:
+            self.profile_cache.save(self._profile_cache_path)
+        except OSError as e:
+            self.logger.warning(
+                f"Failed to save profile cache ({type(e).__name__}): {e}"
+            )
+
     def _log_payload(self, request, message_type: str):
         """リクエストのペイロードをログ出力する"""
         try:
@@ -0,0 +1,99 @@
+"""LINE Messaging API クライアントの HTTP コネクションプール設定"""
+
+import os
+import socket
+import time
+from dataclasses import dataclass
+
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from ..metrics import MetricsRegistry
+
+POOL_WAIT_METRIC = "line.http.pool_wait_seconds"
+
+
+@dataclass(frozen=True)
+class LineHttpSettings:
+    pool_size: int
+    connect_timeout: float
+    read_timeout: float
+    keepalive_idle: int
+    connect_retries: int
+
+    @classmethod
+    def from_env(cls) -> "LineHttpSettings":
+        # gunicorn のスレッド数と揃え、スレッドがプール待ちにならないようにする
+        default_pool_size = os.environ.get("THREADS", "4")
+        return cls(
+            pool_size=int(os.environ.get("LINE_HTTP_POOL_SIZE", default_pool_size)),
+            connect_timeout=float(os.environ.get("LINE_HTTP_CONNECT_TIMEOUT", "3")),
+            read_timeout=float(os.environ.get("LINE_HTTP_READ_TIMEOUT", "10")),
+            keepalive_idle=int(os.environ.get("LINE_HTTP_KEEPALIVE_IDLE", "30")),
+            connect_retries=int(os.environ.get("LINE_HTTP_CONNECT_RETRIES", "2")),
+        )
+
+    @property
+    def request_timeout(self) -> tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+    def socket_options(self) -> list[tuple[int, int, int]]:
+        options = list(HTTPConnection.default_socket_options)
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # TCP_KEEPIDLE などは Linux のみ
+        if hasattr(socket, "TCP_KEEPIDLE"):
+            options.append(
+                (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.keepalive_idle)
+            )
+        if hasattr(socket, "TCP_KEEPINTVL"):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10))
+        if hasattr(socket, "TCP_KEEPCNT"):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3))
+        return options
+
+    def retries(self) -> Retry:
+        # 送信前の接続失敗のみ再試行する。送信後の失敗は POST のため adapter 側で扱う
+        return Retry(
+            total=self.connect_retries,
+            connect=self.connect_retries,
+            read=0,
+            status=0,
+            other=0,
+            backoff_factor=0.1,
+            raise_on_status=False,
+        )
+
+
+def _instrumented_pool_class(
+    base: type, metrics_registry: MetricsRegistry, pool_timeout: float
+) -> type:
+    class InstrumentedPool(base):
+        def _get_conn(self, timeout=None):
+            started = time.perf_counter()
+            try:
+                return super()._get_conn(pool_timeout if timeout is None else timeout)
+            finally:
+                metrics_registry.observe(
+                    POOL_WAIT_METRIC, time.perf_counter() - started
+                )
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def instrument_pool_manager(
+    pool_manager, metrics_registry: MetricsRegistry, pool_timeout: float
+) -> None:
+    """プールに空きがなければ最大 pool_timeout 秒待ち、その待ち時間を記録する"""
+    pool_manager.connection_pool_kw["block"] = True
+    pool_manager.pool_classes_by_scheme = {
+        scheme: _instrumented_pool_class(base, metrics_registry, pool_timeout)
+        for scheme, base in (
+            ("http", HTTPConnectionPool),
+            ("https", HTTPSConnectionPool),
+        )
+    }
+
+
+__all__ = ["LineHttpSettings", "POOL_WAIT_METRIC", "instrument_pool_manager"]
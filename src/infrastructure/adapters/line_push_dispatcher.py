@@ -0,0 +1,193 @@
+"""LINE への push 送信をまとめて行うディスパッチャ
+
+短い時間窓の間に同じ宛先へ積まれたメッセージを 1 リクエスト（最大 5 件）にまとめ、
+同一内容を複数ユーザーへ送る場合は multicast に切り替える。
+送信はバックグラウンドスレッドで行い、トークンバケットで LINE のレート制限内に抑える。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Protocol, Sequence
+
+from linebot.v3.messaging.models import MulticastRequest, PushMessageRequest
+
+from ..logger import Logger, create_logger
+from ..metrics import MetricsRegistry, metrics
+from ..ratelimit.token_bucket import TokenBucket
+
+MAX_MESSAGES_PER_REQUEST = 5
+MAX_MULTICAST_RECIPIENTS = 500
+
+ENQUEUED_METRIC = "line.push.enqueued_messages"
+PUSH_REQUEST_METRIC = "line.push.push_requests"
+MULTICAST_REQUEST_METRIC = "line.push.multicast_requests"
+FAILED_REQUEST_METRIC = "line.push.failed_requests"
+
+
+class PushSenderProtocol(Protocol):
+    def push_message(self, push_message_request) -> None: ...
+
+    def multicast(self, multicast_request) -> None: ...
+
+
+def _is_user_id(recipient: str) -> bool:
+    # multicast はユーザー ID のみ宛先にできる（グループ・トークルームは不可）
+    return recipient.startswith("U")
+
+
+def _signature(messages: Sequence[Any]) -> tuple[str, ...]:
+    return tuple(message.to_json() for message in messages)
+
+
+class LinePushDispatcher:
+    def __init__(
+        self,
+        sender: PushSenderProtocol,
+        window_seconds: float = 0.2,
+        rate_per_second: float = 100.0,
+        logger: Optional[Logger] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
+    ):
+        self._sender = sender
+        self._window_seconds = window_seconds
+        self._bucket = TokenBucket(
+            rate_per_second=rate_per_second, capacity=max(1.0, rate_per_second)
+        )
+        self._logger = logger or create_logger(__name__)
+        self._metrics = metrics_registry or metrics
+        self._pending: OrderedDict[str, list[Any]] = OrderedDict()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self._send_lock = threading.Lock()
+
+    def enqueue(self, to: str, messages: Sequence[Any]) -> None:
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("LinePushDispatcher is closed")
+            self._pending.setdefault(to, []).extend(messages)
+            self._metrics.increment(ENQUEUED_METRIC, len(messages))
+            self._ensure_thread()
+            self._condition.notify()
+
+    def flush(self) -> int:
+        """溜まっているメッセージを即時に送信し、送ったリクエスト数を返す"""
+        # 送信順を保つため、取り出しから送信までを同時に 1 つだけ実行する
+        with self._send_lock:
+            with self._condition:
+                batch = self._drain()
+            return self._send_batch(batch)
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    @property
+    def pending_count(self) -> int:
+        with self._condition:
+            return sum(len(messages) for messages in self._pending.values())
+
+    def _ensure_thread(self) -> None:
+        # fork 後の各ワーカーで最初に使われたときにスレッドを起動する
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="line-push-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+            # 同じ宛先への後続メッセージを待ってからまとめて送る
+            # （close() されたら窓の終わりを待たずにすぐ送る）
+            deadline = time.monotonic() + self._window_seconds
+            with self._condition:
+                while not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(timeout=remaining)
+            self.flush()
+
+    def _drain(self) -> OrderedDict[str, list[Any]]:
+        batch = self._pending
+        self._pending = OrderedDict()
+        return batch
+
+    def _build_requests(
+        self, batch: "OrderedDict[str, list[Any]]"
+    ) -> list[PushMessageRequest | MulticastRequest]:
+        requests: list[PushMessageRequest | MulticastRequest] = []
+        multicast_groups: OrderedDict[tuple[str, ...], list[str]] = OrderedDict()
+        messages_by_signature: dict[tuple[str, ...], list[Any]] = {}
+
+        for to, messages in batch.items():
+            if _is_user_id(to) and len(messages) <= MAX_MESSAGES_PER_REQUEST:
+                signature = _signature(messages)
+                multicast_groups.setdefault(signature, []).append(to)
+                messages_by_signature[signature] = messages
+                continue
+            requests.extend(self._push_requests(to, messages))
+
+        for signature, recipients in multicast_groups.items():
+            messages = messages_by_signature[signature]
+            if len(recipients) == 1:
+                requests.extend(self._push_requests(recipients[0], messages))
+                continue
+            for start in range(0, len(recipients), MAX_MULTICAST_RECIPIENTS):
+                requests.append(
+                    MulticastRequest(
+                        to=recipients[start : start + MAX_MULTICAST_RECIPIENTS],
+                        messages=list(messages),
+                        notificationDisabled=False,
+                        customAggregationUnits=None,
+                    )
+                )
+        return requests
+
+    def _push_requests(self, to: str, messages: list[Any]) -> list[PushMessageRequest]:
+        return [
+            PushMessageRequest(
+                to=to,
+                messages=messages[start : start + MAX_MESSAGES_PER_REQUEST],
+                notificationDisabled=False,
+                customAggregationUnits=None,
+            )
+            for start in range(0, len(messages), MAX_MESSAGES_PER_REQUEST)
+        ]
+
+    def _send_batch(self, batch: "OrderedDict[str, list[Any]]") -> int:
+        if not batch:
+            return 0
+
+        sent = 0
+        for request in self._build_requests(batch):
+            self._bucket.acquire()
+            try:
+                if isinstance(request, MulticastRequest):
+                    self._sender.multicast(request)
+                    self._metrics.increment(MULTICAST_REQUEST_METRIC)
+                else:
+                    self._sender.push_message(request)
+                    self._metrics.increment(PUSH_REQUEST_METRIC)
+                sent += 1
+            except Exception as e:
+                self._metrics.increment(FAILED_REQUEST_METRIC)
+                self._logger.error(
+                    f"Failed to deliver batched push ({type(e).__name__}): {e}"
+                )
+        return sent
+
+
+__all__ = ["LinePushDispatcher", "PushSenderProtocol"]
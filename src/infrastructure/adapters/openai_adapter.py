@@ -1,50 +1,155 @@
 import datetime
+import importlib
 import json
 import os
-from typing import Optional
+import time
+from typing import TYPE_CHECKING, Any, Optional
 from zoneinfo import ZoneInfo
 
-from openai import (
-    APIError,
-    APIConnectionError,
-    AuthenticationError,
-    OpenAI,
-    RateLimitError,
+from ..circuit_breaker import CircuitOpenError, circuit_breakers
+from ..deadline import DeadlineExceededError, call_timeout, current_deadline
+from ..logger import Logger, create_logger
+from ..ratelimit.openai_governor import (
+    KIND_IMAGE,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    GovernorBusyError,
+    OpenAIGovernor,
+)
+from ..telemetry.telemetry_exporter import TelemetryExporter
+from .completion_policy import (
+    DEFAULT_TIMEOUT_SECONDS,
+    CompletionPolicy,
+    CompletionRouter,
+)
+from .prompt_registry import (
+    CHAT_RESPONSE,
+    CONVERSATION_SUMMARY,
+    IMAGE_PROMPT_GENERATION,
+    MEAL_SUGGESTION,
+    PromptTemplate,
+    record_prompt_usage,
 )
-from promptlayer import PromptLayer
 
-from ..logger import Logger, create_logger
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+IMAGE_MODEL = "dall-e-3"
+# OpenAI SDK の既定の自動再試行回数
+SDK_MAX_RETRIES = 2
+
+# openai / promptlayer は読み込みだけで 0.6 秒ほどかかるので、初めて使うときまで遅らせる。
+# 天気やじゃんけんしか処理しないワーカーはこれらを読み込まずに済む。
+_LAZY_IMPORTS = {
+    "APIConnectionError": "openai",
+    "APIError": "openai",
+    "APITimeoutError": "openai",
+    "AuthenticationError": "openai",
+    "InternalServerError": "openai",
+    "OpenAI": "openai",
+    "RateLimitError": "openai",
+    "PromptLayer": "promptlayer",
+}
+
+
+def _lazy(name: str) -> Any:
+    # テストで patch された値はモジュールの globals に入るので、そちらを優先する
+    value = globals().get(name)
+    if value is None:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+        globals()[name] = value
+    return value
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_IMPORTS:
+        return _lazy(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class OpenAIError(Exception):
     pass
 
 
+class OpenAIBusyError(OpenAIError):
+    """レート制限の枠が応答期限内に空かないため呼び出しを見送った"""
+
+
+def _estimate_prompt_tokens(messages: list) -> int:
+    # 日本語は概ね 1 文字 1 トークン前後なので文字数で見積もる
+    return sum(len(str(message.get("content", ""))) for message in messages)
+
+
+def _is_upstream_failure(error: Exception) -> bool:
+    # 429 や認証エラーは OpenAI 自体の障害ではないのでブレーカーの失敗に数えない
+    return isinstance(
+        error, (_lazy("APIConnectionError"), _lazy("InternalServerError"))
+    )
+
+
+def _is_not_attempted(error: Exception) -> bool:
+    # 枠待ちや処理期限切れで OpenAI を呼ばなかった場合はブレーカーの結果に数えない
+    return isinstance(error, (GovernorBusyError, DeadlineExceededError))
+
+
+def _total_tokens(response) -> Optional[int]:
+    total = getattr(getattr(response, "usage", None), "total_tokens", None)
+    return total if isinstance(total, int) else None
+
+
 class OpenAIAdapter:
     OPENAI_API_KEY_ERROR = "OPENAI_API_KEY is not set"
     DEFAULT_MODEL = "gpt-5-mini"
     NO_CHOICES_ERROR = "no choices from OpenAI"
 
-    def __init__(self, logger: Optional[Logger] = None):
+    def __init__(
+        self,
+        logger: Optional[Logger] = None,
+        governor: Optional[OpenAIGovernor] = None,
+        completion_router: Optional[CompletionRouter] = None,
+    ):
         self.logger = logger or create_logger(__name__)
         self.api_key = os.environ.get("OPENAI_API_KEY")
         if not self.api_key:
             raise OpenAIError(OpenAIAdapter.OPENAI_API_KEY_ERROR)
         self.model = os.environ.get("OPENAI_MODEL", OpenAIAdapter.DEFAULT_MODEL)
+        self.governor = governor or OpenAIGovernor.from_env()
+        self.completion_router = completion_router or CompletionRouter(self.model)
+        # 期限のない呼び出しで、ポリシーにタイムアウトがない場合の上限
+        self._default_timeout = DEFAULT_TIMEOUT_SECONDS
+        # 画像生成 1 回のタイムアウト（SDK の既定の 600 秒ではワーカーが先に強制終了される）
+        self._image_timeout = float(
+            os.environ.get("OPENAI_IMAGE_TIMEOUT_SECONDS", str(DEFAULT_TIMEOUT_SECONDS))
+        )
+        self._chat_breaker = circuit_breakers.get("openai.chat")
+        self._image_breaker = circuit_breakers.get("openai.images")
+        self._estimated_completion_tokens = int(
+            os.environ.get("OPENAI_ESTIMATED_COMPLETION_TOKENS", "1000")
+        )
 
         # PromptLayerの設定
         self.promptlayer_api_key = os.environ.get("PROMPTLAYER_API_KEY")
         if self.promptlayer_api_key:
             # PromptLayerでラップされたOpenAIクライアントを使用
             # PromptLayerのラッパーはOpenAI互換だが型チェックでは異なる型として扱われる
-            self.promptlayer_client = PromptLayer(api_key=self.promptlayer_api_key)
+            self.promptlayer_client = _lazy("PromptLayer")(
+                api_key=self.promptlayer_api_key
+            )
             OpenAIWithPL = self.promptlayer_client.openai.OpenAI
-            self.openai_client: OpenAI = OpenAIWithPL(api_key=self.api_key)  # type: ignore[assignment]
+            self.openai_client: "OpenAI" = OpenAIWithPL(api_key=self.api_key)
             self.logger.info("PromptLayer enabled with OpenAI SDK wrapper")
+            # プロンプト・スコアの記録は応答を待たせないようバックグラウンドで送る
+            self.telemetry: Optional[TelemetryExporter] = None
+            if os.environ.get("PROMPTLAYER_ASYNC_TRACKING", "1") != "0":
+                self.telemetry = TelemetryExporter.from_env(
+                    self._export_tracking, name="promptlayer"
+                )
         else:
             # 通常のOpenAIクライアントを使用
             self.promptlayer_client = None
-            self.openai_client: OpenAI = OpenAI(api_key=self.api_key)
+            self.telemetry = None
+            self.openai_client: "OpenAI" = _lazy("OpenAI")(api_key=self.api_key)
             self.logger.info("PromptLayer disabled (PROMPTLAYER_API_KEY not set)")
 
     def _call_openai_api(
@@ -52,6 +157,8 @@ class OpenAIAdapter:
         messages: list,
         pl_tags: Optional[list[str]] = None,
         return_pl_id: bool = False,
+        priority: int = PRIORITY_NORMAL,
+        prompt: Optional[PromptTemplate] = None,
     ) -> str | tuple[str, Optional[int]]:
         """OpenAI SDK + PromptLayerを使ってAPIを呼び出す
 
@@ -59,14 +166,19 @@ class OpenAIAdapter:
             messages: OpenAIに送信するメッセージ
             pl_tags: PromptLayerのタグ
             return_pl_id: PromptLayerのリクエストIDを返すかどうか
+            priority: レート制限の待ち行列での優先度（小さいほど優先）
+            prompt: messages の元になったプロンプト（キャッシュの統計とキーに使う）
 
         Returns:
             return_pl_id=False: レスポンステキスト
             return_pl_id=True: (レスポンステキスト, PromptLayerリクエストID)
         """
+        # プロンプトごとのモデル・出力上限・タイムアウト（主モデルが遅ければ代替モデル）
+        policy = self.completion_router.policy(prompt.name if prompt else None)
+        model = self.completion_router.choose_model(policy)
         try:
             self.logger.debug(
-                f"OpenAI request: model={self.model}, messages={json.dumps(messages, ensure_ascii=False)}"
+                f"OpenAI request: model={model}, messages={json.dumps(messages, ensure_ascii=False)}"
             )
         except Exception:
             pass
@@ -74,11 +186,12 @@ class OpenAIAdapter:
         try:
             # OpenAI SDKで呼び出し
             # PromptLayerでラップされている場合は自動的にログが送信される
-            kwargs = {
-                "model": self.model,
-                "messages": messages,
-                "max_completion_tokens": 3000,
-            }
+            kwargs = policy.completion_kwargs(model)
+            kwargs["messages"] = messages
+
+            # 同じプロンプトのリクエストを、先頭部分のキャッシュを持つサーバーに寄せる
+            if prompt is not None:
+                kwargs["prompt_cache_key"] = prompt.cache_key
 
             # PromptLayerを使用している場合のみpl_tagsを追加
             if self.promptlayer_api_key and pl_tags:
@@ -88,7 +201,9 @@ class OpenAIAdapter:
             if return_pl_id:
                 kwargs["return_pl_id"] = True
 
-            response = self.openai_client.chat.completions.create(**kwargs)
+            response = self._create_completion(
+                kwargs, messages, priority, prompt, policy
+            )
 
             # return_pl_id=Trueの場合、responseはタプル (response, pl_id)
             if return_pl_id and isinstance(response, tuple):
@@ -105,7 +220,24 @@ class OpenAIAdapter:
 
         except OpenAIError:
             raise
-        except (APIError, APIConnectionError, RateLimitError, AuthenticationError) as e:
+        except GovernorBusyError as e:
+            self.logger.warning(f"OpenAI request throttled: {e}")
+            raise OpenAIBusyError(str(e)) from e
+        except DeadlineExceededError as e:
+            self.logger.warning(f"OpenAI request skipped: {e}")
+            raise OpenAIBusyError(str(e)) from e
+        except CircuitOpenError as e:
+            self.logger.warning(f"OpenAI request skipped: {e}")
+            raise OpenAIError(f"OpenAI is temporarily unavailable: {e}") from e
+        except _lazy("RateLimitError") as e:
+            self.governor.penalize(model)
+            self.logger.error(f"OpenAI API error: {type(e).__name__}: {e}")
+            raise OpenAIError(f"OpenAI API error ({type(e).__name__}): {str(e)}") from e
+        except (
+            _lazy("APIError"),
+            _lazy("APIConnectionError"),
+            _lazy("AuthenticationError"),
+        ) as e:
             self.logger.error(f"OpenAI API error: {type(e).__name__}: {e}")
             raise OpenAIError(f"OpenAI API error ({type(e).__name__}): {str(e)}") from e
         except Exception as e:
@@ -114,6 +246,80 @@ class OpenAIAdapter:
             )
             raise OpenAIError(f"Unexpected error: {str(e)}") from e
 
+    def _create_completion(
+        self,
+        kwargs: dict,
+        messages: list,
+        priority: int,
+        prompt: Optional[PromptTemplate] = None,
+        policy: Optional[CompletionPolicy] = None,
+    ):
+        """レート制限の枠を取得してから chat.completions.create を呼ぶ"""
+        model = kwargs["model"]
+        router = self.completion_router
+        estimated_tokens = _estimate_prompt_tokens(messages) + min(
+            self._estimated_completion_tokens,
+            kwargs.get("max_completion_tokens", self._estimated_completion_tokens),
+        )
+
+        def create():
+            permit = self.governor.acquire(
+                model,
+                estimated_tokens=estimated_tokens,
+                priority=priority,
+                max_wait=self._governor_max_wait(),
+            )
+            used_tokens = None
+            try:
+                # 枠を待った後の残り時間で、この呼び出しのタイムアウトを決める
+                default_timeout = kwargs.get("timeout", self._default_timeout)
+                timeout = call_timeout("openai.chat", default_timeout)
+                client = self._client_within_deadline(timeout)
+                started = time.monotonic()
+                try:
+                    response = client.chat.completions.create(
+                        **dict(kwargs, timeout=timeout)
+                    )
+                except _lazy("APITimeoutError"):
+                    # 期限で短くしたタイムアウトはモデルの遅さとして数えない
+                    if policy is not None and timeout >= default_timeout:
+                        router.record_timeout(policy, model)
+                    raise
+                actual = response[0] if isinstance(response, tuple) else response
+                used_tokens = _total_tokens(actual)
+                if policy is not None:
+                    router.record(policy, model, time.monotonic() - started, actual)
+                if prompt is not None:
+                    record_prompt_usage(prompt, actual)
+                return response
+            finally:
+                permit.release(used_tokens)
+
+        return self._chat_breaker.call(
+            create,
+            is_failure=_is_upstream_failure,
+            is_not_attempted=_is_not_attempted,
+        )
+
+    def _governor_max_wait(self) -> Optional[float]:
+        deadline = current_deadline()
+        if deadline is None:
+            return None
+        return max(
+            0.0, min(self.governor.limits.max_wait_seconds, deadline.remaining())
+        )
+
+    def _client_within_deadline(self, timeout: float) -> "OpenAI":
+        """SDK の自動再試行を、処理期限までに収まる回数に絞ったクライアント"""
+        deadline = current_deadline()
+        # PromptLayer のラッパーは with_options の呼び出しも記録してしまうので使わない
+        if deadline is None or self.promptlayer_client is not None or timeout <= 0:
+            return self.openai_client
+        retries = int(deadline.remaining() // timeout) - 1
+        return self.openai_client.with_options(
+            max_retries=max(0, min(SDK_MAX_RETRIES, retries))
+        )
+
     def track_prompt(
         self,
         request_id: int,
@@ -140,10 +346,24 @@ class OpenAIAdapter:
         if prompt_input_variables is None:
             prompt_input_variables = {}
 
+        if self.telemetry is not None:
+            return self.telemetry.submit(
+                "prompt",
+                request_id=request_id,
+                prompt_name=prompt_name,
+                prompt_input_variables=prompt_input_variables,
+                version=version,
+            )
+
         try:
-            # v1.0.71以前のPromptLayer SDKを使用（v1.0.72+にはバグがある）
-            self.promptlayer_client.track.prompt(
-                request_id, prompt_name, prompt_input_variables, version
+            self._export_tracking(
+                "prompt",
+                {
+                    "request_id": request_id,
+                    "prompt_name": prompt_name,
+                    "prompt_input_variables": prompt_input_variables,
+                    "version": version,
+                },
             )
             self.logger.info(
                 f"Successfully tracked prompt: {prompt_name} (version={version}) for request_id={request_id}"
@@ -180,17 +400,16 @@ class OpenAIAdapter:
             self.logger.debug("PromptLayer disabled, skipping score tracking")
             return False
 
+        if self.telemetry is not None:
+            return self.telemetry.submit(
+                "score", request_id=request_id, score=score, score_name=score_name
+            )
+
         try:
-            try:
-                # bound method signature: (request_id, score, score_name=None)
-                self.promptlayer_client.track.score(request_id, score, score_name)
-            except TypeError:
-                # fallback to keyword form if some SDK versions require it
-                self.promptlayer_client.track.score(
-                    request_id=request_id,
-                    score=score,
-                    score_name=score_name,
-                )
+            self._export_tracking(
+                "score",
+                {"request_id": request_id, "score": score, "score_name": score_name},
+            )
             self.logger.info(
                 f"Successfully tracked score: {score_name}={score} for request_id={request_id}"
             )
@@ -199,6 +418,33 @@ class OpenAIAdapter:
             self.logger.warning(f"Failed to track score to PromptLayer: {e}")
             return False
 
+    def _export_tracking(self, kind: str, fields: dict) -> None:
+        """PromptLayer にプロンプト・スコアを 1 件送る。失敗したら例外を送出する"""
+        assert self.promptlayer_client is not None
+        track = self.promptlayer_client.track
+        if kind == "prompt":
+            # v1.0.71以前のPromptLayer SDKを使用（v1.0.72+にはバグがある）
+            result = track.prompt(
+                fields["request_id"],
+                fields["prompt_name"],
+                fields["prompt_input_variables"],
+                fields["version"],
+            )
+        elif kind == "score":
+            try:
+                # bound method signature: (request_id, score, score_name=None)
+                result = track.score(
+                    fields["request_id"], fields["score"], fields["score_name"]
+                )
+            except TypeError:
+                # fallback to keyword form if some SDK versions require it
+                result = track.score(**fields)
+        else:
+            raise ValueError(f"unknown PromptLayer event: {kind}")
+        # SDK は HTTP エラーを例外にせず False を返す
+        if result is False:
+            raise OpenAIError(f"PromptLayer rejected {kind} tracking")
+
     def get_chatgpt_meal_suggestion(
         self, return_request_id: bool = False
     ) -> str | tuple[str, Optional[int]]:
@@ -213,14 +459,13 @@ class OpenAIAdapter:
         """
         now = datetime.datetime.now(ZoneInfo("Asia/Tokyo"))
         now_str = now.strftime("%Y-%m-%d %H:%M")
-        prompt = (
-            f"現在の日時は {now_str} です。これを参考に、"
-            "あなたは親切な料理アドバイザーです。ユーザーに今すぐ作れる料理のおすすめを1つ、"
-            "簡単なレシピや調理時間（目安）と一言コメント付きで提案してください。日本語で答えてください。"
-        )
-        messages = [{"role": "user", "content": prompt}]
+        # 日時は毎回変わるので、固定の指示の後ろ（ユーザーメッセージ）に置く
+        messages = MEAL_SUGGESTION.render(datetime=now_str)
         result = self._call_openai_api(
-            messages, pl_tags=["meal_suggestion"], return_pl_id=True
+            messages,
+            pl_tags=[MEAL_SUGGESTION.name],
+            return_pl_id=True,
+            prompt=MEAL_SUGGESTION,
         )
 
         if isinstance(result, tuple):
@@ -229,9 +474,9 @@ class OpenAIAdapter:
             if pl_id is not None:
                 self.track_prompt(
                     request_id=pl_id,
-                    prompt_name="meal_suggestion",
+                    prompt_name=MEAL_SUGGESTION.name,
                     prompt_input_variables={"datetime": now_str},
-                    version=1,
+                    version=MEAL_SUGGESTION.version,
                 )
             if return_request_id:
                 return response_text, pl_id
@@ -241,18 +486,17 @@ class OpenAIAdapter:
                 return result, None
             return result
 
-    def get_chatgpt_response(self, user_message: str) -> str:
-        system_prompt = (
-            "あなたは群馬県のマスコットキャラクターの「ぐんまちゃん」です。ユーザーのメッセージに対して、"
-            "親しみやすく、時にはユーモアを交えて返答してください。"
-            "話を広げるように心がけ、ユーザーとの会話を楽しんでください。"
-        )
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message},
-        ]
+    def get_chatgpt_response(
+        self, user_message: str, history: Optional[list[dict[str, str]]] = None
+    ) -> str:
+        """ぐんまちゃんとして返答する。history は直前までの会話（要約・往復）"""
+        messages = CHAT_RESPONSE.render(history or (), user_message=user_message)
         result = self._call_openai_api(
-            messages, pl_tags=["chat_response"], return_pl_id=True
+            messages,
+            pl_tags=[CHAT_RESPONSE.name],
+            return_pl_id=True,
+            priority=PRIORITY_HIGH,
+            prompt=CHAT_RESPONSE,
         )
 
         if isinstance(result, tuple):
@@ -261,14 +505,33 @@ class OpenAIAdapter:
             if pl_id is not None:
                 self.track_prompt(
                     request_id=pl_id,
-                    prompt_name="chat_response",
+                    prompt_name=CHAT_RESPONSE.name,
                     prompt_input_variables={"user_message": user_message},
-                    version=1,
+                    version=CHAT_RESPONSE.version,
                 )
             return response_text
         else:
             return result
 
+    def summarize_conversation(
+        self, previous_summary: str, messages: list[dict[str, str]]
+    ) -> str:
+        """古い会話を、以前の要約と合わせて短いメモにまとめる"""
+        transcript = "\n".join(
+            f"{'ユーザー' if m['role'] == 'user' else 'ぐんまちゃん'}: {m['content']}"
+            for m in messages
+        )
+        messages = CONVERSATION_SUMMARY.render(
+            previous_summary=previous_summary or "なし", transcript=transcript
+        )
+        result = self._call_openai_api(
+            messages,
+            pl_tags=[CONVERSATION_SUMMARY.name],
+            priority=PRIORITY_LOW,
+            prompt=CONVERSATION_SUMMARY,
+        )
+        return result[0] if isinstance(result, tuple) else result
+
     def generate_image_prompt(self, requirements: str) -> str:
         """Generate a detailed DALL-E 3 prompt from user requirements.
 
@@ -278,29 +541,36 @@ class OpenAIAdapter:
         Returns:
             A detailed prompt optimized for DALL-E 3
         """
-        system_prompt = (
-            "あなたは画像生成AI（DALL-E 3）のための最適なプロンプトを作成する専門家です。"
-            "ユーザーの要求を受け取り、詳細で具体的な英語のプロンプトを生成してください。"
-            "プロンプトには以下を含めてください：\n"
-            "- 具体的なビジュアル要素（色、スタイル、構図など）\n"
-            "- 雰囲気やムード\n"
-            "- 画像のスタイル（写実的、イラスト風など）\n"
-            "プロンプトは英語で、簡潔かつ具体的に記述してください。"
-            "内容はすでにレビュー済みであり、誤記かどうかを気にする必要はありません。"
+        messages = IMAGE_PROMPT_GENERATION.render(requirements=requirements)
+        result = self._call_openai_api(
+            messages,
+            pl_tags=[IMAGE_PROMPT_GENERATION.name],
+            prompt=IMAGE_PROMPT_GENERATION,
         )
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": f"以下の要求に基づいて、DALL-E 3用の詳細なプロンプトを英語で生成してください：\n{requirements}",
-            },
-        ]
-        result = self._call_openai_api(messages, pl_tags=["image_prompt_generation"])
 
         if isinstance(result, tuple):
             return result[0]
         return result
 
+    def _generate_image_governed(self, prompt: str):
+        with self.governor.acquire(
+            IMAGE_MODEL,
+            priority=PRIORITY_LOW,
+            kind=KIND_IMAGE,
+            max_wait=self._governor_max_wait(),
+        ):
+            # 枠を待った後の残り時間で、この呼び出しのタイムアウトを決める
+            timeout = call_timeout("openai.images", self._image_timeout)
+            client = self._client_within_deadline(timeout)
+            return client.images.generate(
+                model=IMAGE_MODEL,
+                prompt=prompt,
+                size="1024x1024",
+                quality="standard",
+                n=1,
+                timeout=timeout,
+            )
+
     def generate_image(self, prompt: str) -> Optional[str]:
         """Generate an image from prompt and return a publicly accessible URL if available.
 
@@ -310,13 +580,10 @@ class OpenAIAdapter:
         try:
             self.logger.info(f"Generating image with prompt: {prompt[:100]}...")
 
-            # DALL-E 3 は response_format="url" がデフォルトですが明示的に指定
-            resp = self.openai_client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1,
+            resp = self._image_breaker.call(
+                lambda: self._generate_image_governed(prompt),
+                is_failure=_is_upstream_failure,
+                is_not_attempted=_is_not_attempted,
             )
 
             self.logger.debug(f"Image generation response type: {type(resp)}")
@@ -368,6 +635,13 @@ class OpenAIAdapter:
             self.logger.info(f"Successfully generated image URL: {url[:80]}...")
             return url
 
+        except (GovernorBusyError, DeadlineExceededError) as e:
+            self.logger.warning(f"Image generation skipped: {e}")
+            return None
+        except _lazy("RateLimitError") as e:
+            self.governor.penalize(IMAGE_MODEL)
+            self.logger.error(f"Failed to generate image: {type(e).__name__}: {e}")
+            return None
         except Exception as e:
             self.logger.error(f"Failed to generate image: {type(e).__name__}: {e}")
             return None
@@ -1,67 +1,173 @@
 """Pokemon API との通信を行うアダプター"""
 
-import random
-from typing import Optional
-
-import requests
+import os
+import threading
+import time
+from typing import Callable, Optional
 
 from ...domain.models.pokemon_info import PokemonInfo
+from ..cache.shared_memory_cache import TtlCache, create_cache
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError, circuit_breakers
 from ..logger import create_logger
+from .http_client import UpstreamHttpClient
+from .pokemon_id_pool import PokemonIdPool
+
+# 図鑑の内容は変わらないので長めに持つ
+DEFAULT_INFO_CACHE_TTL_SECONDS = 86400
+MAX_DRAWS = 3
+# キャッシュの全キーを読み直す間隔。共有メモリでは全スロットの走査になるため間を空ける
+DEFAULT_CACHED_IDS_REFRESH_SECONDS = 300.0
+
+
+def _create_info_cache() -> TtlCache[PokemonInfo]:
+    return create_cache(
+        max_size=int(os.environ.get("POKEMON_INFO_CACHE_SIZE", "1100")),
+        ttl_seconds=float(
+            os.environ.get(
+                "POKEMON_INFO_CACHE_TTL", str(DEFAULT_INFO_CACHE_TTL_SECONDS)
+            )
+        ),
+    )
 
 
 class PokemonApiAdapter:
-    def __init__(self, logger=None):
+    def __init__(
+        self,
+        logger=None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        id_pool: Optional[PokemonIdPool] = None,
+        info_cache: Optional[TtlCache[PokemonInfo]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         self.logger = logger or create_logger(__name__)
+        self.http = UpstreamHttpClient(
+            circuit_breaker or circuit_breakers.get("pokeapi")
+        )
+        self.id_pool = id_pool or PokemonIdPool.from_env()
+        # 空のキャッシュは偽になるので None と比べる
+        self.info_cache: TtlCache[PokemonInfo] = (
+            info_cache if info_cache is not None else _create_info_cache()
+        )
+        # キャッシュ済みの番号。取得・期限切れに合わせて増減させ、他のワーカーが
+        # 入れた分は cached_ids_refresh_seconds ごとに全キーを読み直して拾う
+        self.cached_ids_refresh_seconds = float(
+            os.environ.get(
+                "POKEMON_CACHED_IDS_REFRESH_SECONDS",
+                str(DEFAULT_CACHED_IDS_REFRESH_SECONDS),
+            )
+        )
+        self._clock = clock
+        self._cached_ids: set[int] = set()
+        self._cached_ids_synced_at: Optional[float] = None
+        self._cached_ids_lock = threading.Lock()
 
     def get_random_pokemon_info(self) -> Optional[PokemonInfo]:
+        """検証済みの番号から 1 匹選ぶ。キャッシュ済みの番号ほど選ばれやすい
+
+        アートワークか日本語名が欠けていた番号は候補から外して引き直す。
+        """
+        cached_ids = self._cached_id_snapshot()
+        for _ in range(MAX_DRAWS):
+            poke_id = self.id_pool.choose(cached_ids)
+            hit, cached = self.info_cache.get(str(poke_id))
+            if hit and cached is not None:
+                return cached
+            if poke_id in cached_ids:
+                # 期限切れ・追い出し済み
+                cached_ids.remove(poke_id)
+                with self._cached_ids_lock:
+                    self._cached_ids.discard(poke_id)
+
+            info = self._fetch_pokemon_info(poke_id)
+            if info is not None:
+                return info
+            if poke_id in self.id_pool:
+                # 通信エラーなど、番号自体の不備ではない失敗は引き直さない
+                return None
+        return None
+
+    def _cached_id_snapshot(self) -> list[int]:
+        now = self._clock()
+        with self._cached_ids_lock:
+            synced_at = self._cached_ids_synced_at
+            stale = (
+                synced_at is None or now - synced_at >= self.cached_ids_refresh_seconds
+            )
+            if stale:
+                self._cached_ids_synced_at = now
+        if stale:
+            ids = {int(key) for key in self.info_cache.keys()}
+            with self._cached_ids_lock:
+                self._cached_ids = ids
+        with self._cached_ids_lock:
+            return list(self._cached_ids)
+
+    def _fetch_pokemon_info(self, poke_id: int) -> Optional[PokemonInfo]:
+        """取得して検証に通ればキャッシュして返す。不備があれば候補から外して None"""
         try:
-            poke_id = random.randint(1, 1000)
             self.logger.debug(f"Fetching Pokemon ID: {poke_id}")
 
-            resp = requests.get(
-                f"https://pokeapi.co/api/v2/pokemon/{poke_id}", timeout=10
-            )
+            resp = self.http.get(f"https://pokeapi.co/api/v2/pokemon/{poke_id}")
             resp.raise_for_status()
             data = resp.json()
 
             zukan_no = data["id"]
             name_en = data["name"]
 
-            name = self._get_japanese_name(data, name_en)
-
             types = [t["type"]["name"] for t in data.get("types", [])]
 
-            image_url = (
-                data.get("sprites", {})
-                .get("other", {})
-                .get("official-artwork", {})
-                .get("front_default")
-            )
-
-            return PokemonInfo(
-                zukan_no=zukan_no, name=name, types=types, image_url=image_url
+            image_url = self._artwork_url(data)
+
+            try:
+                name_ja = self._lookup_japanese_name(data)
+            except Exception as e:
+                # 一時的な失敗で番号を外さないよう、英語名のまま返す（キャッシュしない）
+                self.logger.warning(f"日本語名取得に失敗: {e}")
+                return PokemonInfo(
+                    zukan_no=zukan_no, name=name_en, types=types, image_url=image_url
+                )
+
+            if not image_url or not name_ja:
+                self.logger.info(
+                    f"Pokemon ID {poke_id} にアートワークか日本語名がないため除外します"
+                )
+                self.id_pool.reject(poke_id)
+                return None
+
+            info = PokemonInfo(
+                zukan_no=zukan_no, name=name_ja, types=types, image_url=image_url
             )
+            self.info_cache.set(str(poke_id), info)
+            with self._cached_ids_lock:
+                self._cached_ids.add(poke_id)
+            return info
 
+        except CircuitOpenError as e:
+            self.logger.warning(f"PokeAPI を一時的に呼び出していません: {e}")
+            return None
         except Exception as e:
             self.logger.error(f"ポケモン情報取得エラー: {e}")
             return None
 
-    def _get_japanese_name(self, pokemon_data: dict, fallback_name: str) -> str:
-        """ポケモンの日本語名を取得する（失敗時は英語名を返す）"""
+    def _artwork_url(self, pokemon_data: dict) -> Optional[str]:
+        return (
+            pokemon_data.get("sprites", {})
+            .get("other", {})
+            .get("official-artwork", {})
+            .get("front_default")
+        )
+
+    def _lookup_japanese_name(self, pokemon_data: dict) -> Optional[str]:
+        """species から日本語名を探す。存在しなければ None、通信失敗は例外"""
         species_url = pokemon_data.get("species", {}).get("url")
         if not species_url:
-            return fallback_name
-
-        try:
-            species_resp = requests.get(species_url, timeout=10)
-            species_resp.raise_for_status()
-            species_data = species_resp.json()
-
-            for name_info in species_data.get("names", []):
-                if name_info.get("language", {}).get("name") == "ja":
-                    return name_info.get("name", fallback_name)
+            return None
 
-        except Exception as e:
-            self.logger.warning(f"日本語名取得に失敗: {e}")
+        species_resp = self.http.get(species_url)
+        species_resp.raise_for_status()
+        species_data = species_resp.json()
 
-        return fallback_name
+        for name_info in species_data.get("names", []):
+            if name_info.get("language", {}).get("name") == "ja":
+                return name_info.get("name")
+        return None
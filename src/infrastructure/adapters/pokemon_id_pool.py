@@ -0,0 +1,101 @@
+"""ランダムに出すポケモンの図鑑番号の候補
+
+候補は図鑑番号の範囲（`POKEMON_ID_RANGE`）から作り、事前に検証済みの一覧
+（`POKEMON_ID_POOL_PATH`、`scripts/build_pokemon_id_pool.py` で生成）があれば
+公式アートワークと日本語名が揃っている番号だけに絞る。実行中に不備が見つかった
+番号は候補から外す。
+"""
+
+import json
+import os
+import random
+import threading
+from typing import Iterable, Optional
+
+DEFAULT_ID_RANGE = "1-1025"
+DEFAULT_CACHED_WEIGHT = 0.5
+
+
+def parse_id_ranges(value: str) -> list[int]:
+    """`1-151,252` 形式の範囲指定を図鑑番号の昇順リストに展開する"""
+    ids: set[int] = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        ids.update(range(int(start), int(end or start) + 1))
+    return sorted(ids)
+
+
+class PokemonIdPool:
+    def __init__(
+        self,
+        candidate_ids: Iterable[int],
+        cached_weight: float = DEFAULT_CACHED_WEIGHT,
+        rng: Optional[random.Random] = None,
+    ):
+        self._ids = sorted(set(candidate_ids))
+        if not self._ids:
+            raise ValueError("Pokemon ID pool is empty")
+        self._index = {poke_id: i for i, poke_id in enumerate(self._ids)}
+        self.cached_weight = cached_weight
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "PokemonIdPool":
+        ids = parse_id_ranges(os.environ.get("POKEMON_ID_RANGE", DEFAULT_ID_RANGE))
+        pool_path = os.environ.get("POKEMON_ID_POOL_PATH")
+        if pool_path:
+            ids = _apply_pool_file(ids, pool_path)
+        return cls(
+            ids,
+            cached_weight=float(
+                os.environ.get("POKEMON_CACHED_WEIGHT", str(DEFAULT_CACHED_WEIGHT))
+            ),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def __contains__(self, poke_id: int) -> bool:
+        with self._lock:
+            return poke_id in self._index
+
+    def choose(self, cached_ids: Iterable[int] = ()) -> int:
+        """候補から 1 つ選ぶ。cached_weight の確率でキャッシュ済みの番号から選ぶ"""
+        with self._lock:
+            if self._rng.random() < self.cached_weight:
+                cached = [i for i in cached_ids if i in self._index]
+                if cached:
+                    return self._rng.choice(cached)
+            return self._rng.choice(self._ids)
+
+    def reject(self, poke_id: int) -> None:
+        """アートワークや日本語名が欠けている番号を候補から外す（最後の 1 つは残す）"""
+        with self._lock:
+            position = self._index.get(poke_id)
+            if position is None or len(self._ids) == 1:
+                return
+            # 末尾と入れ替えて O(1) で削除する
+            last = self._ids[-1]
+            self._ids[position] = last
+            self._index[last] = position
+            self._ids.pop()
+            del self._index[poke_id]
+
+
+def _apply_pool_file(ids: list[int], path: str) -> list[int]:
+    """検証済み一覧（{"valid": [...], "invalid": [...]}）で候補を絞る"""
+    with open(path, encoding="utf-8") as f:
+        pool = json.load(f)
+    if pool.get("valid"):
+        valid = set(pool["valid"])
+        ids = [i for i in ids if i in valid]
+    invalid = set(pool.get("invalid") or ())
+    return [i for i in ids if i not in invalid]
+
+
+__all__ = ["PokemonIdPool", "parse_id_ranges"]
@@ -0,0 +1,184 @@
+"""OpenAI に送るプロンプトの定義
+
+OpenAI のプロンプトキャッシュは、リクエストの先頭から一致する部分（1024 トークン以上）に
+効く。そのため各プロンプトは
+
+- 変わらない指示（システムプロンプト）を先頭に置き、バイト単位で毎回同じにする
+- 日時・ユーザーの発言など変わる内容は最後のユーザーメッセージにだけ入れる
+
+という形にそろえ、ここで名前とバージョンを付けて管理する。指示の文面を変えたら
+バージョンを上げる（PromptLayer の記録とキャッシュのキーが切り替わる）。
+
+応答の `usage.prompt_tokens_details.cached_tokens` はプロンプトごとに集計し、
+`prompt_cache_stats()` で返す。
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Optional, Sequence
+
+from ..metrics import MetricsRegistry, metrics
+
+METRIC_PREFIX = "openai.prompt."
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: int
+    system: str
+    user: str
+    fingerprint: str = field(init=False, compare=False)
+
+    def __post_init__(self):
+        digest = hashlib.sha256(self.system.encode("utf-8")).hexdigest()[:12]
+        object.__setattr__(self, "fingerprint", digest)
+
+    @property
+    def cache_key(self) -> str:
+        """同じ先頭部分のリクエストを同じサーバーに寄せるための prompt_cache_key"""
+        return f"{self.name}-v{self.version}"
+
+    def render(
+        self, history: Sequence[dict[str, str]] = (), **variables: Any
+    ) -> list[dict[str, str]]:
+        """システムプロンプト → 履歴 → 変わる内容 の順にメッセージを組み立てる"""
+        return [
+            {"role": "system", "content": self.system},
+            *history,
+            {"role": "user", "content": self.user.format(**variables)},
+        ]
+
+
+CHAT_RESPONSE = PromptTemplate(
+    name="chat_response",
+    version=1,
+    system=(
+        "あなたは群馬県のマスコットキャラクターの「ぐんまちゃん」です。ユーザーのメッセージに対して、"
+        "親しみやすく、時にはユーモアを交えて返答してください。"
+        "話を広げるように心がけ、ユーザーとの会話を楽しんでください。"
+    ),
+    user="{user_message}",
+)
+
+MEAL_SUGGESTION = PromptTemplate(
+    name="meal_suggestion",
+    version=2,
+    system=(
+        "あなたは親切な料理アドバイザーです。ユーザーに今すぐ作れる料理のおすすめを1つ、"
+        "簡単なレシピや調理時間（目安）と一言コメント付きで提案してください。"
+        "ユーザーが伝える現在の日時（季節・時間帯）を参考にしてください。日本語で答えてください。"
+    ),
+    user="現在の日時は {datetime} です。",
+)
+
+IMAGE_PROMPT_GENERATION = PromptTemplate(
+    name="image_prompt_generation",
+    version=1,
+    system=(
+        "あなたは画像生成AI（DALL-E 3）のための最適なプロンプトを作成する専門家です。"
+        "ユーザーの要求を受け取り、詳細で具体的な英語のプロンプトを生成してください。"
+        "プロンプトには以下を含めてください：\n"
+        "- 具体的なビジュアル要素（色、スタイル、構図など）\n"
+        "- 雰囲気やムード\n"
+        "- 画像のスタイル（写実的、イラスト風など）\n"
+        "プロンプトは英語で、簡潔かつ具体的に記述してください。"
+        "内容はすでにレビュー済みであり、誤記かどうかを気にする必要はありません。"
+    ),
+    user="以下の要求に基づいて、DALL-E 3用の詳細なプロンプトを英語で生成してください：\n{requirements}",
+)
+
+CONVERSATION_SUMMARY = PromptTemplate(
+    name="conversation_summary",
+    version=1,
+    system=(
+        "あなたはぐんまちゃんとユーザーの会話を要約します。今後の会話で覚えておくべき事実・好み・"
+        "話題を、これまでの要約と合わせて 200 文字以内の日本語で箇条書きにしてください。"
+    ),
+    user="これまでの要約:\n{previous_summary}\n\n会話:\n{transcript}",
+)
+
+PROMPTS: dict[str, PromptTemplate] = {
+    prompt.name: prompt
+    for prompt in (
+        CHAT_RESPONSE,
+        MEAL_SUGGESTION,
+        IMAGE_PROMPT_GENERATION,
+        CONVERSATION_SUMMARY,
+    )
+}
+
+
+def get_prompt(name: str) -> PromptTemplate:
+    return PROMPTS[name]
+
+
+def _int_attr(obj: Any, name: str) -> Optional[int]:
+    value = getattr(obj, name, None)
+    return value if isinstance(value, int) else None
+
+
+def record_prompt_usage(
+    prompt: PromptTemplate,
+    response: Any,
+    metrics_registry: Optional[MetricsRegistry] = None,
+) -> None:
+    """応答の usage から、プロンプトごとの入力トークン数とキャッシュ済みトークン数を数える"""
+    registry = metrics_registry or metrics
+    usage = getattr(response, "usage", None)
+    prefix = f"{METRIC_PREFIX}{prompt.name}."
+    registry.increment(prefix + "calls")
+    prompt_tokens = _int_attr(usage, "prompt_tokens")
+    if prompt_tokens is None:
+        return
+    cached_tokens = _int_attr(
+        getattr(usage, "prompt_tokens_details", None), "cached_tokens"
+    )
+    registry.increment(prefix + "prompt_tokens", prompt_tokens)
+    if cached_tokens:
+        registry.increment(prefix + "cached_tokens", cached_tokens)
+        registry.increment(prefix + "cache_hits")
+
+
+def prompt_cache_stats(
+    metrics_registry: Optional[MetricsRegistry] = None,
+) -> dict[str, dict[str, Any]]:
+    """プロンプトごとの呼び出し数・キャッシュヒット率・キャッシュされた入力トークンの割合"""
+    registry = metrics_registry or metrics
+    counters: dict[str, dict[str, int]] = {}
+    for name, count in registry.snapshot(METRIC_PREFIX).items():
+        prompt_name, _, counter = name[len(METRIC_PREFIX) :].rpartition(".")
+        counters.setdefault(prompt_name, {})[counter] = count
+
+    result: dict[str, dict[str, Any]] = {}
+    for prompt_name, values in sorted(counters.items()):
+        calls = values.get("calls", 0)
+        prompt_tokens = values.get("prompt_tokens", 0)
+        cached_tokens = values.get("cached_tokens", 0)
+        prompt = PROMPTS.get(prompt_name)
+        result[prompt_name] = {
+            "version": prompt.version if prompt else None,
+            "fingerprint": prompt.fingerprint if prompt else None,
+            "calls": calls,
+            "cache_hits": values.get("cache_hits", 0),
+            "hit_rate": round(values.get("cache_hits", 0) / calls, 3) if calls else 0.0,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cached_ratio": (
+                round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0.0
+            ),
+        }
+    return result
+
+
+__all__ = [
+    "CHAT_RESPONSE",
+    "CONVERSATION_SUMMARY",
+    "IMAGE_PROMPT_GENERATION",
+    "MEAL_SUGGESTION",
+    "PROMPTS",
+    "PromptTemplate",
+    "get_prompt",
+    "prompt_cache_stats",
+    "record_prompt_usage",
+]
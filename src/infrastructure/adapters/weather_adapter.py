@@ -3,14 +3,23 @@ from typing import Optional
 
 import requests
 
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError, circuit_breakers
 from ..logger import Logger, create_logger
+from .http_client import UpstreamHttpClient
 
 
 class WeatherAdapter:
-    def __init__(self, logger: Optional[Logger] = None):
+    def __init__(
+        self,
+        logger: Optional[Logger] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+    ):
         self.api_key = os.environ.get("OPENWEATHERMAP_API_KEY")
         self.base_url = "https://api.openweathermap.org/data/2.5/weather"
         self.logger: Logger = logger or create_logger(__name__)
+        self.http = UpstreamHttpClient(
+            circuit_breaker or circuit_breakers.get("openweathermap")
+        )
 
     def get_weather_text(self, location: str) -> str:
         if not self.api_key:
@@ -25,7 +34,7 @@ class WeatherAdapter:
                 "lang": "ja",  # 日本語での天気説明
             }
 
-            response = requests.get(self.base_url, params=params, timeout=10)
+            response = self.http.get(self.base_url, params=params)
             # 404 の場合は都市が見つからないので明示的にハンドリングする
             if response.status_code == 404:
                 self.logger.info(f"OpenWeatherMap: location not found: {location}")
@@ -45,6 +54,9 @@ class WeatherAdapter:
                 f"湿度: {humidity}%"
             )
 
+        except CircuitOpenError as e:
+            self.logger.warning(f"OpenWeatherMap is temporarily skipped: {e}")
+            return f"{location}の天気情報を取得できませんでした。天気サービスが不安定なため、しばらくしてからお試しください。"
         except requests.exceptions.RequestException as e:
             self.logger.error(f"OpenWeatherMap API request failed: {e}")
             return f"{location}の天気情報の取得に失敗しました。ネットワークエラーまたはAPI制限に達した可能性があります。"
@@ -0,0 +1,164 @@
+"""LRU + TTL のインメモリキャッシュ"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+def write_json_atomic(path: str, data: object) -> None:
+    """一時ファイルに書いてから置き換える
+
+    一時ファイル名は呼び出しごとに一意なので、同じ path へ複数のスレッド・ワーカーが
+    同時に書き出しても互いの書きかけを置き換えない。
+    """
+    f = tempfile.NamedTemporaryFile(
+        "w",
+        encoding="utf-8",
+        dir=os.path.dirname(os.path.abspath(path)),
+        prefix=f"{os.path.basename(path)}.",
+        suffix=".tmp",
+        delete=False,
+    )
+    try:
+        with f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    size: int
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class LruTtlCache(Generic[V]):
+    """文字列キーの LRU キャッシュ。エントリごとに有効期限を持つ。
+
+    値として None を保存するとネガティブキャッシュとして扱われ、
+    `get` は (True, None) を返す。
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Optional[V]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: str) -> tuple[bool, Optional[V]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return False, None
+
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._misses += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return True, value
+
+    def set(
+        self, key: str, value: Optional[V], ttl_seconds: Optional[float] = None
+    ) -> None:
+        ttl = self._ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def keys(self) -> list[str]:
+        """期限内のキーを古い順に返す（ヒット数には数えない）"""
+        now = self._clock()
+        with self._lock:
+            return [
+                key
+                for key, (expires_at, _) in self._entries.items()
+                if expires_at > now
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                size=len(self._entries), hits=self._hits, misses=self._misses
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def save(self, path: str) -> None:
+        """有効なエントリを JSON ファイルへ書き出す（アトミックに置き換える）"""
+        now = self._clock()
+        with self._lock:
+            rows = [
+                [key, expires_at, value]
+                for key, (expires_at, value) in self._entries.items()
+                if expires_at > now
+            ]
+
+        write_json_atomic(path, rows)
+
+    def load(self, path: str) -> int:
+        """`save` で書き出したファイルを読み込み、期限内のエントリ数を返す"""
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+
+        now = self._clock()
+        loaded = 0
+        with self._lock:
+            for key, expires_at, value in rows:
+                if expires_at <= now:
+                    continue
+                self._entries[key] = (expires_at, value)
+                loaded += 1
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        return loaded
+
+
+__all__ = ["CacheStats", "LruTtlCache", "write_json_atomic"]
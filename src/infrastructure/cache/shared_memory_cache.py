@@ -0,0 +1,394 @@
+"""gunicorn のワーカー間で共有するメモリ上のキー・バリューキャッシュ
+
+フォーク前（--preload 時のマスター）に匿名の共有 mmap を確保し、ワーカーは
+それを引き継いで同じ領域を読み書きする。ワーカーごとにキャッシュを持つと
+メモリはワーカー数倍になり、ヒット率はワーカー数分の一になるため。
+
+領域は固定長スロットの並びで、キーのハッシュで決まる `ways` 個のスロットの
+どれかに入る（セットアソシアティブ）。各スロットは
+
+    seq(u64) | key_hash(u64) | expires_at(f64) | flags(u16) | key_len(u16) |
+    value_len(u32) | key | value(pickle)
+
+で、書き込みはプロセス間ロックを取って seq を奇数にしてから行う（seqlock）。
+読み込みはロックを取らず、前後の seq が一致して偶数なら採用し、そうでなければ
+読み直す。ロックは fcntl のレコードロックなので、保持したままワーカーが
+強制終了されても OS が解放する。書き込みの途中で終了して seq が奇数のまま
+残ったスロットは、次の書き込みで偶数に戻る。セット内に空きがなければ有効期限が最も近いスロットを追い出す。
+よく読まれる値は unpickle 済みのものをプロセス内に少しだけ持ち、seq が
+変わっていなければそれを返す。
+
+`LruTtlCache` と同じインターフェースなので、アダプタはどちらでも使える。
+ヒット数・ミス数はプロセスごとに数える。
+"""
+
+import fcntl
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+import weakref
+import zlib
+from typing import Any, Callable, Generic, Optional, TypeVar, Union
+
+from .lru_ttl_cache import CacheStats, LruTtlCache, write_json_atomic
+
+V = TypeVar("V")
+
+_SLOT_HEADER = struct.Struct("<QQdHHI")
+_SEQ = struct.Struct("<Q")
+
+FLAG_EMPTY = 0
+FLAG_VALUE = 1
+FLAG_NONE = 2
+
+DEFAULT_SLOT_SIZE = 1024
+DEFAULT_WAYS = 8
+# セット内の偏りで追い出されないよう、スロットは max_size の 2 倍用意する
+SLOT_OVERPROVISION = 2
+READ_RETRIES = 8
+# プロセスごとに保持する unpickle 済みの値の上限（共有の意味が薄れないよう小さく保つ）
+DECODED_CACHE_SIZE = 256
+
+
+def _key_hash(key_bytes: bytes) -> int:
+    # hash() はプロセスごとに値が変わり得るので、固定のハッシュ関数を使う。
+    # 衝突してもキー本体を比較するので、速さを優先して CRC32 にする
+    return zlib.crc32(key_bytes)
+
+
+class _InterProcessLock:
+    """フォークしたプロセス間の排他ロック
+
+    fcntl のレコードロックはプロセス単位で、同じプロセスのスレッド同士は
+    排他しないため、プロセス内のロックと組み合わせる。
+    """
+
+    def __init__(self):
+        # フォーク前に開いたファイルを全プロセスで共有する（名前は残さない）
+        self._file = tempfile.TemporaryFile()
+        self._thread_lock = threading.Lock()
+
+    def __enter__(self) -> "_InterProcessLock":
+        self._thread_lock.acquire()
+        try:
+            fcntl.lockf(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        try:
+            fcntl.lockf(self._file, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def reset_after_fork(self) -> None:
+        # フォーク時に親の別スレッドが持っていたロックは子では解放されない
+        self._thread_lock = threading.Lock()
+
+
+class SharedMemoryCache(Generic[V]):
+    """文字列キーの共有メモリキャッシュ。エントリごとに有効期限を持つ。
+
+    値として None を保存するとネガティブキャッシュとして扱われ、
+    `get` は (True, None) を返す。スロットに収まらない値は保存しない。
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        slot_size: int = DEFAULT_SLOT_SIZE,
+        ways: int = DEFAULT_WAYS,
+        clock: Callable[[], float] = time.time,
+    ):
+        if slot_size <= _SLOT_HEADER.size:
+            raise ValueError(f"slot_size must be larger than {_SLOT_HEADER.size}")
+        self._ways = max(1, ways)
+        self._sets = max(1, -(-max_size * SLOT_OVERPROVISION // self._ways))
+        self._slot_count = self._sets * self._ways
+        self._slot_size = slot_size
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+        # fileno=-1 は MAP_SHARED | MAP_ANONYMOUS。fork した子プロセスと共有される
+        self._mm = mmap.mmap(-1, self._slot_count * slot_size)
+        self._write_lock = _InterProcessLock()
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        # スロット番号 -> (seq, キー, 値)。seq が変わっていなければ unpickle を省く
+        self._decoded: dict[int, tuple[int, bytes, Optional[V]]] = {}
+        _reset_after_fork.add(self)
+
+    @property
+    def capacity(self) -> int:
+        return self._slot_count
+
+    @property
+    def max_value_size(self) -> int:
+        return self._slot_size - _SLOT_HEADER.size
+
+    def get(self, key: str) -> tuple[bool, Optional[V]]:
+        key_bytes = key.encode("utf-8")
+        key_hash = _key_hash(key_bytes)
+        now = self._clock()
+        mm = self._mm
+        for index in self._set_slots(key_hash):
+            offset = index * self._slot_size
+            seq, slot_hash, expires_at, flags, _, _ = _SLOT_HEADER.unpack_from(
+                mm, offset
+            )
+            if flags == FLAG_EMPTY or slot_hash != key_hash:
+                continue
+            decoded = self._decoded.get(index)
+            if decoded is not None and decoded[0] == seq and decoded[1] == key_bytes:
+                if _SEQ.unpack_from(mm, offset)[0] != seq:
+                    continue
+                if expires_at <= now:
+                    break
+                self._count(hit=True)
+                return True, decoded[2]
+
+            slot = self._read_slot(index)
+            if slot is None:
+                continue
+            seq, slot_hash, expires_at, flags, key_len, body = slot
+            if slot_hash != key_hash or body[:key_len] != key_bytes:
+                continue
+            if flags == FLAG_EMPTY or expires_at <= now:
+                break
+            value = None if flags == FLAG_NONE else pickle.loads(body[key_len:])
+            if len(self._decoded) >= DECODED_CACHE_SIZE:
+                self._decoded.clear()
+            self._decoded[index] = (seq, key_bytes, value)
+            self._count(hit=True)
+            return True, value
+        self._count(hit=False)
+        return False, None
+
+    def set(
+        self, key: str, value: Optional[V], ttl_seconds: Optional[float] = None
+    ) -> None:
+        ttl = self._ttl_seconds if ttl_seconds is None else ttl_seconds
+        key_bytes = key.encode("utf-8")
+        if value is None:
+            flags, value_bytes = FLAG_NONE, b""
+        else:
+            flags, value_bytes = FLAG_VALUE, pickle.dumps(value)
+        if len(key_bytes) + len(value_bytes) > self.max_value_size:
+            return
+
+        key_hash = _key_hash(key_bytes)
+        with self._write_lock:
+            index = self._choose_slot(key_hash, key_bytes)
+            self._write_slot(
+                index,
+                key_hash,
+                self._clock() + ttl,
+                flags,
+                key_bytes,
+                value_bytes,
+            )
+
+    def invalidate(self, key: str) -> bool:
+        key_bytes = key.encode("utf-8")
+        key_hash = _key_hash(key_bytes)
+        with self._write_lock:
+            index = self._find_slot(key_hash, key_bytes)
+            if index is None:
+                return False
+            self._write_slot(index, 0, 0.0, FLAG_EMPTY, b"", b"")
+            return True
+
+    def keys(self) -> list[str]:
+        """期限内のキーを返す（ヒット数には数えない。順序はスロット順）"""
+        now = self._clock()
+        keys = []
+        for index in range(self._slot_count):
+            slot = self._read_slot(index, with_value=False)
+            if slot is None:
+                continue
+            _, _, expires_at, flags, key_len, body = slot
+            if flags != FLAG_EMPTY and expires_at > now:
+                keys.append(body[:key_len].decode("utf-8"))
+        return keys
+
+    def clear(self) -> None:
+        with self._write_lock:
+            for index in range(self._slot_count):
+                self._write_slot(index, 0, 0.0, FLAG_EMPTY, b"", b"")
+
+    def stats(self) -> CacheStats:
+        with self._stats_lock:
+            hits, misses = self._hits, self._misses
+        return CacheStats(size=len(self), hits=hits, misses=misses)
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def save(self, path: str) -> None:
+        """有効なエントリを `LruTtlCache.save` と同じ形式の JSON で書き出す"""
+        now = self._clock()
+        rows: list[list[Any]] = []
+        for index in range(self._slot_count):
+            slot = self._read_slot(index)
+            if slot is None:
+                continue
+            _, _, expires_at, flags, key_len, body = slot
+            if flags == FLAG_EMPTY or expires_at <= now:
+                continue
+            value = None if flags == FLAG_NONE else pickle.loads(body[key_len:])
+            rows.append([body[:key_len].decode("utf-8"), expires_at, value])
+
+        write_json_atomic(path, rows)
+
+    def load(self, path: str) -> int:
+        """`save` で書き出したファイルを読み込み、期限内のエントリ数を返す"""
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+
+        now = self._clock()
+        loaded = 0
+        for key, expires_at, value in rows:
+            if expires_at <= now:
+                continue
+            self.set(key, value, expires_at - now)
+            loaded += 1
+        return loaded
+
+    def _set_slots(self, key_hash: int) -> range:
+        start = (key_hash % self._sets) * self._ways
+        return range(start, start + self._ways)
+
+    def _read_slot(
+        self, index: int, with_value: bool = True
+    ) -> Optional[tuple[int, int, float, int, int, bytes]]:
+        offset = index * self._slot_size
+        mm = self._mm
+        for _ in range(READ_RETRIES):
+            seq, key_hash, expires_at, flags, key_len, value_len = (
+                _SLOT_HEADER.unpack_from(mm, offset)
+            )
+            if seq & 1:
+                continue
+            start = offset + _SLOT_HEADER.size
+            body = mm[start : start + key_len + (value_len if with_value else 0)]
+            if _SEQ.unpack_from(mm, offset)[0] == seq:
+                return seq, key_hash, expires_at, flags, key_len, body
+        # 書き込み中のまま読めなかった場合はミス扱いにする
+        return None
+
+    def _find_slot(self, key_hash: int, key_bytes: bytes) -> Optional[int]:
+        for index in self._set_slots(key_hash):
+            slot = self._read_slot(index)
+            if slot is None:
+                continue
+            _, slot_hash, _, flags, key_len, body = slot
+            if (
+                flags != FLAG_EMPTY
+                and slot_hash == key_hash
+                and body[:key_len] == key_bytes
+            ):
+                return index
+        return None
+
+    def _choose_slot(self, key_hash: int, key_bytes: bytes) -> int:
+        # 同じキー > 空き・期限切れ > 期限が最も近いスロット の順に選ぶ
+        existing = self._find_slot(key_hash, key_bytes)
+        if existing is not None:
+            return existing
+        now = self._clock()
+        slots = self._set_slots(key_hash)
+        victim, victim_expires = slots[0], float("inf")
+        for index in slots:
+            _, _, expires_at, flags, _, _ = _SLOT_HEADER.unpack_from(
+                self._mm, index * self._slot_size
+            )
+            if flags == FLAG_EMPTY or expires_at <= now:
+                return index
+            if expires_at < victim_expires:
+                victim, victim_expires = index, expires_at
+        return victim
+
+    def _write_slot(
+        self,
+        index: int,
+        key_hash: int,
+        expires_at: float,
+        flags: int,
+        key_bytes: bytes,
+        value_bytes: bytes,
+    ) -> None:
+        offset = index * self._slot_size
+        mm = self._mm
+        (seq,) = _SEQ.unpack_from(mm, offset)
+        # 前の書き込みが途中で終わって奇数のまま残っていても、奇数 → 偶数の順にする
+        writing = seq | 1
+        _SEQ.pack_into(mm, offset, writing)
+        _SLOT_HEADER.pack_into(
+            mm,
+            offset,
+            writing,
+            key_hash,
+            expires_at,
+            flags,
+            len(key_bytes),
+            len(value_bytes),
+        )
+        start = offset + _SLOT_HEADER.size
+        body = key_bytes + value_bytes
+        mm[start : start + len(body)] = body
+        _SEQ.pack_into(mm, offset, writing + 1)
+
+    def _count(self, hit: bool) -> None:
+        with self._stats_lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    def _after_fork(self) -> None:
+        self._write_lock.reset_after_fork()
+        self._reset_stats()
+
+    def _reset_stats(self) -> None:
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+
+# 件数はプロセスごと。フォーク前にマスターで数えた分はワーカーに引き継がない
+_reset_after_fork: "weakref.WeakSet[SharedMemoryCache[Any]]" = weakref.WeakSet()
+
+
+def _reset_caches_after_fork() -> None:
+    for cache in list(_reset_after_fork):
+        cache._after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_caches_after_fork)
+
+
+TtlCache = Union[LruTtlCache[V], SharedMemoryCache[V]]
+
+
+def create_cache(
+    max_size: int, ttl_seconds: float, slot_size: int = DEFAULT_SLOT_SIZE
+) -> TtlCache[Any]:
+    """SHARED_CACHE_ENABLED=1 なら共有メモリ、それ以外はプロセス内のキャッシュを返す
+
+    共有されるのはフォーク前に作ったキャッシュだけなので、--preload
+    （GUNICORN_PRELOAD=1）と組み合わせて使う。
+    """
+    if os.environ.get("SHARED_CACHE_ENABLED") == "1":
+        return SharedMemoryCache(max_size, ttl_seconds, slot_size=slot_size)
+    return LruTtlCache(max_size, ttl_seconds)
+
+
+__all__ = ["SharedMemoryCache", "TtlCache", "create_cache"]
@@ -0,0 +1,211 @@
+"""外部 API ごとのサーキットブレーカー
+
+直近の呼び出しの失敗率が閾値を超えたら OPEN にして一定時間は即座に失敗させ、
+その後 HALF_OPEN で少数の試行だけ通し、成功すれば CLOSED に戻す。
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional, TypeVar
+
+from .metrics import MetricsRegistry, metrics
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+REJECTED_METRIC = "circuit.{name}.rejected"
+OPENED_METRIC = "circuit.{name}.opened"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"circuit '{name}' is open; retry after {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _always_failure(error: Exception) -> bool:
+    return True
+
+
+def _never(error: Exception) -> bool:
+    return False
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 5,
+        window_size: int = 20,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        metrics_registry: Optional[MetricsRegistry] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._metrics = metrics_registry or metrics
+        self._clock = clock
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def call(
+        self,
+        fn: Callable[[], T],
+        is_failure: Callable[[Exception], bool] = _always_failure,
+        is_not_attempted: Callable[[Exception], bool] = _never,
+    ) -> T:
+        """fn を実行する。OPEN 中は呼ばずに CircuitOpenError を送出する
+
+        is_failure が False を返す例外（404 など上流の正常応答）は成功として数える。
+        is_not_attempted が True を返す例外（レート制限の待ちや処理期限切れで
+        上流を呼ばなかった場合）は成功にも失敗にも数えず、HALF_OPEN の試行枠も返す。
+        """
+        self._before_call()
+        try:
+            result = fn()
+        except Exception as e:
+            if is_not_attempted(e):
+                self.record_not_attempted()
+            elif is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._close()
+                return
+            self._outcomes.append(True)
+
+    def record_not_attempted(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_calls = max(0, self._half_open_calls - 1)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._outcomes.append(False)
+            if self._state == CLOSED and self._should_open():
+                self._open()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            failures = self._outcomes.count(False)
+            calls = len(self._outcomes)
+            snapshot: dict[str, Any] = {
+                "state": state,
+                "calls": calls,
+                "failure_rate": round(failures / calls, 3) if calls else 0.0,
+                "rejected": self._metrics.get(REJECTED_METRIC.format(name=self.name)),
+            }
+            if state != CLOSED:
+                snapshot["retry_after"] = round(self._retry_after(), 1)
+            return snapshot
+
+    def _before_call(self) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return
+            retry_after = self._retry_after()
+        self._metrics.increment(REJECTED_METRIC.format(name=self.name))
+        raise CircuitOpenError(self.name, retry_after)
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def _retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - self._clock())
+
+    def _should_open(self) -> bool:
+        calls = len(self._outcomes)
+        if calls < self.minimum_calls:
+            return False
+        return self._outcomes.count(False) / calls >= self.failure_rate_threshold
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._metrics.increment(OPENED_METRIC.format(name=self.name))
+
+    def _close(self) -> None:
+        self._state = CLOSED
+        self._outcomes.clear()
+
+
+class CircuitBreakerRegistry:
+    def __init__(self, metrics_registry: Optional[MetricsRegistry] = None):
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._metrics = metrics_registry or metrics
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        """名前ごとに 1 つのブレーカーを返す。設定は初回生成時の環境変数で決まる"""
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name,
+                    failure_rate_threshold=float(
+                        os.environ.get("CIRCUIT_FAILURE_RATE", "0.5")
+                    ),
+                    minimum_calls=int(os.environ.get("CIRCUIT_MIN_CALLS", "5")),
+                    window_size=int(os.environ.get("CIRCUIT_WINDOW_SIZE", "20")),
+                    open_seconds=float(os.environ.get("CIRCUIT_OPEN_SECONDS", "30")),
+                    metrics_registry=self._metrics,
+                )
+                self._breakers[name] = breaker
+            return breaker
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            breakers = sorted(self._breakers.items())
+        return {name: breaker.snapshot() for name, breaker in breakers}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._breakers.clear()
+
+
+circuit_breakers = CircuitBreakerRegistry()
+
+
+__all__ = [
+    "CircuitBreaker",
+    "CircuitBreakerRegistry",
+    "CircuitOpenError",
+    "circuit_breakers",
+]
@@ -0,0 +1,359 @@
+"""ぐんまちゃんとの会話履歴（送信元ごと）
+
+チャットの応答に直近の会話を含めるため、送信元（ユーザー・グループ・トークルーム）
+ごとに最近 N 往復をリングバッファで持つ。プロンプトが膨らまないよう、
+
+- 履歴はトークン数の見積もりが予算（`token_budget`）に収まる分だけ新しい順に使う
+- N 往復からあふれた古い往復は `summary_batch` 件たまるごとに要約し、短いメモにする
+  （Webhook の処理を待たせないよう別スレッドで行い、失敗したら往復を残して次の機会に再試行する）
+
+CONVERSATION_DB_PATH を設定すると SQLite に保存し、ワーカーをまたいで同じ履歴を使う
+（その場合は毎回ファイルから読み直す）。`idle_seconds` より長く話していない送信元の
+行はときどき削除し、フォロー解除されたユーザーの行は `forget` ですぐに消す。
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from ..cache.lru_ttl_cache import LruTtlCache
+from ..logger import Logger, create_logger
+from ..sqlite_support import ThreadLocalSqlite
+
+DEFAULT_MAX_TURNS = 6
+DEFAULT_TOKEN_BUDGET = 1200
+DEFAULT_SUMMARY_BATCH = 4
+DEFAULT_SUMMARY_MAX_TOKENS = 300
+DEFAULT_MAX_USERS = 1000
+DEFAULT_IDLE_SECONDS = 86400
+# 要約に失敗し続けても、未要約の往復は summary_batch のこの倍数までしか残さない
+MAX_PENDING_SUMMARY_BATCHES = 4
+# 話していない送信元の行を SQLite から消す間隔
+PRUNE_INTERVAL_SECONDS = 3600
+# role などメッセージ 1 件ごとに掛かる分
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "これまでの会話の要約: "
+
+# かな・漢字・全角記号はおおむね 1 文字 1 トークン、それ以外は 4 文字 1 トークン
+_WIDE_CHARS = re.compile(r"[\u3000-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+Message = dict[str, str]
+Summarizer = Callable[[str, list[Message]], str]
+
+# スレッドは最初の submit 時に生成されるため、import 時(fork 前)に作っても安全
+_summary_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="conversation-summary"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """tiktoken を使わずにトークン数を見積もる"""
+    wide = len(_WIDE_CHARS.findall(text))
+    return wide + math.ceil((len(text) - wide) / 4)
+
+
+def estimate_message_tokens(messages: list[Message]) -> int:
+    return sum(
+        estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+        for message in messages
+    )
+
+
+@dataclass(frozen=True)
+class Exchange:
+    user: str
+    assistant: str
+    # 履歴を組み立てるたびに数え直さないよう、作成時に見積もっておく
+    tokens: int = field(init=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "tokens", estimate_message_tokens(self.messages()))
+
+    def messages(self) -> list[Message]:
+        return [
+            {"role": "user", "content": self.user},
+            {"role": "assistant", "content": self.assistant},
+        ]
+
+
+@dataclass
+class Conversation:
+    turns: deque[Exchange] = field(default_factory=deque)
+    summary: str = ""
+    # リングバッファからあふれ、まだ要約に含めていない往復
+    overflow: list[Exchange] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "turns": [[t.user, t.assistant] for t in self.turns],
+                "summary": self.summary,
+                "overflow": [[t.user, t.assistant] for t in self.overflow],
+            },
+            ensure_ascii=False,
+        )
+
+    @classmethod
+    def from_json(cls, text: str) -> "Conversation":
+        data = json.loads(text)
+        return cls(
+            turns=deque(Exchange(u, a) for u, a in data.get("turns", [])),
+            summary=data.get("summary", ""),
+            overflow=[Exchange(u, a) for u, a in data.get("overflow", [])],
+        )
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    source_id TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class ConversationStore:
+    """会話履歴を SQLite（WAL）に保存する"""
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self._clock = clock
+        self._db = ThreadLocalSqlite(path, _SCHEMA)
+
+    def load(self, source_id: str, idle_seconds: float) -> Optional[Conversation]:
+        row = (
+            self._db.connection()
+            .execute(
+                "SELECT body FROM conversations WHERE source_id = ? AND updated_at > ?",
+                (source_id, self._clock() - idle_seconds),
+            )
+            .fetchone()
+        )
+        return Conversation.from_json(row[0]) if row else None
+
+    def save(self, source_id: str, conversation: Conversation) -> None:
+        self._db.connection().execute(
+            "INSERT INTO conversations (source_id, body, updated_at) VALUES (?, ?, ?)"
+            " ON CONFLICT (source_id) DO UPDATE SET body = excluded.body,"
+            " updated_at = excluded.updated_at",
+            (source_id, conversation.to_json(), self._clock()),
+        )
+
+    def delete(self, source_id: str) -> None:
+        self._db.connection().execute(
+            "DELETE FROM conversations WHERE source_id = ?", (source_id,)
+        )
+
+    def prune(self, idle_seconds: float) -> int:
+        """idle_seconds より長く更新されていない行を消し、件数を返す"""
+        cursor = self._db.connection().execute(
+            "DELETE FROM conversations WHERE updated_at <= ?",
+            (self._clock() - idle_seconds,),
+        )
+        return cursor.rowcount
+
+
+class ConversationMemory:
+    def __init__(
+        self,
+        max_turns: int = DEFAULT_MAX_TURNS,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        summary_batch: int = DEFAULT_SUMMARY_BATCH,
+        summary_max_tokens: int = DEFAULT_SUMMARY_MAX_TOKENS,
+        summarizer: Optional[Summarizer] = None,
+        store: Optional[ConversationStore] = None,
+        max_users: int = DEFAULT_MAX_USERS,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+        logger: Optional[Logger] = None,
+        clock: Callable[[], float] = time.time,
+        summary_executor: Optional[Executor] = None,
+    ):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_batch = summary_batch
+        self.summary_max_tokens = summary_max_tokens
+        self.idle_seconds = idle_seconds
+        self._summarizer = summarizer
+        self._store = store
+        self._logger = logger or create_logger(__name__)
+        self._clock = clock
+        self._conversations: LruTtlCache[Conversation] = LruTtlCache(
+            max_size=max_users, ttl_seconds=idle_seconds, clock=clock
+        )
+        self._lock = threading.Lock()
+        self._summary_executor = summary_executor or _summary_executor
+        # 要約を実行中の送信元（同じ送信元の要約を重ねて走らせない）
+        self._summarizing: set[str] = set()
+        self._next_prune_at = 0.0
+
+    @classmethod
+    def from_env(
+        cls, summarizer: Optional[Summarizer] = None
+    ) -> Optional["ConversationMemory"]:
+        """CONVERSATION_MEMORY_TURNS が 0（既定）なら None（履歴を使わない）"""
+        max_turns = int(os.environ.get("CONVERSATION_MEMORY_TURNS", "0"))
+        if max_turns <= 0:
+            return None
+        path = os.environ.get("CONVERSATION_DB_PATH")
+        return cls(
+            max_turns=max_turns,
+            token_budget=int(
+                os.environ.get("CONVERSATION_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET))
+            ),
+            summary_batch=int(
+                os.environ.get("CONVERSATION_SUMMARY_BATCH", str(DEFAULT_SUMMARY_BATCH))
+            ),
+            summarizer=summarizer,
+            store=ConversationStore(path) if path else None,
+            idle_seconds=float(
+                os.environ.get("CONVERSATION_IDLE_SECONDS", str(DEFAULT_IDLE_SECONDS))
+            ),
+        )
+
+    def context(self, source_id: str) -> list[Message]:
+        """次の応答に含める履歴（要約 + 予算に収まる直近の往復）"""
+        with self._lock:
+            conversation = self._load(source_id)
+            if conversation is None:
+                return []
+            summary = conversation.summary
+            turns = list(conversation.turns)
+
+        messages: list[Message] = []
+        budget = self.token_budget
+        if summary:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+            budget -= estimate_message_tokens(messages)
+
+        selected: list[Exchange] = []
+        for exchange in reversed(turns):
+            budget -= exchange.tokens
+            if budget < 0:
+                break
+            selected.append(exchange)
+        for exchange in reversed(selected):
+            messages.extend(exchange.messages())
+        return messages
+
+    def append(self, source_id: str, user_message: str, reply: str) -> None:
+        """1 往復を記録する。あふれた往復がたまっていれば別スレッドで要約する"""
+        with self._lock:
+            conversation = self._load(source_id) or Conversation()
+            conversation.turns.append(Exchange(user_message, reply))
+            while len(conversation.turns) > self.max_turns:
+                conversation.overflow.append(conversation.turns.popleft())
+            if self._summarizer is None:
+                conversation.overflow = []
+            pending_limit = self.summary_batch * MAX_PENDING_SUMMARY_BATCHES
+            if len(conversation.overflow) > pending_limit:
+                del conversation.overflow[:-pending_limit]
+            to_summarize: list[Exchange] = []
+            if (
+                len(conversation.overflow) >= self.summary_batch
+                and source_id not in self._summarizing
+            ):
+                to_summarize = list(conversation.overflow)
+                self._summarizing.add(source_id)
+            previous_summary = conversation.summary
+            self._save(source_id, conversation)
+
+        if to_summarize:
+            # 要約は OpenAI を呼ぶので、Webhook の処理スレッドでは待たない
+            self._summary_executor.submit(
+                self._update_summary, source_id, previous_summary, to_summarize
+            )
+
+    def forget(self, source_id: str) -> None:
+        with self._lock:
+            self._conversations.invalidate(source_id)
+            if self._store is not None:
+                self._store.delete(source_id)
+
+    def prune(self) -> int:
+        """idle_seconds より長く話していない送信元の行を SQLite から消す"""
+        if self._store is None:
+            return 0
+        return self._store.prune(self.idle_seconds)
+
+    def _update_summary(
+        self, source_id: str, previous_summary: str, exchanges: list[Exchange]
+    ) -> None:
+        try:
+            summary = self._summarize(previous_summary, exchanges)
+            if summary is None:
+                # 往復は overflow に残っているので、次に記録するときに再試行する
+                return
+            with self._lock:
+                conversation = self._load(source_id)
+                # 要約中に forget された・別のワーカーが要約した場合は反映しない
+                if (
+                    conversation is None
+                    or conversation.overflow[: len(exchanges)] != exchanges
+                ):
+                    return
+                conversation.summary = summary
+                del conversation.overflow[: len(exchanges)]
+                self._save(source_id, conversation)
+        finally:
+            with self._lock:
+                self._summarizing.discard(source_id)
+
+    def _summarize(
+        self, previous_summary: str, exchanges: list[Exchange]
+    ) -> Optional[str]:
+        assert self._summarizer is not None
+        messages = [m for exchange in exchanges for m in exchange.messages()]
+        try:
+            summary = self._summarizer(previous_summary, messages).strip()
+        except Exception as e:
+            self._logger.warning(f"会話の要約に失敗: {e}")
+            return None
+        # 見積もりで予算を超える要約は末尾を切り詰める
+        while summary and estimate_tokens(summary) > self.summary_max_tokens:
+            summary = summary[: int(len(summary) * 0.9)]
+        return summary
+
+    def _load(self, source_id: str) -> Optional[Conversation]:
+        if self._store is not None:
+            try:
+                return self._store.load(source_id, self.idle_seconds)
+            except Exception as e:
+                self._logger.warning(f"会話履歴の読み込みに失敗: {e}")
+        _, conversation = self._conversations.get(source_id)
+        return conversation
+
+    def _save(self, source_id: str, conversation: Conversation) -> None:
+        self._conversations.set(source_id, conversation)
+        if self._store is not None:
+            try:
+                self._store.save(source_id, conversation)
+                self._prune_if_due()
+            except Exception as e:
+                self._logger.warning(f"会話履歴の保存に失敗: {e}")
+
+    def _prune_if_due(self) -> None:
+        now = self._clock()
+        if now < self._next_prune_at:
+            return
+        self._next_prune_at = now + PRUNE_INTERVAL_SECONDS
+        pruned = self.prune()
+        if pruned:
+            self._logger.info(f"{pruned} 件の古い会話履歴を削除")
+
+
+__all__ = [
+    "Conversation",
+    "ConversationMemory",
+    "ConversationStore",
+    "Exchange",
+    "estimate_message_tokens",
+    "estimate_tokens",
+]
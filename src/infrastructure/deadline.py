@@ -0,0 +1,205 @@
+"""Webhook を受けてから上流の呼び出しまで引き継ぐ処理期限
+
+`/callback` でリクエストの期限（gunicorn の `TIMEOUT` から余裕を引いた時刻）を作り、
+ルーターがイベントの `timestamp` + `REQUEST_DEADLINE_MS` で絞り込む。期限は
+contextvars で usecase・アダプタへ暗黙に渡り、各アダプタは `call_timeout` で
+「既定のタイムアウト」と「期限までの残り」の短い方を 1 回の呼び出しのタイムアウトにする。
+
+期限が設定されていない（ジョブ実行スレッドや push のディスパッチャなど Webhook の外の）
+呼び出しは、従来どおり既定のタイムアウトを使う。
+
+期限の設定（`TIMEOUT` / `REQUEST_DEADLINE_MARGIN_MS` / `REQUEST_DEADLINE_MS` /
+`REQUEST_MIN_BUDGET_MS`）はメッセージごとには読まず、最初に使うときに一度だけ読む
+（`.env` を読み込んだ後になるよう、import 時ではなく初回に読む）。
+
+- `deadline.<name>.cut_short`: 残りが少ないためタイムアウトを短くした呼び出し
+- `deadline.<name>.skipped`: 期限を過ぎていたため送らなかった呼び出し
+- `deadline.worker_kills_avoided`: 既定のタイムアウトのままだとワーカーが強制終了
+  される時刻を過ぎうるため、短くした呼び出し
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
+from .metrics import MetricsRegistry, metrics
+
+DEFAULT_WORKER_TIMEOUT_SECONDS = 30.0
+DEFAULT_MARGIN_MS = 2000
+DEFAULT_REQUEST_DEADLINE_MS = 25000
+DEFAULT_MIN_BUDGET_MS = 5000
+# これより残りが少なければ送らない（送っても応答を待てない）
+MIN_CALL_SECONDS = 0.2
+
+METRIC_PREFIX = "deadline."
+WORKER_KILLS_AVOIDED_METRIC = "deadline.worker_kills_avoided"
+
+
+class DeadlineExceededError(Exception):
+    """処理期限を過ぎたため上流を呼ばなかった"""
+
+
+@dataclass(frozen=True)
+class Deadline:
+    expires_at: float
+    # ワーカーが強制終了される時刻（リクエストの受信 + gunicorn の TIMEOUT）
+    hard_limit: Optional[float] = None
+    clock: Callable[[], float] = time.time
+
+    def remaining(self) -> float:
+        return self.expires_at - self.clock()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def narrow(self, expires_at: float) -> "Deadline":
+        return Deadline(min(self.expires_at, expires_at), self.hard_limit, self.clock)
+
+
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+@dataclass(frozen=True)
+class DeadlineSettings:
+    worker_timeout_seconds: float = DEFAULT_WORKER_TIMEOUT_SECONDS
+    margin_seconds: float = DEFAULT_MARGIN_MS / 1000
+    budget_seconds: float = DEFAULT_REQUEST_DEADLINE_MS / 1000
+    min_budget_seconds: float = DEFAULT_MIN_BUDGET_MS / 1000
+
+    @classmethod
+    def from_env(cls) -> "DeadlineSettings":
+        return cls(
+            worker_timeout_seconds=float(
+                os.environ.get("TIMEOUT", DEFAULT_WORKER_TIMEOUT_SECONDS)
+            ),
+            margin_seconds=_env_ms("REQUEST_DEADLINE_MARGIN_MS", DEFAULT_MARGIN_MS),
+            budget_seconds=_env_ms("REQUEST_DEADLINE_MS", DEFAULT_REQUEST_DEADLINE_MS),
+            min_budget_seconds=_env_ms("REQUEST_MIN_BUDGET_MS", DEFAULT_MIN_BUDGET_MS),
+        )
+
+
+def _env_ms(name: str, default_ms: float) -> float:
+    return float(os.environ.get(name, default_ms)) / 1000
+
+
+_settings: Optional[DeadlineSettings] = None
+
+
+def deadline_settings() -> DeadlineSettings:
+    global _settings
+    if _settings is None:
+        _settings = DeadlineSettings.from_env()
+    return _settings
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def request_deadline(
+    clock: Callable[[], float] = time.time,
+    settings: Optional[DeadlineSettings] = None,
+) -> Deadline:
+    """Webhook を受けた時点の期限。ワーカーの TIMEOUT から余裕を引いた時刻"""
+    settings = settings or deadline_settings()
+    now = clock()
+    hard_limit = now + settings.worker_timeout_seconds
+    return Deadline(hard_limit - settings.margin_seconds, hard_limit, clock)
+
+
+def event_deadline(
+    event: Any,
+    parent: Optional[Deadline] = None,
+    settings: Optional[DeadlineSettings] = None,
+) -> Deadline:
+    """イベントの timestamp から REQUEST_DEADLINE_MS 後を期限にする
+
+    LINE が再送した古いイベントでも処理できるよう、受信から REQUEST_MIN_BUDGET_MS は残す。
+    親（リクエストの期限）があればそれより後にはしない。
+    """
+    settings = settings or deadline_settings()
+    parent = parent or current_deadline() or request_deadline(settings=settings)
+    now = parent.clock()
+    timestamp = getattr(event, "timestamp", None)
+    if isinstance(timestamp, (int, float)) and timestamp > 0:
+        expires_at = timestamp / 1000 + settings.budget_seconds
+    else:
+        expires_at = now + settings.budget_seconds
+    return parent.narrow(max(expires_at, now + settings.min_budget_seconds))
+
+
+@contextmanager
+def event_deadline_scope(event: Any) -> Iterator[Deadline]:
+    """上流を呼ぶ処理の間だけ、イベントの期限で絞り込む"""
+    with deadline_scope(event_deadline(event)) as deadline:
+        yield deadline
+
+
+def call_timeout(
+    name: str,
+    default: float,
+    skip_when_expired: bool = True,
+    metrics_registry: Optional[MetricsRegistry] = None,
+) -> float:
+    """1 回の呼び出しに使うタイムアウト（秒）
+
+    期限までの残りが MIN_CALL_SECONDS 未満なら DeadlineExceededError を送出する。
+    skip_when_expired=False（LINE への返信など、送らないとユーザーに何も届かない呼び出し）
+    なら送出せず MIN_CALL_SECONDS を返す。
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    registry = metrics_registry or metrics
+    remaining = deadline.remaining()
+    if remaining < MIN_CALL_SECONDS:
+        if skip_when_expired:
+            registry.increment(f"{METRIC_PREFIX}{name}.skipped")
+            raise DeadlineExceededError(
+                f"{name}: request deadline exceeded ({remaining:.2f}s left)"
+            )
+        remaining = MIN_CALL_SECONDS
+    if remaining >= default:
+        return default
+
+    registry.increment(f"{METRIC_PREFIX}{name}.cut_short")
+    now = deadline.clock()
+    if deadline.hard_limit is not None and now + default > deadline.hard_limit:
+        registry.increment(WORKER_KILLS_AVOIDED_METRIC)
+    return remaining
+
+
+def run_with_deadline(fn: Callable[..., Any], *args: Any) -> Callable[[], Any]:
+    """別スレッドで実行する関数に、呼び出し元の期限を引き継ぐ"""
+    context = contextvars.copy_context()
+    return lambda: context.run(fn, *args)
+
+
+__all__ = [
+    "Deadline",
+    "DeadlineExceededError",
+    "DeadlineSettings",
+    "call_timeout",
+    "current_deadline",
+    "deadline_scope",
+    "deadline_settings",
+    "event_deadline",
+    "event_deadline_scope",
+    "request_deadline",
+    "run_with_deadline",
+]
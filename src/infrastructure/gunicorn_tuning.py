@@ -0,0 +1,225 @@
+"""Gunicorn のワーカー構成をホストの資源から決める
+
+このボットの処理時間はほとんどが OpenAI・LINE などの応答待ちなので、CPU コア数に
+対して十分な並行数（スレッド・greenlet）を用意する。コアあたりに必要な並行数は
+待ち時間の割合 r から 1 / (1 - r) で見積もる（r=0.9 なら 10）。
+
+- コア数: sched_getaffinity と cgroup の CPU 上限（cpu.max / cpu.cfs_quota_us）の小さい方
+- メモリ: cgroup の上限（memory.max / memory.limit_in_bytes）、なければ MemTotal
+- ワーカー数: コア数（冗長性のため最低 2）を、メモリに収まる数で頭打ちにする
+
+WORKERS / THREADS を明示した場合はそちらを優先する。
+"""
+
+import importlib.util
+import math
+import os
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+WORKER_CLASS_GTHREAD = "gthread"
+WORKER_CLASS_GEVENT = "gevent"
+WORKER_CLASS_UVICORN = "uvicorn"
+
+# gunicorn の worker_class に渡す値と、必要なパッケージ
+_WORKER_CLASSES = {
+    WORKER_CLASS_GTHREAD: ("gthread", None),
+    WORKER_CLASS_GEVENT: ("gevent", "gevent"),
+    WORKER_CLASS_UVICORN: (
+        "src.infrastructure.uvicorn_wsgi_worker.UvicornWsgiWorker",
+        "uvicorn",
+    ),
+}
+
+DEFAULT_IO_WAIT_RATIO = 0.9
+DEFAULT_WORKER_MEMORY_MB = 100
+# マスターと OS のために残しておくメモリの割合
+MEMORY_HEADROOM_RATIO = 0.2
+MIN_WORKERS = 2
+MAX_THREADS = 32
+MAX_WORKER_CONNECTIONS = 1000
+# greenlet は軽いので、スレッドの何倍まで同時に受けるか
+GREENLETS_PER_THREAD = 10
+
+
+@dataclass(frozen=True)
+class HostResources:
+    cpu_count: int
+    memory_bytes: Optional[int]
+
+    @classmethod
+    def detect(cls, cgroup_root: str = "/sys/fs/cgroup") -> "HostResources":
+        return cls(
+            cpu_count=_detect_cpu_count(cgroup_root),
+            memory_bytes=_detect_memory_bytes(cgroup_root),
+        )
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    worker_class: str
+    workers: int
+    threads: int
+    timeout: int
+    worker_connections: Optional[int]
+    cpu_count: int
+    memory_bytes: Optional[int]
+    io_wait_ratio: float
+    note: str = ""
+
+    @property
+    def gunicorn_worker_class(self) -> str:
+        return _WORKER_CLASSES[self.worker_class][0]
+
+    def describe(self) -> str:
+        memory = (
+            f"{self.memory_bytes / 1024 / 1024:.0f}MiB"
+            if self.memory_bytes
+            else "unknown"
+        )
+        text = (
+            f"worker_class={self.worker_class} workers={self.workers} "
+            f"threads={self.threads} timeout={self.timeout}"
+        )
+        if self.worker_connections is not None:
+            text += f" worker_connections={self.worker_connections}"
+        text += (
+            f" (cpus={self.cpu_count} memory={memory} "
+            f"io_wait_ratio={self.io_wait_ratio})"
+        )
+        if self.note:
+            text += f" {self.note}"
+        return text
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _read_first_line(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.readline().strip()
+    except OSError:
+        return None
+
+
+def _detect_cpu_count(cgroup_root: str) -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota: Optional[float] = None
+    cpu_max = _read_first_line(os.path.join(cgroup_root, "cpu.max"))
+    if cpu_max:
+        limit, _, period = cpu_max.partition(" ")
+        if limit != "max" and period:
+            quota = int(limit) / int(period)
+    else:
+        limit = _read_first_line(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+        period = _read_first_line(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+        if limit and period and int(limit) > 0:
+            quota = int(limit) / int(period)
+
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return max(1, cpus)
+
+
+def _detect_memory_bytes(cgroup_root: str) -> Optional[int]:
+    for path in (
+        os.path.join(cgroup_root, "memory.max"),
+        os.path.join(cgroup_root, "memory", "memory.limit_in_bytes"),
+    ):
+        value = _read_first_line(path)
+        # cgroup v1 の「上限なし」はページ境界に丸めた巨大な値になる
+        if value and value != "max" and int(value) < 1 << 60:
+            return int(value)
+
+    meminfo = _read_first_line("/proc/meminfo")
+    if meminfo and meminfo.startswith("MemTotal:"):
+        return int(meminfo.split()[1]) * 1024
+    return None
+
+
+def _concurrency_per_core(io_wait_ratio: float) -> int:
+    io_wait_ratio = min(max(io_wait_ratio, 0.0), 0.99)
+    # 1 / (1 - 0.9) が 10.000000000000002 になるのを丸めてから切り上げる
+    return max(1, math.ceil(round(1 / (1 - io_wait_ratio), 6)))
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def autotune(
+    resources: HostResources,
+    worker_class: str = WORKER_CLASS_GTHREAD,
+    io_wait_ratio: float = DEFAULT_IO_WAIT_RATIO,
+    worker_memory_mb: int = DEFAULT_WORKER_MEMORY_MB,
+    timeout: int = 30,
+    workers: Optional[int] = None,
+    threads: Optional[int] = None,
+) -> ServerConfig:
+    """資源と待ち時間の割合から構成を決める。workers / threads を渡せばそれを使う"""
+    note = ""
+    if worker_class not in _WORKER_CLASSES:
+        raise ValueError(f"unknown worker class: {worker_class}")
+    package = _WORKER_CLASSES[worker_class][1]
+    if package and importlib.util.find_spec(package) is None:
+        note = f"({package} is not installed; fell back to gthread)"
+        worker_class = WORKER_CLASS_GTHREAD
+
+    if workers is None:
+        workers = max(MIN_WORKERS, resources.cpu_count)
+        if resources.memory_bytes:
+            usable_mb = resources.memory_bytes / 1024 / 1024
+            usable_mb *= 1 - MEMORY_HEADROOM_RATIO
+            workers = min(workers, max(1, int(usable_mb // worker_memory_mb)))
+
+    concurrency = _concurrency_per_core(io_wait_ratio)
+    if threads is None:
+        # ワーカーがコア数より多い場合は、1 ワーカーあたりの担当コアを按分する
+        cores_per_worker = resources.cpu_count / workers
+        threads = min(MAX_THREADS, max(1, math.ceil(concurrency * cores_per_worker)))
+
+    worker_connections = None
+    if worker_class == WORKER_CLASS_GEVENT:
+        worker_connections = min(MAX_WORKER_CONNECTIONS, threads * GREENLETS_PER_THREAD)
+
+    return ServerConfig(
+        worker_class=worker_class,
+        workers=workers,
+        threads=threads,
+        timeout=timeout,
+        worker_connections=worker_connections,
+        cpu_count=resources.cpu_count,
+        memory_bytes=resources.memory_bytes,
+        io_wait_ratio=io_wait_ratio,
+        note=note,
+    )
+
+
+def autotune_from_env(resources: Optional[HostResources] = None) -> ServerConfig:
+    return autotune(
+        resources or HostResources.detect(),
+        worker_class=os.environ.get("GUNICORN_WORKER_CLASS", WORKER_CLASS_GTHREAD),
+        io_wait_ratio=float(
+            os.environ.get("GUNICORN_IO_WAIT_RATIO", str(DEFAULT_IO_WAIT_RATIO))
+        ),
+        worker_memory_mb=int(
+            os.environ.get("GUNICORN_WORKER_MEMORY_MB", str(DEFAULT_WORKER_MEMORY_MB))
+        ),
+        timeout=int(os.environ.get("TIMEOUT", "30")),
+        workers=_env_int("WORKERS"),
+        threads=_env_int("THREADS"),
+    )
+
+
+__all__ = [
+    "HostResources",
+    "ServerConfig",
+    "autotune",
+    "autotune_from_env",
+]
@@ -0,0 +1,30 @@
+"""ワーカー終了時の受付停止フラグ
+
+gunicorn がワーカーに SIGTERM を送ったら立て、ジョブ実行スレッドが新しいジョブを
+拾わないようにする。新しい接続は gunicorn が受け付けなくなるので、受け付け済みの
+Webhook は断らずに graceful_timeout の間に処理し終える（LINE の Webhook 再送は
+既定で無効のため、断ると届かなくなる）。
+"""
+
+import threading
+
+
+class DrainState:
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def draining(self) -> bool:
+        return self._event.is_set()
+
+    def start(self) -> None:
+        self._event.set()
+
+    def reset(self) -> None:
+        self._event.clear()
+
+
+drain_state = DrainState()
+
+
+__all__ = ["DrainState", "drain_state"]
@@ -0,0 +1,190 @@
+"""ジョブストアのジョブを実行するバックグラウンドスレッド
+
+ワーカーごとに `JOB_WORKER_THREADS` 本動かし、非同期モードで積まれた行・
+終了したワーカーが手放した行・持ち主が落ちた行を取得して、コマンドごとに
+登録されたハンドラ（usecase の `resume`）に渡す。
+
+ハンドラが例外を投げた、またはハンドラが戻っても行が残っている（配信できなかった）
+ジョブは、試行回数に応じた指数バックオフの後に再試行する。
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from ..logger import Logger, create_logger
+from ..metrics import MetricsRegistry, metrics
+from .drain import DrainState, drain_state
+from .job_store import Job, JobStore, default_job_store
+
+DEFAULT_POLL_SECONDS = 1.0
+DEFAULT_WORKER_THREADS = 4
+DEFAULT_RETRY_BASE_SECONDS = 2.0
+DEFAULT_RETRY_MAX_SECONDS = 60.0
+
+RESUMED_METRIC = "jobs.resumed"
+RESUME_FAILED_METRIC = "jobs.resume_failed"
+RETRIED_METRIC = "jobs.retried"
+
+JobHandler = Callable[[Job], None]
+
+
+class JobResumer:
+    def __init__(
+        self,
+        store_provider: Callable[[], Optional[JobStore]] = default_job_store,
+        poll_seconds: Optional[float] = None,
+        threads: Optional[int] = None,
+        retry_base_seconds: Optional[float] = None,
+        retry_max_seconds: Optional[float] = None,
+        drain: Optional[DrainState] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
+        logger: Optional[Logger] = None,
+    ):
+        if poll_seconds is None:
+            poll_seconds = float(
+                os.environ.get("JOB_RESUME_POLL_SECONDS", str(DEFAULT_POLL_SECONDS))
+            )
+        if threads is None:
+            threads = int(
+                os.environ.get("JOB_WORKER_THREADS", str(DEFAULT_WORKER_THREADS))
+            )
+        if retry_base_seconds is None:
+            retry_base_seconds = float(
+                os.environ.get(
+                    "JOB_RETRY_BASE_SECONDS", str(DEFAULT_RETRY_BASE_SECONDS)
+                )
+            )
+        if retry_max_seconds is None:
+            retry_max_seconds = float(
+                os.environ.get("JOB_RETRY_MAX_SECONDS", str(DEFAULT_RETRY_MAX_SECONDS))
+            )
+        self.poll_seconds = poll_seconds
+        self.threads = max(1, threads)
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._store_provider = store_provider
+        self._drain = drain or drain_state
+        self._metrics = metrics_registry or metrics
+        self._logger = logger or create_logger(__name__)
+        self._handlers: dict[str, JobHandler] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._workers: list[threading.Thread] = []
+        self._worker_pid: Optional[int] = None
+        # このプロセスのスレッドがハンドラを実行中のジョブ
+        self._running: set[str] = set()
+
+    def register(self, command: str, handler: JobHandler) -> None:
+        self._handlers[command] = handler
+
+    def resume_pending(self, limit: int = 10) -> int:
+        """実行できるジョブを処理し、ハンドラが成功した件数を返す"""
+        store = self._store_provider()
+        if store is None or self._drain.draining:
+            return 0
+
+        resumed = 0
+        for job in store.claim_resumable(limit):
+            if self._run_job(store, job):
+                resumed += 1
+        return resumed
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(
+            self.retry_max_seconds,
+            self.retry_base_seconds * 2 ** max(0, attempts - 1),
+        )
+
+    def running_job_ids(self) -> list[str]:
+        with self._lock:
+            return sorted(self._running)
+
+    def _run_job(self, store: JobStore, job: Job) -> bool:
+        with self._lock:
+            self._running.add(job.id)
+        try:
+            return self._handle(store, job)
+        finally:
+            with self._lock:
+                self._running.discard(job.id)
+
+    def _handle(self, store: JobStore, job: Job) -> bool:
+        handler = self._handlers.get(job.command)
+        if handler is None:
+            self._logger.warning(f"no resume handler for job {job.command}")
+            return False
+        try:
+            handler(job)
+            error = "not delivered"
+            succeeded = True
+            self._metrics.increment(RESUMED_METRIC)
+            self._logger.info(
+                f"ran {job.command} job {job.id} (attempt {job.attempts})"
+            )
+        except Exception as e:
+            error = str(e)
+            succeeded = False
+            self._metrics.increment(RESUME_FAILED_METRIC)
+            self._logger.error(f"failed to run {job.command} job {job.id}: {e}")
+
+        # 配信できていれば ReplyScheduler が行を消しているので、残っていれば再試行する
+        delay = self.retry_delay(job.attempts)
+        if store.retry(job.id, error, delay):
+            self._metrics.increment(RETRIED_METRIC)
+            self._logger.warning(
+                f"{job.command} job {job.id} will be retried in {delay:.1f}s: {error}"
+            )
+        return succeeded
+
+    def start(self) -> None:
+        if self._store_provider() is None:
+            return
+        # Gunicorn の fork 後はスレッドが引き継がれないため、プロセスごとに起動する
+        with self._lock:
+            if self._stop.is_set():
+                return
+            if self._worker_pid != os.getpid():
+                self._workers = []
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.threads:
+                worker = threading.Thread(
+                    target=self._run,
+                    name=f"job-worker-{len(self._workers)}",
+                    daemon=True,
+                )
+                self._workers.append(worker)
+                worker.start()
+            self._worker_pid = os.getpid()
+
+    def stop(self, timeout: float = 0.0) -> None:
+        """新しいジョブを取らないようにし、実行中のジョブを最大 timeout 秒待つ"""
+        self._stop.set()
+        with self._lock:
+            workers = list(self._workers) if self._worker_pid == os.getpid() else []
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            if worker is threading.current_thread():
+                continue
+            worker.join(max(0.0, deadline - time.monotonic()))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                # 1 件ずつ取り、スレッド間で仕事を分け合う
+                if self.resume_pending(limit=1):
+                    continue
+            except Exception as e:
+                self._logger.warning(f"ジョブの実行に失敗: {e}")
+            store = self._store_provider()
+            if store is None:
+                self._stop.wait(self.poll_seconds)
+            else:
+                store.wait_for_work(self.poll_seconds)
+
+
+job_resumer = JobResumer()
+
+
+__all__ = ["JobResumer", "job_resumer"]
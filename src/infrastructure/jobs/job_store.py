@@ -0,0 +1,312 @@
+"""処理中・処理待ちのジョブを記録する SQLite のジョブストア
+
+OpenAI を呼ぶような時間のかかる応答は、処理を始めるときに入力（コマンド名・
+送信先・ペイロード）をここへ書き、配信が終わったら消す。ワーカーが再起動や
+タイムアウトで落ちても行が残るので、別のワーカーが拾い直して push で届けられる。
+非同期モードでは Webhook の処理中には実行せず、`enqueue` で積むだけにする。
+
+- in_flight: どこかのワーカーが処理中。`lease_until` を過ぎたら持ち主が落ちたとみなす
+- pending: 誰も処理していない（積まれたばかりの行、終了するワーカーが手放した行、
+  失敗して再試行を待つ行）。`available_at` 以降に拾える
+- failed: 試行回数の上限に達したもの（調査用に残す）
+
+ファイルは WAL モードで開き、gunicorn の全ワーカーから同時に読み書きする。
+引き継げるのは同じファイルを読めるワーカーだけなので、再デプロイ（新しいコンテナ）を
+またぐには永続ディスク上のパスを `JOB_STORE_PATH` に指定する。
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+from ..sqlite_support import ThreadLocalSqlite
+
+STATUS_IN_FLIGHT = "in_flight"
+STATUS_PENDING = "pending"
+STATUS_FAILED = "failed"
+
+DEFAULT_LEASE_SECONDS = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    command TEXT NOT NULL,
+    recipient TEXT,
+    reply_token TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    lease_until REAL NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, available_at, lease_until);
+"""
+
+
+@dataclass(frozen=True)
+class Job:
+    id: str
+    command: str
+    recipient: Optional[str]
+    reply_token: Optional[str]
+    payload: dict[str, Any]
+    attempts: int
+    created_at: float
+
+
+def current_owner() -> str:
+    """行の持ち主を表す文字列（フォーク後はワーカーごとに変わる）"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobStore:
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._clock = clock
+        self._db = ThreadLocalSqlite(path, _SCHEMA)
+        # 同じプロセスで積まれたジョブを、ポーリングを待たずに実行スレッドへ知らせる
+        self._work = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> Optional["JobStore"]:
+        path = os.environ.get("JOB_STORE_PATH")
+        if not path:
+            return None
+        return cls(
+            path,
+            lease_seconds=float(
+                os.environ.get("JOB_LEASE_SECONDS", str(DEFAULT_LEASE_SECONDS))
+            ),
+            max_attempts=int(
+                os.environ.get("JOB_MAX_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS))
+            ),
+        )
+
+    def checkpoint(
+        self,
+        command: str,
+        recipient: Optional[str],
+        reply_token: Optional[str],
+        payload: dict[str, Any],
+        created_at: Optional[float] = None,
+    ) -> str:
+        """処理を始めるジョブを in_flight として記録し、ID を返す
+
+        created_at はリプライトークンの起点（イベントの受信時刻）。
+        """
+        job_id = uuid.uuid4().hex
+        now = self._clock()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, command, recipient, reply_token, payload,"
+                " status, owner, lease_until, available_at, attempts, created_at,"
+                " updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?)",
+                (
+                    job_id,
+                    command,
+                    recipient,
+                    reply_token,
+                    json.dumps(payload, ensure_ascii=False),
+                    STATUS_IN_FLIGHT,
+                    current_owner(),
+                    now + self.lease_seconds,
+                    now,
+                    now if created_at is None else created_at,
+                    now,
+                ),
+            )
+        return job_id
+
+    def enqueue(
+        self,
+        command: str,
+        recipient: Optional[str],
+        reply_token: Optional[str],
+        payload: dict[str, Any],
+        created_at: Optional[float] = None,
+    ) -> str:
+        """実行を待つジョブとして積み、ID を返す。created_at はリプライトークンの起点"""
+        job_id = uuid.uuid4().hex
+        now = self._clock()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, command, recipient, reply_token, payload,"
+                " status, available_at, attempts, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?)",
+                (
+                    job_id,
+                    command,
+                    recipient,
+                    reply_token,
+                    json.dumps(payload, ensure_ascii=False),
+                    STATUS_PENDING,
+                    now,
+                    now if created_at is None else created_at,
+                    now,
+                ),
+            )
+        self._work.set()
+        return job_id
+
+    def wait_for_work(self, timeout: float) -> None:
+        """このプロセスで enqueue されるか timeout 秒経つまで待つ"""
+        if self._work.wait(timeout):
+            self._work.clear()
+
+    def complete(self, job_id: str) -> None:
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def release(self, owner: Optional[str] = None, exclude: Sequence[str] = ()) -> int:
+        """owner が処理中のジョブを手放し、すぐ他のワーカーが拾えるようにする
+
+        exclude に挙げたジョブ（まだ誰かが処理を続けているもの）は手放さない。
+        それらはプロセスが終わった後、リースが切れてから拾われる。
+        """
+        now = self._clock()
+        excluded = ""
+        if exclude:
+            excluded = f" AND id NOT IN ({', '.join('?' * len(exclude))})"
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = 0,"
+                " available_at = ?, updated_at = ? WHERE status = ? AND owner = ?"
+                + excluded,
+                (
+                    STATUS_PENDING,
+                    now,
+                    now,
+                    STATUS_IN_FLIGHT,
+                    owner or current_owner(),
+                    *exclude,
+                ),
+            )
+            return cursor.rowcount
+
+    def retry(self, job_id: str, error: str, delay_seconds: float) -> bool:
+        """自分が処理中のジョブを delay_seconds 後に再試行させる。行がなければ False
+
+        試行回数が上限に達していれば failed にする。
+        """
+        now = self._clock()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,"
+                " owner = NULL, lease_until = 0, available_at = ?, updated_at = ?,"
+                " last_error = ? WHERE id = ? AND status = ? AND owner = ?",
+                (
+                    self.max_attempts,
+                    STATUS_FAILED,
+                    STATUS_PENDING,
+                    now + delay_seconds,
+                    now,
+                    error,
+                    job_id,
+                    STATUS_IN_FLIGHT,
+                    current_owner(),
+                ),
+            )
+            return cursor.rowcount > 0
+
+    def claim_resumable(self, limit: int = 10) -> list[Job]:
+        """処理待ちのジョブ・持ち主が落ちたジョブを取得し、自分の in_flight にする"""
+        now = self._clock()
+        owner = current_owner()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, command, recipient, reply_token, payload, attempts,"
+                " created_at FROM jobs WHERE (status = ? AND available_at <= ?)"
+                " OR (status = ? AND lease_until <= ?) ORDER BY created_at LIMIT ?",
+                (STATUS_PENDING, now, STATUS_IN_FLIGHT, now, limit),
+            ).fetchall()
+
+            jobs = []
+            for job_id, command, recipient, token, payload, attempts, created in rows:
+                if attempts >= self.max_attempts:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, owner = NULL, updated_at = ?,"
+                        " last_error = ? WHERE id = ?",
+                        (STATUS_FAILED, now, "max attempts exceeded", job_id),
+                    )
+                    continue
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, lease_until = ?,"
+                    " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (
+                        STATUS_IN_FLIGHT,
+                        owner,
+                        now + self.lease_seconds,
+                        now,
+                        job_id,
+                    ),
+                )
+                jobs.append(
+                    Job(
+                        id=job_id,
+                        command=command,
+                        recipient=recipient,
+                        reply_token=token,
+                        payload=json.loads(payload),
+                        attempts=attempts + 1,
+                        created_at=created,
+                    )
+                )
+            return jobs
+
+    def counts(self) -> dict[str, int]:
+        rows = self._db.connection().execute(
+            "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+        )
+        return {status: count for status, count in rows}
+
+    def _transaction(self):
+        return self._db.transaction()
+
+
+_default_store: Optional[JobStore] = None
+_default_store_loaded = False
+_default_store_lock = threading.Lock()
+
+
+def default_job_store() -> Optional[JobStore]:
+    """JOB_STORE_PATH が設定されていればプロセス共通のストアを返す"""
+    global _default_store, _default_store_loaded
+    with _default_store_lock:
+        if not _default_store_loaded:
+            _default_store = JobStore.from_env()
+            _default_store_loaded = True
+        return _default_store
+
+
+def reset_default_job_store() -> None:
+    global _default_store, _default_store_loaded
+    with _default_store_lock:
+        _default_store = None
+        _default_store_loaded = False
+
+
+__all__ = [
+    "Job",
+    "JobStore",
+    "current_owner",
+    "default_job_store",
+    "reset_default_job_store",
+]
@@ -1,5 +1,17 @@
+from .template_factory import (
+    PrebuiltMessage,
+    digimon_zukan_message,
+    janken_options_message,
+    meal_feedback_template,
+    pokemon_zukan_message,
+)
 from .zukan_button_template import create_pokemon_zukan_button_template
 
 __all__ = [
+    "PrebuiltMessage",
     "create_pokemon_zukan_button_template",
+    "digimon_zukan_message",
+    "janken_options_message",
+    "meal_feedback_template",
+    "pokemon_zukan_message",
 ]
@@ -0,0 +1,101 @@
+"""定型の返信を事前にシリアライズしておく
+
+じゃんけんの選択肢やエラー文のように中身が変わらない返信は、メッセージ部分の
+JSON を一度だけ作り、送信時はリプライトークンを差し込むだけにする。
+`LineMessagingAdapter.reply_prepared` がこの JSON をそのまま POST する。
+"""
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Sequence
+
+from linebot.v3.messaging.models import Message, ReplyMessageRequest, TextMessage
+
+from .template_factory import janken_options_message
+
+SIGNATURE_ERROR_TEXT = "署名検証に失敗しました。管理者に連絡してください。"
+GENERAL_ERROR_TEXT = "現在障害が発生しています。管理者に連絡してください。"
+MEAL_FEEDBACK_THANKS_TEXT = "評価ありがとうございます!😊"
+
+
+@dataclass(frozen=True)
+class PreparedReply:
+    messages: tuple[Message, ...]
+    messages_json: str
+
+    def body(self, reply_token: str) -> bytes:
+        """ReplyMessageRequest と同じ JSON をリプライトークンの差し込みだけで作る"""
+        return (
+            '{"replyToken": '
+            + json.dumps(reply_token)
+            + ', "messages": '
+            + self.messages_json
+            + ', "notificationDisabled": false}'
+        ).encode("utf-8")
+
+    def to_request(self, reply_token: str) -> ReplyMessageRequest:
+        return ReplyMessageRequest(
+            replyToken=reply_token,
+            messages=list(self.messages),
+            notificationDisabled=False,
+        )
+
+
+def prepare_reply(messages: Sequence[Message]) -> PreparedReply:
+    return PreparedReply(
+        messages=tuple(messages),
+        messages_json=json.dumps([message.to_dict() for message in messages]),
+    )
+
+
+def _text(text: str) -> PreparedReply:
+    return prepare_reply([TextMessage(text=text, quickReply=None, quoteToken=None)])
+
+
+@lru_cache(maxsize=1)
+def janken_options_reply() -> PreparedReply:
+    return prepare_reply([janken_options_message().message])
+
+
+@lru_cache(maxsize=1)
+def signature_error_reply() -> PreparedReply:
+    return _text(SIGNATURE_ERROR_TEXT)
+
+
+@lru_cache(maxsize=1)
+def general_error_reply() -> PreparedReply:
+    return _text(GENERAL_ERROR_TEXT)
+
+
+@lru_cache(maxsize=1)
+def meal_feedback_thanks_reply() -> PreparedReply:
+    return _text(MEAL_FEEDBACK_THANKS_TEXT)
+
+
+def warm_prepared_replies() -> None:
+    """起動時に定型の返信をすべてシリアライズしておく"""
+    janken_options_reply()
+    signature_error_reply()
+    general_error_reply()
+    meal_feedback_thanks_reply()
+
+
+def send_prepared_reply(line_adapter: Any, reply_token: str, prepared: PreparedReply):
+    """アダプタが reply_prepared を持っていれば JSON のまま送り、なければ通常の返信にする"""
+    reply_prepared = getattr(line_adapter, "reply_prepared", None)
+    if callable(reply_prepared):
+        return reply_prepared(reply_token, prepared)
+    return line_adapter.reply_message(prepared.to_request(reply_token))
+
+
+__all__ = [
+    "PreparedReply",
+    "general_error_reply",
+    "janken_options_reply",
+    "meal_feedback_thanks_reply",
+    "prepare_reply",
+    "send_prepared_reply",
+    "signature_error_reply",
+    "warm_prepared_replies",
+]
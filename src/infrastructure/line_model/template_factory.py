@@ -0,0 +1,221 @@
+"""LINE テンプレートメッセージの組み立てを使い回すファクトリ
+
+図鑑のテンプレートは入力（図鑑番号・名前など）が同じなら中身も同じなので、
+検証済みの TemplateMessage と送信用の JSON をまとめてキャッシュする。
+返すインスタンスは共有されるため、呼び出し側で変更しないこと。
+
+料理評価のように一部だけが毎回変わるテンプレートは、固定部分を定数にして
+pydantic の検証を省いた `construct` で組み立てる（出力される JSON は同じ）。
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Mapping, Union
+
+from linebot.v3.messaging.models import (
+    ButtonsTemplate,
+    PostbackAction,
+    TemplateMessage,
+    URIAction,
+)
+
+from src.domain.models.digimon_info import DigimonInfo
+from src.domain.models.pokemon_info import PokemonInfo
+
+TEMPLATE_CACHE_SIZE = 2048
+
+POKEMON_FALLBACK_IMAGE_URL = (
+    "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/0.png"
+)
+DIGIMON_FALLBACK_IMAGE_URL = "https://digi-api.com/images/digimon/w/Agumon.png"
+
+JANKEN_CHOICES = (("✊ グー", "✊"), ("✌️ チョキ", "✌️"), ("✋ パー", "✋"))
+MEAL_FEEDBACK_CHOICES = (("😊 良い", 100), ("😐 普通", 50), ("😞 悪い", 0))
+
+
+@dataclass(frozen=True)
+class PrebuiltMessage:
+    """検証済みのメッセージと、LINE API にそのまま載せられる JSON 表現"""
+
+    message: TemplateMessage
+    payload: dict[str, Any]
+    json: str
+
+
+def _prebuilt(message: TemplateMessage) -> PrebuiltMessage:
+    return PrebuiltMessage(
+        message=message, payload=message.to_dict(), json=message.to_json()
+    )
+
+
+def _zukan_id_str(value: Any) -> str:
+    try:
+        return f"{int(value):04d}"
+    except Exception:
+        return str(value)
+
+
+def _zukan_buttons(
+    alt_text: str, title: str, text: str, image_url: str, detail_url: str
+) -> TemplateMessage:
+    actions = [URIAction(label="図鑑で見る", uri=detail_url, altUri=None)]
+
+    template = ButtonsTemplate(
+        title=title,
+        text=text,
+        thumbnailImageUrl=image_url,
+        actions=actions,
+        imageAspectRatio="rectangle",
+        imageSize="cover",
+        imageBackgroundColor="#FFFFFF",
+        defaultAction=None,
+    )
+
+    return TemplateMessage(altText=alt_text, template=template, quickReply=None)
+
+
+def build_pokemon_zukan_template(info: PokemonInfo) -> TemplateMessage:
+    """キャッシュを通さずに組み立てる（ベンチマークの比較用）"""
+    types_ja = info.types_ja
+    type_text = " / ".join(types_ja) if types_ja else "不明"
+    zukan_id_str = _zukan_id_str(info.zukan_no or 0)
+
+    return _zukan_buttons(
+        alt_text="ポケモン図鑑",
+        title=f"No.{zukan_id_str} {info.name or ''}".strip(),
+        text=f"タイプ: {type_text}",
+        image_url=info.image_url or POKEMON_FALLBACK_IMAGE_URL,
+        detail_url=f"https://zukan.pokemon.co.jp/detail/{zukan_id_str}",
+    )
+
+
+def build_digimon_zukan_template(info: DigimonInfo) -> TemplateMessage:
+    """キャッシュを通さずに組み立てる（ベンチマークの比較用）"""
+    digimon_id = info.id or 0
+    digimon_id_str = _zukan_id_str(digimon_id)
+
+    return _zukan_buttons(
+        alt_text="デジモン図鑑",
+        title=f"No.{digimon_id_str} {info.name or ''}".strip(),
+        text=f"レベル: {info.level or '不明'}",
+        image_url=info.image_url or DIGIMON_FALLBACK_IMAGE_URL,
+        detail_url=f"https://digi-api.com/digimon/{digimon_id}",
+    )
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _cached_pokemon_zukan(
+    zukan_no: int, name: str, types: tuple[str, ...], image_url: Any
+) -> PrebuiltMessage:
+    info = PokemonInfo(
+        zukan_no=zukan_no, name=name, types=list(types), image_url=image_url
+    )
+    return _prebuilt(build_pokemon_zukan_template(info))
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def _cached_digimon_zukan(
+    digimon_id: int, name: str, level: Any, image_url: Any
+) -> PrebuiltMessage:
+    info = DigimonInfo(id=digimon_id, name=name, level=level, image_url=image_url)
+    return _prebuilt(build_digimon_zukan_template(info))
+
+
+def pokemon_zukan_message(info: Union[PokemonInfo, Mapping]) -> PrebuiltMessage:
+    if not isinstance(info, PokemonInfo):
+        info = PokemonInfo.from_mapping(dict(info or {}))
+    return _cached_pokemon_zukan(
+        info.zukan_no, info.name, tuple(info.types), info.image_url
+    )
+
+
+def digimon_zukan_message(info: Union[DigimonInfo, Mapping]) -> PrebuiltMessage:
+    if not isinstance(info, DigimonInfo):
+        info = DigimonInfo.from_mapping(dict(info or {}))
+    return _cached_digimon_zukan(info.id, info.name, info.level, info.image_url)
+
+
+@lru_cache(maxsize=1)
+def janken_options_message() -> PrebuiltMessage:
+    return _prebuilt(
+        TemplateMessage(
+            altText="じゃんけんしましょう！",
+            template=ButtonsTemplate(
+                title="じゃんけん",
+                text="どれを出しますか？",
+                actions=[
+                    PostbackAction(
+                        label=label,
+                        data=f"janken:{hand}",
+                        displayText=None,
+                        inputOption=None,
+                        fillInText=None,
+                    )
+                    for label, hand in JANKEN_CHOICES
+                ],
+                thumbnailImageUrl=None,
+                imageAspectRatio=None,
+                imageSize=None,
+                imageBackgroundColor=None,
+                defaultAction=None,
+            ),
+            quickReply=None,
+        )
+    )
+
+
+def meal_feedback_template(pl_request_id: int) -> TemplateMessage:
+    """料理提案の評価ボタン。postback のデータだけがリクエストごとに変わる"""
+    actions = [
+        PostbackAction.construct(
+            type="postback",
+            label=label,
+            data=f"meal_feedback:{pl_request_id}:{score}",
+        )
+        for label, score in MEAL_FEEDBACK_CHOICES
+    ]
+    return TemplateMessage.construct(
+        type="template",
+        alt_text="料理提案の評価をお願いします",
+        template=ButtonsTemplate.construct(
+            type="buttons",
+            title="評価",
+            text="この提案はいかがでしたか？",
+            actions=actions,
+        ),
+    )
+
+
+@lru_cache(maxsize=1)
+def _meal_feedback_skeleton() -> dict[str, Any]:
+    return meal_feedback_template(0).to_dict()
+
+
+def meal_feedback_payload(pl_request_id: int) -> dict[str, Any]:
+    """`meal_feedback_template(...).to_dict()` と同じ内容を、モデルを介さずに作る"""
+    skeleton = _meal_feedback_skeleton()
+    actions = [
+        {**action, "data": f"meal_feedback:{pl_request_id}:{score}"}
+        for action, (_, score) in zip(
+            skeleton["template"]["actions"], MEAL_FEEDBACK_CHOICES
+        )
+    ]
+    return {**skeleton, "template": {**skeleton["template"], "actions": actions}}
+
+
+def clear_template_cache() -> None:
+    _cached_pokemon_zukan.cache_clear()
+    _cached_digimon_zukan.cache_clear()
+
+
+__all__ = [
+    "PrebuiltMessage",
+    "build_digimon_zukan_template",
+    "build_pokemon_zukan_template",
+    "clear_template_cache",
+    "digimon_zukan_message",
+    "janken_options_message",
+    "meal_feedback_payload",
+    "meal_feedback_template",
+    "pokemon_zukan_message",
+]
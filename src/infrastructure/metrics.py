@@ -0,0 +1,84 @@
+"""プロセス内のカウンタ・計測値を集計する簡易メトリクス"""
+
+import math
+import threading
+from collections import Counter, deque
+
+SAMPLE_WINDOW = 1024
+
+
+def _percentile(sorted_values: list[float], ratio: float) -> float:
+    # nearest-rank 法
+    rank = math.ceil(ratio * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+class MetricsRegistry:
+    def __init__(self, sample_window: int = SAMPLE_WINDOW):
+        self._counters: Counter[str] = Counter()
+        self._samples: dict[str, deque[float]] = {}
+        self._sample_window = sample_window
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, name: str) -> int:
+        with self._lock:
+            return self._counters[name]
+
+    def observe(self, name: str, value: float) -> None:
+        """計測値を記録する。直近 sample_window 件からパーセンタイルを算出する"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = deque(maxlen=self._sample_window)
+                self._samples[name] = samples
+            samples.append(value)
+            self._counters[f"{name}.count"] += 1
+
+    def summary(self, name: str) -> dict[str, float]:
+        with self._lock:
+            values = sorted(self._samples.get(name) or ())
+        if not values:
+            return {}
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": _percentile(values, 0.5),
+            "p90": _percentile(values, 0.9),
+            "p99": _percentile(values, 0.99),
+            "max": values[-1],
+        }
+
+    def percentile(self, name: str, ratio: float) -> float | None:
+        with self._lock:
+            values = sorted(self._samples.get(name) or ())
+        if not values:
+            return None
+        return _percentile(values, ratio)
+
+    def snapshot(self, prefix: str = "") -> dict[str, int]:
+        with self._lock:
+            return {
+                name: value
+                for name, value in sorted(self._counters.items())
+                if name.startswith(prefix)
+            }
+
+    def summaries(self, prefix: str = "") -> dict[str, dict[str, float]]:
+        with self._lock:
+            names = [name for name in self._samples if name.startswith(prefix)]
+        return {name: self.summary(name) for name in sorted(names)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._samples.clear()
+
+
+metrics = MetricsRegistry()
+
+
+__all__ = ["MetricsRegistry", "metrics"]
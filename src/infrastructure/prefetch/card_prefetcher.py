@@ -0,0 +1,184 @@
+"""ランダム図鑑（ポケモン・デジモン）の先読みバッファ
+
+次に返す 1 件は誰かが頼む前に決められるので、上流から取得して LINE の
+テンプレートメッセージまで組み立てたものをワーカーごとに数件だけ持っておく。
+取り出すとバックグラウンドのスレッドが非同期に補充する。
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from ..logger import Logger, create_logger
+from ..metrics import MetricsRegistry, metrics
+
+T = TypeVar("T")
+
+DEFAULT_RETRY_SECONDS = 5.0
+
+HIT_METRIC = "prefetch.{name}.hit"
+FALLBACK_METRIC = "prefetch.{name}.fallback"
+FETCH_FAILED_METRIC = "prefetch.{name}.fetch_failed"
+REFILL_LAG_METRIC = "prefetch.{name}.refill_lag_seconds"
+
+
+@dataclass(frozen=True)
+class PrefetchedCard(Generic[T]):
+    info: T
+    message: Any
+
+
+class CardPrefetcher(Generic[T]):
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[], Optional[T]],
+        build_message: Callable[[T], Any],
+        capacity: int = 3,
+        retry_seconds: float = DEFAULT_RETRY_SECONDS,
+        metrics_registry: Optional[MetricsRegistry] = None,
+        logger: Optional[Logger] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.capacity = capacity
+        self.retry_seconds = retry_seconds
+        self._fetch = fetch
+        self._build_message = build_message
+        self._metrics = metrics_registry or metrics
+        self._logger = logger or create_logger(__name__)
+        self._clock = clock
+        self._cards: deque[PrefetchedCard[T]] = deque()
+        # 取り出して空いた枠の時刻。補充されるまでの時間を refill lag として記録する
+        self._vacated_at: deque[float] = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_pid: Optional[int] = None
+
+    def take(self) -> Optional[PrefetchedCard[T]]:
+        """用意済みの 1 件を返す。空なら None（呼び出し側で上流から取得する）"""
+        self._ensure_worker()
+        with self._cond:
+            if not self._cards:
+                self._metrics.increment(FALLBACK_METRIC.format(name=self.name))
+                return None
+            card = self._cards.popleft()
+            self._vacated_at.append(self._clock())
+            self._cond.notify()
+        self._metrics.increment(HIT_METRIC.format(name=self.name))
+        return card
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._cards)
+
+    def start(self) -> None:
+        self._ensure_worker()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict[str, Any]:
+        lag = self._metrics.summary(REFILL_LAG_METRIC.format(name=self.name))
+        return {
+            "depth": self.depth(),
+            "capacity": self.capacity,
+            "hit": self._metrics.get(HIT_METRIC.format(name=self.name)),
+            "fallback": self._metrics.get(FALLBACK_METRIC.format(name=self.name)),
+            "refill_lag_p50": round(lag["p50"], 3) if lag else None,
+            "refill_lag_p99": round(lag["p99"], 3) if lag else None,
+        }
+
+    def _ensure_worker(self) -> None:
+        # Gunicorn の fork 後はスレッドが引き継がれないため、プロセスごとに起動する
+        with self._cond:
+            if self._stop.is_set():
+                return
+            alive = self._worker is not None and self._worker.is_alive()
+            if alive and self._worker_pid == os.getpid():
+                return
+            if self._worker_pid != os.getpid():
+                self._cards.clear()
+                self._vacated_at.clear()
+            self._worker = threading.Thread(
+                target=self._run, name=f"prefetch-{self.name}", daemon=True
+            )
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                while len(self._cards) >= self.capacity and not self._stop.is_set():
+                    self._cond.wait()
+            if self._stop.is_set():
+                return
+
+            card = self._prefetch_one()
+            if card is None:
+                self._metrics.increment(FETCH_FAILED_METRIC.format(name=self.name))
+                self._stop.wait(self.retry_seconds)
+                continue
+
+            with self._cond:
+                self._cards.append(card)
+                if self._vacated_at:
+                    self._metrics.observe(
+                        REFILL_LAG_METRIC.format(name=self.name),
+                        self._clock() - self._vacated_at.popleft(),
+                    )
+
+    def _prefetch_one(self) -> Optional[PrefetchedCard[T]]:
+        try:
+            info = self._fetch()
+            if info is None:
+                return None
+            return PrefetchedCard(info=info, message=self._build_message(info))
+        except Exception as e:
+            self._logger.warning(f"{self.name} の先読みに失敗: {e}")
+            return None
+
+
+class PrefetcherRegistry:
+    def __init__(self):
+        self._prefetchers: dict[str, CardPrefetcher] = {}
+        self._lock = threading.Lock()
+
+    def register(self, prefetcher: CardPrefetcher) -> None:
+        with self._lock:
+            self._prefetchers[prefetcher.name] = prefetcher
+
+    def start_all(self) -> None:
+        with self._lock:
+            prefetchers = list(self._prefetchers.values())
+        for prefetcher in prefetchers:
+            prefetcher.start()
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            prefetchers = sorted(self._prefetchers.items())
+        return {name: prefetcher.snapshot() for name, prefetcher in prefetchers}
+
+    def reset(self) -> None:
+        with self._lock:
+            prefetchers = list(self._prefetchers.values())
+            self._prefetchers.clear()
+        for prefetcher in prefetchers:
+            prefetcher.stop()
+
+
+prefetchers = PrefetcherRegistry()
+
+
+__all__ = [
+    "CardPrefetcher",
+    "PrefetchedCard",
+    "PrefetcherRegistry",
+    "prefetchers",
+]
@@ -0,0 +1,298 @@
+"""OpenAI 呼び出しのレート制限と同時実行数の制御
+
+モデルごとに requests/tokens per minute のトークンバケットと同時実行数の上限を持ち、
+状態は SharedStateStore に置いて gunicorn ワーカー間で共有する。
+待ちは優先度付きの短いキューで順番を決め、応答期限内に枠が空かない場合は
+待たずに GovernorBusyError を送出する。
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from ..metrics import MetricsRegistry, metrics
+from .shared_state import SharedStateStore, create_state_store
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+KIND_CHAT = "chat"
+KIND_IMAGE = "image"
+
+# 同時実行数の空き待ちは所要時間が分からないため短い間隔で確認する
+POLL_INTERVAL_SECONDS = 0.05
+
+WAIT_METRIC = "openai.governor.wait_seconds"
+REJECTED_METRIC = "openai.governor.rejected"
+RATE_LIMITED_METRIC = "openai.governor.rate_limited"
+
+
+class GovernorBusyError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class GovernorLimits:
+    requests_per_minute: float
+    tokens_per_minute: float
+    images_per_minute: float
+    max_concurrency: int
+    queue_size: int
+    max_wait_seconds: float
+    lease_seconds: float
+
+    @classmethod
+    def from_env(cls) -> "GovernorLimits":
+        return cls(
+            requests_per_minute=float(os.environ.get("OPENAI_RPM_LIMIT", "500")),
+            tokens_per_minute=float(os.environ.get("OPENAI_TPM_LIMIT", "200000")),
+            images_per_minute=float(os.environ.get("OPENAI_IMAGES_PER_MINUTE", "5")),
+            max_concurrency=int(os.environ.get("OPENAI_MAX_CONCURRENCY", "4")),
+            queue_size=int(os.environ.get("OPENAI_QUEUE_SIZE", "8")),
+            max_wait_seconds=float(os.environ.get("OPENAI_MAX_WAIT_MS", "10000"))
+            / 1000,
+            lease_seconds=float(os.environ.get("OPENAI_LEASE_SECONDS", "120")),
+        )
+
+
+def _refill(
+    buckets: dict[str, Any], key: str, per_minute: float, now: float
+) -> dict[str, float]:
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = {"tokens": per_minute, "updated_at": now}
+        buckets[key] = bucket
+    elapsed = max(0.0, now - bucket["updated_at"])
+    bucket["tokens"] = min(per_minute, bucket["tokens"] + elapsed * per_minute / 60)
+    bucket["updated_at"] = now
+    return bucket
+
+
+def _wait_seconds(bucket: dict[str, float], needed: float, per_minute: float) -> float:
+    missing = needed - bucket["tokens"]
+    if missing <= 0:
+        return 0.0
+    return missing / (per_minute / 60)
+
+
+class Permit:
+    """取得した実行枠。release で同時実行枠を返し、実際の使用トークン数で TPM を精算する"""
+
+    def __init__(
+        self,
+        governor: "OpenAIGovernor",
+        model: str,
+        slot_id: str,
+        reserved_tokens: int,
+    ):
+        self.model = model
+        self.slot_id = slot_id
+        self.reserved_tokens = reserved_tokens
+        self._governor = governor
+        self._released = False
+
+    def release(self, used_tokens: Optional[int] = None) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._governor._release(self, used_tokens)
+
+    def __enter__(self) -> "Permit":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class OpenAIGovernor:
+    def __init__(
+        self,
+        limits: GovernorLimits,
+        store: Optional[SharedStateStore] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.limits = limits
+        self._store = store or create_state_store(None)
+        self._metrics = metrics_registry or metrics
+        self._clock = clock
+        self._sleep = sleep
+        self._waiters: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_env(cls) -> "OpenAIGovernor":
+        return cls(
+            GovernorLimits.from_env(),
+            store=create_state_store(os.environ.get("OPENAI_GOVERNOR_STATE_PATH")),
+        )
+
+    def acquire(
+        self,
+        model: str,
+        estimated_tokens: int = 0,
+        priority: int = PRIORITY_NORMAL,
+        kind: str = KIND_CHAT,
+        max_wait: Optional[float] = None,
+    ) -> Permit:
+        """実行枠が空くまで待って取得する。max_wait 内に取れない見込みなら即座に失敗する"""
+        started_at = self._clock()
+        deadline = started_at + (
+            self.limits.max_wait_seconds if max_wait is None else max_wait
+        )
+        entry = (priority, next(self._sequence))
+
+        with self._condition:
+            if len(self._waiters) >= self.limits.queue_size:
+                self._reject(f"queue is full ({self.limits.queue_size})")
+            heapq.heappush(self._waiters, entry)
+
+        try:
+            self._wait_for_turn(entry, deadline)
+            while True:
+                reserved, value = self._store.transact(
+                    lambda state: self._try_reserve(
+                        state, model, estimated_tokens, kind
+                    )
+                )
+                if reserved:
+                    self._metrics.observe(WAIT_METRIC, self._clock() - started_at)
+                    return Permit(self, model, value, estimated_tokens)
+
+                wait = POLL_INTERVAL_SECONDS if value is None else value
+                if self._clock() + wait > deadline:
+                    self._reject(f"{model} would wait {wait:.2f}s beyond the budget")
+                self._sleep(min(wait, max(0.0, deadline - self._clock())))
+        finally:
+            with self._condition:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def penalize(self, model: str) -> None:
+        """OpenAI から 429 を受けた場合に、全ワーカーのリクエスト枠を使い切った扱いにする"""
+        self._metrics.increment(RATE_LIMITED_METRIC)
+
+        def drain(state: dict[str, Any]) -> None:
+            now = self._clock()
+            bucket = _refill(
+                state.setdefault("buckets", {}),
+                f"requests:{model}",
+                self.limits.requests_per_minute,
+                now,
+            )
+            bucket["tokens"] = 0.0
+
+        self._store.transact(drain)
+
+    def snapshot(self) -> dict[str, Any]:
+        def read(state: dict[str, Any]) -> dict[str, Any]:
+            now = self._clock()
+            return {
+                "buckets": {
+                    key: round(bucket["tokens"], 1)
+                    for key, bucket in state.get("buckets", {}).items()
+                },
+                "in_flight": {
+                    model: sum(1 for expires_at in slots.values() if expires_at > now)
+                    for model, slots in state.get("slots", {}).items()
+                },
+            }
+
+        result = self._store.transact(read)
+        with self._condition:
+            result["queued"] = len(self._waiters)
+        return result
+
+    def _wait_for_turn(self, entry: tuple[int, int], deadline: float) -> None:
+        with self._condition:
+            while self._waiters[0] != entry:
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    self._reject("timed out waiting in queue")
+                self._condition.wait(remaining)
+
+    def _try_reserve(
+        self, state: dict[str, Any], model: str, estimated_tokens: int, kind: str
+    ) -> tuple[bool, Any]:
+        now = self._clock()
+        slots = state.setdefault("slots", {}).setdefault(model, {})
+        for slot_id, expires_at in list(slots.items()):
+            # 応答前に落ちたワーカーの枠はリース切れで回収する
+            if expires_at <= now:
+                del slots[slot_id]
+        if len(slots) >= self.limits.max_concurrency:
+            return False, None
+
+        buckets = state.setdefault("buckets", {})
+        request_limit = (
+            self.limits.images_per_minute
+            if kind == KIND_IMAGE
+            else self.limits.requests_per_minute
+        )
+        requests = _refill(buckets, f"requests:{model}", request_limit, now)
+        wait = _wait_seconds(requests, 1, request_limit)
+
+        tokens = None
+        needed_tokens = min(estimated_tokens, self.limits.tokens_per_minute)
+        if needed_tokens > 0:
+            tokens = _refill(
+                buckets, f"tokens:{model}", self.limits.tokens_per_minute, now
+            )
+            wait = max(
+                wait,
+                _wait_seconds(tokens, needed_tokens, self.limits.tokens_per_minute),
+            )
+        if wait > 0:
+            return False, wait
+
+        requests["tokens"] -= 1
+        if tokens is not None:
+            tokens["tokens"] -= needed_tokens
+        slot_id = uuid.uuid4().hex
+        slots[slot_id] = now + self.limits.lease_seconds
+        return True, slot_id
+
+    def _release(self, permit: Permit, used_tokens: Optional[int]) -> None:
+        def release(state: dict[str, Any]) -> None:
+            state.setdefault("slots", {}).get(permit.model, {}).pop(
+                permit.slot_id, None
+            )
+            if used_tokens is None or permit.reserved_tokens <= 0:
+                return
+            # 見積もりとの差分を戻す（超過した場合は次の呼び出しが待つ）
+            bucket = _refill(
+                state.setdefault("buckets", {}),
+                f"tokens:{permit.model}",
+                self.limits.tokens_per_minute,
+                self._clock(),
+            )
+            bucket["tokens"] = min(
+                self.limits.tokens_per_minute,
+                bucket["tokens"] + permit.reserved_tokens - used_tokens,
+            )
+
+        self._store.transact(release)
+
+    def _reject(self, reason: str) -> None:
+        self._metrics.increment(REJECTED_METRIC)
+        raise GovernorBusyError(f"OpenAI governor rejected request: {reason}")
+
+
+__all__ = [
+    "GovernorBusyError",
+    "GovernorLimits",
+    "OpenAIGovernor",
+    "Permit",
+    "PRIORITY_HIGH",
+    "PRIORITY_LOW",
+    "PRIORITY_NORMAL",
+]
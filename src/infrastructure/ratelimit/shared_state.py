@@ -0,0 +1,69 @@
+"""レート制限の状態をプロセス間で共有するためのストア
+
+gunicorn の複数ワーカーで同じ上限を守るため、状態を JSON ファイルに置き
+`fcntl.flock` の排他ロック内で読み書きする。パス未指定時はプロセス内の dict を使う。
+"""
+
+import fcntl
+import json
+import os
+import threading
+from typing import Any, Callable, Optional, Protocol, TypeVar
+
+T = TypeVar("T")
+
+
+class SharedStateStore(Protocol):
+    def transact(self, fn: Callable[[dict[str, Any]], T]) -> T:
+        """状態を排他的に読み、fn で更新した結果を保存して fn の戻り値を返す"""
+        ...
+
+
+class InMemoryStateStore:
+    def __init__(self) -> None:
+        self._state: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def transact(self, fn: Callable[[dict[str, Any]], T]) -> T:
+        with self._lock:
+            return fn(self._state)
+
+
+class FileStateStore:
+    def __init__(self, path: str):
+        self.path = path
+
+    def transact(self, fn: Callable[[dict[str, Any]], T]) -> T:
+        # 呼び出しごとに開き直すことで、同一プロセス内のスレッド間でも flock が効く
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                raw = f.read()
+                try:
+                    state = json.loads(raw) if raw else {}
+                except ValueError:
+                    # 書き込み途中でプロセスが落ちた場合は状態を作り直す
+                    state = {}
+                result = fn(state)
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f, separators=(",", ":"))
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def create_state_store(path: Optional[str]) -> SharedStateStore:
+    if path:
+        return FileStateStore(path)
+    return InMemoryStateStore()
+
+
+__all__ = [
+    "FileStateStore",
+    "InMemoryStateStore",
+    "SharedStateStore",
+    "create_state_store",
+]
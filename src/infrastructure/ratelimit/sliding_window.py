@@ -0,0 +1,84 @@
+"""キーごとのスライディングウィンドウ・レート制限
+
+直前と現在の固定窓のカウントだけを持ち、直前窓の件数を経過割合で按分して
+スライディングウィンドウの件数を近似する（1 キーあたり 3 つの数値）。
+"""
+
+import time
+from typing import Any, Callable, Optional
+
+from .shared_state import SharedStateStore, create_state_store
+
+DEFAULT_MAX_KEYS = 10000
+
+
+class SlidingWindowLimiter:
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        window_seconds: float,
+        store: Optional[SharedStateStore] = None,
+        max_keys: int = DEFAULT_MAX_KEYS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._store = store or create_state_store(None)
+        self._clock = clock
+
+    def hit(self, key: str) -> bool:
+        """上限内なら 1 件として記録して True、超えていれば記録せず False"""
+        return self._store.transact(lambda state: self._hit(state, key))
+
+    def count(self, key: str) -> float:
+        def read(state: dict[str, Any]) -> float:
+            entry = state.get(self.name, {}).get(key)
+            if entry is None:
+                return 0.0
+            return self._estimate(self._advance(entry, self._window_index()))
+
+        return self._store.transact(read)
+
+    def _window_index(self) -> int:
+        return int(self._clock() // self.window_seconds)
+
+    def _advance(self, entry: list, window: int) -> list:
+        # entry = [窓の番号, 現在の窓の件数, 直前の窓の件数]
+        start, current, _ = entry
+        if window == start:
+            return entry
+        if window == start + 1:
+            return [window, 0, current]
+        return [window, 0, 0]
+
+    def _estimate(self, entry: list) -> float:
+        _, current, previous = entry
+        elapsed = (self._clock() % self.window_seconds) / self.window_seconds
+        return current + previous * (1 - elapsed)
+
+    def _hit(self, state: dict[str, Any], key: str) -> bool:
+        entries: dict[str, list] = state.setdefault(self.name, {})
+        window = self._window_index()
+        entry = entries.pop(key, None)
+        entry = self._advance(entry, window) if entry else [window, 0, 0]
+
+        allowed = self._estimate(entry) + 1 <= self.limit
+        if allowed:
+            entry[1] += 1
+        # 挿入順を最近使った順として扱い、古いキーから捨てる
+        entries[key] = entry
+        if len(entries) > self.max_keys:
+            self._evict(entries, window)
+        return allowed
+
+    def _evict(self, entries: dict[str, list], window: int) -> None:
+        for key in [k for k, entry in entries.items() if entry[0] < window - 1]:
+            del entries[key]
+        while len(entries) > self.max_keys:
+            del entries[next(iter(entries))]
+
+
+__all__ = ["SlidingWindowLimiter"]
@@ -0,0 +1,61 @@
+"""gunicorn のワーカー間で共有する SQLite ファイルへの接続
+
+ファイルは WAL モードで開き、接続はスレッドごと・プロセスごとに作る
+（sqlite3 の接続はスレッドやフォークをまたげない）。
+"""
+
+import os
+import sqlite3
+import threading
+
+BUSY_TIMEOUT_MS = 5000
+
+
+class ThreadLocalSqlite:
+    def __init__(self, path: str, schema: str):
+        self.path = path
+        self._schema = schema
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(self._schema)
+                self._schema_ready = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def transaction(self) -> "ImmediateTransaction":
+        return ImmediateTransaction(self.connection())
+
+
+class ImmediateTransaction:
+    """BEGIN IMMEDIATE で書き込みロックを先に取り、SELECT → UPDATE を原子的に行う"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self._conn.execute("COMMIT")
+        else:
+            self._conn.execute("ROLLBACK")
+
+
+__all__ = ["ImmediateTransaction", "ThreadLocalSqlite"]
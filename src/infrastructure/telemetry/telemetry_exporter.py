@@ -0,0 +1,405 @@
+"""PromptLayer などへの記録（テレメトリ）をバックグラウンドで送るエクスポータ
+
+`submit` はメモリ上の待ち行列に積むだけで、応答の処理を待たせない。送信は
+バックグラウンドスレッドが行い、`window_seconds` ごとに最大 `round_size` 件を
+1 件ずつ送る（PromptLayer の track API にまとめて送る口はなく、1 件 1 リクエスト）。
+
+- 送信に失敗したイベントは試行回数に応じた指数バックオフの後に送り直し、
+  `max_attempts` 回失敗したら捨てる
+- 待ち行列があふれたイベントと、終了時（`close`）に送れていないイベントは
+  `TELEMETRY_SPOOL_PATH` の SQLite に書き出す。書き出したイベントは待ち行列が
+  空いているときに（同じファイルを使う別のワーカーも含めて）読み戻して送る
+- スプールから読み戻した行は消さずにリース（`lease_until`）を付けるだけにし、
+  送れた行だけを消す。送信中にワーカーが落ちた行はリースが切れてから別のワーカーが
+  送り直す（同じイベントが二重に送られることはあるが、失われはしない）
+"""
+
+import json
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+from ..logger import Logger, create_logger
+from ..metrics import MetricsRegistry, metrics
+from ..sqlite_support import ThreadLocalSqlite
+
+DEFAULT_ROUND_SIZE = 20
+DEFAULT_WINDOW_SECONDS = 0.5
+DEFAULT_MAX_QUEUE = 1000
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_BASE_SECONDS = 1.0
+DEFAULT_RETRY_MAX_SECONDS = 60.0
+DEFAULT_SPOOL_LEASE_SECONDS = 120.0
+
+METRIC_PREFIX = "telemetry."
+
+Sender = Callable[[str, dict[str, Any]], None]
+
+
+@dataclass(eq=False)
+class TelemetryEvent:
+    kind: str
+    fields: dict[str, Any]
+    attempts: int = 0
+    available_at: float = 0.0
+    created_at: float = field(default_factory=time.time)
+    # スプールから読み戻したイベントの行 ID（送れたら ack で消す）
+    spool_id: Optional[int] = None
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS telemetry_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+"""
+
+
+class TelemetrySpool:
+    """送れなかったイベントを SQLite（WAL）に保存する"""
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = DEFAULT_SPOOL_LEASE_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._clock = clock
+        self._db = ThreadLocalSqlite(path, _SCHEMA)
+
+    def save(self, events: list[TelemetryEvent]) -> None:
+        if not events:
+            return
+        with self._db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO telemetry_events (kind, fields, attempts, created_at)"
+                " VALUES (?, ?, ?, ?)",
+                [
+                    (
+                        event.kind,
+                        json.dumps(event.fields, ensure_ascii=False),
+                        event.attempts,
+                        event.created_at,
+                    )
+                    for event in events
+                ],
+            )
+
+    def take(self, limit: int) -> list[TelemetryEvent]:
+        """リースの切れている行を古い順に最大 limit 件読み、リースを付けて返す
+
+        行は消さない。送れたら `ack`、送れなかったら `release` を呼ぶ。どちらも
+        呼ばれないまま（ワーカーが落ちて）リースが切れた行は、また取り出される。
+        """
+        now = self._clock()
+        with self._db.transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, kind, fields, attempts, created_at FROM telemetry_events"
+                " WHERE lease_until <= ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE telemetry_events SET lease_until = ? WHERE id = ?",
+                [(now + self.lease_seconds, row[0]) for row in rows],
+            )
+        return [
+            TelemetryEvent(
+                kind, json.loads(fields), attempts, 0.0, created_at, spool_id=row_id
+            )
+            for row_id, kind, fields, attempts, created_at in rows
+        ]
+
+    def ack(self, events: list[TelemetryEvent]) -> None:
+        """送れた（または捨てる）イベントの行を消す"""
+        ids = [(event.spool_id,) for event in events if event.spool_id is not None]
+        if not ids:
+            return
+        with self._db.transaction() as conn:
+            conn.executemany("DELETE FROM telemetry_events WHERE id = ?", ids)
+
+    def release(self, events: list[TelemetryEvent], delay: float) -> None:
+        """送れなかったイベントの試行回数を記録し、delay 秒後に取り出せるようにする"""
+        until = self._clock() + delay
+        rows = [
+            (event.attempts, until, event.spool_id)
+            for event in events
+            if event.spool_id is not None
+        ]
+        if not rows:
+            return
+        with self._db.transaction() as conn:
+            conn.executemany(
+                "UPDATE telemetry_events SET attempts = ?, lease_until = ?"
+                " WHERE id = ?",
+                rows,
+            )
+
+    def count(self) -> int:
+        row = (
+            self._db.connection()
+            .execute("SELECT COUNT(*) FROM telemetry_events")
+            .fetchone()
+        )
+        return row[0]
+
+
+class TelemetryExporter:
+    def __init__(
+        self,
+        sender: Sender,
+        name: str = "telemetry",
+        round_size: int = DEFAULT_ROUND_SIZE,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_base_seconds: float = DEFAULT_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = DEFAULT_RETRY_MAX_SECONDS,
+        spool: Optional[TelemetrySpool] = None,
+        autostart: bool = True,
+        metrics_registry: Optional[MetricsRegistry] = None,
+        logger: Optional[Logger] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.name = name
+        self.round_size = max(1, round_size)
+        self.window_seconds = window_seconds
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._sender = sender
+        self._spool = spool
+        self._autostart = autostart
+        self._metrics = metrics_registry or metrics
+        self._logger = logger or create_logger(__name__)
+        self._clock = clock
+        self._queue: deque[TelemetryEvent] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        _exporters.add(self)
+
+    @classmethod
+    def from_env(cls, sender: Sender, name: str = "telemetry") -> "TelemetryExporter":
+        path = os.environ.get("TELEMETRY_SPOOL_PATH")
+        return cls(
+            sender,
+            name=name,
+            round_size=int(
+                os.environ.get("TELEMETRY_ROUND_SIZE", str(DEFAULT_ROUND_SIZE))
+            ),
+            max_queue=int(
+                os.environ.get("TELEMETRY_MAX_QUEUE", str(DEFAULT_MAX_QUEUE))
+            ),
+            max_attempts=int(
+                os.environ.get("TELEMETRY_MAX_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS))
+            ),
+            spool=TelemetrySpool(path) if path else None,
+        )
+
+    def submit(self, kind: str, **fields: Any) -> bool:
+        """イベントを積む。送信は待たない。積めなかった（閉じている）ら False"""
+        event = TelemetryEvent(kind, fields, created_at=self._clock())
+        with self._condition:
+            if self._closed:
+                self._spill([event])
+                return False
+            if len(self._queue) >= self.max_queue:
+                overflow = [event]
+            else:
+                overflow = []
+                self._queue.append(event)
+                self._condition.notify()
+            if self._autostart:
+                self._ensure_thread()
+        self._metrics.increment(f"{METRIC_PREFIX}{self.name}.submitted")
+        if overflow:
+            # あふれた分だけはディスクに書く（送信先が長く止まっているときのみ）
+            self._spill(overflow)
+        return True
+
+    def export_once(self) -> int:
+        """送信できるイベントを最大 round_size 件、1 件ずつ送り、送れた件数を返す"""
+        events = self._take_ready()
+        if not events:
+            return 0
+        sent: list[TelemetryEvent] = []
+        try:
+            for index, event in enumerate(events):
+                try:
+                    self._sender(event.kind, event.fields)
+                except Exception as e:
+                    self._metrics.increment(f"{METRIC_PREFIX}{self.name}.failed")
+                    self._logger.warning(
+                        f"Failed to export {event.kind} to {self.name}: {e}"
+                    )
+                    # 送信先が落ちているとみなし、残りも同じ時刻まで待たせる
+                    self._reschedule(event, events[index + 1 :])
+                    break
+                sent.append(event)
+        finally:
+            # スプールの行は送れた分だけ消す
+            self._ack(sent)
+        self._metrics.increment(f"{METRIC_PREFIX}{self.name}.exported", len(sent))
+        return len(sent)
+
+    def retry_delay(self, attempts: int) -> float:
+        return min(
+            self.retry_max_seconds,
+            self.retry_base_seconds * 2 ** max(0, attempts - 1),
+        )
+
+    def close(self, timeout: float = 5.0) -> int:
+        """送れるだけ送り、残ったイベントをスプールに書き出して件数を返す"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        deadline = time.monotonic() + timeout
+        # スプールから読み戻したイベントは送らない（残りのワーカーに任せる）
+        while self.pending_count and time.monotonic() < deadline:
+            if not self.export_once():
+                break
+        with self._condition:
+            remaining = list(self._queue)
+            self._queue.clear()
+        self._spill(remaining)
+        return len(remaining)
+
+    @property
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._queue)
+
+    def _take_ready(self) -> list[TelemetryEvent]:
+        now = self._clock()
+        with self._condition:
+            ready = [event for event in self._queue if event.available_at <= now]
+            events = ready[: self.round_size]
+            for event in events:
+                self._queue.remove(event)
+            idle = not self._queue
+        if not events and idle and self._spool is not None:
+            # 待ち行列が空いていれば、書き出されたイベント（他のワーカーの分も）を送る
+            try:
+                events = self._spool.take(self.round_size)
+            except Exception as e:
+                self._logger.warning(f"Failed to read telemetry spool: {e}")
+        return events
+
+    def _reschedule(self, failed: TelemetryEvent, rest: list[TelemetryEvent]) -> None:
+        failed.attempts += 1
+        delay = self.retry_delay(failed.attempts)
+        available_at = self._clock() + delay
+        retry = []
+        if failed.attempts >= self.max_attempts:
+            self._metrics.increment(f"{METRIC_PREFIX}{self.name}.dropped")
+            self._logger.error(
+                f"Dropped {failed.kind} event for {self.name} after "
+                f"{failed.attempts} attempts"
+            )
+            self._ack([failed])
+        else:
+            retry.append(failed)
+        retry.extend(rest)
+        # スプールから読み戻したイベントはリースを延ばして行に戻し、メモリには持たない
+        spooled = [event for event in retry if event.spool_id is not None]
+        if spooled and self._spool is not None:
+            try:
+                self._spool.release(spooled, delay)
+            except Exception as e:
+                # 戻せなくても行はリースが切れれば読み戻される
+                self._logger.warning(f"Failed to release telemetry spool rows: {e}")
+        requeue = [event for event in retry if event.spool_id is None]
+        for event in requeue:
+            event.available_at = available_at
+        with self._condition:
+            self._queue.extendleft(reversed(requeue))
+
+    def _ack(self, events: list[TelemetryEvent]) -> None:
+        if self._spool is None or not events:
+            return
+        try:
+            self._spool.ack(events)
+        except Exception as e:
+            # 消せなかった行はリースが切れた後にもう一度送られる
+            self._logger.warning(f"Failed to ack telemetry spool rows: {e}")
+
+    def _spill(self, events: list[TelemetryEvent]) -> None:
+        if not events:
+            return
+        if self._spool is None:
+            self._metrics.increment(f"{METRIC_PREFIX}{self.name}.dropped", len(events))
+            self._logger.warning(
+                f"Dropped {len(events)} {self.name} events (no TELEMETRY_SPOOL_PATH)"
+            )
+            return
+        try:
+            self._spool.save(events)
+            self._metrics.increment(f"{METRIC_PREFIX}{self.name}.spooled", len(events))
+        except Exception as e:
+            self._metrics.increment(f"{METRIC_PREFIX}{self.name}.dropped", len(events))
+            self._logger.error(f"Failed to spool {self.name} events: {e}")
+
+    def _ensure_thread(self) -> None:
+        # fork 後の各ワーカーで最初に積まれたときにスレッドを起動する
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.name}-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if self._closed:
+                    return
+                if not self._queue and self._spool is None:
+                    self._condition.wait()
+                    continue
+            # 後続のイベントを待ってからまとめて送る
+            time.sleep(self.window_seconds)
+            try:
+                if self.export_once():
+                    continue
+            except Exception as e:
+                self._logger.warning(f"Telemetry export loop error: {e}")
+            with self._condition:
+                if not self._closed:
+                    self._condition.wait(self._idle_wait())
+
+    def _idle_wait(self) -> float:
+        # 再試行待ちのイベントがあればその時刻まで、なければスプールを見に行く間隔
+        if self._queue:
+            next_at = min(event.available_at for event in self._queue)
+            return max(self.window_seconds, next_at - self._clock())
+        return self.retry_max_seconds
+
+
+_exporters: "weakref.WeakSet[TelemetryExporter]" = weakref.WeakSet()
+
+
+def close_exporters(timeout: float = 5.0) -> int:
+    """ワーカー終了時に呼ぶ。全エクスポータを閉じ、書き出した件数を返す"""
+    return sum(exporter.close(timeout) for exporter in list(_exporters))
+
+
+__all__ = [
+    "TelemetryEvent",
+    "TelemetryExporter",
+    "TelemetrySpool",
+    "close_exporters",
+]
@@ -0,0 +1,14 @@
+"""Flask（WSGI）アプリを uvicorn で動かす gunicorn ワーカー
+
+uvicorn の既定ではアプリを ASGI として扱うため、interface を wsgi に固定する。
+GUNICORN_WORKER_CLASS=uvicorn で、uvicorn がインストールされているときだけ使う。
+"""
+
+from uvicorn.workers import UvicornWorker
+
+
+class UvicornWsgiWorker(UvicornWorker):
+    CONFIG_KWARGS = {**UvicornWorker.CONFIG_KWARGS, "interface": "wsgi"}
+
+
+__all__ = ["UvicornWsgiWorker"]
@@ -3,8 +3,25 @@ set -euo pipefail
 
 : "Start script to run the application with gunicorn. Uses $PORT (default 8080)."
 PORT=${PORT:-8080}
-WORKERS=${WORKERS:-2}
-THREADS=${THREADS:-4}
 TIMEOUT=${TIMEOUT:-30}
+# WORKERS / THREADS は未指定ならコア数・メモリ上限から gunicorn.conf.py が決める
+# OpenAI のレート制限状態をワーカー間で共有する
+export OPENAI_GOVERNOR_STATE_PATH=${OPENAI_GOVERNOR_STATE_PATH:-/tmp/openai-governor.json}
+# ランダム図鑑（ポケモン・デジモン）をワーカーごとに先読みしておく件数
+export PREFETCH_DEPTH=${PREFETCH_DEPTH:-3}
 
-exec gunicorn --bind 0.0.0.0:${PORT} --workers ${WORKERS} --threads ${THREADS} --timeout ${TIMEOUT} "src.app:app"
+# マスターでアプリを読み込んでからフォークし、ワーカーの起動を速くする
+export GUNICORN_PRELOAD=${GUNICORN_PRELOAD:-1}
+# プロフィール・ポケモン情報のキャッシュをワーカー間の共有メモリに置くには
+# SHARED_CACHE_ENABLED=1 を指定する（既定はワーカーごとのキャッシュ）
+# 終了するワーカーの処理中ジョブを他のワーカーが push で届け直すには JOB_STORE_PATH を指定する
+# （再デプロイをまたいで引き継ぐには永続ディスク上のパスにする）
+# 画像生成・料理提案を Webhook の処理中には実行せず、ジョブとして積んでから処理するには
+# JOB_STORE_PATH と合わせて JOB_QUEUE_COMMANDS=outfit,meal を指定する
+# ぐんまちゃんに会話を覚えさせるには CONVERSATION_MEMORY_TURNS（往復数）を、
+# 全ワーカーで共有するには CONVERSATION_DB_PATH を指定する（既定は覚えない）
+# 終了時に送れていない PromptLayer の記録を書き出し、残りのワーカーが送る
+export TELEMETRY_SPOOL_PATH=${TELEMETRY_SPOOL_PATH:-/tmp/line-bot-telemetry.sqlite3}
+
+export PORT TIMEOUT
+exec gunicorn -c gunicorn.conf.py "src.app:app"
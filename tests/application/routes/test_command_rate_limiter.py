@@ -0,0 +1,98 @@
+"""CommandRateLimiter のテスト"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from src.application.routes.command_rate_limiter import (
+    CHEAP,
+    EXPENSIVE,
+    CommandRateLimiter,
+)
+from src.infrastructure.metrics import MetricsRegistry
+from src.infrastructure.ratelimit.sliding_window import SlidingWindowLimiter
+from tests.support.mock_adapter import MockMessagingAdapter
+
+
+def _event(user_id=None, group_id=None, reply_token="rtok"):
+    return SimpleNamespace(
+        reply_token=reply_token,
+        source=SimpleNamespace(user_id=user_id, group_id=group_id),
+    )
+
+
+def _limiter(line_adapter, registry=None, cheap=3, expensive=1):
+    return CommandRateLimiter(
+        line_adapter,
+        {
+            CHEAP: SlidingWindowLimiter(CHEAP, cheap, 60),
+            EXPENSIVE: SlidingWindowLimiter(EXPENSIVE, expensive, 60),
+        },
+        logger=MagicMock(),
+        metrics_registry=registry or MetricsRegistry(),
+    )
+
+
+def test_command_classes_have_separate_limits():
+    """軽いコマンドと重いコマンドで別々に数えること"""
+    limiter = _limiter(MockMessagingAdapter())
+    event = _event(user_id="U1")
+
+    assert limiter.allow(event, "chat") is True
+    assert limiter.allow(event, "meal") is False
+    assert limiter.allow(event, "janken") is True
+    assert limiter.allow(event, "pokemon") is True
+
+
+def test_group_is_limited_as_one_source():
+    """グループ内の発言はグループ単位で数えること"""
+    limiter = _limiter(MockMessagingAdapter())
+
+    assert limiter.allow(_event(user_id="U1", group_id="C1"), "outfit") is True
+    assert limiter.allow(_event(user_id="U2", group_id="C1"), "outfit") is False
+
+
+def test_throttled_request_gets_friendly_reply():
+    """超過時は定型文を返信し、メトリクスを加算すること"""
+    line_adapter = MockMessagingAdapter()
+    registry = MetricsRegistry()
+    limiter = _limiter(line_adapter, registry=registry)
+    limiter.allow(_event(user_id="U1"), "chat")
+
+    limiter.allow(_event(user_id="U1"), "chat")
+
+    replies = line_adapter.get_replies()
+    assert len(replies) == 1
+    assert replies[0].reply_token == "rtok"
+    assert registry.get("ratelimit.expensive.throttled") == 1
+
+
+def test_events_without_source_or_unknown_commands_are_allowed():
+    """発言元が分からないイベントや対象外のコマンドは制限しないこと"""
+    limiter = _limiter(MockMessagingAdapter(), expensive=0)
+
+    assert limiter.allow(_event(), "chat") is True
+    assert limiter.allow(_event(user_id="U1"), "unknown") is True
+
+
+def test_store_failure_does_not_block_requests():
+    """共有ストアの障害時は制限せずに通すこと"""
+    broken = MagicMock()
+    broken.hit.side_effect = OSError("disk full")
+    limiter = CommandRateLimiter(
+        MockMessagingAdapter(), {EXPENSIVE: broken}, logger=MagicMock()
+    )
+
+    assert limiter.allow(_event(user_id="U1"), "chat") is True
+
+
+def test_from_env_reads_limits(monkeypatch, tmp_path):
+    """環境変数から上限と共有ストアを設定すること"""
+    monkeypatch.setenv("RATE_LIMIT_EXPENSIVE", "2/30")
+    monkeypatch.setenv("RATE_LIMIT_STATE_PATH", str(tmp_path / "rl.json"))
+    first = CommandRateLimiter.from_env(MockMessagingAdapter(), MagicMock())
+    second = CommandRateLimiter.from_env(MockMessagingAdapter(), MagicMock())
+    event = _event(user_id="U1")
+
+    assert first.allow(event, "chat") is True
+    assert second.allow(event, "chat") is True
+    assert first.allow(event, "chat") is False
@@ -0,0 +1,65 @@
+"""FollowRouter の単体テスト"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from src.application.routes.follow_router import FollowRouter
+from tests.support.mock_adapter import MockMessagingAdapter
+
+
+def _make_event(user_id):
+    return SimpleNamespace(source=SimpleNamespace(user_id=user_id))
+
+
+def test_route_follow_invalidates_profile():
+    """フォローイベントでプロフィールキャッシュを破棄すること"""
+    line_adapter = MockMessagingAdapter()
+    router = FollowRouter(line_adapter)
+
+    router.route_follow(_make_event("U1"))
+
+    assert line_adapter.invalidated_user_ids == ["U1"]
+
+
+def test_route_unfollow_invalidates_profile():
+    """フォロー解除イベントでプロフィールキャッシュを破棄すること"""
+    line_adapter = MockMessagingAdapter()
+    router = FollowRouter(line_adapter)
+
+    router.route_unfollow(_make_event("U2"))
+
+    assert line_adapter.invalidated_user_ids == ["U2"]
+
+
+def test_route_unfollow_forgets_conversation():
+    """フォロー解除イベントで会話履歴を消し、フォローでは消さないこと"""
+    memory = MagicMock()
+    router = FollowRouter(MockMessagingAdapter(), conversation_memory=memory)
+
+    router.route_follow(_make_event("U1"))
+    router.route_unfollow(_make_event("U2"))
+
+    memory.forget.assert_called_once_with("U2")
+
+
+def test_route_follow_without_user_id_is_ignored():
+    """user_id がないイベントは無視すること"""
+    line_adapter = MockMessagingAdapter()
+    router = FollowRouter(line_adapter)
+
+    router.route_follow(_make_event(None))
+    router.route_follow(SimpleNamespace())
+
+    assert line_adapter.invalidated_user_ids == []
+
+
+def test_route_follow_swallows_adapter_error():
+    """破棄に失敗しても例外を送出しないこと"""
+
+    class FailingAdapter(MockMessagingAdapter):
+        def invalidate_display_name(self, user_id: str) -> None:
+            raise RuntimeError("boom")
+
+    router = FollowRouter(FailingAdapter())
+
+    router.route_follow(_make_event("U1"))
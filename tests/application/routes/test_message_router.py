@@ -6,6 +6,7 @@ from unittest.mock import MagicMock
 import pytest
 
 from src.application.routes.message_router import MessageRouter
+from src.infrastructure.deadline import current_deadline
 
 
 class FakeLineAdapter:
@@ -385,6 +386,35 @@ class TestMessageRouterChatGPTRoute:
         assert len(openai_adapter.get_chatgpt_response_calls) == 1
 
 
+class TestMessageRouterRateLimit:
+    """発言元ごとのレート制限のテスト"""
+
+    def test_expensive_command_is_throttled_without_upstream_call(self, monkeypatch):
+        """上限を超えた重いコマンドは OpenAI を呼ばずに定型文を返すこと"""
+        monkeypatch.setenv("RATE_LIMIT_EXPENSIVE", "1/60")
+        monkeypatch.delenv("RATE_LIMIT_STATE_PATH", raising=False)
+        line_adapter = FakeLineAdapter()
+        openai_adapter = FakeOpenAIAdapter("こんにちは！")
+
+        router = MessageRouter(
+            line_adapter,
+            openai_adapter,
+            FakeWeatherAdapter(),
+            pokemon_adapter=FakePokemonAdapter(),
+            digimon_adapter=FakeDigimonAdapter(),
+            janken_service=FakeJankenService(),
+            logger=FakeLogger(),
+        )
+
+        router.route_message(_make_message_event("ぐんまちゃん、こんにちは"))
+        router.route_message(_make_message_event("ぐんまちゃん、もう一回"))
+        router.route_message(_make_message_event("ぐんまちゃん、別の人", "U999"))
+
+        assert len(openai_adapter.get_chatgpt_response_calls) == 2
+        throttled = line_adapter.reply_message_calls[1]
+        assert "時間をおいて" in throttled.messages[0].text
+
+
 class TestMessageRouterUnmatchedMessage:
     """どのルートにも該当しないメッセージのテスト"""
 
@@ -454,3 +484,50 @@ class TestMessageRouterUnmatchedMessage:
         assert len(openai_adapter.get_chatgpt_response_calls) == 0
         assert len(openai_adapter.get_chatgpt_meal_suggestion_calls) == 0
         assert len(weather_adapter.get_weather_text_calls) == 0
+
+
+def test_route_message_carries_event_deadline_to_adapters():
+    """ルーターが決めた処理期限が、usecase を経てアダプタから見えること"""
+    seen = []
+
+    class DeadlineAwareWeatherAdapter(FakeWeatherAdapter):
+        def get_weather_text(self, location: str) -> str:
+            seen.append(current_deadline())
+            return super().get_weather_text(location)
+
+    router = MessageRouter(
+        FakeLineAdapter(),
+        FakeOpenAIAdapter(),
+        DeadlineAwareWeatherAdapter(),
+        pokemon_adapter=FakePokemonAdapter(),
+        digimon_adapter=FakeDigimonAdapter(),
+        janken_service=FakeJankenService(),
+        logger=FakeLogger(),
+    )
+
+    router.route_message(_make_message_event("東京の天気"))
+
+    assert seen[0] is not None and seen[0].remaining() > 0
+    assert current_deadline() is None
+
+
+def test_unmatched_text_does_not_build_event_deadline(monkeypatch):
+    """上流を呼ばないメッセージでは処理期限を作らないこと"""
+    built = []
+    monkeypatch.setattr(
+        "src.infrastructure.deadline.event_deadline",
+        lambda event: built.append(event),
+    )
+    router = MessageRouter(
+        FakeLineAdapter(),
+        FakeOpenAIAdapter(),
+        FakeWeatherAdapter(),
+        pokemon_adapter=FakePokemonAdapter(),
+        digimon_adapter=FakeDigimonAdapter(),
+        janken_service=FakeJankenService(),
+        logger=FakeLogger(),
+    )
+
+    router.route_message(_make_message_event("こんにちは"))
+
+    assert built == []
@@ -22,6 +22,9 @@ class FakeLineAdapter:
     def get_display_name_from_line_profile(self, user_id: str) -> str:
         return "TestUser"
 
+    def get_cached_display_name(self, user_id: str):
+        return False, None
+
 
 class FakeOpenAIAdapter:
     """テスト用 OpenAI アダプタ"""
@@ -75,16 +75,20 @@ class TestBindRoutes:
         # bind_routes を実行
         bind_routes(fake_app, fake_handler, fake_line_adapter, fake_logger)
 
-        # 2つのハンドラ（MessageEvent, PostbackEvent）が登録されていることを確認
-        assert len(fake_handler.decorators) == 2
+        # 4つのハンドラ（MessageEvent, PostbackEvent, FollowEvent, UnfollowEvent）が登録されていることを確認
+        assert len(fake_handler.decorators) == 4
 
         # デコレータの型を確認
+        from linebot.v3.webhooks.models.follow_event import FollowEvent
         from linebot.v3.webhooks.models.message_event import MessageEvent
         from linebot.v3.webhooks.models.postback_event import PostbackEvent
+        from linebot.v3.webhooks.models.unfollow_event import UnfollowEvent
 
         event_types = [decorator[0] for decorator in fake_handler.decorators]
         assert MessageEvent in event_types
         assert PostbackEvent in event_types
+        assert FollowEvent in event_types
+        assert UnfollowEvent in event_types
 
     def test_bind_routes_uses_provided_line_adapter(self, monkeypatch):
         """bind_routes が提供された line_adapter を使用すること"""
@@ -101,7 +105,7 @@ class TestBindRoutes:
         bind_routes(fake_app, fake_handler, provided_adapter, fake_logger)
 
         # ハンドラが登録されていることを確認
-        assert len(fake_handler.decorators) == 2
+        assert len(fake_handler.decorators) == 4
 
     def test_bind_routes_creates_default_line_adapter_if_not_provided(
         self, monkeypatch
@@ -122,7 +126,7 @@ class TestBindRoutes:
         bind_routes(fake_app, fake_handler, line_adapter=None, logger=fake_logger)
 
         # ハンドラが登録されていることを確認（内部でデフォルト adapter が生成される）
-        assert len(fake_handler.decorators) == 2
+        assert len(fake_handler.decorators) == 4
 
     def test_bind_routes_creates_default_logger_if_not_provided(self, monkeypatch):
         """bind_routes が logger が未提供の場合デフォルトを生成すること"""
@@ -138,4 +142,67 @@ class TestBindRoutes:
         bind_routes(fake_app, fake_handler, fake_line_adapter, logger=None)
 
         # ハンドラが登録されていることを確認
-        assert len(fake_handler.decorators) == 2
+        assert len(fake_handler.decorators) == 4
+
+    def test_bind_routes_does_not_require_openai_api_key(self, monkeypatch):
+        """OPENAI_API_KEY が未設定でも起動でき、OpenAIAdapter を生成しないこと"""
+        fake_app = Mock()
+        fake_app.route = Mock()
+
+        fake_handler = FakeWebhookHandler()
+
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        factory = Mock()
+        monkeypatch.setattr(
+            "src.infrastructure.adapters.lazy_openai_adapter.OpenAIAdapter", factory
+        )
+
+        bind_routes(fake_app, fake_handler, FakeLineAdapter(), FakeLogger())
+
+        assert len(fake_handler.decorators) == 4
+        factory.assert_not_called()
+
+    def test_bind_routes_shares_rate_limiter_between_routers(self, monkeypatch):
+        """メッセージとポストバックが同じコマンド制限を使うこと"""
+        from linebot.v3.webhooks.models.message_event import MessageEvent
+        from linebot.v3.webhooks.models.postback_event import PostbackEvent
+
+        monkeypatch.delenv("RATE_LIMIT_STATE_PATH", raising=False)
+        fake_handler = FakeWebhookHandler()
+
+        bind_routes(Mock(), fake_handler, FakeLineAdapter(), FakeLogger())
+
+        routers = {
+            event_type: func.__self__ for event_type, func in fake_handler.decorators
+        }
+        assert routers[MessageEvent].rate_limiter is routers[PostbackEvent].rate_limiter
+
+    def test_chat_resume_handler_uses_conversation_memory(self, monkeypatch):
+        """引き継いだチャットのジョブもルーターと同じ会話履歴を使うこと"""
+        from linebot.v3.webhooks.models.message_event import MessageEvent
+
+        from src.infrastructure.jobs.job_resumer import job_resumer
+
+        monkeypatch.setenv("CONVERSATION_MEMORY_TURNS", "2")
+        monkeypatch.delenv("CONVERSATION_DB_PATH", raising=False)
+        monkeypatch.setattr(job_resumer, "_handlers", {})
+        usecase = Mock()
+        monkeypatch.setattr(
+            "src.application.bind_routes.SendChatResponseUsecase", usecase
+        )
+        fake_handler = FakeWebhookHandler()
+
+        bind_routes(
+            Mock(),
+            fake_handler,
+            FakeLineAdapter(),
+            FakeLogger(),
+            start_background=False,
+        )
+        job = Mock()
+        job_resumer._handlers["chat"](job)
+
+        router = dict(fake_handler.decorators)[MessageEvent].__self__
+        assert router.conversation_memory is not None
+        assert usecase.call_args.kwargs["memory"] is router.conversation_memory
+        usecase.return_value.resume.assert_called_once_with(job)
@@ -15,6 +15,19 @@ def test_health():
         assert response.data == b"ok"
 
 
+def test_status_reports_circuit_breakers():
+    from src.infrastructure.circuit_breaker import circuit_breakers
+
+    circuit_breakers.get("pokeapi").record_failure()
+    with app.test_client() as client:
+        response = client.get("/status")
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body["circuit_breakers"]["pokeapi"]["state"] == "closed"
+        assert body["circuit_breakers"]["pokeapi"]["failure_rate"] == 1.0
+        assert "prefetch" in body
+
+
 def test_callback_invalid_signature():
     with app.test_client() as client:
         # X-Line-Signatureが不正な場合は400
@@ -61,3 +74,35 @@ def test_callback_valid_signature():
         )
         assert response.status_code == 200
         assert response.data == b"OK"
+
+
+def test_callback_is_handled_while_draining():
+    """終了処理中のワーカーも受け付け済みの Webhook を断らずに処理すること
+
+    LINE の Webhook 再送は既定で無効のため、503 で断るとメッセージが失われる。
+    """
+    from src.infrastructure.jobs.drain import drain_state
+
+    drain_state.start()
+    with app.test_client() as client:
+        response = client.post(
+            "/callback", headers={"X-Line-Signature": "invalid"}, data="{}"
+        )
+        # 503 ではなく通常どおり署名を検証する
+        assert response.status_code == 400
+        assert client.get("/status").get_json()["draining"] is True
+
+
+def test_drain_worker_releases_in_flight_jobs(tmp_path, monkeypatch):
+    """drain_worker は自分が処理中のジョブを他のワーカーに手放すこと"""
+    import src.app as app_module
+    from src.infrastructure.jobs.job_store import default_job_store
+
+    monkeypatch.setenv("JOB_STORE_PATH", str(tmp_path / "jobs.sqlite3"))
+    store = default_job_store()
+    assert store is not None
+    store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+
+    app_module.drain_worker()
+
+    assert store.counts() == {"pending": 1}
@@ -0,0 +1,332 @@
+"""ReplyScheduler のテスト"""
+
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from linebot.v3.messaging.exceptions import ApiException
+from linebot.v3.messaging.models import TextMessage
+
+from src.application.usecases.reply_scheduler import (
+    ABANDONED,
+    FALLBACK,
+    ON_TIME,
+    ReplyScheduler,
+)
+from src.application.usecases.send_chat_response_usecase import (
+    SendChatResponseUsecase,
+)
+from src.application.usecases.send_meal_usecase import SendMealUsecase
+from src.application.usecases.send_outfit_usecase import SendOutfitUsecase
+from src.infrastructure.jobs.job_store import JobStore
+from src.infrastructure.metrics import MetricsRegistry
+from tests.support.mock_adapter import MockMessagingAdapter
+
+EVENT_TIME = 1_700_000_000.0
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _event(user_id="U1", group_id=None, reply_token="rtok"):
+    return SimpleNamespace(
+        reply_token=reply_token,
+        timestamp=int(EVENT_TIME * 1000),
+        source=SimpleNamespace(user_id=user_id, group_id=group_id),
+    )
+
+
+def _scheduler(line_adapter, elapsed: float, registry=None) -> ReplyScheduler:
+    return ReplyScheduler(
+        line_adapter,
+        budget_seconds=30,
+        safety_margin_seconds=2,
+        push_fallback_commands=["chat", "outfit"],
+        metrics_registry=registry or MetricsRegistry(),
+        logger=MagicMock(),
+        clock=FakeClock(EVENT_TIME + elapsed),
+    )
+
+
+def _text(text: str) -> TextMessage:
+    return TextMessage(text=text, quickReply=None, quoteToken=None)
+
+
+def test_remaining_budget_is_measured_from_event_timestamp():
+    """イベントの timestamp から残り時間を計算すること"""
+    scheduler = _scheduler(MockMessagingAdapter(), elapsed=10)
+
+    ticket = scheduler.start("chat", _event())
+
+    assert ticket.remaining() == pytest.approx(18)
+
+
+def test_replies_when_token_is_still_valid():
+    """期限内なら reply で送信すること"""
+    adapter = MockMessagingAdapter()
+    registry = MetricsRegistry()
+    ticket = _scheduler(adapter, elapsed=5, registry=registry).start("chat", _event())
+
+    assert ticket.deliver([_text("hi")]) == ON_TIME
+    assert adapter.get_replies()[0].reply_token == "rtok"
+    assert adapter.get_enqueued_pushes() == []
+    assert registry.get("reply.chat.on_time") == 1
+
+
+def test_falls_back_to_push_after_expiry():
+    """期限切れなら発言元に push すること"""
+    adapter = MockMessagingAdapter()
+    ticket = _scheduler(adapter, elapsed=29).start("chat", _event(group_id="C1"))
+
+    assert ticket.deliver([_text("hi")]) == FALLBACK
+    assert adapter.get_replies() == []
+    to, messages = adapter.get_enqueued_pushes()[0]
+    assert to == "C1"
+    assert messages[0].text == "hi"
+
+
+def test_rejected_reply_token_falls_back_to_push():
+    """reply が 400 で拒否された場合も push に切り替えること"""
+    adapter = MagicMock()
+    adapter.reply_message.side_effect = ApiException(status=400)
+    ticket = _scheduler(adapter, elapsed=5).start("chat", _event())
+
+    assert ticket.deliver([_text("hi")]) == FALLBACK
+    adapter.enqueue_push.assert_called_once()
+
+
+def test_expired_command_without_push_fallback_is_abandoned():
+    """push 対象外のコマンドは期限切れで打ち切ること"""
+    adapter = MockMessagingAdapter()
+    registry = MetricsRegistry()
+    scheduler = _scheduler(adapter, elapsed=29, registry=registry)
+    ticket = scheduler.start("pokemon", _event())
+
+    assert ticket.check() is False
+    assert ticket.deliver([_text("hi")]) is None
+    assert adapter.get_replies() == []
+    assert adapter.get_enqueued_pushes() == []
+    assert scheduler.stats() == {"pokemon": {ON_TIME: 0, FALLBACK: 0, ABANDONED: 1}}
+
+
+def test_event_without_timestamp_starts_budget_now():
+    """timestamp がないイベントは受信時点から計算すること"""
+    scheduler = _scheduler(MockMessagingAdapter(), elapsed=100)
+
+    ticket = scheduler.start("chat", SimpleNamespace(reply_token="rtok"))
+
+    assert ticket.remaining() == pytest.approx(28)
+    assert ticket.push_available is False
+
+
+def test_outfit_skips_image_generation_when_undeliverable():
+    """届けられない場合は画像生成を呼ばないこと"""
+    adapter = MockMessagingAdapter()
+    openai_adapter = MagicMock()
+    openai_adapter.generate_image_prompt.return_value = "prompt"
+    scheduler = _scheduler(adapter, elapsed=29)
+    usecase = SendOutfitUsecase(adapter, openai_adapter, reply_scheduler=scheduler)
+
+    usecase.execute(_event(user_id=None), "20度の服装")
+
+    openai_adapter.generate_image.assert_not_called()
+    assert adapter.get_replies() == []
+
+
+def test_checkpointed_job_is_completed_on_delivery(tmp_path):
+    """payload 付きで始めたジョブは記録され、配信したら消えること"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    scheduler = ReplyScheduler(
+        MockMessagingAdapter(),
+        push_fallback_commands=["chat"],
+        logger=MagicMock(),
+        clock=FakeClock(EVENT_TIME + 1),
+        job_store=store,
+    )
+
+    ticket = scheduler.start("chat", _event(), {"user_message": "hi"})
+    assert store.counts() == {"in_flight": 1}
+
+    ticket.deliver([_text("hi")])
+    assert store.counts() == {}
+
+
+def test_checkpoint_starts_at_event_timestamp(tmp_path):
+    """記録したジョブの起点はイベントの受信時刻であること"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    scheduler = ReplyScheduler(
+        MockMessagingAdapter(),
+        push_fallback_commands=["chat"],
+        logger=MagicMock(),
+        clock=FakeClock(EVENT_TIME + 5),
+        job_store=store,
+    )
+
+    scheduler.start("chat", _event(), {"user_message": "hi"})
+    store.release()
+
+    [job] = store.claim_resumable()
+    assert job.created_at == EVENT_TIME
+
+
+def test_checkpoint_is_removed_when_handler_raises(tmp_path):
+    """配信前に例外で抜けても記録を残さないこと（他のワーカーが二重に届けないように）"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    adapter = MockMessagingAdapter()
+    openai_adapter = MagicMock()
+    openai_adapter.generate_image_prompt.return_value = "prompt"
+    openai_adapter.generate_image.return_value = "https://example.com/a.png"
+    adapter.reply_message = MagicMock(side_effect=RuntimeError("boom"))
+    scheduler = ReplyScheduler(
+        adapter,
+        push_fallback_commands=["outfit"],
+        logger=MagicMock(),
+        clock=FakeClock(EVENT_TIME + 1),
+        job_store=store,
+    )
+
+    with pytest.raises(RuntimeError):
+        SendOutfitUsecase(adapter, openai_adapter, reply_scheduler=scheduler).execute(
+            _event(), "20度の服装"
+        )
+
+    assert store.counts() == {}
+
+
+def test_checkpoint_is_removed_when_chat_swallows_error(tmp_path):
+    """応答の生成中の例外を握りつぶした場合も記録を消すこと"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    adapter = MockMessagingAdapter()
+    scheduler = ReplyScheduler(
+        adapter,
+        push_fallback_commands=["chat"],
+        logger=MagicMock(),
+        clock=FakeClock(EVENT_TIME + 1),
+        job_store=store,
+    )
+    usecase = SendChatResponseUsecase(adapter, MagicMock(), reply_scheduler=scheduler)
+    usecase._history = MagicMock(side_effect=RuntimeError("boom"))
+
+    usecase.execute(_event(), "ぐんまちゃん、こんにちは")
+
+    assert adapter.get_replies() == []
+    assert store.counts() == {}
+
+
+def test_command_without_push_fallback_is_not_checkpointed(tmp_path):
+    """push できないコマンドは引き継げないので記録しないこと"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    scheduler = ReplyScheduler(
+        MockMessagingAdapter(),
+        push_fallback_commands=["chat"],
+        logger=MagicMock(),
+        job_store=store,
+    )
+
+    ticket = scheduler.start("pokemon", _event(), {})
+
+    assert ticket.job_id is None
+    assert store.counts() == {}
+
+
+def test_resumed_chat_job_is_pushed_after_token_expiry(tmp_path):
+    """引き継いだジョブはリプライトークンが切れていれば push で届けること"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+    store.release()
+    [job] = store.claim_resumable()
+    adapter = MockMessagingAdapter()
+    openai_adapter = MagicMock()
+    openai_adapter.get_chatgpt_response.return_value = "こんにちは"
+    scheduler = ReplyScheduler(
+        adapter,
+        logger=MagicMock(),
+        clock=FakeClock(job.created_at + 60),
+        job_store=store,
+    )
+
+    SendChatResponseUsecase(adapter, openai_adapter, reply_scheduler=scheduler).resume(
+        job
+    )
+
+    openai_adapter.get_chatgpt_response.assert_called_once_with("hi")
+    assert adapter.get_replies() == []
+    # ジョブの push はディスパッチャに積まず、送り終えてから行を消す
+    assert adapter.get_enqueued_pushes() == []
+    assert adapter.get_pushes()[0].to == "U1"
+    assert store.counts() == {}
+
+
+def test_resumed_job_is_kept_when_push_fails(tmp_path):
+    """push に失敗したジョブは行を残し、再試行できるようにすること"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.enqueue("meal", "U1", "rtok", {}, created_at=EVENT_TIME)
+    [job] = store.claim_resumable()
+    adapter = MockMessagingAdapter()
+    adapter.push_message = MagicMock(side_effect=RuntimeError("boom"))
+    openai_adapter = MagicMock()
+    openai_adapter.get_chatgpt_meal_suggestion.return_value = ("カレー", None)
+    scheduler = ReplyScheduler(
+        adapter,
+        logger=MagicMock(),
+        clock=FakeClock(EVENT_TIME + 60),
+        job_store=store,
+    )
+
+    SendMealUsecase(adapter, openai_adapter, reply_scheduler=scheduler).resume(job)
+
+    assert store.counts() == {"in_flight": 1}
+
+
+def test_queued_command_is_enqueued_instead_of_run(tmp_path):
+    """非同期モードのコマンドは実行せずにジョブとして積み、後で reply すること"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    adapter = MockMessagingAdapter()
+    openai_adapter = MagicMock()
+    openai_adapter.get_chatgpt_meal_suggestion.return_value = ("カレー", None)
+    scheduler = ReplyScheduler(
+        adapter,
+        logger=MagicMock(),
+        clock=FakeClock(EVENT_TIME + 1),
+        job_store=store,
+        queued_commands=["meal"],
+    )
+    usecase = SendMealUsecase(adapter, openai_adapter, reply_scheduler=scheduler)
+
+    usecase.execute(_event())
+
+    openai_adapter.get_chatgpt_meal_suggestion.assert_not_called()
+    [job] = store.claim_resumable()
+    assert (job.recipient, job.reply_token, job.created_at) == (
+        "U1",
+        "rtok",
+        EVENT_TIME,
+    )
+
+    usecase.resume(job)
+
+    assert adapter.get_replies()[0].reply_token == "rtok"
+    assert store.counts() == {}
+
+
+def test_command_runs_synchronously_without_job_store():
+    """ジョブストアがなければ非同期モードでもその場で処理すること"""
+    adapter = MockMessagingAdapter()
+    openai_adapter = MagicMock()
+    openai_adapter.get_chatgpt_response.return_value = "こんにちは"
+    scheduler = ReplyScheduler(
+        adapter, logger=MagicMock(), queued_commands=["chat"], clock=time.time
+    )
+
+    SendChatResponseUsecase(adapter, openai_adapter, reply_scheduler=scheduler).execute(
+        SimpleNamespace(reply_token="rtok", source=SimpleNamespace(user_id="U1")),
+        "hi",
+    )
+
+    assert len(adapter.get_replies()) == 1
@@ -49,3 +49,55 @@ def test_execute_failure():
     assert "req" in sent
     req = sent["req"]
     assert "OPENAI_API_KEY" in req.messages[0].text
+
+
+def test_execute_sends_history_and_remembers_exchange():
+    """会話履歴を渡して応答し、届けた往復を記録すること"""
+    from types import SimpleNamespace
+    from unittest.mock import MagicMock
+
+    from src.infrastructure.metrics import MetricsRegistry
+    from tests.support.mock_adapter import MockMessagingAdapter
+
+    history = [
+        {"role": "user", "content": "焼きまんじゅうが好き"},
+        {"role": "assistant", "content": "おいしいよね！"},
+    ]
+    memory = MagicMock()
+    memory.context.return_value = history
+    openai_adapter = MagicMock()
+    openai_adapter.get_chatgpt_response.return_value = "焼きまんじゅう！"
+    registry = MetricsRegistry()
+    event = SimpleNamespace(reply_token="dummy", source=SimpleNamespace(user_id="U1"))
+
+    SendChatResponseUsecase(
+        MockMessagingAdapter(),
+        openai_adapter,
+        memory=memory,
+        metrics_registry=registry,
+    ).execute(event, "私の好物は？")
+
+    openai_adapter.get_chatgpt_response.assert_called_once_with("私の好物は？", history)
+    memory.append.assert_called_once_with("U1", "私の好物は？", "焼きまんじゅう！")
+    assert registry.summary("chat.prompt_tokens")["count"] == 1
+    assert registry.summary("chat.latency_seconds")["count"] == 1
+
+
+def test_failed_response_is_not_remembered():
+    """応答を生成できなかった往復は記録しないこと"""
+    from types import SimpleNamespace
+    from unittest.mock import MagicMock
+
+    from tests.support.mock_adapter import MockMessagingAdapter
+
+    memory = MagicMock()
+    memory.context.return_value = []
+    openai_adapter = MagicMock()
+    openai_adapter.get_chatgpt_response.side_effect = RuntimeError("api error")
+    event = SimpleNamespace(reply_token="dummy", source=SimpleNamespace(user_id="U1"))
+
+    SendChatResponseUsecase(
+        MockMessagingAdapter(), openai_adapter, memory=memory
+    ).execute(event, "こんにちは")
+
+    memory.append.assert_not_called()
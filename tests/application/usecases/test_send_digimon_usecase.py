@@ -99,3 +99,23 @@ class TestSendDigimonUsecase:
         # TemplateMessageが送信されていることを確認
         message = line_adapter.reply_message_calls[0].messages[0]
         assert message.__class__.__name__ == "TemplateMessage"
+
+    def test_execute_uses_prefetched_card(self):
+        """先読み済みのカードがあればデジモンAPIを呼ばずに返信すること"""
+        from src.infrastructure.line_model.digimon_button_template import (
+            create_digimon_zukan_button_template,
+        )
+        from src.infrastructure.prefetch.card_prefetcher import PrefetchedCard
+
+        line_adapter = FakeLineAdapter()
+        digimon_adapter = FakeDigimonAdapter(None)
+        info = DigimonInfo(id=2, name="Gabumon", level="Rookie", image_url=None)
+        message = create_digimon_zukan_button_template(info)
+        prefetcher = Mock()
+        prefetcher.take.return_value = PrefetchedCard(info=info, message=message)
+
+        usecase = SendDigimonUsecase(line_adapter, digimon_adapter, prefetcher)
+        usecase.execute(_make_message_event())
+
+        assert digimon_adapter.get_random_digimon_info_calls == []
+        assert line_adapter.reply_message_calls[0].messages == [message]
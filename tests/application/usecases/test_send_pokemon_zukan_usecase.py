@@ -82,3 +82,30 @@ def test_send_pokemon_zukan_failure():
     # エラーメッセージの内容を確認
     message_text = sent[0].messages[0].text
     assert "取得に失敗" in message_text
+
+
+def test_send_pokemon_zukan_uses_prefetched_card():
+    """先読み済みのカードがあれば上流を呼ばずにそのテンプレートを返信すること"""
+    from unittest.mock import MagicMock
+
+    from src.infrastructure.line_model.zukan_button_template import (
+        create_pokemon_zukan_button_template,
+    )
+    from src.infrastructure.prefetch.card_prefetcher import PrefetchedCard
+
+    line_adapter = MagicMock()
+    pokemon_adapter = MagicMock()
+    message = create_pokemon_zukan_button_template(
+        PokemonInfo(zukan_no=25, name="ピカチュウ", types=["electric"], image_url=None)
+    )
+    prefetcher = MagicMock()
+    prefetcher.take.return_value = PrefetchedCard(info=None, message=message)
+    event = MagicMock(reply_token="test_token", timestamp=None)
+
+    SendPokemonZukanUsecase(
+        line_adapter, pokemon_adapter, prefetcher=prefetcher
+    ).execute(event)
+
+    pokemon_adapter.get_random_pokemon_info.assert_not_called()
+    request = line_adapter.reply_message.call_args[0][0]
+    assert request.messages == [message]
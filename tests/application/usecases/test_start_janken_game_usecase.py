@@ -1,13 +1,16 @@
+import threading
 from typing import Optional
 from unittest.mock import Mock
 
 from src.application.usecases.start_janken_game_usecase import StartJankenGameUsecase
+from src.infrastructure.metrics import MetricsRegistry
 
 
 class FakeLineAdapter:
-    def __init__(self, fn, display_name_provider=None):
+    def __init__(self, fn, display_name_provider=None, cached_names=None):
         self._fn = fn
         self._display_name_provider = display_name_provider
+        self._cached_names = cached_names or {}
 
     def reply_message(self, req):
         return self._fn(req)
@@ -20,6 +23,11 @@ class FakeLineAdapter:
             return "Alice"
         return self._display_name_provider(user_id)
 
+    def get_cached_display_name(self, user_id: str):
+        if user_id in self._cached_names:
+            return True, self._cached_names[user_id]
+        return False, None
+
 
 def _make_event(data: Optional[str], user_id: str = "U111"):
     event = Mock()
@@ -124,3 +132,107 @@ def test_execute_with_none_data_does_not_send():
     svc.execute(event)
 
     assert sent == []
+
+
+class EchoJankenService:
+    def play_and_make_reply(self, user_hand_input: str, user_label: str) -> str:
+        return f"{user_label}: {user_hand_input}\nBot: ✌️\n結果: あなたの勝ち！"
+
+
+def test_execute_slow_profile_falls_back_to_default_label():
+    """プロフィール取得が予算内に終わらない場合は既定の表示名で即時返信すること"""
+    sent = []
+    release = threading.Event()
+
+    def slow_profile_getter(_):
+        release.wait(timeout=5)
+        return "Slow"
+
+    registry = MetricsRegistry()
+    svc = StartJankenGameUsecase(
+        FakeLineAdapter(sent.append, slow_profile_getter),
+        janken_service=EchoJankenService(),  # type: ignore
+        profile_timeout_seconds=0.01,
+        metrics_registry=registry,
+    )
+
+    svc.execute(_make_event("janken:✊"))
+    release.set()
+
+    assert len(sent) == 1
+    assert sent[0].messages[0].text.startswith("あなた: ✊")
+    assert registry.get(StartJankenGameUsecase.PROFILE_LOOKUP_METRIC) == 1
+    assert registry.get(StartJankenGameUsecase.PROFILE_FALLBACK_METRIC) == 1
+
+
+def test_execute_fast_profile_does_not_count_fallback():
+    """予算内に取得できた場合はフォールバックとして数えないこと"""
+    sent = []
+    registry = MetricsRegistry()
+    svc = StartJankenGameUsecase(
+        FakeLineAdapter(sent.append, lambda uid: "Alice"),
+        janken_service=EchoJankenService(),  # type: ignore
+        profile_timeout_seconds=1.0,
+        metrics_registry=registry,
+    )
+
+    svc.execute(_make_event("janken:✋"))
+
+    assert sent[0].messages[0].text.startswith("あなた (Alice): ✋")
+    assert registry.get(StartJankenGameUsecase.PROFILE_LOOKUP_METRIC) == 1
+    assert registry.get(StartJankenGameUsecase.PROFILE_FALLBACK_METRIC) == 0
+
+
+def test_execute_without_user_id_skips_profile_lookup():
+    """user_id がない場合はプロフィールを問い合わせないこと"""
+    sent = []
+    profile_getter = Mock(return_value="Alice")
+    registry = MetricsRegistry()
+    svc = StartJankenGameUsecase(
+        FakeLineAdapter(sent.append, profile_getter),
+        janken_service=EchoJankenService(),  # type: ignore
+        metrics_registry=registry,
+    )
+    event = _make_event("janken:✊")
+    event.source.user_id = None
+
+    svc.execute(event)
+
+    assert sent[0].messages[0].text.startswith("あなた: ✊")
+    profile_getter.assert_not_called()
+    assert registry.get(StartJankenGameUsecase.PROFILE_LOOKUP_METRIC) == 0
+
+
+def test_profile_timeout_from_env(monkeypatch):
+    """JANKEN_PROFILE_TIMEOUT_MS で予算を設定できること"""
+    monkeypatch.setenv("JANKEN_PROFILE_TIMEOUT_MS", "250")
+
+    svc = StartJankenGameUsecase(
+        FakeLineAdapter(lambda req: None),
+        janken_service=EchoJankenService(),  # type: ignore
+    )
+
+    assert svc._profile_timeout_seconds == 0.25
+
+
+def test_execute_cached_profile_skips_executor(monkeypatch):
+    """キャッシュ済みの表示名はスレッドプールを通さずに使うこと"""
+    from src.application.usecases import start_janken_game_usecase
+
+    submit = Mock(side_effect=AssertionError("executor must not be used"))
+    monkeypatch.setattr(start_janken_game_usecase._profile_executor, "submit", submit)
+    sent = []
+    profile_getter = Mock(return_value="Remote")
+    registry = MetricsRegistry()
+    svc = StartJankenGameUsecase(
+        FakeLineAdapter(sent.append, profile_getter, cached_names={"U111": "Cached"}),
+        janken_service=EchoJankenService(),  # type: ignore
+        profile_timeout_seconds=0.01,
+        metrics_registry=registry,
+    )
+
+    svc.execute(_make_event("janken:✊"))
+
+    assert sent[0].messages[0].text.startswith("あなた (Cached): ✊")
+    profile_getter.assert_not_called()
+    assert registry.get(StartJankenGameUsecase.PROFILE_FALLBACK_METRIC) == 0
@@ -0,0 +1,31 @@
+import pytest
+
+from src.infrastructure.adapters.http_client import hedge_budget
+from src.infrastructure.circuit_breaker import circuit_breakers
+from src.infrastructure.jobs.drain import drain_state
+from src.infrastructure.jobs.job_store import reset_default_job_store
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """プロセス共有のサーキットブレーカーの状態をテスト間で持ち越さない"""
+    circuit_breakers.reset()
+    yield
+    circuit_breakers.reset()
+
+
+@pytest.fixture(autouse=True)
+def disable_upstream_hedging(monkeypatch):
+    """共有メトリクスの計測値次第でヘッジが走り、呼び出し回数が揺れるのを防ぐ"""
+    monkeypatch.setattr(hedge_budget, "enabled", False)
+
+
+@pytest.fixture(autouse=True)
+def isolate_job_store(monkeypatch):
+    """環境の JOB_STORE_PATH や前のテストの終了処理フラグを持ち込まない"""
+    monkeypatch.delenv("JOB_STORE_PATH", raising=False)
+    reset_default_job_store()
+    drain_state.reset()
+    yield
+    reset_default_job_store()
+    drain_state.reset()
@@ -0,0 +1,105 @@
+"""completion_policy のテスト"""
+
+from types import SimpleNamespace
+
+from src.infrastructure.adapters.completion_policy import (
+    CompletionPolicy,
+    CompletionRouter,
+    default_policies,
+    supports_reasoning_effort,
+)
+from src.infrastructure.metrics import MetricsRegistry
+
+POLICY = CompletionPolicy("chat_response", latency_budget_seconds=5.0)
+
+
+def _router(registry, probe_every=20):
+    return CompletionRouter(
+        "gpt-5-mini",
+        policies={POLICY.name: POLICY},
+        fallback_model="gpt-5-nano",
+        probe_every=probe_every,
+        metrics_registry=registry,
+    )
+
+
+def _response(completion_tokens=100, finish_reason="stop"):
+    return SimpleNamespace(
+        usage=SimpleNamespace(completion_tokens=completion_tokens),
+        choices=[SimpleNamespace(finish_reason=finish_reason)],
+    )
+
+
+def test_env_overrides_policy(monkeypatch):
+    monkeypatch.setenv("OPENAI_MEAL_SUGGESTION_MODEL", "gpt-4.1-mini")
+    monkeypatch.setenv("OPENAI_MEAL_SUGGESTION_MAX_TOKENS", "800")
+    monkeypatch.setenv("OPENAI_MEAL_SUGGESTION_REASONING_EFFORT", "")
+
+    policy = default_policies()["meal_suggestion"]
+
+    assert policy.model == "gpt-4.1-mini"
+    assert policy.max_completion_tokens == 800
+    assert "reasoning_effort" not in policy.completion_kwargs("gpt-4.1-mini")
+
+
+def test_reasoning_effort_is_sent_only_to_reasoning_models():
+    policy = default_policies()["chat_response"]
+
+    assert policy.completion_kwargs("gpt-5-mini")["reasoning_effort"] == "low"
+    for model in ("gpt-4o-mini", "gpt-4.1", "gpt-5-chat-latest"):
+        assert "reasoning_effort" not in policy.completion_kwargs(model)
+    assert supports_reasoning_effort("o4-mini")
+    assert supports_reasoning_effort("ft:gpt-5-mini:org::abc")
+
+
+def test_unknown_prompt_keeps_previous_defaults():
+    router = _router(MetricsRegistry())
+
+    kwargs = router.policy(None).completion_kwargs("gpt-5-mini")
+
+    assert kwargs["max_completion_tokens"] == 3000
+    assert "reasoning_effort" not in kwargs
+
+
+def test_uses_primary_while_latency_fits_budget():
+    registry = MetricsRegistry()
+    router = _router(registry)
+    for _ in range(10):
+        router.record(POLICY, "gpt-5-mini", 2.0, _response())
+
+    assert router.choose_model(POLICY) == "gpt-5-mini"
+
+
+def test_falls_back_when_primary_is_slow_and_probes_primary():
+    registry = MetricsRegistry()
+    router = _router(registry, probe_every=3)
+    for _ in range(10):
+        router.record(POLICY, "gpt-5-mini", 9.0, _response())
+
+    chosen = [router.choose_model(POLICY) for _ in range(6)]
+
+    assert chosen == ["gpt-5-nano", "gpt-5-nano", "gpt-5-mini"] * 2
+    assert registry.get("openai.chat_response.fallback") == 4
+
+
+def test_timeouts_count_towards_primary_latency():
+    registry = MetricsRegistry()
+    router = _router(registry)
+    for _ in range(5):
+        router.record_timeout(POLICY, "gpt-5-mini")
+
+    assert router.choose_model(POLICY) == "gpt-5-nano"
+    assert registry.get("openai.chat_response.timeouts") == 5
+
+
+def test_records_histograms_and_truncation():
+    registry = MetricsRegistry()
+    router = _router(registry)
+
+    router.record(POLICY, "gpt-5-mini", 1.5, _response(250))
+    router.record(POLICY, "gpt-5-mini", 2.5, _response(1000, "length"))
+
+    summaries = registry.summaries("openai.chat_response.")
+    assert summaries["openai.chat_response.latency_seconds"]["max"] == 2.5
+    assert summaries["openai.chat_response.completion_tokens"]["mean"] == 625
+    assert registry.get("openai.chat_response.truncated") == 1
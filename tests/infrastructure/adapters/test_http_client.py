@@ -0,0 +1,137 @@
+"""UpstreamHttpClient のヘッジのテスト"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from src.infrastructure.adapters.http_client import HedgeBudget, UpstreamHttpClient
+from src.infrastructure.circuit_breaker import CircuitBreaker
+from src.infrastructure.deadline import Deadline, deadline_scope
+from src.infrastructure.metrics import MetricsRegistry
+
+LATENCY = "upstream.pokeapi.latency_seconds"
+
+
+def _client(budget: HedgeBudget, registry: MetricsRegistry) -> UpstreamHttpClient:
+    breaker = CircuitBreaker("pokeapi", metrics_registry=registry)
+    return UpstreamHttpClient(breaker, hedge=budget, metrics_registry=registry)
+
+
+def _warm(registry: MetricsRegistry, seconds: float, count: int = 20) -> None:
+    for _ in range(count):
+        registry.observe(LATENCY, seconds)
+
+
+def _response(status: int = 200) -> MagicMock:
+    response = MagicMock()
+    response.status_code = status
+    return response
+
+
+def test_hedge_budget_accrues_per_request_and_caps():
+    budget = HedgeBudget(ratio=0.5, capacity=1.0)
+
+    assert budget.try_spend() is False
+    budget.record_request()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_spend() is True
+    assert budget.try_spend() is False
+    assert budget.snapshot() == {"requests": 3, "hedges": 1, "tokens": 0.0}
+
+
+def test_no_hedge_until_enough_samples():
+    registry = MetricsRegistry()
+    client = _client(HedgeBudget(ratio=1.0, min_samples=5), registry)
+    _warm(registry, 0.01, count=4)
+
+    assert client.hedge_delay() is None
+    registry.observe(LATENCY, 0.02)
+    assert client.hedge_delay() == pytest.approx(0.02)
+
+
+def test_slow_primary_is_hedged_and_fast_duplicate_wins():
+    registry = MetricsRegistry()
+    client = _client(HedgeBudget(ratio=1.0), registry)
+    _warm(registry, 0.01)
+
+    release_primary = threading.Event()
+    fast = _response()
+    slow = _response()
+    calls = []
+
+    def fake_get(url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            release_primary.wait(1)
+            return slow
+        return fast
+
+    with patch(
+        "src.infrastructure.adapters.http_client.requests.get", side_effect=fake_get
+    ):
+        assert client.get("https://example.test/a") is fast
+        release_primary.set()
+
+    assert len(calls) == 2
+    assert registry.get("upstream.pokeapi.hedged") == 1
+    assert registry.get("upstream.pokeapi.hedge_won") == 1
+
+
+def test_no_hedge_without_budget():
+    registry = MetricsRegistry()
+    client = _client(HedgeBudget(ratio=0.0), registry)
+    _warm(registry, 0.001)
+    slow = _response()
+
+    def fake_get(url, **kwargs):
+        threading.Event().wait(0.02)
+        return slow
+
+    with patch(
+        "src.infrastructure.adapters.http_client.requests.get", side_effect=fake_get
+    ) as mock_get:
+        assert client.get("https://example.test/a") is slow
+
+    assert mock_get.call_count == 1
+    assert registry.get("upstream.pokeapi.hedge_denied") == 1
+
+
+def test_hedge_failure_falls_back_to_primary():
+    registry = MetricsRegistry()
+    client = _client(HedgeBudget(ratio=1.0), registry)
+    _warm(registry, 0.001)
+    primary = _response()
+    calls = []
+
+    def fake_get(url, **kwargs):
+        calls.append(url)
+        if len(calls) == 1:
+            threading.Event().wait(0.05)
+            return primary
+        raise requests.ConnectionError("reset")
+
+    with patch(
+        "src.infrastructure.adapters.http_client.requests.get", side_effect=fake_get
+    ):
+        assert client.get("https://example.test/a") is primary
+
+    assert registry.get("upstream.pokeapi.hedged") == 1
+    assert registry.get("upstream.pokeapi.hedge_won") == 0
+
+
+def test_timeout_follows_request_deadline():
+    """処理期限があれば、タイムアウトは期限までの残りに短くすること"""
+    registry = MetricsRegistry()
+    client = _client(HedgeBudget(enabled=False), registry)
+
+    with patch("requests.get", return_value=_response()) as get:
+        client.get("https://example.com")
+        with deadline_scope(Deadline(time.time() + 2)):
+            client.get("https://example.com")
+
+    assert get.call_args_list[0].kwargs["timeout"] == 10
+    assert get.call_args_list[1].kwargs["timeout"] <= 2
@@ -0,0 +1,62 @@
+"""LazyOpenAIAdapter のテスト"""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.infrastructure.adapters.lazy_openai_adapter import LazyOpenAIAdapter
+from src.infrastructure.adapters.openai_adapter import OpenAIError
+
+
+def test_adapter_is_created_on_first_call_and_reused():
+    adapter = MagicMock()
+    adapter.get_chatgpt_response.return_value = "こんにちは"
+    factory = MagicMock(return_value=adapter)
+    lazy = LazyOpenAIAdapter(factory=factory, logger=MagicMock())
+
+    assert not lazy.initialized
+    factory.assert_not_called()
+
+    assert lazy.get_chatgpt_response("やあ") == "こんにちは"
+    lazy.track_score(1, 100)
+
+    assert lazy.initialized
+    factory.assert_called_once_with()
+    adapter.track_score.assert_called_once_with(1, 100, "user_feedback")
+
+
+def test_concurrent_first_calls_create_single_adapter():
+    created = []
+    barrier = threading.Barrier(8)
+
+    def factory():
+        created.append(object())
+        return MagicMock()
+
+    lazy = LazyOpenAIAdapter(factory=factory, logger=MagicMock())
+
+    def call():
+        barrier.wait()
+        lazy.generate_image("prompt")
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+
+
+def test_failed_creation_is_not_cached():
+    adapter = MagicMock()
+    factory = MagicMock(side_effect=[OpenAIError("no key"), adapter])
+    lazy = LazyOpenAIAdapter(factory=factory, logger=MagicMock())
+
+    with pytest.raises(OpenAIError):
+        lazy.generate_image_prompt("服装")
+    assert not lazy.initialized
+
+    lazy.get_chatgpt_meal_suggestion(return_request_id=True)
+    adapter.get_chatgpt_meal_suggestion.assert_called_once_with(return_request_id=True)
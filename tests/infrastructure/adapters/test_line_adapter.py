@@ -1,10 +1,31 @@
 """LineMessagingAdapter のテスト"""
 
-from unittest.mock import MagicMock, patch
+import http.client
+import json
+from unittest.mock import ANY, MagicMock, patch
 
 import pytest
 
-from src.infrastructure.adapters.line_adapter import LineMessagingAdapter
+from src.infrastructure.adapters.line_adapter import (
+    RECONNECT_METRIC,
+    LineMessagingAdapter,
+)
+from src.infrastructure.adapters.line_http_pool import LineHttpSettings
+from src.infrastructure.metrics import MetricsRegistry
+
+REQUEST_TIMEOUT = (3.0, 10.0)
+
+
+def _settings(**overrides) -> LineHttpSettings:
+    values = {
+        "pool_size": 8,
+        "connect_timeout": 3.0,
+        "read_timeout": 10.0,
+        "keepalive_idle": 30,
+        "connect_retries": 2,
+    }
+    values.update(overrides)
+    return LineHttpSettings(**values)
 
 
 class TestLineMessagingAdapter:
@@ -44,6 +65,12 @@ class TestLineMessagingAdapter:
         mock_api_client.assert_called_once_with(configuration=mock_config_instance)
         mock_messaging_api.assert_called_once_with(mock_api_client_instance)
         assert adapter.messaging_api == mock_messaging_api_instance
+        assert (
+            mock_config_instance.connection_pool_maxsize
+            == adapter.http_settings.pool_size
+        )
+        assert mock_config_instance.retries.total == 2
+        assert mock_config_instance.socket_options
 
     @patch("src.infrastructure.adapters.line_adapter.Configuration")
     def test_init_import_error(self, mock_config):
@@ -82,7 +109,9 @@ class TestLineMessagingAdapter:
 
         adapter.reply_message(mock_request)
 
-        mock_messaging_api.reply_message.assert_called_once_with(mock_request)
+        mock_messaging_api.reply_message.assert_called_once_with(
+            mock_request, _request_timeout=adapter.http_settings.request_timeout
+        )
         mock_logger.debug.assert_called()
 
     @patch("linebot.v3.messaging.models.ReplyMessageRequest.parse_obj")
@@ -129,7 +158,11 @@ class TestLineMessagingAdapter:
 
         adapter.push_message(mock_request)
 
-        mock_messaging_api.push_message.assert_called_once_with(mock_request)
+        mock_messaging_api.push_message.assert_called_once_with(
+            mock_request,
+            x_line_retry_key=ANY,
+            _request_timeout=adapter.http_settings.request_timeout,
+        )
         mock_logger.debug.assert_called()
 
     @patch("linebot.v3.messaging.models.PushMessageRequest.parse_obj")
@@ -165,7 +198,9 @@ class TestLineMessagingAdapter:
         result = adapter.get_display_name_from_line_profile("user123")
 
         assert result == "Test User"
-        mock_messaging_api.get_profile.assert_called_once_with("user123")
+        mock_messaging_api.get_profile.assert_called_once_with(
+            "user123", _request_timeout=adapter.http_settings.request_timeout
+        )
 
     def test_get_display_name_not_initialized(self):
         """messaging_apiが初期化されていない場合、Noneを返すこと"""
@@ -204,3 +239,364 @@ class TestLineMessagingAdapter:
 
         assert result is None
         mock_logger.error.assert_called_once()
+
+    def test_get_display_name_uses_cache(self):
+        """2回目以降はキャッシュから表示名を返すこと"""
+        adapter = LineMessagingAdapter(logger=MagicMock())
+
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.get_profile.return_value.display_name = "Test User"
+        adapter.messaging_api = mock_messaging_api
+
+        assert adapter.get_display_name_from_line_profile("user123") == "Test User"
+        assert adapter.get_display_name_from_line_profile("user123") == "Test User"
+
+        mock_messaging_api.get_profile.assert_called_once_with(
+            "user123", _request_timeout=adapter.http_settings.request_timeout
+        )
+        stats = adapter.get_profile_cache_stats()
+        assert stats["size"] == 1
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_get_cached_display_name_does_not_call_line(self):
+        """キャッシュだけを引き、LINE には問い合わせないこと"""
+        adapter = LineMessagingAdapter(logger=MagicMock())
+        mock_messaging_api = MagicMock()
+        adapter.messaging_api = mock_messaging_api
+
+        assert adapter.get_cached_display_name("user123") == (False, None)
+        adapter.profile_cache.set("user123", "Test User")
+        assert adapter.get_cached_display_name("user123") == (True, "Test User")
+        mock_messaging_api.get_profile.assert_not_called()
+
+    def test_get_display_name_not_found_is_negative_cached(self):
+        """存在しないユーザーはネガティブキャッシュされること"""
+        from linebot.v3.messaging.exceptions import NotFoundException
+
+        adapter = LineMessagingAdapter(logger=MagicMock())
+
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.get_profile.side_effect = NotFoundException(status=404)
+        adapter.messaging_api = mock_messaging_api
+
+        assert adapter.get_display_name_from_line_profile("ghost") is None
+        assert adapter.get_display_name_from_line_profile("ghost") is None
+
+        mock_messaging_api.get_profile.assert_called_once_with(
+            "ghost", _request_timeout=adapter.http_settings.request_timeout
+        )
+
+    def test_get_display_name_connection_error_is_not_cached(self):
+        """通信エラーはキャッシュせず次回再取得すること"""
+        adapter = LineMessagingAdapter(logger=MagicMock())
+
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.get_profile.side_effect = Exception("API error")
+        adapter.messaging_api = mock_messaging_api
+
+        adapter.get_display_name_from_line_profile("user123")
+        adapter.get_display_name_from_line_profile("user123")
+
+        assert mock_messaging_api.get_profile.call_count == 2
+
+    def test_invalidate_display_name(self):
+        """invalidate_display_name でキャッシュが破棄され再取得されること"""
+        adapter = LineMessagingAdapter(logger=MagicMock())
+
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.get_profile.return_value.display_name = "Test User"
+        adapter.messaging_api = mock_messaging_api
+
+        adapter.get_display_name_from_line_profile("user123")
+        adapter.invalidate_display_name("user123")
+        adapter.get_display_name_from_line_profile("user123")
+
+        assert mock_messaging_api.get_profile.call_count == 2
+
+    def test_profile_cache_persists_across_instances(self, tmp_path):
+        """キャッシュファイルを指定すると再起動後も表示名を再利用できること"""
+        path = str(tmp_path / "profiles.json")
+
+        adapter = LineMessagingAdapter(logger=MagicMock(), profile_cache_path=path)
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.get_profile.return_value.display_name = "Test User"
+        adapter.messaging_api = mock_messaging_api
+        adapter.get_display_name_from_line_profile("user123")
+        adapter.save_profile_cache()
+
+        restarted = LineMessagingAdapter(logger=MagicMock(), profile_cache_path=path)
+        restarted_api = MagicMock()
+        restarted.messaging_api = restarted_api
+
+        assert restarted.get_display_name_from_line_profile("user123") == "Test User"
+        restarted_api.get_profile.assert_not_called()
+
+    def test_profile_cache_is_saved_later_not_on_cache_miss(
+        self, tmp_path, monkeypatch
+    ):
+        """キャッシュミスの応答中には書き出さず、まとめて書き出すこと"""
+        monkeypatch.setenv("LINE_PROFILE_CACHE_SAVE_INTERVAL", "60")
+        path = tmp_path / "profiles.json"
+        adapter = LineMessagingAdapter(logger=MagicMock(), profile_cache_path=str(path))
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.get_profile.side_effect = lambda user_id, **_: MagicMock(
+            display_name=user_id
+        )
+        adapter.messaging_api = mock_messaging_api
+
+        adapter.get_display_name_from_line_profile("user1")
+        adapter.get_display_name_from_line_profile("user2")
+        assert not path.exists()
+
+        adapter.save_profile_cache()
+        assert sorted(row[0] for row in json.loads(path.read_text())) == [
+            "user1",
+            "user2",
+        ]
+        assert [p.name for p in tmp_path.iterdir()] == ["profiles.json"]
+
+    def test_broken_profile_cache_file_from_env_is_ignored(self, tmp_path, monkeypatch):
+        """壊れたキャッシュファイルは警告のみで無視すること"""
+        path = tmp_path / "profiles.json"
+        path.write_text("not json", encoding="utf-8")
+        monkeypatch.setenv("LINE_PROFILE_CACHE_PATH", str(path))
+        mock_logger = MagicMock()
+
+        adapter = LineMessagingAdapter(logger=mock_logger)
+
+        assert adapter.get_profile_cache_stats()["size"] == 0
+        mock_logger.warning.assert_called_once()
+
+    def test_init_builds_tuned_pool_manager(self):
+        """プールサイズ・ブロッキング・計測付きプールで初期化されること"""
+        adapter = LineMessagingAdapter(
+            logger=MagicMock(), http_settings=_settings(pool_size=6)
+        )
+
+        adapter.init("test_access_token")
+
+        assert adapter.messaging_api is not None
+        pool_manager = adapter.messaging_api.api_client.rest_client.pool_manager
+        assert pool_manager.connection_pool_kw["maxsize"] == 6
+        assert pool_manager.connection_pool_kw["block"] is True
+        pool_cls = pool_manager.pool_classes_by_scheme["https"]
+        assert pool_cls.__name__ == "InstrumentedHTTPSConnectionPool"
+
+    def test_reply_message_reconnects_on_stale_connection(self):
+        """キープアライブ切れの場合は 1 回だけ再接続して再送すること"""
+        registry = MetricsRegistry()
+        adapter = LineMessagingAdapter(logger=MagicMock(), metrics_registry=registry)
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.reply_message.side_effect = [
+            http.client.RemoteDisconnected("closed"),
+            None,
+        ]
+        adapter.messaging_api = mock_messaging_api
+
+        adapter.reply_message(MagicMock())
+
+        assert mock_messaging_api.reply_message.call_count == 2
+        assert registry.get(RECONNECT_METRIC) == 1
+        assert adapter.get_http_stats()["reconnects"] == 1
+
+    def test_reply_message_raises_after_repeated_connection_errors(self):
+        """再接続後も失敗した場合は例外を送出すること"""
+        mock_logger = MagicMock()
+        adapter = LineMessagingAdapter(
+            logger=mock_logger, metrics_registry=MetricsRegistry()
+        )
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.reply_message.side_effect = http.client.RemoteDisconnected(
+            "closed"
+        )
+        adapter.messaging_api = mock_messaging_api
+
+        with pytest.raises(http.client.RemoteDisconnected):
+            adapter.reply_message(MagicMock())
+
+        assert mock_messaging_api.reply_message.call_count == 2
+        mock_logger.error.assert_called_once()
+
+    def test_push_message_retry_reuses_retry_key(self):
+        """push の再送では同じ X-Line-Retry-Key を使うこと"""
+        adapter = LineMessagingAdapter(
+            logger=MagicMock(), metrics_registry=MetricsRegistry()
+        )
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.push_message.side_effect = [
+            http.client.RemoteDisconnected("closed"),
+            None,
+        ]
+        adapter.messaging_api = mock_messaging_api
+
+        adapter.push_message(MagicMock())
+
+        keys = [
+            call.kwargs["x_line_retry_key"]
+            for call in mock_messaging_api.push_message.call_args_list
+        ]
+        assert len(keys) == 2
+        assert keys[0] == keys[1]
+
+    def test_push_message_conflict_is_treated_as_delivered(self):
+        """リトライキー重複 (409) は送信済みとして扱うこと"""
+        from linebot.v3.messaging.exceptions import ApiException
+
+        adapter = LineMessagingAdapter(
+            logger=MagicMock(), metrics_registry=MetricsRegistry()
+        )
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.push_message.side_effect = [
+            http.client.RemoteDisconnected("closed"),
+            ApiException(status=409),
+        ]
+        adapter.messaging_api = mock_messaging_api
+
+        adapter.push_message(MagicMock())
+
+        assert mock_messaging_api.push_message.call_count == 2
+
+    def test_multicast_success(self):
+        """multicast がリトライキー付きで送信されること"""
+        adapter = LineMessagingAdapter(logger=MagicMock(), http_settings=_settings())
+        mock_messaging_api = MagicMock()
+        adapter.messaging_api = mock_messaging_api
+        request = MagicMock()
+
+        adapter.multicast(request)
+
+        mock_messaging_api.multicast.assert_called_once_with(
+            request, x_line_retry_key=ANY, _request_timeout=REQUEST_TIMEOUT
+        )
+
+    def test_enqueue_push_is_coalesced_on_flush(self, monkeypatch):
+        """enqueue_push したメッセージが flush 時にまとめて送信されること"""
+        from linebot.v3.messaging.models import TextMessage
+
+        monkeypatch.setenv("LINE_PUSH_COALESCE_WINDOW_MS", "60000")
+        adapter = LineMessagingAdapter(
+            logger=MagicMock(), metrics_registry=MetricsRegistry()
+        )
+        mock_messaging_api = MagicMock()
+        adapter.messaging_api = mock_messaging_api
+
+        adapter.enqueue_push(
+            "C1", [TextMessage(text="a", quickReply=None, quoteToken=None)]
+        )
+        adapter.enqueue_push(
+            "C1", [TextMessage(text="b", quickReply=None, quoteToken=None)]
+        )
+
+        assert adapter.flush_pushes() == 1
+        request = mock_messaging_api.push_message.call_args.args[0]
+        assert [m.text for m in request.messages] == ["a", "b"]
+
+    def test_invalid_reply_token_does_not_trip_circuit(self):
+        """4xx 応答は LINE の障害として数えないこと"""
+        from linebot.v3.messaging.exceptions import ApiException
+
+        from src.infrastructure.circuit_breaker import CLOSED, CircuitBreaker
+
+        breaker = CircuitBreaker(
+            "line", minimum_calls=2, metrics_registry=MetricsRegistry()
+        )
+        adapter = LineMessagingAdapter(
+            logger=MagicMock(),
+            metrics_registry=MetricsRegistry(),
+            circuit_breaker=breaker,
+        )
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.reply_message.side_effect = ApiException(status=400)
+        adapter.messaging_api = mock_messaging_api
+
+        for _ in range(3):
+            with pytest.raises(ApiException):
+                adapter.reply_message(MagicMock())
+
+        assert breaker.state == CLOSED
+        assert mock_messaging_api.reply_message.call_count == 3
+
+    def test_server_errors_open_circuit(self):
+        """5xx が続いたら LINE API を呼ばずに失敗させること"""
+        from linebot.v3.messaging.exceptions import ApiException
+
+        from src.infrastructure.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+        breaker = CircuitBreaker(
+            "line", minimum_calls=2, metrics_registry=MetricsRegistry()
+        )
+        adapter = LineMessagingAdapter(
+            logger=MagicMock(),
+            metrics_registry=MetricsRegistry(),
+            circuit_breaker=breaker,
+        )
+        mock_messaging_api = MagicMock()
+        mock_messaging_api.push_message.side_effect = ApiException(status=503)
+        adapter.messaging_api = mock_messaging_api
+
+        for _ in range(2):
+            with pytest.raises(ApiException):
+                adapter.push_message(MagicMock())
+        with pytest.raises(CircuitOpenError):
+            adapter.push_message(MagicMock())
+
+        assert mock_messaging_api.push_message.call_count == 2
+
+    def test_http_settings_from_env(self, monkeypatch):
+        """環境変数から HTTP 設定を読み込むこと"""
+        monkeypatch.setenv("THREADS", "12")
+        monkeypatch.setenv("LINE_HTTP_READ_TIMEOUT", "5")
+        monkeypatch.delenv("LINE_HTTP_POOL_SIZE", raising=False)
+
+        settings = LineHttpSettings.from_env()
+
+        assert settings.pool_size == 12
+        assert settings.request_timeout == (3.0, 5.0)
+
+        monkeypatch.setenv("LINE_HTTP_POOL_SIZE", "20")
+        assert LineHttpSettings.from_env().pool_size == 20
+
+    def test_reply_prepared_posts_serialized_body(self):
+        """事前にシリアライズした返信をトークンだけ差し込んで POST すること"""
+        from src.infrastructure.line_model.prepared_reply import janken_options_reply
+
+        registry = MetricsRegistry()
+        adapter = LineMessagingAdapter(logger=MagicMock(), metrics_registry=registry)
+        adapter.init("dummy-token")
+        pool_manager = MagicMock()
+        pool_manager.request.return_value = MagicMock(status=200)
+        adapter.messaging_api.api_client.rest_client.pool_manager = pool_manager
+
+        prepared = janken_options_reply()
+        adapter.reply_prepared("reply-token", prepared)
+
+        method, url = pool_manager.request.call_args[0]
+        kwargs = pool_manager.request.call_args[1]
+        assert (method, url) == ("POST", "https://api.line.me/v2/bot/message/reply")
+        assert kwargs["body"] == prepared.to_request("reply-token").to_json().encode()
+        assert kwargs["headers"]["Authorization"] == "Bearer dummy-token"
+        assert kwargs["headers"]["Content-Type"] == "application/json"
+        assert registry.get("line.reply.prepared") == 1
+
+    def test_reply_prepared_raises_api_exception_on_error_status(self):
+        """4xx/5xx は reply_message と同じく ApiException として送出すること"""
+        from linebot.v3.messaging.exceptions import ApiException
+
+        from src.infrastructure.line_model.prepared_reply import general_error_reply
+
+        adapter = LineMessagingAdapter(
+            logger=MagicMock(), metrics_registry=MetricsRegistry()
+        )
+        adapter.init("dummy-token")
+        pool_manager = MagicMock()
+        pool_manager.request.return_value = MagicMock(
+            status=400, reason="Bad Request", data=b'{"message":"Invalid reply token"}'
+        )
+        adapter.messaging_api.api_client.rest_client.pool_manager = pool_manager
+
+        with pytest.raises(ApiException) as excinfo:
+            adapter.reply_prepared("expired", general_error_reply())
+
+        assert excinfo.value.status == 400
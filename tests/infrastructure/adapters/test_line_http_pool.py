@@ -0,0 +1,83 @@
+"""line_http_pool のテスト"""
+
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import urllib3
+
+from src.infrastructure.adapters.line_http_pool import (
+    POOL_WAIT_METRIC,
+    LineHttpSettings,
+    instrument_pool_manager,
+)
+from src.infrastructure.metrics import MetricsRegistry
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_instrumented_pool_records_wait_time(local_server):
+    """コネクション取得の待ち時間が記録されること"""
+    registry = MetricsRegistry()
+    pool_manager = urllib3.PoolManager(maxsize=1)
+    instrument_pool_manager(pool_manager, registry, pool_timeout=1.0)
+
+    for _ in range(3):
+        assert pool_manager.request("GET", local_server).status == 200
+
+    summary = registry.summary(POOL_WAIT_METRIC)
+    assert summary["count"] == 3
+    assert summary["max"] < 1.0
+
+
+def test_socket_options_enable_keepalive():
+    """TCP キープアライブが有効になること"""
+    settings = LineHttpSettings(
+        pool_size=4,
+        connect_timeout=3,
+        read_timeout=10,
+        keepalive_idle=45,
+        connect_retries=2,
+    )
+
+    options = settings.socket_options()
+
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 45) in options
+
+
+def test_retries_only_cover_connect_errors():
+    """送信後の読み取りエラーは urllib3 側で再試行しないこと"""
+    settings = LineHttpSettings(
+        pool_size=4,
+        connect_timeout=3,
+        read_timeout=10,
+        keepalive_idle=30,
+        connect_retries=2,
+    )
+
+    retries = settings.retries()
+
+    assert retries.connect == 2
+    assert retries.read == 0
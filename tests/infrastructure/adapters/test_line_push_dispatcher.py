@@ -0,0 +1,152 @@
+"""LinePushDispatcher のテスト"""
+
+import threading
+import time
+
+from linebot.v3.messaging.models import (
+    MulticastRequest,
+    PushMessageRequest,
+    TextMessage,
+)
+
+from src.infrastructure.adapters.line_push_dispatcher import (
+    MULTICAST_REQUEST_METRIC,
+    PUSH_REQUEST_METRIC,
+    LinePushDispatcher,
+)
+from src.infrastructure.metrics import MetricsRegistry
+
+
+class FakeSender:
+    def __init__(self, fail: bool = False):
+        self.requests = []
+        self.fail = fail
+        self.sent = threading.Event()
+
+    def push_message(self, push_message_request):
+        if self.fail:
+            raise RuntimeError("boom")
+        self.requests.append(push_message_request)
+        self.sent.set()
+
+    def multicast(self, multicast_request):
+        self.requests.append(multicast_request)
+        self.sent.set()
+
+
+def _text(text: str) -> TextMessage:
+    return TextMessage(text=text, quickReply=None, quoteToken=None)
+
+
+def _dispatcher(sender, **kwargs) -> LinePushDispatcher:
+    kwargs.setdefault("rate_per_second", 1000)
+    kwargs.setdefault("metrics_registry", MetricsRegistry())
+    return LinePushDispatcher(sender, **kwargs)
+
+
+def test_messages_to_same_recipient_are_coalesced():
+    """同じ宛先へのメッセージは 1 リクエストにまとめること"""
+    sender = FakeSender()
+    dispatcher = _dispatcher(sender, window_seconds=60)
+
+    dispatcher.enqueue("U1", [_text("a")])
+    dispatcher.enqueue("U1", [_text("b"), _text("c")])
+
+    assert dispatcher.flush() == 1
+    request = sender.requests[0]
+    assert isinstance(request, PushMessageRequest)
+    assert request.to == "U1"
+    assert [m.text for m in request.messages] == ["a", "b", "c"]
+
+
+def test_more_than_five_messages_are_split_in_order():
+    """5 件を超える場合は順序を保って分割すること"""
+    sender = FakeSender()
+    dispatcher = _dispatcher(sender, window_seconds=60)
+
+    dispatcher.enqueue("C1", [_text(str(i)) for i in range(7)])
+
+    assert dispatcher.flush() == 2
+    assert [m.text for m in sender.requests[0].messages] == ["0", "1", "2", "3", "4"]
+    assert [m.text for m in sender.requests[1].messages] == ["5", "6"]
+
+
+def test_identical_content_to_many_users_uses_multicast():
+    """同一内容を複数ユーザーに送る場合は multicast を使うこと"""
+    sender = FakeSender()
+    registry = MetricsRegistry()
+    dispatcher = _dispatcher(sender, window_seconds=60, metrics_registry=registry)
+
+    for user_id in ("U1", "U2", "U3"):
+        dispatcher.enqueue(user_id, [_text("お知らせ")])
+    dispatcher.enqueue("U4", [_text("個別")])
+
+    assert dispatcher.flush() == 2
+    multicast = sender.requests[0]
+    assert isinstance(multicast, MulticastRequest)
+    assert multicast.to == ["U1", "U2", "U3"]
+    assert isinstance(sender.requests[1], PushMessageRequest)
+    assert sender.requests[1].to == "U4"
+    assert registry.get(MULTICAST_REQUEST_METRIC) == 1
+    assert registry.get(PUSH_REQUEST_METRIC) == 1
+
+
+def test_groups_are_never_multicast():
+    """グループ宛ては同一内容でも push で送ること"""
+    sender = FakeSender()
+    dispatcher = _dispatcher(sender, window_seconds=60)
+
+    dispatcher.enqueue("C1", [_text("x")])
+    dispatcher.enqueue("C2", [_text("x")])
+
+    assert dispatcher.flush() == 2
+    assert all(isinstance(r, PushMessageRequest) for r in sender.requests)
+
+
+def test_background_thread_flushes_after_window():
+    """時間窓の経過後にバックグラウンドで送信されること"""
+    sender = FakeSender()
+    dispatcher = _dispatcher(sender, window_seconds=0.01)
+
+    dispatcher.enqueue("U1", [_text("a")])
+
+    assert sender.sent.wait(timeout=2)
+    assert dispatcher.pending_count == 0
+    dispatcher.close()
+
+
+def test_messages_enqueued_during_window_are_sent_together():
+    """時間窓の途中で積まれたメッセージも同じリクエストにまとめること"""
+    sender = FakeSender()
+    dispatcher = _dispatcher(sender, window_seconds=0.2)
+
+    dispatcher.enqueue("U1", [_text("a")])
+    time.sleep(0.05)
+    dispatcher.enqueue("U1", [_text("b")])
+
+    assert sender.sent.wait(timeout=2)
+    assert len(sender.requests) == 1
+    assert [m.text for m in sender.requests[0].messages] == ["a", "b"]
+    dispatcher.close()
+
+
+def test_send_failure_is_logged_and_counted():
+    """送信失敗は例外を送出せず件数に含めないこと"""
+    dispatcher = _dispatcher(FakeSender(fail=True), window_seconds=60)
+
+    dispatcher.enqueue("C1", [_text("a")])
+
+    assert dispatcher.flush() == 0
+
+
+def test_close_flushes_pending_messages():
+    """close 時に残っているメッセージを送信すること"""
+    sender = FakeSender()
+    dispatcher = _dispatcher(sender, window_seconds=60)
+    dispatcher.enqueue("U1", [_text("a")])
+
+    started = time.monotonic()
+    dispatcher.close(timeout=1)
+
+    assert len(sender.requests) == 1
+    assert time.monotonic() - started < 1
@@ -1,10 +1,24 @@
 """OpenAIAdapter のテスト (OpenAI SDK版)"""
 
+import subprocess
+import sys
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from src.infrastructure.adapters.openai_adapter import OpenAIAdapter, OpenAIError
+from src.infrastructure.adapters.openai_adapter import (
+    OpenAIAdapter,
+    OpenAIBusyError,
+    OpenAIError,
+)
+from src.infrastructure.adapters.prompt_registry import MEAL_SUGGESTION
+from src.infrastructure.deadline import Deadline, deadline_scope
+from src.infrastructure.ratelimit.openai_governor import (
+    PRIORITY_HIGH,
+    GovernorBusyError,
+)
+from src.infrastructure.telemetry.telemetry_exporter import TelemetryExporter
 
 
 class TestOpenAIAdapter:
@@ -102,6 +116,92 @@ class TestOpenAIAdapter:
 
         assert result == "こんにちは！"
 
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_get_chatgpt_response_includes_history(self, mock_openai_class):
+        """会話履歴はシステムプロンプトと今回の発言の間に入ること"""
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "覚えてるよ！"
+        mock_client.chat.completions.create.return_value = mock_response
+        history = [
+            {"role": "user", "content": "焼きまんじゅうが好き"},
+            {"role": "assistant", "content": "おいしいよね！"},
+        ]
+
+        OpenAIAdapter().get_chatgpt_response("私の好物は？", history)
+
+        messages = mock_client.chat.completions.create.call_args.kwargs["messages"]
+        assert [m["role"] for m in messages] == ["system", "user", "assistant", "user"]
+        assert messages[1:3] == history
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_meal_suggestion_keeps_static_prefix_first(self, mock_openai_class):
+        """料理提案は固定のシステムプロンプトが先頭で、日時は最後のメッセージに入ること"""
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "肉じゃが"
+        mock_client.chat.completions.create.return_value = mock_response
+
+        OpenAIAdapter().get_chatgpt_meal_suggestion()
+
+        kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert kwargs["messages"][0] == {
+            "role": "system",
+            "content": MEAL_SUGGESTION.system,
+        }
+        assert "現在の日時は" in kwargs["messages"][-1]["content"]
+        assert kwargs["prompt_cache_key"] == MEAL_SUGGESTION.cache_key
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_image_prompt_uses_its_policy(self, mock_openai_class):
+        """画像プロンプトは専用の出力上限・推論の深さ・タイムアウトで呼ぶこと"""
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "a sunny autumn street"
+        mock_client.chat.completions.create.return_value = mock_response
+        adapter = OpenAIAdapter()
+        policy = adapter.completion_router.policy("image_prompt_generation")
+
+        adapter.generate_image_prompt("摂氏20度の11月の服装")
+
+        kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert kwargs["model"] == "gpt-5-mini"
+        assert kwargs["max_completion_tokens"] == policy.max_completion_tokens < 3000
+        assert kwargs["reasoning_effort"] == "minimal"
+        assert kwargs["timeout"] == policy.timeout_seconds
+
+    @patch.dict(
+        "os.environ",
+        {"OPENAI_API_KEY": "test_api_key", "OPENAI_MODEL": "gpt-4o-mini"},
+        clear=True,
+    )
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_non_reasoning_model_gets_no_reasoning_effort(self, mock_openai_class):
+        """推論しないモデル（OPENAI_MODEL=gpt-4o-mini）には reasoning_effort を送らないこと"""
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "こんにちは"
+        mock_client.chat.completions.create.return_value = mock_response
+        adapter = OpenAIAdapter()
+
+        adapter.get_chatgpt_response("テスト")
+        adapter.generate_image_prompt("摂氏20度の11月の服装")
+
+        for call in mock_client.chat.completions.create.call_args_list:
+            assert call.kwargs["model"] == "gpt-4o-mini"
+            assert "reasoning_effort" not in call.kwargs
+
     @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
     @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
     def test_api_error(self, mock_openai_class):
@@ -160,3 +260,180 @@ class TestOpenAIAdapter:
         call_kwargs = mock_wrapped_openai.chat.completions.create.call_args[1]
         assert "pl_tags" in call_kwargs
         assert call_kwargs["pl_tags"] == ["chat_response"]
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_throttled_request_is_not_sent(self, mock_openai_class):
+        """レート制限の枠が取れない場合は API を呼ばずに OpenAIBusyError を送出すること"""
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        governor = MagicMock()
+        governor.acquire.side_effect = GovernorBusyError("busy")
+
+        adapter = OpenAIAdapter(governor=governor)
+        with pytest.raises(OpenAIBusyError):
+            adapter.get_chatgpt_response("テスト")
+
+        mock_client.chat.completions.create.assert_not_called()
+        # 呼ばなかった分はブレーカーの成功にも失敗にも数えない
+        assert adapter._chat_breaker.snapshot()["calls"] == 0
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_permit_is_settled_with_usage(self, mock_openai_class):
+        """レスポンスの usage で使用トークン数を精算すること"""
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "こんにちは！"
+        mock_response.usage.total_tokens = 123
+        mock_client.chat.completions.create.return_value = mock_response
+        governor = MagicMock()
+
+        adapter = OpenAIAdapter(governor=governor)
+        adapter.get_chatgpt_response("こんにちは")
+
+        assert governor.acquire.call_args.kwargs["priority"] == PRIORITY_HIGH
+        governor.acquire.return_value.release.assert_called_once_with(123)
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_rate_limit_error_penalizes_governor(self, mock_openai_class):
+        """429 を受けたらガバナーのリクエスト枠を空にすること"""
+        from openai import RateLimitError
+
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        mock_client.chat.completions.create.side_effect = RateLimitError(
+            "rate limited", response=MagicMock(status_code=429), body=None
+        )
+        governor = MagicMock()
+
+        adapter = OpenAIAdapter(governor=governor)
+        with pytest.raises(OpenAIError):
+            adapter.get_chatgpt_response("テスト")
+
+        governor.penalize.assert_called_once_with("gpt-5-mini")
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_request_deadline_bounds_timeout_and_retries(self, mock_openai_class):
+        """処理期限の残りでタイムアウトを短くし、SDK の再試行をしないこと"""
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        limited = mock_client.with_options.return_value
+        mock_response = MagicMock()
+        mock_response.choices = [MagicMock()]
+        mock_response.choices[0].message.content = "はーい"
+        limited.chat.completions.create.return_value = mock_response
+
+        with deadline_scope(Deadline(time.time() + 5)):
+            OpenAIAdapter().get_chatgpt_response("こんにちは")
+
+        mock_client.with_options.assert_called_once_with(max_retries=0)
+        assert limited.chat.completions.create.call_args.kwargs["timeout"] <= 5
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_expired_deadline_skips_request(self, mock_openai_class):
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+
+        with deadline_scope(Deadline(time.time() - 1)):
+            with pytest.raises(OpenAIBusyError):
+                OpenAIAdapter().get_chatgpt_response("こんにちは")
+
+        mock_client.chat.completions.create.assert_not_called()
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_image_generation_is_bounded_by_request_deadline(self, mock_openai_class):
+        """画像生成も処理期限の残りでタイムアウト・ガバナーの待ち時間・再試行を絞ること"""
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+        limited = mock_client.with_options.return_value
+        limited.images.generate.return_value = MagicMock(
+            data=[MagicMock(url="https://example.com/outfit.png")]
+        )
+        governor = MagicMock()
+        governor.limits.max_wait_seconds = 30
+
+        with deadline_scope(Deadline(time.time() + 5)):
+            url = OpenAIAdapter(governor=governor).generate_image("autumn outfit")
+
+        assert url == "https://example.com/outfit.png"
+        assert governor.acquire.call_args.kwargs["max_wait"] <= 5
+        mock_client.with_options.assert_called_once_with(max_retries=0)
+        assert limited.images.generate.call_args.kwargs["timeout"] <= 5
+
+    @patch.dict("os.environ", {"OPENAI_API_KEY": "test_api_key"}, clear=True)
+    @patch("src.infrastructure.adapters.openai_adapter.OpenAI")
+    def test_image_generation_is_skipped_after_deadline(self, mock_openai_class):
+        mock_client = MagicMock()
+        mock_openai_class.return_value = mock_client
+
+        with deadline_scope(Deadline(time.time() - 1)):
+            assert OpenAIAdapter().generate_image("autumn outfit") is None
+
+        mock_client.images.generate.assert_not_called()
+
+    @patch.dict(
+        "os.environ",
+        {
+            "OPENAI_API_KEY": "test_api_key",
+            "PROMPTLAYER_API_KEY": "test_promptlayer_key",
+        },
+        clear=True,
+    )
+    @patch("src.infrastructure.adapters.openai_adapter.PromptLayer")
+    def test_track_score_is_exported_in_background(self, mock_promptlayer_class):
+        """スコアの記録は待ち行列に積むだけで、送信はエクスポータが行うこと"""
+        mock_pl_client = MagicMock()
+        mock_promptlayer_class.return_value = mock_pl_client
+        adapter = OpenAIAdapter()
+        adapter.telemetry = TelemetryExporter(
+            adapter._export_tracking, autostart=False, logger=MagicMock()
+        )
+
+        assert adapter.track_score(12345, 100) is True
+        mock_pl_client.track.score.assert_not_called()
+
+        assert adapter.telemetry.export_once() == 1
+        mock_pl_client.track.score.assert_called_once_with(12345, 100, "user_feedback")
+
+    @patch.dict(
+        "os.environ",
+        {
+            "OPENAI_API_KEY": "test_api_key",
+            "PROMPTLAYER_API_KEY": "test_promptlayer_key",
+            "PROMPTLAYER_ASYNC_TRACKING": "0",
+        },
+        clear=True,
+    )
+    @patch("src.infrastructure.adapters.openai_adapter.PromptLayer")
+    def test_track_prompt_synchronously_when_async_disabled(
+        self, mock_promptlayer_class
+    ):
+        mock_pl_client = MagicMock()
+        mock_pl_client.track.prompt.return_value = False
+        mock_promptlayer_class.return_value = mock_pl_client
+        adapter = OpenAIAdapter()
+
+        assert adapter.telemetry is None
+        assert adapter.track_prompt(1, "meal_suggestion", {}, 2) is False
+        mock_pl_client.track.prompt.assert_called_once_with(1, "meal_suggestion", {}, 2)
+
+
+def test_module_import_does_not_load_openai_sdk():
+    """モジュールの import だけでは openai / promptlayer を読み込まないこと"""
+    code = (
+        "import sys\n"
+        "import src.infrastructure.adapters.openai_adapter\n"
+        "assert 'openai' not in sys.modules, 'openai'\n"
+        "assert 'promptlayer' not in sys.modules, 'promptlayer'\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
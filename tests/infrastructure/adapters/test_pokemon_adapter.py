@@ -2,15 +2,6 @@ from src.domain.models.pokemon_info import PokemonInfo
 from src.infrastructure.adapters.pokemon_adapter import PokemonApiAdapter
 
 
-def test_pokemon_adapter_get_japanese_name():
-    """日本語名取得のテスト"""
-    adapter = PokemonApiAdapter()
-
-    # フォールバック名のテスト
-    result = adapter._get_japanese_name({}, "pikachu")
-    assert result == "pikachu"
-
-
 def test_pokemon_adapter_initialization():
     """アダプター初期化のテスト"""
     adapter = PokemonApiAdapter()
@@ -44,3 +35,123 @@ def test_types_ja_property():
 
 # 注意: 実際のAPIを呼び出すテストは、モックやフィクスチャーが必要
 # 本番では外部API依存を避けるためにモックを使用すること
+
+
+def test_open_circuit_fails_fast_without_request():
+    """PokeAPI の障害中はリクエストせずに None を返すこと"""
+    from unittest.mock import MagicMock, patch
+
+    import requests
+
+    from src.infrastructure.circuit_breaker import CircuitBreaker
+    from src.infrastructure.metrics import MetricsRegistry
+
+    breaker = CircuitBreaker(
+        "pokeapi", minimum_calls=2, metrics_registry=MetricsRegistry()
+    )
+    adapter = PokemonApiAdapter(logger=MagicMock(), circuit_breaker=breaker)
+
+    with patch(
+        "src.infrastructure.adapters.http_client.requests.get",
+        side_effect=requests.ConnectionError("down"),
+    ) as mock_get:
+        assert adapter.get_random_pokemon_info() is None
+        assert adapter.get_random_pokemon_info() is None
+        assert adapter.get_random_pokemon_info() is None
+
+    assert mock_get.call_count == 2
+
+
+def _pokemon_responses(poke_id: int, artwork, ja_name):
+    from unittest.mock import MagicMock
+
+    pokemon = MagicMock(status_code=200)
+    pokemon.json.return_value = {
+        "id": poke_id,
+        "name": f"mon{poke_id}",
+        "types": [{"type": {"name": "electric"}}],
+        "sprites": {"other": {"official-artwork": {"front_default": artwork}}},
+        "species": {"url": f"https://pokeapi.co/api/v2/pokemon-species/{poke_id}"},
+    }
+    names = [{"language": {"name": "ja"}, "name": ja_name}] if ja_name else []
+    species = MagicMock(status_code=200)
+    species.json.return_value = {"names": names}
+    return [pokemon, species]
+
+
+def test_get_random_pokemon_info_rejects_invalid_ids_and_redraws():
+    """アートワークのない番号は候補から外して引き直し、取得結果はキャッシュすること"""
+    import random
+    from unittest.mock import MagicMock, patch
+
+    from src.infrastructure.adapters.pokemon_id_pool import PokemonIdPool
+
+    pool = PokemonIdPool([10, 25], cached_weight=1.0, rng=random.Random(1))
+    adapter = PokemonApiAdapter(logger=MagicMock(), id_pool=pool)
+    responses = {
+        10: _pokemon_responses(10, None, "ナシ"),
+        25: _pokemon_responses(25, "https://img/25.png", "ピカチュウ"),
+    }
+
+    def fake_get(url, **kwargs):
+        poke_id = int(url.rstrip("/").rsplit("/", 1)[1])
+        pokemon, species = responses[poke_id]
+        return species if "species" in url else pokemon
+
+    with patch(
+        "src.infrastructure.adapters.http_client.requests.get", side_effect=fake_get
+    ) as mock_get:
+        infos = [adapter.get_random_pokemon_info() for _ in range(5)]
+
+    assert all(info.name == "ピカチュウ" for info in infos)
+    assert 10 not in pool
+    # 2 件目以降はキャッシュから返す
+    assert mock_get.call_count <= 4
+
+
+def test_cached_ids_are_read_once_per_refresh_interval():
+    """キャッシュの全キーの読み直しは引き直しごとではなく、間隔ごとに 1 回であること"""
+    import random
+    from unittest.mock import MagicMock, patch
+
+    from src.infrastructure.adapters.pokemon_id_pool import PokemonIdPool
+    from src.infrastructure.cache.lru_ttl_cache import LruTtlCache
+
+    class CountingCache(LruTtlCache):
+        keys_calls = 0
+
+        def keys(self):
+            CountingCache.keys_calls += 1
+            return super().keys()
+
+    now = [0.0]
+    pool = PokemonIdPool([10, 11, 12, 25], cached_weight=0.0, rng=random.Random(3))
+    adapter = PokemonApiAdapter(
+        logger=MagicMock(),
+        id_pool=pool,
+        info_cache=CountingCache(max_size=10, ttl_seconds=60),
+        clock=lambda: now[0],
+    )
+    adapter.cached_ids_refresh_seconds = 60
+    responses = {
+        poke_id: _pokemon_responses(poke_id, None, None) for poke_id in (10, 11, 12)
+    }
+    responses[25] = _pokemon_responses(25, "https://img/25.png", "ピカチュウ")
+
+    def fake_get(url, **kwargs):
+        poke_id = int(url.rstrip("/").rsplit("/", 1)[1])
+        pokemon, species = responses[poke_id]
+        return species if "species" in url else pokemon
+
+    with patch(
+        "src.infrastructure.adapters.http_client.requests.get", side_effect=fake_get
+    ):
+        for _ in range(4):
+            adapter.get_random_pokemon_info()
+        assert CountingCache.keys_calls == 1
+
+        now[0] += 60
+        adapter.get_random_pokemon_info()
+
+    assert CountingCache.keys_calls == 2
+    assert adapter._cached_id_snapshot() == [25]
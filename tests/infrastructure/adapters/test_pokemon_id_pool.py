@@ -0,0 +1,55 @@
+"""PokemonIdPool のテスト"""
+
+import json
+import random
+
+import pytest
+
+from src.infrastructure.adapters.pokemon_id_pool import PokemonIdPool, parse_id_ranges
+
+
+def test_parse_id_ranges():
+    assert parse_id_ranges("1-3, 7,5-6") == [1, 2, 3, 5, 6, 7]
+
+
+def test_empty_pool_is_rejected():
+    with pytest.raises(ValueError):
+        PokemonIdPool([])
+
+
+def test_choose_prefers_cached_ids():
+    pool = PokemonIdPool(range(1, 1001), cached_weight=1.0, rng=random.Random(0))
+
+    assert {pool.choose([25, 150]) for _ in range(50)} == {25, 150}
+
+
+def test_choose_ignores_cached_ids_outside_pool():
+    pool = PokemonIdPool([1, 2], cached_weight=1.0, rng=random.Random(0))
+
+    assert {pool.choose([999]) for _ in range(50)} <= {1, 2}
+
+
+def test_reject_removes_id_but_keeps_last_one():
+    pool = PokemonIdPool([1, 2, 3], cached_weight=0.0, rng=random.Random(0))
+    pool.reject(2)
+    pool.reject(42)
+
+    assert len(pool) == 2
+    assert 2 not in pool
+    assert {pool.choose() for _ in range(50)} == {1, 3}
+
+    pool.reject(1)
+    pool.reject(3)
+    assert len(pool) == 1
+
+
+def test_from_env_applies_range_and_pool_file(monkeypatch, tmp_path):
+    pool_path = tmp_path / "pool.json"
+    pool_path.write_text(json.dumps({"valid": [1, 2, 3, 2000], "invalid": [3]}))
+    monkeypatch.setenv("POKEMON_ID_RANGE", "1-10")
+    monkeypatch.setenv("POKEMON_ID_POOL_PATH", str(pool_path))
+
+    pool = PokemonIdPool.from_env()
+
+    assert len(pool) == 2
+    assert 1 in pool and 2 in pool
@@ -0,0 +1,69 @@
+"""prompt_registry のテスト"""
+
+from types import SimpleNamespace
+
+from src.infrastructure.adapters.prompt_registry import (
+    CHAT_RESPONSE,
+    MEAL_SUGGESTION,
+    PROMPTS,
+    prompt_cache_stats,
+    record_prompt_usage,
+)
+from src.infrastructure.metrics import MetricsRegistry
+
+
+def _response(prompt_tokens, cached_tokens):
+    return SimpleNamespace(
+        usage=SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+        )
+    )
+
+
+def test_render_keeps_system_prompt_first_and_identical():
+    """システムプロンプトは毎回同じ内容で先頭に、変わる内容は最後に入ること"""
+    first = MEAL_SUGGESTION.render(datetime="2026-01-01 12:00")
+    second = MEAL_SUGGESTION.render(datetime="2026-07-31 19:30")
+
+    assert (
+        first[0] == second[0] == {"role": "system", "content": MEAL_SUGGESTION.system}
+    )
+    assert first[-1]["content"] == "現在の日時は 2026-01-01 12:00 です。"
+    assert "2026" not in MEAL_SUGGESTION.system
+
+
+def test_render_places_history_between_system_and_variable_content():
+    history = [
+        {"role": "user", "content": "こんにちは"},
+        {"role": "assistant", "content": "やあ！"},
+    ]
+
+    messages = CHAT_RESPONSE.render(history, user_message="元気？")
+
+    assert messages[1:3] == history
+    assert messages[-1] == {"role": "user", "content": "元気？"}
+
+
+def test_system_prompts_contain_no_placeholders():
+    """先頭に置く指示には変数を入れない"""
+    for prompt in PROMPTS.values():
+        assert "{" not in prompt.system
+
+
+def test_cache_stats_from_usage():
+    registry = MetricsRegistry()
+    record_prompt_usage(CHAT_RESPONSE, _response(2000, 0), registry)
+    record_prompt_usage(CHAT_RESPONSE, _response(2000, 1536), registry)
+    record_prompt_usage(CHAT_RESPONSE, SimpleNamespace(usage=None), registry)
+
+    stats = prompt_cache_stats(registry)["chat_response"]
+
+    assert stats["calls"] == 3
+    assert stats["cache_hits"] == 1
+    assert stats["hit_rate"] == 0.333
+    assert stats["prompt_tokens"] == 4000
+    assert stats["cached_tokens"] == 1536
+    assert stats["cached_ratio"] == 0.384
+    assert stats["version"] == CHAT_RESPONSE.version
+    assert stats["fingerprint"] == CHAT_RESPONSE.fingerprint
@@ -0,0 +1,127 @@
+"""LruTtlCache のテスト"""
+
+import threading
+
+from src.infrastructure.cache.lru_ttl_cache import LruTtlCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_get_returns_miss_for_unknown_key():
+    """未登録のキーはミスになること"""
+    cache: LruTtlCache[str] = LruTtlCache(max_size=10, ttl_seconds=60)
+
+    assert cache.get("U1") == (False, None)
+    assert cache.stats().misses == 1
+
+
+def test_set_and_get_hit():
+    """登録したキーはヒットすること"""
+    cache: LruTtlCache[str] = LruTtlCache(max_size=10, ttl_seconds=60)
+    cache.set("U1", "Alice")
+
+    assert cache.get("U1") == (True, "Alice")
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.size == 1
+    assert stats.hit_rate == 1.0
+
+
+def test_negative_entry_is_hit_with_none():
+    """None を保存するとネガティブキャッシュとしてヒットすること"""
+    cache: LruTtlCache[str] = LruTtlCache(max_size=10, ttl_seconds=60)
+    cache.set("U1", None)
+
+    assert cache.get("U1") == (True, None)
+
+
+def test_entry_expires_after_ttl():
+    """TTL を過ぎたエントリは破棄されること"""
+    clock = FakeClock()
+    cache: LruTtlCache[str] = LruTtlCache(max_size=10, ttl_seconds=60, clock=clock)
+    cache.set("U1", "Alice")
+    cache.set("U2", None, ttl_seconds=5)
+
+    clock.now += 10
+    assert cache.get("U2") == (False, None)
+    assert cache.get("U1") == (True, "Alice")
+
+    clock.now += 60
+    assert cache.get("U1") == (False, None)
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    """最大件数を超えると最も使われていないエントリが削除されること"""
+    cache: LruTtlCache[str] = LruTtlCache(max_size=2, ttl_seconds=60)
+    cache.set("U1", "Alice")
+    cache.set("U2", "Bob")
+    cache.get("U1")
+    cache.set("U3", "Carol")
+
+    assert cache.get("U2") == (False, None)
+    assert cache.get("U1") == (True, "Alice")
+    assert cache.get("U3") == (True, "Carol")
+
+
+def test_invalidate_removes_entry():
+    """invalidate でエントリが削除されること"""
+    cache: LruTtlCache[str] = LruTtlCache(max_size=10, ttl_seconds=60)
+    cache.set("U1", "Alice")
+
+    assert cache.invalidate("U1") is True
+    assert cache.invalidate("U1") is False
+    assert cache.get("U1") == (False, None)
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """保存したキャッシュを別インスタンスで読み込めること"""
+    clock = FakeClock()
+    path = str(tmp_path / "profiles.json")
+    cache: LruTtlCache[str] = LruTtlCache(max_size=10, ttl_seconds=60, clock=clock)
+    cache.set("U1", "Alice")
+    cache.set("U2", None)
+    cache.set("U3", "Expired", ttl_seconds=1)
+    clock.now += 2
+    cache.save(path)
+
+    restored: LruTtlCache[str] = LruTtlCache(max_size=10, ttl_seconds=60, clock=clock)
+    assert restored.load(path) == 2
+    assert restored.get("U1") == (True, "Alice")
+    assert restored.get("U2") == (True, None)
+    assert restored.get("U3") == (False, None)
+
+
+def test_concurrent_saves_do_not_share_a_temp_file(tmp_path):
+    """同じファイルへ同時に書き出しても壊れず、一時ファイルも残らないこと"""
+    path = str(tmp_path / "profiles.json")
+    cache: LruTtlCache[str] = LruTtlCache(max_size=100, ttl_seconds=60)
+    for i in range(50):
+        cache.set(f"U{i}", f"name{i}")
+
+    threads = [threading.Thread(target=cache.save, args=(path,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert LruTtlCache(max_size=100, ttl_seconds=60).load(path) == 50
+    assert [p.name for p in tmp_path.iterdir()] == ["profiles.json"]
+
+
+def test_keys_skip_expired_entries_without_counting_hits():
+    """keys は期限内のキーだけを返し、ヒット数に数えないこと"""
+    clock = FakeClock()
+    cache: LruTtlCache[str] = LruTtlCache(max_size=10, ttl_seconds=60, clock=clock)
+    cache.set("U1", "Alice", ttl_seconds=10)
+    cache.set("U2", "Bob")
+    clock.now += 30
+
+    assert cache.keys() == ["U2"]
+    assert cache.stats().hits == 0
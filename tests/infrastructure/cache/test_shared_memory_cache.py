@@ -0,0 +1,172 @@
+"""SharedMemoryCache のテスト"""
+
+import multiprocessing
+import os
+import signal
+import struct
+import threading
+
+from src.domain.models.pokemon_info import PokemonInfo
+from src.infrastructure.cache.lru_ttl_cache import LruTtlCache
+from src.infrastructure.cache.shared_memory_cache import SharedMemoryCache, create_cache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_set_and_get_hit():
+    """登録した値（dataclass を含む）はヒットすること"""
+    cache: SharedMemoryCache[PokemonInfo] = SharedMemoryCache(
+        max_size=16, ttl_seconds=60
+    )
+    info = PokemonInfo(
+        zukan_no=25, name="ピカチュウ", types=["electric"], image_url=None
+    )
+    cache.set("25", info)
+
+    assert cache.get("25") == (True, info)
+    assert cache.get("1") == (False, None)
+    stats = cache.stats()
+    assert (stats.size, stats.hits, stats.misses) == (1, 1, 1)
+
+
+def test_negative_entry_and_invalidate():
+    """None はネガティブキャッシュとしてヒットし、invalidate で消えること"""
+    cache: SharedMemoryCache[str] = SharedMemoryCache(max_size=16, ttl_seconds=60)
+    cache.set("U1", None)
+
+    assert cache.get("U1") == (True, None)
+    assert cache.invalidate("U1") is True
+    assert cache.invalidate("U1") is False
+    assert cache.get("U1") == (False, None)
+
+
+def test_entry_expires_after_its_own_ttl():
+    """エントリごとの TTL で期限切れになること"""
+    clock = FakeClock()
+    cache: SharedMemoryCache[str] = SharedMemoryCache(
+        max_size=16, ttl_seconds=60, clock=clock
+    )
+    cache.set("long", "a")
+    cache.set("short", "b", ttl_seconds=5)
+
+    clock.now += 10
+    assert cache.get("short") == (False, None)
+    assert cache.get("long") == (True, "a")
+    assert cache.keys() == ["long"]
+
+
+def test_full_set_evicts_entry_closest_to_expiry():
+    """セットが埋まっていたら期限が最も近いエントリを追い出すこと"""
+    cache: SharedMemoryCache[str] = SharedMemoryCache(
+        max_size=1, ttl_seconds=60, ways=2
+    )
+    cache.set("a", "1", ttl_seconds=10)
+    cache.set("b", "2", ttl_seconds=100)
+    cache.set("c", "3", ttl_seconds=50)
+
+    assert cache.get("a") == (False, None)
+    assert cache.get("b") == (True, "2")
+    assert cache.get("c") == (True, "3")
+
+
+def test_oversized_value_is_not_stored():
+    """スロットに収まらない値は保存しないこと"""
+    cache: SharedMemoryCache[str] = SharedMemoryCache(
+        max_size=4, ttl_seconds=60, slot_size=64
+    )
+    cache.set("big", "x" * 100)
+
+    assert cache.get("big") == (False, None)
+
+
+def _write_in_child(cache: SharedMemoryCache) -> None:
+    cache.set("U1", "Alice")
+
+
+def test_entries_are_shared_with_forked_processes():
+    """フォーク前に作ったキャッシュは子プロセスの書き込みが親から見えること"""
+    cache: SharedMemoryCache[str] = SharedMemoryCache(max_size=16, ttl_seconds=60)
+    process = multiprocessing.get_context("fork").Process(
+        target=_write_in_child, args=(cache,)
+    )
+    process.start()
+    process.join(timeout=10)
+
+    assert process.exitcode == 0
+    assert cache.get("U1") == (True, "Alice")
+
+
+def _die_holding_write_lock(cache: SharedMemoryCache) -> None:
+    cache._write_lock.__enter__()
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+def test_writer_killed_while_holding_lock_does_not_block_others():
+    """ロックを持ったまま強制終了されたプロセスがいても書き込めること"""
+    cache: SharedMemoryCache[str] = SharedMemoryCache(max_size=16, ttl_seconds=60)
+    process = multiprocessing.get_context("fork").Process(
+        target=_die_holding_write_lock, args=(cache,)
+    )
+    process.start()
+    process.join(timeout=10)
+    assert process.exitcode == -signal.SIGKILL
+
+    writer = threading.Thread(target=cache.set, args=("U1", "Alice"), daemon=True)
+    writer.start()
+    writer.join(timeout=5)
+
+    assert not writer.is_alive()
+    assert cache.get("U1") == (True, "Alice")
+
+
+def test_slot_left_mid_write_is_readable_after_next_write():
+    """書き込み途中で seq が奇数のまま残ったスロットも、次の書き込みで読めること"""
+    cache: SharedMemoryCache[str] = SharedMemoryCache(
+        max_size=1, ttl_seconds=60, ways=1
+    )
+    cache.set("U1", "Alice")
+    (seq,) = struct.unpack_from("<Q", cache._mm, 0)
+    struct.pack_into("<Q", cache._mm, 0, seq + 1)
+    assert cache.get("U1") == (False, None)
+
+    cache.set("U1", "Bob")
+
+    (seq,) = struct.unpack_from("<Q", cache._mm, 0)
+    assert seq % 2 == 0
+    assert cache.get("U1") == (True, "Bob")
+
+
+def test_save_and_load_is_compatible_with_lru_ttl_cache(tmp_path):
+    """LruTtlCache と同じ形式で保存・読み込みできること"""
+    path = str(tmp_path / "profiles.json")
+    clock = FakeClock()
+    source: SharedMemoryCache[str] = SharedMemoryCache(
+        max_size=16, ttl_seconds=60, clock=clock
+    )
+    source.set("U1", "Alice")
+    source.set("U2", None)
+    source.save(path)
+
+    restored: LruTtlCache[str] = LruTtlCache(max_size=16, ttl_seconds=60, clock=clock)
+    assert restored.load(path) == 2
+    assert restored.get("U1") == (True, "Alice")
+
+    reloaded: SharedMemoryCache[str] = SharedMemoryCache(
+        max_size=16, ttl_seconds=60, clock=clock
+    )
+    assert reloaded.load(path) == 2
+    assert reloaded.get("U2") == (True, None)
+
+
+def test_create_cache_switches_on_environment(monkeypatch):
+    monkeypatch.delenv("SHARED_CACHE_ENABLED", raising=False)
+    assert isinstance(create_cache(8, 60), LruTtlCache)
+
+    monkeypatch.setenv("SHARED_CACHE_ENABLED", "1")
+    assert isinstance(create_cache(8, 60), SharedMemoryCache)
@@ -0,0 +1,187 @@
+"""ConversationMemory のテスト"""
+
+from concurrent.futures import Future
+from unittest.mock import MagicMock
+
+from src.infrastructure.conversation.conversation_memory import (
+    ConversationMemory,
+    ConversationStore,
+    estimate_tokens,
+)
+
+
+class InlineExecutor:
+    """submit した処理をその場で実行する（要約の完了を待つため）"""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        future: Future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_estimate_tokens_counts_wide_chars_individually():
+    """かな・漢字は 1 文字 1 トークン、英数字は 4 文字 1 トークンで見積もること"""
+    assert estimate_tokens("ぐんまちゃん") == 6
+    assert estimate_tokens("hello world!") == 3
+    assert estimate_tokens("") == 0
+
+
+def test_keeps_last_n_turns_per_source():
+    """送信元ごとに直近 N 往復だけを古い順に返すこと"""
+    memory = ConversationMemory(max_turns=2, logger=MagicMock())
+    for n in range(3):
+        memory.append("U1", f"質問{n}", f"回答{n}")
+    memory.append("U2", "別の人", "こんにちは")
+
+    contents = [m["content"] for m in memory.context("U1")]
+
+    assert contents == ["質問1", "回答1", "質問2", "回答2"]
+    assert memory.context("U3") == []
+
+
+def test_history_is_trimmed_to_token_budget():
+    """トークン予算を超える分は古い往復から落とすこと"""
+    memory = ConversationMemory(max_turns=10, token_budget=30, logger=MagicMock())
+    memory.append("U1", "あ" * 10, "い" * 10)
+    memory.append("U1", "う" * 5, "え" * 5)
+
+    contents = [m["content"] for m in memory.context("U1")]
+
+    # 直近の往復（5 + 5 + 4 × 2 = 18 トークン）だけが予算 30 に収まる
+    assert contents == ["う" * 5, "え" * 5]
+
+
+def test_overflowed_turns_are_summarized_in_batches():
+    """あふれた往復が summary_batch 件たまったら要約し、履歴の先頭に入れること"""
+    summarizer = MagicMock(return_value="・焼きまんじゅうが好き")
+    memory = ConversationMemory(
+        max_turns=1,
+        summary_batch=2,
+        summarizer=summarizer,
+        logger=MagicMock(),
+        summary_executor=InlineExecutor(),
+    )
+    memory.append("U1", "焼きまんじゅうが好き", "いいね！")
+    memory.append("U1", "今日は晴れ", "お出かけ日和だね")
+    summarizer.assert_not_called()
+
+    memory.append("U1", "何食べよう", "焼きまんじゅう！")
+
+    previous, messages = summarizer.call_args.args
+    assert previous == ""
+    assert [m["content"] for m in messages][0] == "焼きまんじゅうが好き"
+    context = memory.context("U1")
+    assert context[0] == {
+        "role": "system",
+        "content": "これまでの会話の要約: ・焼きまんじゅうが好き",
+    }
+    assert [m["content"] for m in context[1:]] == ["何食べよう", "焼きまんじゅう！"]
+
+
+def test_failed_summary_keeps_previous_memo_and_retries_turns():
+    """要約に失敗しても以前のメモを使い続け、あふれた往復は次の要約に含めること"""
+    summarizer = MagicMock(side_effect=["最初のメモ", RuntimeError("boom"), "次のメモ"])
+    memory = ConversationMemory(
+        max_turns=1,
+        summary_batch=1,
+        summarizer=summarizer,
+        logger=MagicMock(),
+        summary_executor=InlineExecutor(),
+    )
+    for n in range(3):
+        memory.append("U1", f"質問{n}", f"回答{n}")
+
+    assert memory.context("U1")[0]["content"].endswith("最初のメモ")
+
+    memory.append("U1", "質問3", "回答3")
+
+    previous, messages = summarizer.call_args.args
+    assert previous == "最初のメモ"
+    assert [m["content"] for m in messages] == ["質問1", "回答1", "質問2", "回答2"]
+    assert memory.context("U1")[0]["content"].endswith("次のメモ")
+
+
+def test_summary_runs_off_the_calling_thread():
+    """要約は append を呼んだスレッドでは行わないこと"""
+    summarizer = MagicMock(return_value="メモ")
+    executor = MagicMock()
+    memory = ConversationMemory(
+        max_turns=1,
+        summary_batch=1,
+        summarizer=summarizer,
+        logger=MagicMock(),
+        summary_executor=executor,
+    )
+
+    memory.append("U1", "質問0", "回答0")
+    memory.append("U1", "質問1", "回答1")
+    memory.append("U1", "質問2", "回答2")
+
+    summarizer.assert_not_called()
+    # 要約中の送信元には重ねて依頼しない
+    executor.submit.assert_called_once()
+
+
+def test_sqlite_store_shares_history_between_instances(tmp_path):
+    """SQLite に保存した履歴は別のインスタンス（別ワーカー）からも読めること"""
+    path = str(tmp_path / "conversations.sqlite3")
+    writer = ConversationMemory(
+        max_turns=3, store=ConversationStore(path), logger=MagicMock()
+    )
+    reader = ConversationMemory(
+        max_turns=3, store=ConversationStore(path), logger=MagicMock()
+    )
+    writer.append("U1", "こんにちは", "やあ！")
+
+    assert [m["content"] for m in reader.context("U1")] == ["こんにちは", "やあ！"]
+
+    reader.forget("U1")
+    assert writer.context("U1") == []
+
+
+def test_idle_rows_are_pruned_from_sqlite(tmp_path):
+    """しばらく話していない送信元の行は SQLite から消すこと"""
+    now = [1000.0]
+    store = ConversationStore(
+        str(tmp_path / "conversations.sqlite3"), clock=lambda: now[0]
+    )
+    memory = ConversationMemory(
+        max_turns=3,
+        store=store,
+        idle_seconds=60,
+        logger=MagicMock(),
+        clock=lambda: now[0],
+    )
+    memory.append("U1", "こんにちは", "やあ！")
+    now[0] += 30
+    memory.append("U2", "こんにちは", "やあ！")
+
+    now[0] += 31
+    assert memory.prune() == 1
+    assert store.load("U1", idle_seconds=10**9) is None
+    assert store.load("U2", idle_seconds=10**9) is not None
+
+
+def test_idle_conversation_expires():
+    """しばらく話していない送信元の履歴は使わないこと"""
+    now = [1000.0]
+    memory = ConversationMemory(
+        max_turns=3, idle_seconds=60, logger=MagicMock(), clock=lambda: now[0]
+    )
+    memory.append("U1", "こんにちは", "やあ！")
+
+    now[0] += 61
+    assert memory.context("U1") == []
+
+
+def test_from_env_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("CONVERSATION_MEMORY_TURNS", raising=False)
+    assert ConversationMemory.from_env() is None
+
+    monkeypatch.setenv("CONVERSATION_MEMORY_TURNS", "4")
+    memory = ConversationMemory.from_env()
+    assert memory is not None and memory.max_turns == 4
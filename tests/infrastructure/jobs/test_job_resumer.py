@@ -0,0 +1,146 @@
+"""JobResumer のテスト"""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.infrastructure.jobs.drain import DrainState
+from src.infrastructure.jobs.job_resumer import JobResumer
+from src.infrastructure.jobs.job_store import JobStore
+from src.infrastructure.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def _resumer(store, drain=None, registry=None) -> JobResumer:
+    return JobResumer(
+        store_provider=lambda: store,
+        poll_seconds=0.01,
+        drain=drain or DrainState(),
+        metrics_registry=registry or MetricsRegistry(),
+        logger=MagicMock(),
+    )
+
+
+def test_released_jobs_are_passed_to_command_handler(store):
+    """手放されたジョブはコマンドごとのハンドラに渡ること"""
+    store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+    store.release()
+    registry = MetricsRegistry()
+    resumer = _resumer(store, registry=registry)
+    handled = []
+    resumer.register("chat", handled.append)
+
+    assert resumer.resume_pending() == 1
+    assert handled[0].payload == {"user_message": "hi"}
+    assert registry.get("jobs.resumed") == 1
+
+
+def test_failed_handler_retries_job_with_backoff(store):
+    """ハンドラが失敗したジョブは試行回数に応じて待ってから再試行すること"""
+    store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+    store.release()
+    registry = MetricsRegistry()
+    resumer = _resumer(store, registry=registry)
+    resumer.register("chat", MagicMock(side_effect=RuntimeError("boom")))
+
+    assert resumer.resume_pending() == 0
+    assert registry.get("jobs.resume_failed") == 1
+    assert registry.get("jobs.retried") == 1
+    assert store.counts() == {"pending": 1}
+    # 2 回目の試行なので 2 秒 × 2 待つ
+    assert store.claim_resumable() == []
+
+
+def test_undelivered_job_is_retried(store):
+    """ハンドラが戻っても行が残っている（配信できなかった）ジョブは再試行すること"""
+    store.enqueue("meal", "U1", "rtok", {})
+    registry = MetricsRegistry()
+    resumer = _resumer(store, registry=registry)
+    resumer.register("meal", MagicMock())
+
+    assert resumer.resume_pending() == 1
+    assert registry.get("jobs.retried") == 1
+    assert store.counts() == {"pending": 1}
+
+
+def test_retry_delay_grows_exponentially_up_to_limit():
+    resumer = JobResumer(
+        store_provider=lambda: None,
+        retry_base_seconds=2,
+        retry_max_seconds=10,
+        logger=MagicMock(),
+    )
+
+    assert [resumer.retry_delay(n) for n in (1, 2, 3, 4)] == [2, 4, 8, 10]
+
+
+def test_worker_threads_run_enqueued_jobs(store):
+    """起動したスレッドが積まれたジョブを実行すること"""
+    done = threading.Event()
+    resumer = _resumer(store)
+    resumer.threads = 2
+
+    def handle(job):
+        store.complete(job.id)
+        done.set()
+
+    resumer.register("chat", handle)
+    resumer.start()
+    try:
+        store.enqueue("chat", "U1", "rtok", {"user_message": "hi"})
+        assert done.wait(5)
+        assert len(resumer._workers) == 2
+    finally:
+        resumer.stop()
+
+
+def test_draining_worker_does_not_take_jobs(store):
+    """終了処理中のワーカーはジョブを引き継がないこと"""
+    store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+    store.release()
+    drain = DrainState()
+    drain.start()
+    resumer = _resumer(store, drain=drain)
+    resumer.register("chat", MagicMock())
+
+    assert resumer.resume_pending() == 0
+    assert store.counts() == {"pending": 1}
+
+
+def test_start_is_noop_without_store():
+    """ジョブストアが未設定ならスレッドを起動しないこと"""
+    resumer = _resumer(None)
+    resumer.start()
+
+    assert resumer._workers == []
+
+
+def test_stop_waits_for_running_job_and_reports_it(store):
+    """stop は実行中のジョブを待ち、待っている間は実行中として返すこと"""
+    store.enqueue("chat", "U1", "rtok", {"user_message": "hi"})
+    resumer = _resumer(store)
+    started = threading.Event()
+    finish = threading.Event()
+
+    def handler(job):
+        started.set()
+        finish.wait(timeout=5)
+        store.complete(job.id)
+
+    resumer.register("chat", handler)
+    resumer.start()
+    assert started.wait(timeout=5)
+
+    assert len(resumer.running_job_ids()) == 1
+    resumer.stop(timeout=0.01)
+    assert len(resumer.running_job_ids()) == 1
+
+    finish.set()
+    resumer.stop(timeout=5)
+    assert resumer.running_job_ids() == []
+    assert store.counts() == {}
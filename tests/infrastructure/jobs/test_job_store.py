@@ -0,0 +1,171 @@
+"""JobStore のテスト"""
+
+import multiprocessing
+import threading
+
+import pytest
+
+from src.infrastructure.jobs.job_store import JobStore
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=60, clock=clock)
+
+
+def test_completed_job_is_removed(store):
+    """配信が終わったジョブは消えること"""
+    job_id = store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+    assert store.counts() == {"in_flight": 1}
+
+    store.complete(job_id)
+
+    assert store.counts() == {}
+
+
+def test_in_flight_job_is_not_claimed_until_lease_expires(store, clock):
+    """処理中のジョブはリースが切れるまで他のワーカーに渡らないこと"""
+    job_id = store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+    assert store.claim_resumable() == []
+
+    clock.now += 61
+    [job] = store.claim_resumable()
+
+    assert (job.id, job.command, job.recipient) == (job_id, "chat", "U1")
+    assert job.payload == {"user_message": "hi"}
+    assert job.attempts == 2
+    assert store.claim_resumable() == []
+
+
+def test_released_job_can_be_claimed_immediately(store):
+    """終了するワーカーが手放したジョブはすぐ拾えること"""
+    store.checkpoint("meal", "U1", "rtok", {})
+
+    assert store.release() == 1
+    assert store.counts() == {"pending": 1}
+    [job] = store.claim_resumable()
+
+    assert job.command == "meal"
+    assert store.counts() == {"in_flight": 1}
+
+
+def test_release_only_touches_own_jobs(store):
+    """他のワーカーが処理中のジョブは手放さないこと"""
+    store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+
+    assert store.release(owner="other-host:1") == 0
+    assert store.counts() == {"in_flight": 1}
+
+
+def test_release_skips_excluded_jobs(store):
+    """まだ処理を続けているジョブは手放さないこと"""
+    running = store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+    store.checkpoint("meal", "U2", "rtok2", {})
+
+    assert store.release(exclude=[running]) == 1
+    assert store.counts() == {"in_flight": 1, "pending": 1}
+
+
+def test_job_exceeding_max_attempts_is_marked_failed(tmp_path, clock):
+    """試行回数の上限に達したジョブは failed として残すこと"""
+    store = JobStore(
+        str(tmp_path / "jobs.sqlite3"), lease_seconds=60, max_attempts=2, clock=clock
+    )
+    store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+    clock.now += 61
+    assert len(store.claim_resumable()) == 1
+
+    clock.now += 61
+    assert store.claim_resumable() == []
+    assert store.counts() == {"failed": 1}
+
+
+def test_enqueued_job_is_claimed_once(store):
+    """積んだジョブは 1 回だけ取り出され、試行回数が 1 になること"""
+    job_id = store.enqueue("outfit", "U1", "rtok", {"text": "20度の服装"}, 990.0)
+
+    [job] = store.claim_resumable()
+
+    assert (job.id, job.attempts, job.created_at) == (job_id, 1, 990.0)
+    assert store.claim_resumable() == []
+
+
+def test_retry_waits_for_backoff(store, clock):
+    """再試行は指定した時間が経つまで取り出されないこと"""
+    store.enqueue("meal", "U1", "rtok", {})
+    [job] = store.claim_resumable()
+
+    assert store.retry(job.id, "boom", delay_seconds=4) is True
+    assert store.claim_resumable() == []
+    clock.now += 4
+    [retried] = store.claim_resumable()
+    assert retried.attempts == 2
+
+
+def test_retry_after_last_attempt_marks_failed(tmp_path, clock):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"), max_attempts=1, clock=clock)
+    store.enqueue("meal", "U1", "rtok", {})
+    [job] = store.claim_resumable()
+
+    store.retry(job.id, "boom", delay_seconds=1)
+
+    assert store.counts() == {"failed": 1}
+
+
+def test_retry_of_completed_job_is_noop(store):
+    job_id = store.enqueue("meal", "U1", "rtok", {})
+    store.claim_resumable()
+    store.complete(job_id)
+
+    assert store.retry(job_id, "boom", delay_seconds=1) is False
+
+
+def test_concurrent_claims_never_hand_out_a_job_twice(tmp_path):
+    """複数スレッドから同時に取り出しても、同じジョブを二重に渡さないこと"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_ids = {store.enqueue("chat", "U1", None, {"n": n}) for n in range(100)}
+    claimed: list[str] = []
+
+    def claim_all():
+        while jobs := store.claim_resumable(limit=3):
+            claimed.extend(job.id for job in jobs)
+
+    threads = [threading.Thread(target=claim_all) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def _release_in_child(path: str) -> None:
+    JobStore(path).release()
+
+
+def test_jobs_are_shared_between_processes(store):
+    """別プロセスが手放したジョブを拾えること（フォーク後は接続を作り直す）"""
+    store.checkpoint("chat", "U1", "rtok", {"user_message": "hi"})
+    # 子プロセスは親と同じ持ち主名にならないので、親の行は触られない
+    process = multiprocessing.get_context("fork").Process(
+        target=_release_in_child, args=(store.path,)
+    )
+    process.start()
+    process.join(timeout=10)
+
+    assert process.exitcode == 0
+    assert store.counts() == {"in_flight": 1}
+    assert store.release() == 1
@@ -0,0 +1,56 @@
+"""事前シリアライズした返信のテスト"""
+
+import json
+from unittest.mock import MagicMock
+
+from linebot.v3.messaging.models import TextMessage
+
+from src.infrastructure.line_model.prepared_reply import (
+    meal_feedback_thanks_reply,
+    prepare_reply,
+    send_prepared_reply,
+)
+
+
+def test_body_matches_sdk_serialization():
+    """トークンを差し込んだ JSON が ReplyMessageRequest の JSON と一致すること"""
+    prepared = prepare_reply(
+        [TextMessage(text='"引用"\nと改行', quickReply=None, quoteToken=None)]
+    )
+
+    body = prepared.body("token-1")
+
+    assert body == prepared.to_request("token-1").to_json().encode("utf-8")
+    assert json.loads(body)["replyToken"] == "token-1"
+
+
+def test_static_replies_are_built_once():
+    assert meal_feedback_thanks_reply() is meal_feedback_thanks_reply()
+
+
+def test_send_prepared_reply_uses_fast_path_when_available():
+    adapter = MagicMock()
+    prepared = meal_feedback_thanks_reply()
+
+    send_prepared_reply(adapter, "token", prepared)
+
+    adapter.reply_prepared.assert_called_once_with("token", prepared)
+    adapter.reply_message.assert_not_called()
+
+
+def test_send_prepared_reply_falls_back_to_reply_message():
+    """reply_prepared を持たないアダプタには通常の ReplyMessageRequest を送ること"""
+
+    class ReplyOnlyAdapter:
+        def __init__(self):
+            self.requests = []
+
+        def reply_message(self, request):
+            self.requests.append(request)
+
+    adapter = ReplyOnlyAdapter()
+
+    send_prepared_reply(adapter, "token", meal_feedback_thanks_reply())
+
+    assert adapter.requests[0].reply_token == "token"
+    assert adapter.requests[0].messages[0].text == "評価ありがとうございます!😊"
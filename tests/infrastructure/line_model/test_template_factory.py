@@ -0,0 +1,118 @@
+"""テンプレートファクトリのテスト"""
+
+import json
+
+from linebot.v3.messaging.models import (
+    ButtonsTemplate,
+    PostbackAction,
+    ReplyMessageRequest,
+    TemplateMessage,
+)
+
+from src.domain.models.digimon_info import DigimonInfo
+from src.domain.models.pokemon_info import PokemonInfo
+from src.infrastructure.line_model.template_factory import (
+    build_pokemon_zukan_template,
+    digimon_zukan_message,
+    janken_options_message,
+    meal_feedback_payload,
+    meal_feedback_template,
+    pokemon_zukan_message,
+)
+
+
+def _pikachu(**overrides) -> PokemonInfo:
+    fields = dict(
+        zukan_no=25,
+        name="ピカチュウ",
+        types=["electric"],
+        image_url="https://example.com/25.png",
+    )
+    fields.update(overrides)
+    return PokemonInfo(**fields)
+
+
+class TestPokemonZukanMessage:
+    def test_same_input_returns_cached_instance(self):
+        """同じ入力なら同じインスタンスを返すこと"""
+        first = pokemon_zukan_message(_pikachu())
+        second = pokemon_zukan_message(_pikachu())
+
+        assert first is second
+
+    def test_different_input_is_not_shared(self):
+        """入力のどこかが違えば別のテンプレートになること"""
+        first = pokemon_zukan_message(_pikachu())
+        second = pokemon_zukan_message(_pikachu(image_url=None))
+
+        assert first is not second
+        assert "0.png" in second.message.template.thumbnail_image_url
+
+    def test_payload_matches_uncached_build(self):
+        """JSON 表現がキャッシュなしで組み立てたものと一致すること"""
+        prebuilt = pokemon_zukan_message(_pikachu())
+        expected = build_pokemon_zukan_template(_pikachu()).to_dict()
+
+        assert prebuilt.payload == expected
+        assert json.loads(prebuilt.json) == expected
+
+    def test_accepts_mapping(self):
+        prebuilt = pokemon_zukan_message({"zukan_no": 25, "name": "ピカチュウ"})
+
+        assert prebuilt.message.template.title == "No.0025 ピカチュウ"
+
+
+def test_digimon_zukan_message_is_cached():
+    info = DigimonInfo(id=1, name="Agumon", level="Rookie", image_url=None)
+
+    assert digimon_zukan_message(info) is digimon_zukan_message(info)
+    assert digimon_zukan_message(info).payload["altText"] == "デジモン図鑑"
+
+
+def test_janken_options_message_is_static():
+    prebuilt = janken_options_message()
+
+    assert prebuilt is janken_options_message()
+    datas = [action["data"] for action in prebuilt.payload["template"]["actions"]]
+    assert datas == ["janken:✊", "janken:✌️", "janken:✋"]
+
+
+def test_meal_feedback_template_serializes_like_validated_model():
+    """検証を省いて組み立てても、検証済みモデルと同じ JSON になること"""
+    expected = TemplateMessage(
+        altText="料理提案の評価をお願いします",
+        template=ButtonsTemplate(
+            title="評価",
+            text="この提案はいかがでしたか？",
+            actions=[
+                PostbackAction(
+                    label=label,
+                    data=f"meal_feedback:42:{score}",
+                    displayText=None,
+                    inputOption=None,
+                    fillInText=None,
+                )
+                for label, score in (("😊 良い", 100), ("😐 普通", 50), ("😞 悪い", 0))
+            ],
+            thumbnailImageUrl=None,
+            imageAspectRatio=None,
+            imageSize=None,
+            imageBackgroundColor=None,
+            defaultAction=None,
+        ),
+        quickReply=None,
+    )
+
+    template = meal_feedback_template(42)
+
+    assert template.to_dict() == expected.to_dict()
+    request = ReplyMessageRequest(
+        replyToken="token", messages=[template], notificationDisabled=False
+    )
+    assert request.to_dict()["messages"][0] == expected.to_dict()
+
+
+def test_meal_feedback_payload_matches_template():
+    """事前に組み立てた JSON 表現がモデルから作ったものと一致し、使い回されないこと"""
+    assert meal_feedback_payload(7) == meal_feedback_template(7).to_dict()
+    assert meal_feedback_payload(8) != meal_feedback_payload(7)
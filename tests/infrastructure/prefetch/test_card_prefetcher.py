@@ -0,0 +1,110 @@
+"""CardPrefetcher のテスト"""
+
+import threading
+
+from src.infrastructure.metrics import MetricsRegistry
+from src.infrastructure.prefetch.card_prefetcher import (
+    CardPrefetcher,
+    PrefetcherRegistry,
+)
+
+
+def _wait_for_depth(prefetcher: CardPrefetcher, depth: int) -> None:
+    for _ in range(200):
+        if prefetcher.depth() >= depth:
+            return
+        threading.Event().wait(0.005)
+    raise AssertionError(f"depth {prefetcher.depth()} < {depth}")
+
+
+def _prefetcher(fetch, capacity=2, registry=None) -> CardPrefetcher:
+    return CardPrefetcher(
+        "pokemon",
+        fetch,
+        lambda info: {"card": info},
+        capacity=capacity,
+        retry_seconds=0.01,
+        metrics_registry=registry or MetricsRegistry(),
+    )
+
+
+def test_take_returns_prefetched_card_and_refills():
+    """取り出した分がバックグラウンドで補充され、refill lag が記録されること"""
+    counter = iter(range(100))
+    registry = MetricsRegistry()
+    prefetcher = _prefetcher(lambda: next(counter), registry=registry)
+    prefetcher.start()
+    try:
+        _wait_for_depth(prefetcher, 2)
+
+        card = prefetcher.take()
+        assert card.info == 0
+        assert card.message == {"card": 0}
+
+        _wait_for_depth(prefetcher, 2)
+        snapshot = prefetcher.snapshot()
+        assert snapshot["depth"] == 2
+        assert snapshot["hit"] == 1
+        assert snapshot["refill_lag_p99"] is not None
+    finally:
+        prefetcher.stop()
+
+
+def test_take_on_empty_buffer_counts_fallback():
+    """空なら None を返し、上流へのフォールバックとして数えること"""
+    release = threading.Event()
+
+    def slow_fetch():
+        release.wait(1)
+        return None
+
+    prefetcher = _prefetcher(slow_fetch)
+    try:
+        assert prefetcher.take() is None
+        assert prefetcher.snapshot()["fallback"] == 1
+    finally:
+        release.set()
+        prefetcher.stop()
+
+
+def test_fetch_failures_are_retried():
+    """取得に失敗しても止まらずに再試行すること"""
+    results = iter([None, RuntimeError("boom"), "ok"])
+
+    def flaky_fetch():
+        result = next(results, "ok")
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    registry = MetricsRegistry()
+    prefetcher = _prefetcher(flaky_fetch, capacity=1, registry=registry)
+    prefetcher.start()
+    try:
+        _wait_for_depth(prefetcher, 1)
+        assert registry.get("prefetch.pokemon.fetch_failed") == 2
+    finally:
+        prefetcher.stop()
+
+
+def test_registry_snapshot_and_reset_stops_prefetchers():
+    prefetcher = _prefetcher(lambda: None)
+    registry = PrefetcherRegistry()
+    registry.register(prefetcher)
+
+    assert registry.snapshot()["pokemon"]["depth"] == 0
+    registry.reset()
+    assert registry.snapshot() == {}
+    assert prefetcher.take() is None
+
+
+def test_registry_start_all_starts_registered_prefetchers():
+    prefetcher = _prefetcher(lambda: {"id": 1}, capacity=1)
+    registry = PrefetcherRegistry()
+    registry.register(prefetcher)
+    try:
+        assert prefetcher.depth() == 0
+        registry.start_all()
+        _wait_for_depth(prefetcher, 1)
+    finally:
+        registry.reset()
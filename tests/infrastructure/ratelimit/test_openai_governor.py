@@ -0,0 +1,173 @@
+"""OpenAIGovernor のテスト"""
+
+import threading
+import time
+
+import pytest
+
+from src.infrastructure.metrics import MetricsRegistry
+from src.infrastructure.ratelimit.openai_governor import (
+    KIND_IMAGE,
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    REJECTED_METRIC,
+    GovernorBusyError,
+    GovernorLimits,
+    OpenAIGovernor,
+)
+from src.infrastructure.ratelimit.shared_state import FileStateStore
+
+
+def _limits(**overrides) -> GovernorLimits:
+    values = {
+        "requests_per_minute": 600,
+        "tokens_per_minute": 6000,
+        "images_per_minute": 60,
+        "max_concurrency": 2,
+        "queue_size": 8,
+        "max_wait_seconds": 1.0,
+        "lease_seconds": 60,
+    }
+    values.update(overrides)
+    return GovernorLimits(**values)
+
+
+def _governor(**overrides) -> OpenAIGovernor:
+    return OpenAIGovernor(_limits(**overrides), metrics_registry=MetricsRegistry())
+
+
+def test_fast_fails_when_request_budget_is_exhausted():
+    """RPM を使い切ったら期限を超える待ちはせず即座に失敗すること"""
+    governor = _governor(requests_per_minute=1)
+    governor.acquire("m").release()
+
+    started = time.monotonic()
+    with pytest.raises(GovernorBusyError):
+        governor.acquire("m", max_wait=0.5)
+
+    assert time.monotonic() - started < 0.1
+
+
+def test_token_usage_refunds_estimate():
+    """実際の使用トークン数で見積もりとの差分を戻すこと"""
+    governor = _governor(tokens_per_minute=1000)
+
+    permit = governor.acquire("m", estimated_tokens=900)
+    permit.release(used_tokens=100)
+
+    governor.acquire("m", estimated_tokens=800, max_wait=0).release()
+
+
+def test_token_budget_limits_large_requests():
+    """TPM が足りない場合は待ちが長すぎると判断して失敗すること"""
+    governor = _governor(tokens_per_minute=1000)
+    governor.acquire("m", estimated_tokens=900).release(used_tokens=900)
+
+    with pytest.raises(GovernorBusyError):
+        governor.acquire("m", estimated_tokens=900, max_wait=0.1)
+
+
+def test_concurrency_is_bounded_per_model():
+    """モデルごとに同時実行数を制限すること"""
+    governor = _governor(max_concurrency=1)
+    permit = governor.acquire("m")
+
+    with pytest.raises(GovernorBusyError):
+        governor.acquire("m", max_wait=0.1)
+    governor.acquire("other", max_wait=0).release()
+
+    permit.release()
+    governor.acquire("m", max_wait=0).release()
+
+
+def test_waiter_proceeds_when_slot_is_released():
+    """枠が空けば待っていた呼び出しが進むこと"""
+    governor = _governor(max_concurrency=1)
+    permit = governor.acquire("m")
+    threading.Timer(0.1, permit.release).start()
+
+    governor.acquire("m", max_wait=1).release()
+
+
+def test_higher_priority_waiter_goes_first():
+    """優先度の高い待ちが先に枠を取ること"""
+    governor = _governor(max_concurrency=1)
+    permit = governor.acquire("m")
+    order = []
+
+    def wait(priority, name):
+        with governor.acquire("m", priority=priority, max_wait=2):
+            order.append(name)
+
+    low = threading.Thread(target=wait, args=(PRIORITY_LOW, "low"))
+    low.start()
+    time.sleep(0.05)
+    high = threading.Thread(target=wait, args=(PRIORITY_HIGH, "high"))
+    high.start()
+    time.sleep(0.05)
+    permit.release()
+    low.join()
+    high.join()
+
+    assert order == ["high", "low"]
+
+
+def test_full_queue_is_rejected():
+    """待ち行列が満杯なら即座に失敗すること"""
+    registry = MetricsRegistry()
+    governor = OpenAIGovernor(
+        _limits(max_concurrency=1, queue_size=1), metrics_registry=registry
+    )
+    permit = governor.acquire("m")
+    waiter = threading.Thread(target=lambda: governor.acquire("m", max_wait=0.3))
+    waiter.start()
+    time.sleep(0.05)
+
+    with pytest.raises(GovernorBusyError):
+        governor.acquire("m")
+
+    permit.release()
+    waiter.join()
+    assert registry.get(REJECTED_METRIC) >= 1
+
+
+def test_penalize_drains_request_bucket():
+    """429 を受けたら全体のリクエスト枠を空にすること"""
+    governor = _governor()
+
+    governor.penalize("m")
+
+    with pytest.raises(GovernorBusyError):
+        governor.acquire("m", max_wait=0)
+
+
+def test_image_requests_use_image_limit():
+    """画像生成は images per minute で制限すること"""
+    governor = _governor(images_per_minute=1)
+    governor.acquire("dall-e-3", kind=KIND_IMAGE).release()
+
+    with pytest.raises(GovernorBusyError):
+        governor.acquire("dall-e-3", kind=KIND_IMAGE, max_wait=0)
+
+
+def test_state_is_shared_through_file_store(tmp_path):
+    """ファイルストア経由で別インスタンス（別ワーカー）と枠を共有すること"""
+    store_path = str(tmp_path / "governor.json")
+    first = OpenAIGovernor(
+        _limits(max_concurrency=1),
+        store=FileStateStore(store_path),
+        metrics_registry=MetricsRegistry(),
+    )
+    second = OpenAIGovernor(
+        _limits(max_concurrency=1),
+        store=FileStateStore(store_path),
+        metrics_registry=MetricsRegistry(),
+    )
+
+    permit = first.acquire("m")
+    with pytest.raises(GovernorBusyError):
+        second.acquire("m", max_wait=0.1)
+    assert second.snapshot()["in_flight"] == {"m": 1}
+
+    permit.release()
+    second.acquire("m", max_wait=0).release()
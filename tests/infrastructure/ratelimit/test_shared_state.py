@@ -0,0 +1,57 @@
+"""SharedStateStore のテスト"""
+
+import multiprocessing
+
+from src.infrastructure.ratelimit.shared_state import (
+    FileStateStore,
+    InMemoryStateStore,
+    create_state_store,
+)
+
+
+def _increment(state: dict) -> int:
+    state["count"] = state.get("count", 0) + 1
+    return state["count"]
+
+
+def _increment_many(path: str, times: int) -> None:
+    store = FileStateStore(path)
+    for _ in range(times):
+        store.transact(_increment)
+
+
+def test_in_memory_store_keeps_state():
+    """プロセス内の dict に状態を保持すること"""
+    store = InMemoryStateStore()
+
+    assert store.transact(_increment) == 1
+    assert store.transact(_increment) == 2
+
+
+def test_file_store_is_shared_between_processes(tmp_path):
+    """複数プロセスからの更新が失われないこと"""
+    path = str(tmp_path / "state.json")
+    processes = [
+        multiprocessing.Process(target=_increment_many, args=(path, 50))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+
+    assert FileStateStore(path).transact(lambda state: state["count"]) == 200
+
+
+def test_file_store_recovers_from_corrupted_file(tmp_path):
+    """壊れたファイルは空の状態として扱うこと"""
+    path = tmp_path / "state.json"
+    path.write_text("{broken", encoding="utf-8")
+
+    assert FileStateStore(str(path)).transact(_increment) == 1
+
+
+def test_create_state_store(tmp_path):
+    """パス指定の有無でバックエンドを選ぶこと"""
+    assert isinstance(create_state_store(None), InMemoryStateStore)
+    assert isinstance(create_state_store(str(tmp_path / "s.json")), FileStateStore)
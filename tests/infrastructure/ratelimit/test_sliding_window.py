@@ -0,0 +1,75 @@
+"""SlidingWindowLimiter のテスト"""
+
+import pytest
+
+from src.infrastructure.ratelimit.shared_state import FileStateStore
+from src.infrastructure.ratelimit.sliding_window import SlidingWindowLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_allows_up_to_limit_per_key():
+    """キーごとに上限まで許可すること"""
+    limiter = SlidingWindowLimiter("t", limit=2, window_seconds=60, clock=FakeClock())
+
+    assert limiter.hit("U1") is True
+    assert limiter.hit("U1") is True
+    assert limiter.hit("U1") is False
+    assert limiter.hit("U2") is True
+
+
+def test_previous_window_is_weighted_by_elapsed_time():
+    """直前の窓の件数を経過割合で按分すること"""
+    clock = FakeClock(0)
+    limiter = SlidingWindowLimiter("t", limit=4, window_seconds=60, clock=clock)
+    for _ in range(4):
+        limiter.hit("U1")
+
+    clock.now = 75  # 次の窓の 1/4 経過 → 直前の 4 件は 3 件分として数える
+    assert limiter.count("U1") == pytest.approx(3)
+    assert limiter.hit("U1") is True
+    assert limiter.hit("U1") is False
+
+    clock.now = 200
+    assert limiter.count("U1") == 0
+
+
+def test_rejected_hits_are_not_counted():
+    """拒否されたリクエストは件数に含めないこと"""
+    clock = FakeClock(0)
+    limiter = SlidingWindowLimiter("t", limit=1, window_seconds=60, clock=clock)
+    limiter.hit("U1")
+    for _ in range(10):
+        limiter.hit("U1")
+
+    assert limiter.count("U1") == 1
+
+
+def test_least_recently_used_keys_are_evicted():
+    """キー数の上限を超えたら古いキーから捨てること"""
+    limiter = SlidingWindowLimiter(
+        "t", limit=1, window_seconds=60, max_keys=2, clock=FakeClock()
+    )
+    limiter.hit("U1")
+    limiter.hit("U2")
+    limiter.hit("U3")
+
+    assert limiter.count("U1") == 0
+    assert limiter.hit("U1") is True
+
+
+def test_limits_are_shared_through_file_store(tmp_path):
+    """ファイルストアを使うと別インスタンスと件数を共有すること"""
+    path = str(tmp_path / "ratelimit.json")
+    clock = FakeClock()
+    first = SlidingWindowLimiter("t", 1, 60, store=FileStateStore(path), clock=clock)
+    second = SlidingWindowLimiter("t", 1, 60, store=FileStateStore(path), clock=clock)
+
+    assert first.hit("U1") is True
+    assert second.hit("U1") is False
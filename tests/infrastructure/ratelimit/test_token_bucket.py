@@ -0,0 +1,68 @@
+"""TokenBucket のテスト"""
+
+from src.infrastructure.ratelimit.token_bucket import TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def test_try_acquire_until_empty():
+    """容量分までは即時に取得できること"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=1, capacity=2, clock=clock)
+
+    assert bucket.try_acquire() is True
+    assert bucket.try_acquire() is True
+    assert bucket.try_acquire() is False
+
+
+def test_tokens_refill_over_time():
+    """時間経過でトークンが補充されること（容量が上限）"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=2, capacity=4, clock=clock)
+    assert bucket.try_acquire(4) is True
+
+    clock.now += 1
+    assert bucket.available == 2
+
+    clock.now += 10
+    assert bucket.available == 4
+
+
+def test_wait_time():
+    """不足分が貯まるまでの秒数を返すこと"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=4, capacity=4, clock=clock)
+    bucket.try_acquire(4)
+
+    assert bucket.wait_time(2) == 0.5
+    clock.now += 1
+    assert bucket.wait_time(2) == 0.0
+
+
+def test_acquire_waits_for_tokens():
+    """acquire はトークンが貯まるまで待つこと"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=10, capacity=1, clock=clock, sleep=clock.sleep)
+    bucket.try_acquire()
+
+    assert bucket.acquire() is True
+    assert clock.now == 0.1
+
+
+def test_acquire_gives_up_after_timeout():
+    """timeout 内に貯まらない場合は False を返すこと"""
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=1, capacity=1, clock=clock, sleep=clock.sleep)
+    bucket.try_acquire()
+
+    assert bucket.acquire(timeout=0.5) is False
+    assert clock.now == 0.0
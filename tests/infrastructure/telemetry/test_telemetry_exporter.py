@@ -0,0 +1,195 @@
+"""TelemetryExporter のテスト"""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.infrastructure.metrics import MetricsRegistry
+from src.infrastructure.telemetry.telemetry_exporter import (
+    TelemetryEvent,
+    TelemetryExporter,
+    TelemetrySpool,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RecordingSender:
+    def __init__(self, failures: int = 0):
+        self.sent: list[tuple[str, dict]] = []
+        self.failures = failures
+
+    def __call__(self, kind: str, fields: dict) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("PromptLayer is down")
+        self.sent.append((kind, fields))
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return TelemetrySpool(str(tmp_path / "telemetry.sqlite3"))
+
+
+def _exporter(sender, clock=None, registry=None, **kwargs) -> TelemetryExporter:
+    return TelemetryExporter(
+        sender,
+        autostart=False,
+        metrics_registry=registry or MetricsRegistry(),
+        logger=MagicMock(),
+        clock=clock or FakeClock(),
+        **kwargs,
+    )
+
+
+def test_submit_does_not_send_until_exported():
+    sender = RecordingSender()
+    exporter = _exporter(sender, round_size=2)
+
+    for score in (100, 50, 0):
+        assert exporter.submit("score", request_id=1, score=score) is True
+
+    assert sender.sent == []
+    assert exporter.export_once() == 2
+    assert exporter.export_once() == 1
+    assert [fields["score"] for _, fields in sender.sent] == [100, 50, 0]
+
+
+def test_failed_batch_is_retried_with_backoff():
+    """失敗したイベントと残りのイベントは、バックオフの後にまとめて送り直すこと"""
+    clock = FakeClock()
+    sender = RecordingSender(failures=2)
+    registry = MetricsRegistry()
+    exporter = _exporter(sender, clock=clock, registry=registry, retry_base_seconds=1.0)
+    exporter.submit("prompt", request_id=1)
+    exporter.submit("prompt", request_id=2)
+
+    assert exporter.export_once() == 0
+    assert exporter.export_once() == 0  # 1 秒たつまで送らない
+    clock.now += 1.0
+    assert exporter.export_once() == 0  # 2 回目の失敗で 2 秒待つ
+    clock.now += 2.0
+    assert exporter.export_once() == 2
+
+    assert [fields["request_id"] for _, fields in sender.sent] == [1, 2]
+    assert registry.get("telemetry.telemetry.failed") == 2
+
+
+def test_event_is_dropped_after_max_attempts():
+    clock = FakeClock()
+    registry = MetricsRegistry()
+    exporter = _exporter(
+        RecordingSender(failures=10), clock=clock, registry=registry, max_attempts=2
+    )
+    exporter.submit("score", request_id=1, score=100)
+
+    exporter.export_once()
+    clock.now += 60
+    exporter.export_once()
+
+    assert exporter.pending_count == 0
+    assert registry.get("telemetry.telemetry.dropped") == 1
+
+
+def test_overflow_and_close_persist_events_for_another_worker(spool):
+    """あふれた分・終了時に送れなかった分はスプールに残り、別のワーカーが送ること"""
+    exporter = _exporter(RecordingSender(failures=1), spool=spool, max_queue=1)
+    exporter.submit("score", request_id=1, score=100)
+    exporter.submit("score", request_id=2, score=0)  # あふれる
+    assert spool.count() == 1
+
+    exporter.export_once()  # 失敗して再試行待ちになる
+    assert exporter.close(timeout=0.1) == 1
+    assert spool.count() == 2
+
+    sender = RecordingSender()
+    other = _exporter(sender, spool=spool)
+    assert other.export_once() == 2
+    assert sorted(fields["request_id"] for _, fields in sender.sent) == [1, 2]
+    assert spool.count() == 0
+
+
+def test_spooled_rows_survive_a_crash_during_export(tmp_path):
+    """読み戻した行は送れるまで消えず、落ちたワーカーの分はリース切れ後に送られること"""
+    clock = FakeClock()
+    spool = TelemetrySpool(
+        str(tmp_path / "telemetry.sqlite3"), lease_seconds=30, clock=clock
+    )
+    spool.save([TelemetryEvent("score", {"request_id": 1, "score": 100})])
+
+    def crashing_sender(kind, fields):
+        raise SystemExit  # 送信中にワーカーが落ちる
+
+    with pytest.raises(SystemExit):
+        _exporter(crashing_sender, spool=spool).export_once()
+    assert spool.count() == 1
+
+    sender = RecordingSender()
+    other = _exporter(sender, spool=spool)
+    assert other.export_once() == 0  # リース中は他のワーカーも送らない
+    clock.now += 30
+    assert other.export_once() == 1
+    assert sender.sent == [("score", {"request_id": 1, "score": 100})]
+    assert spool.count() == 0
+
+
+def test_failed_spooled_rows_stay_in_spool_until_dropped(tmp_path):
+    """読み戻して送れなかった行はバックオフ付きでスプールに戻し、上限で消すこと"""
+    clock = FakeClock()
+    spool = TelemetrySpool(str(tmp_path / "telemetry.sqlite3"), clock=clock)
+    spool.save([TelemetryEvent("prompt", {"request_id": 1})])
+    registry = MetricsRegistry()
+    exporter = _exporter(
+        RecordingSender(failures=10),
+        clock=clock,
+        registry=registry,
+        spool=spool,
+        max_attempts=2,
+        retry_base_seconds=1.0,
+    )
+
+    assert exporter.export_once() == 0
+    assert exporter.pending_count == 0
+    assert spool.count() == 1
+    assert exporter.export_once() == 0  # 1 秒たつまで取り出さない
+    clock.now += 1.0
+    assert exporter.export_once() == 0  # 2 回目の失敗で捨てる
+
+    assert spool.count() == 0
+    assert registry.get("telemetry.telemetry.dropped") == 1
+
+
+def test_slow_sender_does_not_block_submit():
+    release = threading.Event()
+    sent = []
+
+    def slow_sender(kind, fields):
+        release.wait(5)
+        sent.append(fields)
+
+    exporter = TelemetryExporter(
+        slow_sender,
+        window_seconds=0.01,
+        metrics_registry=MetricsRegistry(),
+        logger=MagicMock(),
+    )
+
+    started = time.perf_counter()
+    exporter.submit("prompt", request_id=1)
+    exporter.submit("prompt", request_id=2)
+    assert time.perf_counter() - started < 0.1
+
+    release.set()
+    deadline = time.monotonic() + 2
+    while len(sent) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [fields["request_id"] for fields in sent] == [1, 2]
+    exporter.close(timeout=1)
@@ -0,0 +1,165 @@
+"""CircuitBreaker のテスト"""
+
+import pytest
+
+from src.infrastructure.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+)
+from src.infrastructure.metrics import MetricsRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _fail():
+    raise ConnectionError("down")
+
+
+def _breaker(clock=None, **kwargs) -> CircuitBreaker:
+    kwargs.setdefault("minimum_calls", 4)
+    kwargs.setdefault("window_size", 10)
+    kwargs.setdefault("open_seconds", 30)
+    return CircuitBreaker(
+        "upstream",
+        metrics_registry=MetricsRegistry(),
+        clock=clock or FakeClock(),
+        **kwargs,
+    )
+
+
+def _trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.minimum_calls):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+
+def test_opens_when_failure_rate_exceeds_threshold():
+    """失敗率が閾値を超えたら OPEN になること"""
+    breaker = _breaker()
+    breaker.call(lambda: "ok")
+    breaker.call(lambda: "ok")
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == CLOSED
+
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+
+    assert breaker.state == OPEN
+
+
+def test_open_circuit_fails_fast_without_calling():
+    """OPEN 中は関数を呼ばずに CircuitOpenError を送出すること"""
+    breaker = _breaker()
+    _trip(breaker)
+    calls = []
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.call(lambda: calls.append(1))
+
+    assert calls == []
+    assert excinfo.value.retry_after == 30
+    assert breaker.snapshot()["rejected"] == 1
+
+
+def test_half_open_success_closes_circuit():
+    """待機時間後の試行が成功したら CLOSED に戻ること"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _trip(breaker)
+
+    clock.now = 30
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls"] == 0
+
+
+def test_half_open_failure_reopens_circuit():
+    """HALF_OPEN での試行が失敗したら再び OPEN になること"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _trip(breaker)
+
+    clock.now = 30
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+
+    assert breaker.state == OPEN
+    clock.now = 45
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+
+def test_half_open_allows_limited_probes():
+    """HALF_OPEN では同時に 1 件だけ試行させること"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _trip(breaker)
+    clock.now = 30
+
+    def probe():
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: "second")
+        return "first"
+
+    assert breaker.call(probe) == "first"
+
+
+def test_non_failures_are_counted_as_success():
+    """is_failure が False の例外は失敗として数えないこと"""
+    breaker = _breaker()
+
+    for _ in range(10):
+        with pytest.raises(ValueError):
+            breaker.call(_raise_value_error, is_failure=lambda e: False)
+
+    assert breaker.state == CLOSED
+
+
+def _raise_value_error():
+    raise ValueError("not found")
+
+
+def test_not_attempted_calls_keep_half_open_and_return_probe():
+    """上流を呼ばなかった例外は HALF_OPEN を閉じず、試行枠を返すこと"""
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    _trip(breaker)
+    clock.now = 30
+
+    with pytest.raises(TimeoutError):
+        breaker.call(_raise_timeout, is_not_attempted=lambda e: True)
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "probe") == "probe"
+    assert breaker.state == CLOSED
+
+
+def _raise_timeout():
+    raise TimeoutError("busy")
+
+
+def test_registry_returns_same_breaker_and_snapshots(monkeypatch):
+    """名前ごとに同じブレーカーを返し、状態一覧を取得できること"""
+    monkeypatch.setenv("CIRCUIT_MIN_CALLS", "1")
+    registry = CircuitBreakerRegistry(metrics_registry=MetricsRegistry())
+
+    breaker = registry.get("pokeapi")
+    assert registry.get("pokeapi") is breaker
+    breaker.record_failure()
+
+    snapshot = registry.snapshot()
+    assert snapshot["pokeapi"]["state"] == OPEN
+    assert snapshot["pokeapi"]["failure_rate"] == 1.0
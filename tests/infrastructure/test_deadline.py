@@ -0,0 +1,103 @@
+"""処理期限（deadline）のテスト"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.infrastructure.deadline import (
+    MIN_CALL_SECONDS,
+    Deadline,
+    DeadlineExceededError,
+    DeadlineSettings,
+    call_timeout,
+    current_deadline,
+    deadline_scope,
+    event_deadline,
+    request_deadline,
+)
+from src.infrastructure.metrics import MetricsRegistry
+
+NOW = 1_700_000_000.0
+
+
+def _clock():
+    return NOW
+
+
+def test_without_deadline_default_timeout_is_used():
+    assert current_deadline() is None
+    assert call_timeout("pokeapi", 10) == 10
+
+
+def test_timeout_is_cut_to_remaining_budget():
+    registry = MetricsRegistry()
+    deadline = Deadline(NOW + 3, hard_limit=NOW + 30, clock=_clock)
+
+    with deadline_scope(deadline):
+        assert call_timeout("pokeapi", 10, metrics_registry=registry) == 3
+        assert call_timeout("pokeapi", 2, metrics_registry=registry) == 2
+
+    assert current_deadline() is None
+    assert registry.get("deadline.pokeapi.cut_short") == 1
+    assert registry.get("deadline.worker_kills_avoided") == 0
+
+
+def test_call_that_could_outlive_worker_counts_as_avoided_kill():
+    registry = MetricsRegistry()
+    deadline = Deadline(NOW + 20, hard_limit=NOW + 22, clock=_clock)
+
+    with deadline_scope(deadline):
+        assert call_timeout("openai.chat", 60, metrics_registry=registry) == 20
+
+    assert registry.get("deadline.worker_kills_avoided") == 1
+
+
+def test_expired_deadline_skips_call_unless_required():
+    registry = MetricsRegistry()
+
+    with deadline_scope(Deadline(NOW - 1, clock=_clock)):
+        with pytest.raises(DeadlineExceededError):
+            call_timeout("openai.chat", 10, metrics_registry=registry)
+        timeout = call_timeout(
+            "line", 10, skip_when_expired=False, metrics_registry=registry
+        )
+
+    assert timeout == MIN_CALL_SECONDS
+    assert registry.get("deadline.openai.chat.skipped") == 1
+
+
+def test_settings_are_read_from_env(monkeypatch):
+    monkeypatch.setenv("TIMEOUT", "60")
+    monkeypatch.setenv("REQUEST_DEADLINE_MARGIN_MS", "3000")
+    monkeypatch.setenv("REQUEST_DEADLINE_MS", "40000")
+    monkeypatch.setenv("REQUEST_MIN_BUDGET_MS", "1000")
+
+    assert DeadlineSettings.from_env() == DeadlineSettings(60, 3, 40, 1)
+
+
+def test_request_deadline_leaves_margin_before_worker_timeout():
+    settings = DeadlineSettings(worker_timeout_seconds=30, margin_seconds=2)
+
+    deadline = request_deadline(_clock, settings)
+
+    assert (deadline.expires_at, deadline.hard_limit) == (NOW + 28, NOW + 30)
+
+
+def test_event_deadline_starts_from_event_timestamp():
+    settings = DeadlineSettings(budget_seconds=25)
+    parent = Deadline(NOW + 28, clock=_clock)
+    event = SimpleNamespace(timestamp=int((NOW - 4) * 1000))
+
+    assert event_deadline(event, parent, settings).expires_at == pytest.approx(NOW + 21)
+
+
+def test_redelivered_event_keeps_minimum_budget_within_parent():
+    settings = DeadlineSettings(min_budget_seconds=5)
+    event = SimpleNamespace(timestamp=int((NOW - 600) * 1000))
+
+    assert event_deadline(
+        event, Deadline(NOW + 28, clock=_clock), settings
+    ).expires_at == (NOW + 5)
+    assert event_deadline(
+        event, Deadline(NOW + 2, clock=_clock), settings
+    ).expires_at == (NOW + 2)
@@ -0,0 +1,89 @@
+"""gunicorn_tuning のテスト"""
+
+import pytest
+
+from src.infrastructure import gunicorn_tuning
+from src.infrastructure.gunicorn_tuning import (
+    HostResources,
+    autotune,
+    autotune_from_env,
+)
+
+GIB = 1024 * 1024 * 1024
+
+
+def test_threads_follow_io_wait_ratio_per_core():
+    """コアあたりの並行数が 1 / (1 - 待ち時間の割合) になること"""
+    config = autotune(HostResources(cpu_count=4, memory_bytes=8 * GIB))
+
+    assert config.worker_class == "gthread"
+    assert config.gunicorn_worker_class == "gthread"
+    assert (config.workers, config.threads) == (4, 10)
+
+
+def test_single_core_keeps_two_workers_and_splits_threads():
+    config = autotune(
+        HostResources(cpu_count=1, memory_bytes=8 * GIB), io_wait_ratio=0.8
+    )
+
+    assert (config.workers, config.threads) == (2, 3)
+
+
+def test_workers_are_capped_by_memory():
+    """メモリに収まらないワーカーは起動しないこと"""
+    config = autotune(
+        HostResources(cpu_count=8, memory_bytes=512 * 1024 * 1024),
+        worker_memory_mb=150,
+    )
+
+    assert config.workers == 2
+    assert config.threads == 32
+
+
+def test_explicit_workers_and_threads_win(monkeypatch):
+    monkeypatch.setenv("WORKERS", "3")
+    monkeypatch.setenv("THREADS", "7")
+
+    config = autotune_from_env(HostResources(cpu_count=16, memory_bytes=None))
+
+    assert (config.workers, config.threads) == (3, 7)
+    assert "workers=3 threads=7" in config.describe()
+
+
+def test_missing_gevent_falls_back_to_gthread(monkeypatch):
+    monkeypatch.setattr(gunicorn_tuning.importlib.util, "find_spec", lambda _: None)
+
+    config = autotune(
+        HostResources(cpu_count=2, memory_bytes=None), worker_class="gevent"
+    )
+
+    assert config.worker_class == "gthread"
+    assert config.worker_connections is None
+    assert "fell back to gthread" in config.describe()
+
+
+def test_gevent_sets_worker_connections(monkeypatch):
+    monkeypatch.setattr(gunicorn_tuning.importlib.util, "find_spec", lambda _: object())
+
+    config = autotune(
+        HostResources(cpu_count=2, memory_bytes=None), worker_class="gevent"
+    )
+
+    assert config.gunicorn_worker_class == "gevent"
+    assert config.worker_connections == 100
+
+
+def test_unknown_worker_class_is_rejected():
+    with pytest.raises(ValueError):
+        autotune(HostResources(cpu_count=1, memory_bytes=None), worker_class="sync")
+
+
+def test_detect_reads_cgroup_v2_limits(tmp_path):
+    """cgroup v2 の CPU・メモリ上限を読むこと"""
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    (tmp_path / "memory.max").write_text(str(GIB) + "\n")
+
+    resources = HostResources.detect(cgroup_root=str(tmp_path))
+
+    assert resources.cpu_count <= 2
+    assert resources.memory_bytes == GIB
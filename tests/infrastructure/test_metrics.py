@@ -0,0 +1,60 @@
+"""MetricsRegistry のテスト"""
+
+from src.infrastructure.metrics import MetricsRegistry
+
+
+def test_increment_and_get():
+    """カウンタを加算して取得できること"""
+    registry = MetricsRegistry()
+    registry.increment("a")
+    registry.increment("a", 2)
+
+    assert registry.get("a") == 3
+    assert registry.get("missing") == 0
+
+
+def test_snapshot_filters_by_prefix():
+    """snapshot がプレフィックスで絞り込めること"""
+    registry = MetricsRegistry()
+    registry.increment("janken.lookup")
+    registry.increment("janken.fallback")
+    registry.increment("other")
+
+    assert registry.snapshot("janken.") == {
+        "janken.fallback": 1,
+        "janken.lookup": 1,
+    }
+    assert len(registry.snapshot()) == 3
+
+
+def test_reset_clears_counters():
+    """reset でカウンタが消えること"""
+    registry = MetricsRegistry()
+    registry.increment("a")
+    registry.reset()
+
+    assert registry.snapshot() == {}
+
+
+def test_observe_and_summary():
+    """計測値からパーセンタイルを算出できること"""
+    registry = MetricsRegistry()
+    for value in range(1, 101):
+        registry.observe("latency", float(value))
+
+    summary = registry.summary("latency")
+
+    assert summary["count"] == 100
+    assert summary["p50"] == 50.0
+    assert summary["p90"] == 90.0
+    assert summary["max"] == 100.0
+    assert registry.percentile("latency", 0.99) == 99.0
+    assert registry.get("latency.count") == 100
+
+
+def test_summary_of_unknown_metric_is_empty():
+    """未計測のメトリクスは空の集計を返すこと"""
+    registry = MetricsRegistry()
+
+    assert registry.summary("missing") == {}
+    assert registry.percentile("missing", 0.9) is None
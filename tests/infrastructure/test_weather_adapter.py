@@ -329,3 +329,49 @@ def test_extreme_temperature_values(monkeypatch):
     assert "39℃" in res
     assert "42℃" in res
     assert "30%" in res
+
+
+def test_open_circuit_skips_request(monkeypatch):
+    """障害が続いたら API を呼ばずにすぐ返すこと"""
+    from src.infrastructure.circuit_breaker import CircuitBreaker
+    from src.infrastructure.metrics import MetricsRegistry
+
+    monkeypatch.setenv("OPENWEATHERMAP_API_KEY", "dummy")
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(url)
+        return FakeResponse(status_code=503)
+
+    monkeypatch.setattr("requests.get", fake_get)
+    breaker = CircuitBreaker(
+        "openweathermap", minimum_calls=2, metrics_registry=MetricsRegistry()
+    )
+    adapter = WeatherAdapter(circuit_breaker=breaker)
+
+    adapter.get_weather_text("Tokyo")
+    adapter.get_weather_text("Tokyo")
+    res = adapter.get_weather_text("Tokyo")
+
+    assert len(calls) == 2
+    assert "しばらくしてから" in res
+
+
+def test_location_not_found_does_not_trip_circuit(monkeypatch):
+    """404 は上流の障害として数えないこと"""
+    from src.infrastructure.circuit_breaker import CLOSED, CircuitBreaker
+    from src.infrastructure.metrics import MetricsRegistry
+
+    monkeypatch.setenv("OPENWEATHERMAP_API_KEY", "dummy")
+    monkeypatch.setattr(
+        "requests.get", lambda url, params=None, timeout=None: FakeResponse(404)
+    )
+    breaker = CircuitBreaker(
+        "openweathermap", minimum_calls=2, metrics_registry=MetricsRegistry()
+    )
+    adapter = WeatherAdapter(circuit_breaker=breaker)
+
+    for _ in range(3):
+        adapter.get_weather_text("NoSuchCity")
+
+    assert breaker.state == CLOSED
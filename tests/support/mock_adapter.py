@@ -6,7 +6,9 @@ class MockMessagingAdapter:
         self.access_token: str | None = None
         self._replies: List[Any] = []
         self._pushes: List[Any] = []
+        self._enqueued_pushes: List[Any] = []
         self.inited: bool = False
+        self.invalidated_user_ids: List[str] = []
 
     def init(self, access_token: str):
         self.access_token = access_token
@@ -19,10 +21,19 @@ class MockMessagingAdapter:
     def push_message(self, push_message_request):
         self._pushes.append(push_message_request)
 
+    def enqueue_push(self, to: str, messages) -> None:
+        self._enqueued_pushes.append((to, list(messages)))
+
     def get_display_name_from_line_profile(self, user_id: str) -> str | None:
         # Mock implementation - returns a test display name
         return f"TestUser_{user_id}" if user_id else None
 
+    def get_cached_display_name(self, user_id: str) -> tuple[bool, str | None]:
+        return False, None
+
+    def invalidate_display_name(self, user_id: str) -> None:
+        self.invalidated_user_ids.append(user_id)
+
     # Helper methods for tests
     def get_replies(self) -> List[Any]:
         return list(self._replies)
@@ -30,9 +41,13 @@ class MockMessagingAdapter:
     def get_pushes(self) -> List[Any]:
         return list(self._pushes)
 
+    def get_enqueued_pushes(self) -> List[Any]:
+        return list(self._enqueued_pushes)
+
     def reset(self) -> None:
         self._replies.clear()
         self._pushes.clear()
+        self._enqueued_pushes.clear()
 
 
 __all__ = ["MockMessagingAdapter"]